@@ -0,0 +1,129 @@
+"""
+Mide el cierre mensual (EstadisticaMensual.guardar_estadisticas_y_limpiar) sobre una base generada.
+
+Crea una base SQLite temporal con --usuarios usuarios y gastos repartidos en tres meses,
+con sus balances, y mide el cierre del mes del medio: tiempo, consultas ejecutadas y
+gastos eliminados. El archivo columnar del mes se escribe en la misma carpeta temporal.
+Con --referencia también mide, sobre una base idéntica, el cierre anterior (un
+update_or_create, un SUM y un DELETE con señales por usuario).
+
+El esquema se crea directamente desde los modelos (syncdb), sin aplicar las migraciones.
+
+Uso:
+    python benchmarks/cierre_mensual.py [--usuarios 10000] [--gastos-por-mes 5] [--referencia]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gastos.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection, connections, transaction  # noqa: E402
+from django.db.models import Sum  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from gastitos.models import BalanceDiario, BalanceMensual, EstadisticaMensual, Gasto  # noqa: E402
+
+AÑO, MES = 2025, 3
+
+
+def cierre_por_usuario(año, mes):
+    """Cierre anterior: una transacción y varias consultas por usuario"""
+    inicio_mes = timezone.make_aware(datetime(año, mes, 1))
+    inicio_siguiente = timezone.make_aware(datetime(año + mes // 12, mes % 12 + 1, 1))
+    for usuario in User.objects.all():
+        with transaction.atomic():
+            gastos_mes = Gasto.objects.filter(usuario=usuario, fecha__gte=inicio_mes, fecha__lt=inicio_siguiente)
+            total = gastos_mes.aggregate(total=Sum('monto'))['total'] or Decimal('0')
+            EstadisticaMensual.objects.update_or_create(
+                usuario=usuario, año=año, mes=mes, defaults={'total_gastos': total}
+            )
+            gastos_mes.delete()
+
+
+def preparar_base(ruta, usuarios, gastos_por_mes, semilla=0):
+    """Crea el esquema en `ruta` y la llena con usuarios, gastos y balances"""
+    connections.close_all()
+    settings.DATABASES['default']['NAME'] = ruta
+    settings.MIGRATION_MODULES = {'gastitos': None}
+    call_command('migrate', run_syncdb=True, verbosity=0)
+
+    generador = random.Random(semilla)
+    User.objects.bulk_create([User(username=f'usuario{i}') for i in range(usuarios)], batch_size=1000)
+    gastos = []
+    for usuario_id in User.objects.values_list('id', flat=True):
+        for mes in (MES - 1, MES, MES + 1):
+            for _ in range(generador.randint(0, 2 * gastos_por_mes)):
+                gastos.append(Gasto(
+                    usuario_id=usuario_id,
+                    descripcion='Gasto de prueba',
+                    monto=Decimal(generador.randint(100, 5000000)) / 100,
+                    fecha=timezone.make_aware(datetime(AÑO, mes, generador.randint(1, 28), generador.randint(0, 23))),
+                ))
+    fechas = [gasto.fecha for gasto in gastos]
+    Gasto.objects.bulk_create(gastos, batch_size=2000)
+    # Gasto.fecha es auto_now_add: aplicar las fechas generadas después del insert
+    for gasto, fecha in zip(gastos, fechas):
+        gasto.fecha = fecha
+    Gasto.objects.bulk_update(gastos, ['fecha'], batch_size=2000)
+    BalanceMensual.reconciliar()
+    BalanceDiario.reconciliar()
+    return len(gastos)
+
+
+def medir(funcion):
+    consultas = []
+
+    def contar(execute, sql, params, many, context):
+        consultas.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(contar):
+        inicio = time.perf_counter()
+        funcion(AÑO, MES)
+        segundos = time.perf_counter() - inicio
+    return segundos, len(consultas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--usuarios', type=int, default=10000)
+    parser.add_argument('--gastos-por-mes', type=int, default=5, help='Promedio de gastos por usuario y mes')
+    parser.add_argument('--referencia', action='store_true', help='Medir también el cierre por usuario')
+    args = parser.parse_args()
+
+    implementaciones = [('por lotes', EstadisticaMensual.guardar_estadisticas_y_limpiar)]
+    if args.referencia:
+        implementaciones.insert(0, ('por usuario', cierre_por_usuario))
+
+    print(f'Python {sys.version.split()[0]}, SQLite {connection.Database.sqlite_version}')
+    print(f'{args.usuarios} usuarios, ~{args.gastos_por_mes} gastos por usuario y mes\n')
+    print(f'{"cierre":<14}{"gastos":>10}{"eliminados":>12}{"consultas":>11}{"tiempo (s)":>12}')
+    with tempfile.TemporaryDirectory() as directorio:
+        for numero, (nombre, funcion) in enumerate(implementaciones):
+            total = preparar_base(os.path.join(directorio, f'base{numero}.sqlite3'), args.usuarios, args.gastos_por_mes)
+            settings.ARCHIVO_GASTOS_DIR = os.path.join(directorio, f'archivo{numero}')
+            antes = Gasto.objects.count()
+            segundos, consultas = medir(funcion)
+            eliminados = antes - Gasto.objects.count()
+            print(f'{nombre:<14}{total:>10}{eliminados:>12}{consultas:>11}{segundos:>12.2f}')
+        connections.close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""Utilidades compartidas por los benchmarks"""
+import contextlib
+import io
+import subprocess
+import types
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def funcion_de_referencia(commit, nombre, ruta='gastitos/utils.py'):
+    """
+    Carga una función desde la versión de un módulo en otro commit, para comparar
+    la implementación actual con una anterior. La salida por consola de la función
+    se descarta.
+    """
+    fuente = subprocess.run(
+        ['git', 'show', f'{commit}:{ruta}'],
+        capture_output=True, text=True, cwd=BASE_DIR, check=True
+    ).stdout
+    modulo = types.ModuleType(f'referencia_{nombre}')
+    modulo.__package__ = 'gastitos'
+    exec(compile(fuente, f'{commit}:{ruta}', 'exec'), modulo.__dict__)
+    funcion = getattr(modulo, nombre)
+
+    def sin_salida(*args, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return funcion(*args, **kwargs)
+    return sin_salida
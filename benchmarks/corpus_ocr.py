@@ -0,0 +1,226 @@
+"""
+Genera un corpus sintético de comprobantes e historiales de MercadoPago con su verdad.
+
+Cada muestra es una imagen dibujada con PIL a partir de un texto conocido:
+
+- comprobantes: fotos (JPEG) de un comprobante de pago con un total y una fecha, sobre
+  un fondo con gradiente; el ancho simula la resolución de la cámara;
+- historiales: capturas (PNG) de la lista de movimientos, con encabezados de fecha,
+  gastos, ingresos y líneas de ruido; el largo depende de la cantidad de filas.
+
+Las variantes combinan resolución, nivel de ruido (ruido gaussiano, y desenfoque en el
+nivel más alto) y, en los historiales, cantidad de filas. Con la misma semilla se
+generan las mismas imágenes. La verdad de cada muestra es lo que el pipeline de OCR
+debería extraer: monto y fecha del comprobante, o los gastos (monto y fecha) del
+historial, sin los ingresos.
+
+Uso:
+    python benchmarks/corpus_ocr.py --directorio /tmp/corpus_ocr [--por-variante 3] [--semilla 0]
+"""
+import argparse
+import io
+import json
+import random
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+RESOLUCIONES_COMPROBANTE = {'baja': 720, 'media': 1440, 'alta': 3024}  # ancho de la foto en px
+RESOLUCIONES_HISTORIAL = {'baja': 540, 'media': 1080, 'alta': 1440}  # ancho de la captura en px
+RUIDOS = {'limpio': 0, 'leve': 8, 'fuerte': 20}  # desvío del ruido gaussiano
+FILAS_HISTORIAL = [10, 40, 150]
+
+COMERCIOS = [
+    'Supermercado Dia', 'Farmacity', 'YPF Palermo', 'Carrefour Express', 'Kiosco El Sol',
+    'Libreria Rodriguez', 'Verduleria Don Jose', 'Pedidos Ya', 'Coto Digital', 'Easy Belgrano',
+]
+DESCRIPCIONES_HISTORIAL = [
+    'Pago Supermercado Dia', 'Transferencia enviada Juan Perez', 'Compra Farmacia',
+    'Pago Netflix', 'Recarga SUBE', 'Pago Edesur', 'Debito automatico Personal',
+    'Pago con QR Kiosco', 'Mercado Libre', 'Rappi Pedido',
+]
+
+
+def fuente(tamaño):
+    try:
+        return ImageFont.truetype('DejaVuSans.ttf', tamaño)
+    except OSError:
+        return ImageFont.load_default(size=tamaño)
+
+
+def formato_monto(monto, centavos=True):
+    """12345.67 -> '12.345,67' (formato argentino); sin centavos, '12.346'"""
+    if not centavos:
+        return f'{round(monto):,}'.replace(',', '.')
+    entero, decimales = f'{monto:.2f}'.split('.')
+    return f'{int(entero):,}'.replace(',', '.') + f',{decimales}'
+
+
+def texto_comprobante(generador):
+    monto = generador.randint(100, 25000000) / 100
+    fecha = date(2025, 1, 1) + timedelta(days=generador.randint(0, 364))
+    lineas = [
+        'MERCADO PAGO',
+        'Comprobante de pago',
+        f'Fecha: {fecha:%d/%m/%Y} {generador.randint(0, 23):02d}:{generador.randint(0, 59):02d}',
+        f'Destinatario: {generador.choice(COMERCIOS)}',
+        f'CVU {generador.randint(10 ** 21, 10 ** 22 - 1)}',
+        f'Operacion N {generador.randint(10 ** 10, 10 ** 11 - 1)}',
+        f'Total $ {formato_monto(monto)}',
+    ]
+    return lineas, {'monto': monto, 'fecha': fecha}
+
+
+def texto_historial(generador, filas):
+    """Líneas de un historial con `filas` movimientos; la verdad son solo los gastos"""
+    lineas, gastos = [], []
+    fecha = date(2025, 12, 31)
+    movimientos = 0
+    while movimientos < filas:
+        fecha -= timedelta(days=generador.randint(1, 3))
+        lineas.append(f'{fecha:%d/%m/%Y}')
+        for _ in range(min(generador.randint(1, 5), filas - movimientos)):
+            movimientos += 1
+            # El historial muestra pesos enteros ("$ 7.000"); extraer_gastos_historial
+            # prioriza los miles con punto y con centavos leería "1.234,56" como 1234
+            monto = float(generador.randint(1, 300000))
+            if generador.random() < 0.15:
+                lineas.append(f'Transferencia recibida + $ {formato_monto(monto, centavos=False)}')
+                continue
+            descripcion = f'{generador.choice(DESCRIPCIONES_HISTORIAL)} {generador.randint(1, 999)}'
+            lineas.append(f'{descripcion} $ {formato_monto(monto, centavos=False)}')
+            gastos.append({'monto': monto, 'fecha': fecha})
+            if generador.random() < 0.1:
+                lineas.append('Ver detalle')
+    return lineas, gastos
+
+
+def renderizar(lineas, ancho, ruido, generador, tamaño_fuente, alto=None, gradiente=False):
+    """Dibuja las líneas en escala de grises y les agrega ruido; devuelve un ndarray uint8"""
+    letra = fuente(tamaño_fuente)
+    interlineado = int(tamaño_fuente * 1.8)
+    margen = int(tamaño_fuente * 1.5)
+    alto = alto or 2 * margen + interlineado * len(lineas)
+
+    lienzo = Image.new('L', (ancho, alto), 250)
+    dibujo = ImageDraw.Draw(lienzo)
+    for numero, linea in enumerate(lineas):
+        dibujo.text((margen, margen + numero * interlineado), linea, fill=25, font=letra)
+    if ruido >= RUIDOS['fuerte']:
+        lienzo = lienzo.filter(ImageFilter.GaussianBlur(tamaño_fuente / 30))
+
+    pixeles = np.asarray(lienzo, dtype=np.float32)
+    if gradiente:
+        pixeles = pixeles - np.linspace(0, 45, ancho, dtype=np.float32)[None, :]
+    if ruido:
+        azar = np.random.default_rng(generador.randrange(2 ** 32))
+        pixeles = pixeles + azar.normal(0, ruido, pixeles.shape).astype(np.float32)
+    return np.clip(pixeles, 0, 255).astype(np.uint8)
+
+
+def codificar(pixeles, formato):
+    buffer = io.BytesIO()
+    if formato == 'JPEG':
+        Image.fromarray(pixeles).save(buffer, format='JPEG', quality=88)
+    else:
+        Image.fromarray(pixeles).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def generar_corpus(por_variante=3, semilla=0, resoluciones=None, ruidos=None, filas=None):
+    """
+    Genera las muestras de todas las variantes.
+
+    Returns:
+        list: dicts con 'nombre', 'tipo' ('comprobante' o 'historial'), 'resolucion',
+        'ruido', 'filas', 'ancho', 'alto', 'datos' (bytes de la imagen), 'texto' (el
+        texto dibujado) y 'verdad'
+    """
+    generador = random.Random(semilla)
+    resoluciones = resoluciones or list(RESOLUCIONES_COMPROBANTE)
+    ruidos = ruidos or list(RUIDOS)
+    filas = filas or FILAS_HISTORIAL
+    muestras = []
+
+    for resolucion in resoluciones:
+        for ruido in ruidos:
+            ancho = RESOLUCIONES_COMPROBANTE[resolucion]
+            for numero in range(por_variante):
+                lineas, verdad = texto_comprobante(generador)
+                # Foto 3:4 con el texto ocupando la parte de arriba del comprobante
+                pixeles = renderizar(lineas, ancho, RUIDOS[ruido], generador, ancho // 28,
+                                     alto=ancho * 4 // 3, gradiente=True)
+                muestras.append(_muestra(f'comprobante-{resolucion}-{ruido}-{numero}', 'comprobante',
+                                         resolucion, ruido, None, pixeles, 'JPEG', lineas, verdad))
+
+            ancho = RESOLUCIONES_HISTORIAL[resolucion]
+            for cantidad in filas:
+                for numero in range(por_variante):
+                    lineas, verdad = texto_historial(generador, cantidad)
+                    pixeles = renderizar(lineas, ancho, RUIDOS[ruido], generador, ancho // 34)
+                    muestras.append(_muestra(f'historial-{resolucion}-{ruido}-{cantidad}-{numero}', 'historial',
+                                             resolucion, ruido, cantidad, pixeles, 'PNG', lineas, verdad))
+    return muestras
+
+
+def _muestra(nombre, tipo, resolucion, ruido, filas, pixeles, formato, lineas, verdad):
+    return {
+        'nombre': nombre, 'tipo': tipo, 'resolucion': resolucion, 'ruido': ruido, 'filas': filas,
+        'ancho': pixeles.shape[1], 'alto': pixeles.shape[0],
+        'datos': codificar(pixeles, formato), 'extension': 'jpg' if formato == 'JPEG' else 'png',
+        'texto': '\n'.join(lineas), 'verdad': verdad,
+    }
+
+
+def _verdad_a_json(verdad):
+    if isinstance(verdad, list):
+        return [_verdad_a_json(gasto) for gasto in verdad]
+    return {'monto': verdad['monto'], 'fecha': verdad['fecha'].isoformat()}
+
+
+def _verdad_desde_json(verdad):
+    if isinstance(verdad, list):
+        return [_verdad_desde_json(gasto) for gasto in verdad]
+    return {'monto': verdad['monto'], 'fecha': date.fromisoformat(verdad['fecha'])}
+
+
+def guardar_corpus(muestras, directorio):
+    """Escribe las imágenes y un corpus.json con el texto y la verdad de cada una"""
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    indice = []
+    for muestra in muestras:
+        archivo = f'{muestra["nombre"]}.{muestra["extension"]}'
+        (directorio / archivo).write_bytes(muestra['datos'])
+        datos = {clave: valor for clave, valor in muestra.items() if clave not in ('datos', 'verdad')}
+        indice.append({**datos, 'archivo': archivo, 'verdad': _verdad_a_json(muestra['verdad'])})
+    (directorio / 'corpus.json').write_text(json.dumps(indice, indent=1, ensure_ascii=False), encoding='utf-8')
+
+
+def cargar_corpus(directorio):
+    directorio = Path(directorio)
+    muestras = []
+    for muestra in json.loads((directorio / 'corpus.json').read_text(encoding='utf-8')):
+        muestra['datos'] = (directorio / muestra.pop('archivo')).read_bytes()
+        muestra['verdad'] = _verdad_desde_json(muestra['verdad'])
+        muestras.append(muestra)
+    return muestras
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--directorio', required=True)
+    parser.add_argument('--por-variante', type=int, default=3, help='Muestras por combinación de parámetros')
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args()
+
+    muestras = generar_corpus(args.por_variante, args.semilla)
+    guardar_corpus(muestras, args.directorio)
+    megabytes = sum(len(muestra['datos']) for muestra in muestras) / (1024 * 1024)
+    print(f'{len(muestras)} imágenes ({megabytes:.1f} MB) en {args.directorio}')
+
+
+if __name__ == '__main__':
+    main()
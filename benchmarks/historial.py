@@ -0,0 +1,79 @@
+"""
+Mide extraer_gastos_historial sobre historiales sintéticos de MercadoPago.
+
+Genera textos con encabezados de fecha, gastos, ingresos (con '+') y líneas de
+ruido, y mide el tiempo del parser actual para varios tamaños. Con --referencia
+también mide la versión de gastitos/utils.py de ese commit (por ejemplo, la
+anterior al tokenizador), con su salida por consola descartada.
+
+Uso:
+    python benchmarks/historial.py [--lineas 1000 5000 10000] [--referencia <commit>]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from benchmarks.comun import funcion_de_referencia  # noqa: E402
+from gastitos.utils import extraer_gastos_historial  # noqa: E402
+
+DESCRIPCIONES = [
+    'Pago Supermercado Dia', 'Transferencia enviada Juan Perez', 'Compra Farmacia',
+    'Pago Netflix', 'Recarga SUBE', 'Pago Edesur', 'Débito automático Personal',
+    'Pago con QR Kiosco', 'Mercado Libre', 'Rappi*Pedido',
+]
+
+
+def historial_sintetico(lineas, semilla=0):
+    generador = random.Random(semilla)
+    resultado = []
+    while len(resultado) < lineas:
+        resultado.append(f'{generador.randint(1, 28):02d}/{generador.randint(1, 12):02d}/2025')
+        for _ in range(generador.randint(2, 8)):
+            descripcion = f'{generador.choice(DESCRIPCIONES)} {generador.randint(1, 999)}'
+            monto = f'{generador.randint(1, 250)}.{generador.randint(0, 999):03d}'
+            tipo = generador.random()
+            if tipo < 0.1:
+                resultado.append(f'Transferencia recibida + $ {monto}')
+            elif tipo < 0.2:
+                resultado.append(generador.choice(['Hoy', 'Ver detalle', 'Ok']))
+            else:
+                resultado.append(f'{descripcion} $ {monto},{generador.randint(0, 99):02d}')
+    return '\n'.join(resultado[:lineas])
+
+
+def medir(funcion, texto, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(texto)
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--lineas', type=int, nargs='+', default=[1000, 5000, 10000])
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--referencia', help='Commit con el parser a comparar')
+    args = parser.parse_args()
+
+    parsers = [('actual', extraer_gastos_historial)]
+    if args.referencia:
+        parsers.insert(0, (args.referencia, funcion_de_referencia(args.referencia, 'extraer_gastos_historial')))
+
+    print(f'Python {sys.version.split()[0]} - mediana de {args.repeticiones} repeticiones\n')
+    print(f'{"parser":<12}{"líneas":>8}{"tiempo (ms)":>14}{"µs/línea":>10}')
+    for nombre, funcion in parsers:
+        for lineas in args.lineas:
+            tiempo = medir(funcion, historial_sintetico(lineas), args.repeticiones)
+            print(f'{nombre:<12}{lineas:>8}{tiempo:>14.1f}{tiempo * 1000 / lineas:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Mide el costo de arranque de un proceso web: tiempo de importación y memoria residente.
+
+Compara un worker que solo carga las vistas con uno que además carga la pila de OCR
+(OpenCV, NumPy, PIL, pytesseract). Cada escenario corre en un intérprete nuevo con
+`python -X importtime` y se informan los módulos más costosos. También se informa cuáles
+de las bibliotecas pesadas quedaron cargadas: con solo las vistas no debe haber ninguna.
+
+Uso:
+    python benchmarks/importacion.py [--repeticiones 5] [--top 10]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+BIBLIOTECAS_PESADAS = ('cv2', 'numpy', 'PIL', 'pytesseract', 'pdfplumber')
+
+CODIGO_MEDICION = '''
+import json, os, resource, sys, time
+sys.path.insert(0, {base!r})
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gastos.settings')
+inicio = time.perf_counter()
+import django
+django.setup()
+import gastitos.urls
+{extra}
+fin = time.perf_counter()
+print(json.dumps({{
+    'segundos': fin - inicio,
+    'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'cargadas': [nombre for nombre in {pesadas!r} if nombre in sys.modules],
+}}))
+'''
+
+ESCENARIOS = [
+    ('vistas', ''),
+    ('vistas + OCR', 'from gastitos.ocr import precargar; precargar()'),
+]
+
+
+def medir(extra, con_importtime=False):
+    codigo = CODIGO_MEDICION.format(base=str(BASE_DIR), extra=extra, pesadas=BIBLIOTECAS_PESADAS)
+    comando = [sys.executable]
+    if con_importtime:
+        comando += ['-X', 'importtime']
+    comando += ['-c', codigo]
+    proceso = subprocess.run(comando, capture_output=True, text=True, cwd=BASE_DIR, check=True)
+    return json.loads(proceso.stdout.strip().splitlines()[-1]), proceso.stderr
+
+
+def modulos_mas_costosos(salida_importtime, top):
+    """Módulos de primer nivel con mayor tiempo acumulado según -X importtime"""
+    modulos = []
+    for linea in salida_importtime.splitlines():
+        if not linea.startswith('import time:') or 'cumulative' in linea:
+            continue
+        _, acumulado, nombre = linea[len('import time:'):].split('|')
+        # Los submódulos aparecen indentados con espacios adicionales
+        if nombre.startswith('  '):
+            continue
+        modulos.append((int(acumulado), nombre.strip()))
+    return sorted(modulos, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    print(f'Python {sys.version.split()[0]} - {args.repeticiones} repeticiones por escenario\n')
+    print(f'{"escenario":<16}{"importación (ms)":>18}{"RSS máx (MB)":>16}  bibliotecas pesadas cargadas')
+    sobrantes = []
+    for nombre, extra in ESCENARIOS:
+        resultados = [medir(extra)[0] for _ in range(args.repeticiones)]
+        tiempo = statistics.median(r['segundos'] for r in resultados) * 1000
+        rss = statistics.median(r['rss_kb'] for r in resultados) / 1024
+        cargadas = resultados[0]['cargadas']
+        print(f'{nombre:<16}{tiempo:>18.1f}{rss:>16.1f}  {", ".join(cargadas) or "ninguna"}')
+        if not extra and cargadas:
+            sobrantes = cargadas
+
+    for nombre, extra in ESCENARIOS:
+        _, salida = medir(extra, con_importtime=True)
+        print(f'\nMódulos de primer nivel más costosos ({nombre}), -X importtime:')
+        for acumulado, modulo in modulos_mas_costosos(salida, args.top):
+            print(f'  {acumulado / 1000:>9.1f} ms  {modulo}')
+
+    if sobrantes:
+        sys.exit(f'\nCargar las vistas importó {", ".join(sobrantes)}: deben importarse en el primer uso')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Mide la importación de movimientos de resúmenes de tarjeta de muchas páginas.
+
+Usa los resúmenes sintéticos de pdf_tarjeta.py (60 compras por página) y mide
+procesar_movimientos_tarjeta extrayendo las páginas en un solo proceso y repartidas
+entre varios, además del tiempo por página que devuelve la extracción.
+
+Uso:
+    python benchmarks/movimientos_tarjeta.py [--paginas 12 60 120] [--procesos 1 4]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gastos.settings')
+
+from benchmarks.pdf_tarjeta import resumen_sintetico  # noqa: E402
+from gastitos.utils import procesar_movimientos_tarjeta  # noqa: E402
+
+
+def medir(datos, procesos, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = procesar_movimientos_tarjeta(datos, procesos=procesos)
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos) * 1000, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--paginas', type=int, nargs='+', default=[12, 60, 120])
+    parser.add_argument('--procesos', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f'Python {sys.version.split()[0]}, {os.cpu_count()} núcleos - mediana de {args.repeticiones} repeticiones\n')
+    print(f'{"procesos":>8}{"páginas":>9}{"movimientos":>13}{"tiempo (ms)":>14}{"ms/página":>11}')
+    for paginas in args.paginas:
+        datos = resumen_sintetico(paginas)
+        for procesos in args.procesos:
+            tiempo, resultado = medir(datos, procesos, args.repeticiones)
+            por_pagina = statistics.mean(p['segundos'] for p in resultado['paginas']) * 1000
+            print(f'{procesos:>8}{paginas:>9}{len(resultado["movimientos"]):>13}{tiempo:>14.1f}{por_pagina:>11.2f}')
+
+
+if __name__ == '__main__':
+    main()
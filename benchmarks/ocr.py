@@ -0,0 +1,214 @@
+"""
+Mide el pipeline de OCR por etapas sobre el corpus sintético (benchmarks/corpus_ocr.py).
+
+Para cada imagen se mide por separado lo mismo que hacen procesar_imagen_comprobante y
+procesar_historial_mercadopago: decodificación (decodificar_imagen), preprocesamiento
+(preprocesar_imagen), OCR (el motor del proceso; por franjas en los historiales) y
+análisis del texto (extraer_datos_texto o extraer_gastos_historial). Se informa la
+mediana de cada etapa por variante, el rendimiento (imágenes y megapíxeles por segundo)
+y la exactitud contra la verdad del corpus:
+
+- comprobantes: fracción con el monto y con la fecha correctos;
+- historiales: precisión y cobertura de los gastos (monto y fecha) extraídos.
+
+También se cuentan los procesos lanzados durante la medición: con el motor dentro del
+proceso (tesserocr o libtesseract) tiene que ser cero; con pytesseract, uno por imagen
+o por franja.
+
+Sin Tesseract instalado la etapa de OCR se omite y el análisis se hace sobre el texto
+dibujado, así que la exactitud mide solo el parser.
+
+Uso:
+    python benchmarks/ocr.py [--por-variante 3] [--directorio <corpus guardado>] [--json resultados.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gastos.settings')
+# Igual que en los procesos del pool de OCR (tasks_ocr._inicializar_trabajador)
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+import django  # noqa: E402
+
+django.setup()
+
+from benchmarks.corpus_ocr import FILAS_HISTORIAL, RESOLUCIONES_COMPROBANTE, RUIDOS, cargar_corpus, generar_corpus  # noqa: E402
+from gastitos import utils  # noqa: E402
+from gastitos.motor_ocr import TesseractNoDisponible, obtener_motor  # noqa: E402
+
+ETAPAS = ['decodificacion', 'preprocesamiento', 'ocr', 'analisis']
+
+
+class _PopenContado(subprocess.Popen):
+    """subprocess.Popen que cuenta los procesos lanzados (pytesseract lanza uno por llamada)"""
+    lanzados = 0
+
+    def __init__(self, *args, **kwargs):
+        _PopenContado.lanzados += 1
+        super().__init__(*args, **kwargs)
+
+
+def medir_muestra(muestra, motor):
+    """Corre las etapas sobre una muestra; devuelve los tiempos (s) y lo extraído"""
+    tiempos = {}
+
+    inicio = time.perf_counter()
+    gris = utils.decodificar_imagen(muestra['datos'])
+    tiempos['decodificacion'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    pil_imagen = utils.preprocesar_imagen(gris)
+    tiempos['preprocesamiento'] = time.perf_counter() - inicio
+
+    if motor is None:
+        texto = muestra['texto']
+    else:
+        inicio = time.perf_counter()
+        if muestra['tipo'] == 'comprobante':
+            texto = motor.reconocer(pil_imagen)
+        else:
+            texto = utils.reconocer_por_franjas(pil_imagen, motor)
+        tiempos['ocr'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    if muestra['tipo'] == 'comprobante':
+        extraido = utils.extraer_datos_texto(texto)
+    else:
+        extraido = utils.extraer_gastos_historial(texto)
+    tiempos['analisis'] = time.perf_counter() - inicio
+    return tiempos, extraido
+
+
+def aciertos_comprobante(extraido, verdad):
+    monto = extraido['monto'] is not None and abs(extraido['monto'] - verdad['monto']) < 0.005
+    return {'monto': monto, 'fecha': extraido['fecha'] == verdad['fecha']}
+
+
+def aciertos_historial(extraidos, verdad):
+    """Gastos extraídos que coinciden en monto y fecha con alguno de la verdad (sin repetir)"""
+    esperados = Counter((round(gasto['monto'], 2), gasto['fecha']) for gasto in verdad)
+    obtenidos = Counter((round(gasto['monto'], 2), gasto['fecha']) for gasto in extraidos)
+    coincidencias = sum((esperados & obtenidos).values())
+    return {'coincidencias': coincidencias, 'extraidos': len(extraidos), 'esperados': len(verdad)}
+
+
+def variante(muestra):
+    if muestra['tipo'] == 'comprobante':
+        return (muestra['tipo'], muestra['resolucion'], muestra['ruido'], '')
+    return (muestra['tipo'], muestra['resolucion'], muestra['ruido'], muestra['filas'])
+
+
+def resumir(mediciones):
+    """Agrupa las mediciones por variante: medianas por etapa, rendimiento y exactitud"""
+    por_variante = defaultdict(list)
+    for medicion in mediciones:
+        por_variante[medicion['variante']].append(medicion)
+
+    filas = []
+    for clave, grupo in por_variante.items():
+        tipo, resolucion, ruido, cantidad = clave
+        total = sum(sum(medicion['tiempos'].values()) for medicion in grupo)
+        megapixeles = sum(medicion['megapixeles'] for medicion in grupo)
+        fila = {
+            'tipo': tipo, 'resolucion': resolucion, 'ruido': ruido, 'filas': cantidad,
+            'imagenes': len(grupo),
+            'megapixeles': round(megapixeles / len(grupo), 2),
+            'etapas_ms': {
+                etapa: round(statistics.median(medicion['tiempos'][etapa] for medicion in grupo) * 1000, 2)
+                for etapa in ETAPAS if etapa in grupo[0]['tiempos']
+            },
+            'imagenes_por_segundo': round(len(grupo) / total, 2),
+            'megapixeles_por_segundo': round(megapixeles / total, 2),
+        }
+        if tipo == 'comprobante':
+            fila['exactitud'] = {
+                campo: round(sum(medicion['aciertos'][campo] for medicion in grupo) / len(grupo), 3)
+                for campo in ('monto', 'fecha')
+            }
+        else:
+            coincidencias = sum(medicion['aciertos']['coincidencias'] for medicion in grupo)
+            extraidos = sum(medicion['aciertos']['extraidos'] for medicion in grupo)
+            esperados = sum(medicion['aciertos']['esperados'] for medicion in grupo)
+            fila['exactitud'] = {
+                'precision': round(coincidencias / extraidos, 3) if extraidos else 0.0,
+                'cobertura': round(coincidencias / esperados, 3) if esperados else 1.0,
+            }
+        filas.append(fila)
+    return filas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--directorio', help='Corpus guardado con corpus_ocr.py (por defecto se genera en memoria)')
+    parser.add_argument('--por-variante', type=int, default=3)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--resoluciones', nargs='+', choices=list(RESOLUCIONES_COMPROBANTE))
+    parser.add_argument('--ruidos', nargs='+', choices=list(RUIDOS))
+    parser.add_argument('--filas', type=int, nargs='+', default=FILAS_HISTORIAL)
+    parser.add_argument('--sin-ocr', action='store_true', help='Omitir el OCR aunque Tesseract esté instalado')
+    parser.add_argument('--json', help='Guardar los resultados por variante en este archivo')
+    args = parser.parse_args()
+
+    if args.directorio:
+        muestras = cargar_corpus(args.directorio)
+    else:
+        muestras = generar_corpus(args.por_variante, args.semilla, args.resoluciones, args.ruidos, args.filas)
+
+    utils.cargar_bibliotecas_ocr()
+    motor = None
+    if not args.sin_ocr:
+        try:
+            motor = obtener_motor()
+        except TesseractNoDisponible:
+            pass
+    estado_ocr = f'OCR con {motor.backend} ({motor.idiomas or "idioma por defecto"})' if motor else (
+        'sin OCR: el análisis se hace sobre el texto dibujado'
+    )
+    print(f'Python {sys.version.split()[0]}, OpenCV {utils.cv2.__version__}, {os.cpu_count()} núcleos - '
+          f'{len(muestras)} imágenes, {estado_ocr}\n')
+
+    # Primera pasada sin medir: carga de bibliotecas y del motor
+    medir_muestra(muestras[0], motor)
+    subprocess.Popen = _PopenContado
+    mediciones = []
+    for muestra in muestras:
+        tiempos, extraido = medir_muestra(muestra, motor)
+        if muestra['tipo'] == 'comprobante':
+            aciertos = aciertos_comprobante(extraido, muestra['verdad'])
+        else:
+            aciertos = aciertos_historial(extraido, muestra['verdad'])
+        mediciones.append({
+            'variante': variante(muestra), 'tiempos': tiempos, 'aciertos': aciertos,
+            'megapixeles': muestra['ancho'] * muestra['alto'] / 1e6,
+        })
+    subprocess.Popen = _PopenContado.__base__
+    filas = resumir(mediciones)
+    procesos_por_imagen = _PopenContado.lanzados / len(muestras)
+
+    etapas = [etapa for etapa in ETAPAS if etapa in filas[0]['etapas_ms']]
+    encabezado_etapas = ''.join(f'{etapa[:8] + " ms":>14}' for etapa in etapas)
+    print(f'{"tipo":<13}{"resolución":<12}{"ruido":<8}{"filas":>6}{"MP":>7}{encabezado_etapas}{"img/s":>8}{"MP/s":>8}   exactitud')
+    for fila in filas:
+        tiempos = ''.join(f'{fila["etapas_ms"][etapa]:>14.1f}' for etapa in etapas)
+        exactitud = '  '.join(f'{campo} {valor:.0%}' for campo, valor in fila['exactitud'].items())
+        print(f'{fila["tipo"]:<13}{fila["resolucion"]:<12}{fila["ruido"]:<8}{fila["filas"]:>6}{fila["megapixeles"]:>7.1f}'
+              f'{tiempos}{fila["imagenes_por_segundo"]:>8.1f}{fila["megapixeles_por_segundo"]:>8.1f}   {exactitud}')
+
+    print(f'\nProcesos lanzados: {_PopenContado.lanzados} ({procesos_por_imagen:.2f} por imagen)')
+
+    if args.json:
+        resultados = {'ocr': estado_ocr, 'procesos_por_imagen': procesos_por_imagen, 'variantes': filas}
+        Path(args.json).write_text(json.dumps(resultados, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Mide la lectura del total de estados de cuenta de tarjeta en PDF de varias páginas.
+
+Genera resúmenes sintéticos (sin dependencias extra: el PDF se escribe a mano con
+Helvetica) con el total y el periodo en la primera página y movimientos en el resto,
+y mide procesar_pdf_tarjeta_credito. Con --referencia también mide la versión de ese
+commit (por ejemplo, la que copiaba el PDF a disco y extraía todas las páginas).
+
+Uso:
+    python benchmarks/pdf_tarjeta.py [--paginas 2 10 30] [--referencia <commit>]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gastos.settings')
+
+from django.core.files.uploadedfile import SimpleUploadedFile  # noqa: E402
+
+from benchmarks.comun import funcion_de_referencia  # noqa: E402
+from gastitos.utils import procesar_pdf_tarjeta_credito  # noqa: E402
+
+COMERCIOS = ['MERCADOLIBRE', 'COTO', 'YPF', 'NETFLIX.COM', 'FARMACITY', 'GARBARINO', 'DISCO', 'SPOTIFY']
+
+
+def _escapar(texto):
+    return texto.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def pdf_texto(paginas):
+    """Escribe un PDF mínimo con una lista de líneas por página"""
+    objetos = ['<< /Type /Catalog /Pages 2 0 R >>', None, '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    hojas = []
+    for lineas in paginas:
+        contenido = 'BT /F1 9 Tf 11 TL 40 800 Td\n' + '\n'.join(
+            f'({_escapar(linea)}) Tj T*' for linea in lineas
+        ) + '\nET'
+        objetos.append(f'<< /Length {len(contenido.encode("latin-1"))} >>\nstream\n{contenido}\nendstream')
+        objetos.append(
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+            f'/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objetos)} 0 R >>'
+        )
+        hojas.append(len(objetos))
+    objetos[1] = f'<< /Type /Pages /Kids [{" ".join(f"{n} 0 R" for n in hojas)}] /Count {len(hojas)} >>'
+
+    salida = bytearray(b'%PDF-1.4\n')
+    posiciones = []
+    for numero, objeto in enumerate(objetos, 1):
+        posiciones.append(len(salida))
+        salida += f'{numero} 0 obj\n{objeto}\nendobj\n'.encode('latin-1')
+    inicio_xref = len(salida)
+    salida += f'xref\n0 {len(objetos) + 1}\n0000000000 65535 f \n'.encode('latin-1')
+    for posicion in posiciones:
+        salida += f'{posicion:010d} 00000 n \n'.encode('latin-1')
+    salida += f'trailer\n<< /Size {len(objetos) + 1} /Root 1 0 R >>\nstartxref\n{inicio_xref}\n%%EOF\n'.encode('latin-1')
+    return bytes(salida)
+
+
+def resumen_sintetico(cantidad_paginas, semilla=0):
+    generador = random.Random(semilla)
+    paginas = [[
+        'BANCO DE PRUEBA - RESUMEN DE CUENTA VISA',
+        'Periodo 01/03/2025 al 31/03/2025',
+        'Saldo anterior $ 98.765,43',
+        'Total a pagar $ 123.456,78',
+        'Pago minimo $ 12.345,67',
+        'Vencimiento 10/04/2025',
+    ]]
+    for _ in range(cantidad_paginas - 1):
+        paginas.append([
+            f'{generador.randint(1, 28):02d}/03/25 {generador.choice(COMERCIOS)} '
+            f'C.{generador.randint(1, 3):02d}/03 {generador.randint(1, 99)}.{generador.randint(0, 999):03d},'
+            f'{generador.randint(0, 99):02d}'
+            for _ in range(60)
+        ])
+    return pdf_texto(paginas)
+
+
+def medir(funcion, datos, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        archivo = SimpleUploadedFile('resumen.pdf', datos, content_type='application/pdf')
+        inicio = time.perf_counter()
+        resultado = funcion(archivo)
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos) * 1000, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--paginas', type=int, nargs='+', default=[2, 10, 30])
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--referencia', help='Commit con la implementación a comparar')
+    args = parser.parse_args()
+
+    implementaciones = [('actual', procesar_pdf_tarjeta_credito)]
+    if args.referencia:
+        implementaciones.insert(0, (
+            args.referencia, funcion_de_referencia(args.referencia, 'procesar_pdf_tarjeta_credito')
+        ))
+
+    print(f'Python {sys.version.split()[0]} - mediana de {args.repeticiones} repeticiones\n')
+    print(f'{"versión":<12}{"páginas":>8}{"tiempo (ms)":>14}  resultado')
+    for nombre, funcion in implementaciones:
+        for paginas in args.paginas:
+            tiempo, resultado = medir(funcion, resumen_sintetico(paginas), args.repeticiones)
+            monto = resultado['monto'] if resultado else None
+            print(f'{nombre:<12}{paginas:>8}{tiempo:>14.1f}  {monto}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Compara el preprocesamiento de comprobantes antes y después de decodificar en memoria.
+
+El pipeline anterior copiaba la subida a un archivo temporal, lo leía con cv2.imread a
+resolución completa y aplicaba los filtros sobre la foto entera. El actual decodifica
+los bytes en memoria directamente a escala de grises y reduce la imagen según la
+altura estimada del texto antes de filtrar. Se usan fotos sintéticas de 12 MP con
+texto dibujado, por lo que no hace falta Tesseract.
+
+Uso:
+    python benchmarks/preprocesamiento.py [--repeticiones 5] [--ancho 3024] [--alto 4032]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from gastitos import utils  # noqa: E402
+
+LINEAS_COMPROBANTE = [
+    'MERCADO PAGO',
+    'Comprobante de transferencia',
+    'Fecha: 15/03/2025 14:32',
+    'Destinatario: Supermercado Dia',
+    'CVU 0000003100012345678901',
+    'Monto: $ 12.345,67',
+    'Operacion N 98765432101',
+    'Total $ 12.345,67',
+]
+
+
+def foto_sintetica(ancho, alto, escala_fuente):
+    """Foto de un comprobante: fondo con gradiente y ruido, texto oscuro"""
+    generador = np.random.default_rng(0)
+    gradiente = np.linspace(200, 240, ancho, dtype=np.float32)
+    fondo = np.tile(gradiente, (alto, 1)) + generador.normal(0, 6, (alto, ancho))
+    imagen = np.clip(fondo, 0, 255).astype(np.uint8)
+    imagen = cv2.cvtColor(imagen, cv2.COLOR_GRAY2BGR)
+
+    alto_linea = int(40 * escala_fuente)
+    for repeticion in range(alto // (alto_linea * len(LINEAS_COMPROBANTE)) + 1):
+        for i, linea in enumerate(LINEAS_COMPROBANTE):
+            y = (repeticion * len(LINEAS_COMPROBANTE) + i + 1) * alto_linea
+            if y >= alto:
+                break
+            cv2.putText(imagen, linea, (ancho // 20, y), cv2.FONT_HERSHEY_SIMPLEX,
+                        escala_fuente, (30, 30, 30), max(1, int(escala_fuente * 2)), cv2.LINE_AA)
+    _, codificada = cv2.imencode('.jpg', imagen, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return codificada.tobytes()
+
+
+def pipeline_anterior(datos):
+    """Archivo temporal + cv2.imread a color + filtros a resolución completa"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
+        temp_file.write(datos)
+        ruta = temp_file.name
+    try:
+        imagen = cv2.imread(ruta)
+        gris = cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY)
+        gris = cv2.medianBlur(gris, 3)
+        gris = cv2.convertScaleAbs(gris, alpha=1.5, beta=30)
+        binario = cv2.adaptiveThreshold(gris, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+        return Image.fromarray(binario)
+    finally:
+        os.unlink(ruta)
+
+
+def pipeline_actual(datos):
+    return utils.imagen_para_ocr(datos)
+
+
+def medir(funcion, datos, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(datos)
+        tiempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    funcion(datos)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(tiempos) * 1000, pico / (1024 * 1024), resultado.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--ancho', type=int, default=3024)
+    parser.add_argument('--alto', type=int, default=4032)
+    args = parser.parse_args()
+
+    utils.cargar_bibliotecas_ocr()
+    print(f'Python {sys.version.split()[0]}, OpenCV {cv2.__version__} - '
+          f'{args.repeticiones} repeticiones, foto {args.ancho}x{args.alto}\n')
+    print(f'{"texto":<10}{"pipeline":<10}{"tiempo (ms)":>14}{"pico (MB)":>12}{"salida":>14}')
+    for nombre, escala_fuente in (('grande', 3.0), ('mediano', 1.6)):
+        datos = foto_sintetica(args.ancho, args.alto, escala_fuente)
+        for etiqueta, funcion in (('anterior', pipeline_anterior), ('actual', pipeline_actual)):
+            tiempo, pico, tamaño = medir(funcion, datos, args.repeticiones)
+            print(f'{nombre:<10}{etiqueta:<10}{tiempo:>14.1f}{pico:>12.1f}{f"{tamaño[0]}x{tamaño[1]}":>14}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Mide el pronóstico Monte Carlo de metas de ahorro (gastitos.pronostico_ahorro).
+
+Genera un historial de ahorro neto y metas con montos y plazos al azar, y mide la
+simulación de los caminos (simular_ahorros) más la evaluación de todas las metas
+(pronosticar). Con --por-meta también mide la forma directa: un ciclo por meta que
+calcula el mes de cumplimiento de cada camino y sus cuantiles.
+
+Uso:
+    python benchmarks/pronostico_ahorro.py [--metas 1 10 100] [--caminos 1000 10000] [--por-meta]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gastos.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+import numpy as np  # noqa: E402
+
+from gastitos.pronostico_ahorro import HORIZONTE_MESES, pronosticar, simular_ahorros  # noqa: E402
+
+
+def metas_sinteticas(cantidad, semilla=0):
+    generador = np.random.default_rng(semilla)
+    historial = generador.normal(400000, 150000, 18)
+    restantes = generador.uniform(50000, 3000000, cantidad)
+    meses_limite = generador.integers(1, 60, cantidad)
+    recomendados = restantes / meses_limite
+    return historial, restantes, recomendados / recomendados.sum(), meses_limite
+
+
+def pronosticar_por_meta(ahorros, restantes, pesos, meses_limite):
+    """Forma directa: mes de cumplimiento de cada camino, meta por meta"""
+    horizonte, caminos = ahorros.shape
+    acumulado = np.maximum.accumulate(np.vstack([np.zeros((1, caminos)), np.cumsum(ahorros, axis=0)]), axis=0)
+    resultados = []
+    for restante, peso, limite in zip(restantes, pesos, meses_limite):
+        cumplida = acumulado * peso >= restante
+        meses = np.where(cumplida.any(axis=0), cumplida.argmax(axis=0), horizonte + 1)
+        p50, p90 = np.quantile(meses, [0.5, 0.9], method='inverted_cdf')
+        resultados.append((
+            (meses <= limite).mean(),
+            p50 if p50 <= horizonte else -1,
+            p90 if p90 <= horizonte else -1,
+        ))
+    return resultados
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--metas', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--caminos', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--repeticiones', type=int, default=7)
+    parser.add_argument('--por-meta', action='store_true', help='Medir también el ciclo por meta')
+    args = parser.parse_args()
+
+    print(f'Python {sys.version.split()[0]}, NumPy {np.__version__}, {os.cpu_count()} núcleos, '
+          f'horizonte {HORIZONTE_MESES} meses - mediana de {args.repeticiones} repeticiones\n')
+    print(f'{"forma":<10}{"metas":>6}{"caminos":>9}{"simulación (ms)":>17}{"pronóstico (ms)":>17}{"total (ms)":>12}')
+    formas = [('vectorial', pronosticar)]
+    if args.por_meta:
+        formas.append(('por meta', pronosticar_por_meta))
+    for nombre, funcion in formas:
+        for cantidad in args.metas:
+            historial, restantes, pesos, meses_limite = metas_sinteticas(cantidad)
+            for caminos in args.caminos:
+                simulacion = medir(lambda: simular_ahorros(historial, caminos), args.repeticiones)
+                ahorros = simular_ahorros(historial, caminos)
+                # pronosticar reordena su matriz interna pero no modifica `ahorros`
+                pronostico = medir(lambda: funcion(ahorros, restantes, pesos, meses_limite), args.repeticiones)
+                print(f'{nombre:<10}{cantidad:>6}{caminos:>9}{simulacion:>17.1f}{pronostico:>17.1f}'
+                      f'{simulacion + pronostico:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
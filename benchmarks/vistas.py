@@ -0,0 +1,171 @@
+"""
+Mide las vistas principales sobre datos de carga y las compara con una línea de base.
+
+Crea una base SQLite temporal, la llena con el comando generar_datos_carga (--usuarios
+usuarios con --gastos gastos cada uno, misma semilla en cada corrida) y pide cada vista
+con el cliente de pruebas de Django, cada vez con un usuario distinto. La latencia y las
+consultas salen de la instrumentación de las vistas (gastitos.instrumentacion). Por
+defecto se vacía la caché antes de cada pedido, así se mide el cálculo completo; con
+--con-cache se mide el caso habitual.
+
+Los resultados se comparan con benchmarks/resultados/vistas.json: una vista que hace
+más consultas, o cuya mediana empeora más que --tolerancia, es una regresión y el
+script termina con código 1. Con --guardar los resultados pasan a ser la nueva base.
+
+El esquema se crea directamente desde los modelos (syncdb), sin aplicar las migraciones.
+
+Uso:
+    python benchmarks/vistas.py [--usuarios 50] [--gastos 500] [--solicitudes 30] [--guardar]
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import warnings
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gastos.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection, connections  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from gastitos import instrumentacion  # noqa: E402
+
+VISTAS = ['index', 'dashboard', 'modo_ahorro', 'perfil', 'estadisticas_mensuales', 'gastos_fijos']
+LINEA_DE_BASE = BASE_DIR / 'benchmarks' / 'resultados' / 'vistas.json'
+PREFIJO = 'carga'
+
+
+def preparar_base(directorio, args):
+    connections.close_all()
+    settings.DATABASES['default']['NAME'] = os.path.join(directorio, 'vistas.sqlite3')
+    settings.MIGRATION_MODULES = {'gastitos': None}
+    settings.ARCHIVO_GASTOS_DIR = os.path.join(directorio, 'archivo')
+    call_command('migrate', run_syncdb=True, verbosity=0)
+    call_command(
+        'generar_datos_carga', usuarios=args.usuarios, gastos=args.gastos, semilla=args.semilla,
+        prefijo=PREFIJO, stdout=io.StringIO(),
+    )
+
+
+def medir_vistas(args):
+    """Pide cada vista --solicitudes veces y devuelve instrumentacion.resumen() por vista"""
+    usuarios = list(User.objects.filter(username__startswith=PREFIJO).order_by('username'))
+    clientes = []
+    for usuario in usuarios[:args.solicitudes]:
+        cliente = Client()
+        cliente.force_login(usuario)
+        clientes.append(cliente)
+
+    resultados = {}
+    for vista in VISTAS:
+        url = reverse(vista)
+        # Primer pedido sin medir: carga de plantillas y de módulos
+        clientes[0].get(url)
+        instrumentacion.reiniciar()
+        for numero in range(args.solicitudes):
+            if not args.con_cache:
+                cache.clear()
+            respuesta = clientes[numero % len(clientes)].get(url)
+            if respuesta.status_code != 200:
+                raise SystemExit(f'{vista} respondió {respuesta.status_code}')
+        resultados[vista] = instrumentacion.resumen()[vista]
+    return resultados
+
+
+def comparar(base, actual, tolerancia):
+    """Imprime la diferencia con la línea de base y devuelve las vistas con regresiones"""
+    print(f'\nContra la línea de base ({LINEA_DE_BASE.relative_to(BASE_DIR)}):')
+    if base['parametros'] != actual['parametros']:
+        print(f'  Atención: la base se midió con otros parámetros: {base["parametros"]}')
+    print(f'{"vista":<24}{"p50 base":>10}{"p50":>10}{"cambio":>9}{"consultas":>12}')
+    regresiones = []
+    for vista, medido in actual['vistas'].items():
+        anterior = base['vistas'].get(vista)
+        if anterior is None:
+            print(f'{vista:<24}{"-":>10}{medido["p50_ms"]:>10.1f}{"nueva":>9}{medido["consultas_max"]:>12}')
+            continue
+        cambio = medido['p50_ms'] / anterior['p50_ms'] - 1 if anterior['p50_ms'] else 0.0
+        problemas = []
+        if medido['consultas_max'] > anterior['consultas_max']:
+            problemas.append('consultas')
+        if cambio > tolerancia:
+            problemas.append('latencia')
+        if problemas:
+            regresiones.append(vista)
+        consultas = f'{anterior["consultas_max"]}->{medido["consultas_max"]}'
+        linea = f'{vista:<24}{anterior["p50_ms"]:>10.1f}{medido["p50_ms"]:>10.1f}{cambio:>+9.0%}{consultas:>12}'
+        print(f'{linea}   REGRESIÓN ({", ".join(problemas)})' if problemas else linea)
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--usuarios', type=int, default=50)
+    parser.add_argument('--gastos', type=int, default=500, help='Gastos por usuario')
+    parser.add_argument('--solicitudes', type=int, default=30, help='Pedidos medidos por vista')
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--con-cache', action='store_true', help='No vaciar la caché entre pedidos')
+    parser.add_argument('--tolerancia', type=float, default=0.25, help='Empeoramiento admitido de la mediana')
+    parser.add_argument('--guardar', action='store_true', help='Guardar los resultados como línea de base')
+    args = parser.parse_args()
+
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ['testserver']
+    # Las vistas comparan fechas con datetime.now(); el aviso repetido tapa los resultados
+    warnings.filterwarnings('ignore', message='DateTimeField .* received a naive datetime')
+    parametros = {
+        'usuarios': args.usuarios, 'gastos': args.gastos, 'solicitudes': args.solicitudes,
+        'semilla': args.semilla, 'con_cache': args.con_cache,
+    }
+
+    with tempfile.TemporaryDirectory() as directorio:
+        preparar_base(directorio, args)
+        print(f'Python {sys.version.split()[0]}, Django {django.get_version()}, SQLite {connection.Database.sqlite_version}')
+        print(f'{args.usuarios} usuarios x {args.gastos} gastos, {args.solicitudes} pedidos por vista, '
+              f'{"con" if args.con_cache else "sin"} caché\n')
+        vistas = medir_vistas(args)
+        connections.close_all()
+
+    print(f'{"vista":<24}{"p50 (ms)":>10}{"p95 (ms)":>10}{"consultas":>11}{"SQL (ms)":>10}{"plantillas (ms)":>17}')
+    for vista, medido in vistas.items():
+        print(f'{vista:<24}{medido["p50_ms"]:>10.1f}{medido["p95_ms"]:>10.1f}{medido["consultas_max"]:>11}'
+              f'{medido["sql_ms_promedio"]:>10.1f}{medido["plantillas_ms_promedio"]:>17.1f}')
+
+    actual = {
+        'entorno': {
+            'python': sys.version.split()[0], 'django': django.get_version(),
+            'sqlite': connection.Database.sqlite_version, 'nucleos': os.cpu_count(),
+        },
+        'parametros': parametros,
+        'vistas': vistas,
+    }
+    if args.guardar:
+        LINEA_DE_BASE.write_text(json.dumps(actual, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+        print(f'\nLínea de base guardada en {LINEA_DE_BASE.relative_to(BASE_DIR)}')
+        return
+    if not LINEA_DE_BASE.exists():
+        print('\nNo hay línea de base; correr con --guardar para crearla')
+        return
+    base = json.loads(LINEA_DE_BASE.read_text(encoding='utf-8'))
+    regresiones = comparar(base, actual, args.tolerancia)
+    if regresiones:
+        print(f'\nRegresiones en: {", ".join(regresiones)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,4 @@
 from django.apps import AppConfig
-from django.utils import timezone
-import threading
-import time
-from datetime import datetime, timedelta
 
 
 class GastitosConfig(AppConfig):
@@ -10,11 +6,8 @@ class GastitosConfig(AppConfig):
     name = 'gastitos'
     
     def ready(self):
-        # Evitar ejecutar en comandos de manejo como migrate
-        import sys
-        if 'runserver' not in sys.argv:
-            return
-            
-        # Iniciar el hilo para la tarea programada
-        from .tasks import iniciar_tarea_limpieza_mensual
-        iniciar_tarea_limpieza_mensual()
+        # Registrar señales que mantienen el balance mensual
+        from . import signals  # noqa: F401
+        
+        # Las tareas periódicas (cierre mensual, gastos fijos, metas vencidas) no corren
+        # en los procesos web: se ejecutan con `python manage.py ejecutar_tareas`
@@ -0,0 +1,333 @@
+"""
+Archivo columnar de los gastos de meses cerrados.
+
+Al cerrar un mes (EstadisticaMensual.guardar_estadisticas_y_limpiar) los gastos se
+eliminan de la tabla Gasto, pero antes se escriben aquí, en una carpeta por mes dentro
+de settings.ARCHIVO_GASTOS_DIR:
+
+    2025-03/
+        indice.npy              int64 (usuarios, 3): usuario_id, desde, hasta
+        segundos.npy            uint32: segundos desde el inicio del mes
+        centavos.npy            int64: monto en centavos
+        codigos.npy             uint32: posición de la descripción en la tabla
+        descripciones.json.gz   tabla de descripciones distintas (comprimida)
+        meta.json               año, mes, inicio (epoch) y cantidades
+
+Las filas están ordenadas por usuario y fecha, así que los gastos de un usuario son
+un rango contiguo que se encuentra con una búsqueda binaria en el índice. Las columnas
+numéricas se abren con memory-map: una consulta solo lee las páginas del rango del
+usuario. indice.json, en la raíz, lista los meses archivados.
+
+Durante el cierre cada lote de usuarios se guarda como una parte temporal; al terminar,
+consolidar_mes une las partes en los archivos definitivos. Si el mes se reabre por gastos
+cargados después del cierre, las partes de esa pasada se suman a lo ya archivado.
+"""
+import functools
+import glob
+import gzip
+import json
+import os
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+VERSION_FORMATO = 1
+COLUMNAS = ('segundos', 'centavos', 'codigos')
+
+
+def directorio_base():
+    return str(getattr(settings, 'ARCHIVO_GASTOS_DIR', os.path.join(settings.BASE_DIR, 'archivo_gastos')))
+
+
+def _directorio_mes(año, mes, base=None):
+    return os.path.join(base or directorio_base(), f'{año:04d}-{mes:02d}')
+
+
+def inicio_del_mes(año, mes):
+    """Inicio del mes en la zona horaria local, como datetime aware"""
+    return timezone.make_aware(datetime(año, mes, 1))
+
+
+def _escribir_json(ruta, datos, comprimido=False):
+    """Escribe un JSON de forma atómica (archivo temporal y reemplazo)"""
+    temporal = f'{ruta}.tmp'
+    abrir = gzip.open if comprimido else open
+    with abrir(temporal, 'wt', encoding='utf-8') as f:
+        json.dump(datos, f, ensure_ascii=False)
+    os.replace(temporal, ruta)
+
+
+def _leer_json(ruta, comprimido=False):
+    abrir = gzip.open if comprimido else open
+    with abrir(ruta, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _guardar_npy(ruta, arreglo):
+    """np.save atómico: quien tenga el archivo anterior en memory-map lo sigue leyendo entero"""
+    temporal = ruta[:-len('.npy')] + '.tmp.npy'
+    np.save(temporal, arreglo)
+    os.replace(temporal, ruta)
+
+
+def escribir_parte(año, mes, desde_usuario_id, filas, base=None, pasada=0):
+    """
+    Guarda los gastos de un lote de usuarios como parte temporal del mes. La parte toma
+    su nombre definitivo cuando se confirma la transacción en curso. Si la parte ya existe
+    (un cierre interrumpido que se retoma) se reemplaza.
+
+    Args:
+        desde_usuario_id: Primer usuario del lote, identifica la parte
+        filas: (usuario_id, fecha, monto, descripcion) ordenadas por usuario y fecha
+        pasada: Reapertura del cierre a la que pertenece la parte (0 en el primer cierre)
+    """
+    directorio = _directorio_mes(año, mes, base)
+    os.makedirs(directorio, exist_ok=True)
+    inicio = inicio_del_mes(año, mes)
+
+    tabla = {}
+    usuarios, segundos, centavos, codigos = [], [], [], []
+    for usuario_id, fecha, monto, descripcion in filas:
+        usuarios.append(usuario_id)
+        segundos.append(int((fecha - inicio).total_seconds()))
+        centavos.append(int(monto * 100))
+        codigos.append(tabla.setdefault(descripcion, len(tabla)))
+
+    nombre = f'parte_{desde_usuario_id:012d}.npz' if not pasada else f'parte_{pasada:03d}_{desde_usuario_id:012d}.npz'
+    ruta = os.path.join(directorio, nombre)
+    # Fuera del patrón parte_*.npz: consolidar_mes no la ve hasta que se confirme
+    temporal = os.path.join(directorio, f'pendiente_{nombre}')
+    np.savez_compressed(
+        temporal,
+        usuarios=np.array(usuarios, dtype=np.int64),
+        segundos=np.array(segundos, dtype=np.uint32),
+        centavos=np.array(centavos, dtype=np.int64),
+        codigos=np.array(codigos, dtype=np.uint32),
+        descripciones=np.array(list(tabla), dtype=str),
+    )
+    # Si la transacción se revierte la parte queda pendiente y no se archiva: los gastos
+    # siguen en la tabla y el lote que se reintente la vuelve a escribir
+    transaction.on_commit(functools.partial(os.replace, temporal, ruta))
+
+
+def consolidar_mes(año, mes, base=None):
+    """
+    Une las partes del mes en los archivos columnares definitivos y lo agrega al
+    índice general. Si el mes ya estaba consolidado, las partes nuevas se suman a
+    los gastos archivados. No hace nada si no quedan partes sin consolidar.
+
+    Returns:
+        dict: Metadatos del mes archivado
+    """
+    base = base or directorio_base()
+    directorio = _directorio_mes(año, mes, base)
+    ruta_meta = os.path.join(directorio, 'meta.json')
+    meta_anterior = _leer_json(ruta_meta) if os.path.exists(ruta_meta) else None
+    consolidadas = set(meta_anterior.get('partes', [])) if meta_anterior else set()
+    partes = sorted(glob.glob(os.path.join(directorio, 'parte_*.npz')))
+    nuevas = [ruta for ruta in partes if os.path.basename(ruta) not in consolidadas]
+    if not nuevas and meta_anterior is not None:
+        # Partes que una consolidación interrumpida ya incorporó pero no llegó a borrar
+        for ruta in partes:
+            os.remove(ruta)
+        return meta_anterior
+    os.makedirs(directorio, exist_ok=True)
+
+    tabla = {}
+    columnas = {'usuarios': [], 'segundos': [], 'centavos': [], 'codigos': []}
+    if meta_anterior is not None:
+        anterior = MesArchivado(directorio)
+        tabla = {texto: codigo for codigo, texto in enumerate(anterior.descripciones)}
+        columnas['usuarios'].append(np.repeat(anterior.indice[:, 0], anterior.indice[:, 2] - anterior.indice[:, 1]))
+        for nombre in COLUMNAS:
+            columnas[nombre].append(np.array(getattr(anterior, nombre)))
+    for ruta in nuevas:
+        with np.load(ruta) as parte:
+            # Reasignar los códigos de la tabla de la parte a la tabla del mes
+            nuevos = np.array(
+                [tabla.setdefault(str(texto), len(tabla)) for texto in parte['descripciones']],
+                dtype=np.uint32
+            )
+            for nombre in ('usuarios', 'segundos', 'centavos'):
+                columnas[nombre].append(parte[nombre])
+            columnas['codigos'].append(nuevos[parte['codigos']] if len(nuevos) else parte['codigos'])
+
+    tipos = {'usuarios': np.int64, 'segundos': np.uint32, 'centavos': np.int64, 'codigos': np.uint32}
+    datos = {
+        nombre: np.concatenate(arreglos).astype(tipos[nombre]) if arreglos else np.empty(0, dtype=tipos[nombre])
+        for nombre, arreglos in columnas.items()
+    }
+    if meta_anterior is not None:
+        # Los gastos agregados se intercalan para mantener el orden por usuario y fecha
+        orden = np.lexsort((datos['segundos'], datos['usuarios']))
+        datos = {nombre: arreglo[orden] for nombre, arreglo in datos.items()}
+
+    # Índice: rango [desde, hasta) de cada usuario (las partes ya vienen ordenadas)
+    usuarios, desde = np.unique(datos['usuarios'], return_index=True)
+    hasta = np.append(desde[1:], len(datos['usuarios']))
+    indice = np.column_stack([usuarios, desde, hasta]).astype(np.int64).reshape(-1, 3)
+
+    _guardar_npy(os.path.join(directorio, 'indice.npy'), indice)
+    for nombre in COLUMNAS:
+        _guardar_npy(os.path.join(directorio, f'{nombre}.npy'), datos[nombre])
+    _escribir_json(os.path.join(directorio, 'descripciones.json.gz'), list(tabla), comprimido=True)
+    meta = {
+        'version': VERSION_FORMATO,
+        'año': año,
+        'mes': mes,
+        'inicio': int(inicio_del_mes(año, mes).timestamp()),
+        'filas': int(len(datos['centavos'])),
+        'usuarios': int(len(usuarios)),
+        'total_centavos': int(datos['centavos'].sum()),
+        'partes': sorted(consolidadas | {os.path.basename(ruta) for ruta in nuevas}),
+    }
+    _escribir_json(ruta_meta, meta)
+
+    for ruta in partes:
+        os.remove(ruta)
+
+    ruta_indice = os.path.join(base, 'indice.json')
+    indice_general = _leer_json(ruta_indice) if os.path.exists(ruta_indice) else {}
+    indice_general[f'{año:04d}-{mes:02d}'] = {clave: meta[clave] for clave in ('filas', 'usuarios', 'total_centavos')}
+    _escribir_json(ruta_indice, dict(sorted(indice_general.items())))
+    return meta
+
+
+class MesArchivado:
+    """Lectura de un mes archivado con las columnas numéricas en memory-map"""
+
+    def __init__(self, directorio):
+        self.meta = _leer_json(os.path.join(directorio, 'meta.json'))
+        self.año, self.mes = self.meta['año'], self.meta['mes']
+        self.inicio = datetime.fromtimestamp(self.meta['inicio'], tz=dt_timezone.utc)
+        self.indice = np.load(os.path.join(directorio, 'indice.npy'), mmap_mode='r')
+        for nombre in COLUMNAS:
+            setattr(self, nombre, np.load(os.path.join(directorio, f'{nombre}.npy'), mmap_mode='r'))
+        self._directorio = directorio
+
+    @functools.cached_property
+    def descripciones(self):
+        return _leer_json(os.path.join(self._directorio, 'descripciones.json.gz'), comprimido=True)
+
+    def rango(self, usuario_id):
+        """Posiciones [desde, hasta) de los gastos del usuario (vacío si no tiene)"""
+        usuarios = self.indice[:, 0]
+        posicion = int(np.searchsorted(usuarios, usuario_id))
+        if posicion < len(usuarios) and usuarios[posicion] == usuario_id:
+            return int(self.indice[posicion, 1]), int(self.indice[posicion, 2])
+        return 0, 0
+
+    def total(self, usuario_id):
+        """(total, cantidad) de gastos del usuario en el mes"""
+        desde, hasta = self.rango(usuario_id)
+        return Decimal(int(self.centavos[desde:hasta].sum())) / 100, hasta - desde
+
+    def codigos_que_contienen(self, texto):
+        texto = texto.lower()
+        return np.array(
+            [codigo for codigo, descripcion in enumerate(self.descripciones) if texto in descripcion.lower()],
+            dtype=np.uint32
+        )
+
+    def gastos(self, usuario_id, texto=None):
+        """
+        Gastos del usuario en el mes, opcionalmente solo los que contienen `texto`.
+
+        Returns:
+            list: Diccionarios con fecha (datetime aware), descripcion y monto (Decimal)
+        """
+        desde, hasta = self.rango(usuario_id)
+        posiciones = np.arange(desde, hasta)
+        if texto:
+            posiciones = posiciones[np.isin(self.codigos[desde:hasta], self.codigos_que_contienen(texto))]
+        return [
+            {
+                'fecha': self.inicio + timedelta(seconds=int(self.segundos[posicion])),
+                'descripcion': self.descripciones[int(self.codigos[posicion])],
+                'monto': Decimal(int(self.centavos[posicion])) / 100,
+            }
+            for posicion in posiciones
+        ]
+
+
+@functools.lru_cache(maxsize=64)
+def _abrir(directorio, modificado):
+    return MesArchivado(directorio)
+
+
+def abrir_mes(año, mes, base=None):
+    """Devuelve el MesArchivado del mes, o None si no está archivado"""
+    directorio = _directorio_mes(año, mes, base)
+    try:
+        modificado = os.stat(os.path.join(directorio, 'meta.json')).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    return _abrir(directorio, modificado)
+
+
+def meses_archivados(año=None, base=None):
+    """Lista de (año, mes) archivados, del más antiguo al más reciente"""
+    ruta = os.path.join(base or directorio_base(), 'indice.json')
+    if not os.path.exists(ruta):
+        return []
+    meses = [tuple(int(parte) for parte in clave.split('-')) for clave in _leer_json(ruta)]
+    return [(a, m) for a, m in meses if año is None or a == año]
+
+
+def totales_mensuales(usuario_id, año=None, base=None):
+    """Total y cantidad de gastos archivados del usuario por mes"""
+    totales = []
+    for año_mes, mes in meses_archivados(año, base):
+        total, cantidad = abrir_mes(año_mes, mes, base).total(usuario_id)
+        totales.append({'año': año_mes, 'mes': mes, 'total': total, 'cantidad': cantidad})
+    return totales
+
+
+def buscar_gastos(usuario_id, texto, año=None, base=None):
+    """Gastos archivados del usuario cuya descripción contiene `texto` (sin distinguir mayúsculas)"""
+    resultados = []
+    for año_mes, mes in meses_archivados(año, base):
+        resultados.extend(abrir_mes(año_mes, mes, base).gastos(usuario_id, texto))
+    return resultados
+
+
+def resumen_anual(usuario_id, año, top=10, base=None):
+    """
+    Desglose de un año archivado: total por mes y descripciones con mayor gasto.
+
+    Returns:
+        dict: 'año', 'total', 'cantidad', 'meses' y 'descripciones' (las `top` con mayor total)
+    """
+    meses = []
+    por_descripcion = {}
+    for año_mes, mes in meses_archivados(año, base):
+        archivado = abrir_mes(año_mes, mes, base)
+        desde, hasta = archivado.rango(usuario_id)
+        codigos = np.asarray(archivado.codigos[desde:hasta])
+        centavos = np.asarray(archivado.centavos[desde:hasta])
+        meses.append({'mes': mes, 'total': Decimal(int(centavos.sum())) / 100, 'cantidad': hasta - desde})
+
+        # Sumar por código con bincount y acumular por texto (los códigos son por mes)
+        if len(codigos):
+            sumas = np.bincount(codigos, weights=centavos)
+            cantidades = np.bincount(codigos)
+            for codigo in np.flatnonzero(cantidades):
+                acumulado = por_descripcion.setdefault(archivado.descripciones[codigo], [0, 0])
+                acumulado[0] += int(sumas[codigo])
+                acumulado[1] += int(cantidades[codigo])
+
+    descripciones = sorted(por_descripcion.items(), key=lambda item: item[1][0], reverse=True)[:top]
+    return {
+        'año': año,
+        'total': sum((mes['total'] for mes in meses), Decimal('0')),
+        'cantidad': sum(mes['cantidad'] for mes in meses),
+        'meses': meses,
+        'descripciones': [
+            {'descripcion': descripcion, 'total': Decimal(centavos) / 100, 'cantidad': cantidad}
+            for descripcion, (centavos, cantidad) in descripciones
+        ],
+    }
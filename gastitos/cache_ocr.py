@@ -0,0 +1,202 @@
+"""
+Caché persistente de resultados de OCR y de lectura de PDFs.
+
+Los resultados se guardan en ResultadoOCR con la clave (SHA-256 del archivo, tipo,
+versión del pipeline), así que volver a subir el mismo comprobante, la misma captura
+del historial o el mismo PDF devuelve el resultado sin repetir el procesamiento.
+La tabla se acota a settings.OCR_CACHE_MAX_ENTRADAS descartando las entradas usadas
+hace más tiempo (LRU). La poda no corre en cada guardado: cada proceso poda una vez
+cada settings.OCR_CACHE_PODAR_CADA guardados, y la tarea diaria poda_cache_ocr
+(gastitos.tasks) acota la tabla aunque ningún proceso llegue a ese número.
+
+Subir VERSION_PIPELINE al cambiar el preprocesamiento o el parseo invalida las
+entradas anteriores: dejan de devolverse en el acto y se eliminan en la siguiente poda.
+"""
+import hashlib
+import os
+import threading
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+VERSION_PIPELINE = 3
+PODAR_CADA = 50  # Por defecto; se configura con settings.OCR_CACHE_PODAR_CADA
+
+_contadores = {'aciertos': 0, 'fallos': 0}
+_contadores_lock = threading.Lock()
+_guardados_desde_poda = 0
+
+
+def calcular_huella(archivo):
+    """
+    Calcula el SHA-256 del contenido de un archivo.
+
+    Args:
+        archivo: Archivo de Django (subido o FieldFile), bytes o ruta en disco
+
+    Returns:
+        str: Hash en hexadecimal
+    """
+    sha = hashlib.sha256()
+    if isinstance(archivo, (bytes, bytearray, memoryview)):
+        sha.update(archivo)
+    elif isinstance(archivo, (str, os.PathLike)):
+        with open(archivo, 'rb') as f:
+            for bloque in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(bloque)
+    else:
+        for bloque in archivo.chunks():
+            sha.update(bloque)
+        archivo.seek(0)
+    return sha.hexdigest()
+
+
+def _contar(evento):
+    with _contadores_lock:
+        _contadores[evento] += 1
+
+
+def _restaurar(tipo, resultado):
+    """Recupera los tipos que JSON no conserva (el monto de los PDFs es Decimal, las fechas date)"""
+    if tipo == 'tarjeta_movimientos' and resultado:
+        for movimiento in resultado.get('movimientos', []):
+            movimiento['fecha'] = date.fromisoformat(movimiento['fecha'])
+        _restaurar('tarjeta', resultado.get('total'))
+    if tipo == 'tarjeta' and resultado and resultado.get('monto') is not None:
+        resultado['monto'] = Decimal(str(resultado['monto']))
+    return resultado
+
+
+def _es_cacheable(resultado):
+    """No guardar resultados vacíos: pueden deberse a un fallo transitorio (p. ej. sin Tesseract)"""
+    if not resultado:
+        return False
+    if isinstance(resultado, dict):
+        return any(valor for valor in resultado.values())
+    return True
+
+
+def obtener(huella, tipo):
+    """
+    Busca un resultado en la caché y, si existe, lo marca como recién usado.
+
+    Returns:
+        El resultado guardado, o None si no está en caché
+    """
+    from .models import ResultadoOCR
+
+    if not huella:
+        return None
+
+    entrada = ResultadoOCR.objects.filter(
+        huella=huella, tipo=tipo, version=VERSION_PIPELINE
+    ).values_list('id', 'resultado').first()
+    if entrada is None:
+        _contar('fallos')
+        return None
+
+    entrada_id, resultado = entrada
+    ResultadoOCR.objects.filter(id=entrada_id).update(
+        aciertos=F('aciertos') + 1, fecha_ultimo_uso=timezone.now()
+    )
+    _contar('aciertos')
+    return _restaurar(tipo, resultado)
+
+
+def _toca_podar():
+    """Cuenta un guardado y dice si este proceso ya acumuló los suficientes para podar"""
+    global _guardados_desde_poda
+    cada = getattr(settings, 'OCR_CACHE_PODAR_CADA', PODAR_CADA)
+    with _contadores_lock:
+        _guardados_desde_poda += 1
+        if _guardados_desde_poda < cada:
+            return False
+        _guardados_desde_poda = 0
+        return True
+
+
+def guardar(huella, tipo, resultado):
+    """Guarda un resultado en la caché y, cada tanto, poda las entradas sobrantes"""
+    from .models import ResultadoOCR
+
+    if not huella or not _es_cacheable(resultado):
+        return
+
+    try:
+        with transaction.atomic():
+            ResultadoOCR.objects.update_or_create(
+                huella=huella, tipo=tipo, version=VERSION_PIPELINE,
+                defaults={'resultado': resultado, 'fecha_ultimo_uso': timezone.now()}
+            )
+    except IntegrityError:
+        # Otro proceso guardó el mismo archivo al mismo tiempo
+        return
+    if _toca_podar():
+        podar()
+
+
+def podar(max_entradas=None):
+    """
+    Elimina las entradas de versiones anteriores y las menos usadas por encima del límite.
+
+    Returns:
+        int: Cantidad de entradas eliminadas
+    """
+    from .models import ResultadoOCR
+
+    if max_entradas is None:
+        max_entradas = getattr(settings, 'OCR_CACHE_MAX_ENTRADAS', 1000)
+
+    eliminadas, _ = ResultadoOCR.objects.exclude(version=VERSION_PIPELINE).delete()
+    sobrantes = list(
+        ResultadoOCR.objects.order_by('-fecha_ultimo_uso').values_list('id', flat=True)[max_entradas:]
+    )
+    if sobrantes:
+        eliminadas += ResultadoOCR.objects.filter(id__in=sobrantes).delete()[0]
+    return eliminadas
+
+
+def con_cache(tipo, archivo, funcion):
+    """
+    Devuelve el resultado en caché para el archivo o lo calcula con funcion(archivo).
+
+    Args:
+        tipo: 'comprobante', 'historial', 'tarjeta' o 'tarjeta_movimientos'
+        archivo: Archivo subido
+        funcion: Función de extracción a usar si no hay resultado en caché
+    """
+    huella = calcular_huella(archivo)
+    resultado = obtener(huella, tipo)
+    if resultado is not None:
+        return resultado
+
+    resultado = funcion(archivo)
+    guardar(huella, tipo, resultado)
+    return resultado
+
+
+def estadisticas():
+    """
+    Contadores de la caché.
+
+    Returns:
+        dict: Aciertos y fallos de este proceso, y entradas y aciertos acumulados en la base
+    """
+    from .models import ResultadoOCR
+
+    with _contadores_lock:
+        contadores = dict(_contadores)
+    totales = ResultadoOCR.objects.filter(version=VERSION_PIPELINE).aggregate(aciertos=Sum('aciertos'))
+    consultas = contadores['aciertos'] + contadores['fallos']
+    return {
+        'aciertos': contadores['aciertos'],
+        'fallos': contadores['fallos'],
+        'tasa_aciertos': contadores['aciertos'] / consultas if consultas else 0,
+        'entradas': ResultadoOCR.objects.filter(version=VERSION_PIPELINE).count(),
+        'aciertos_acumulados': totales['aciertos'] or 0,
+        'version': VERSION_PIPELINE,
+    }
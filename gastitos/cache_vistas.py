@@ -0,0 +1,53 @@
+"""
+Caché por usuario del contexto de las vistas más costosas (dashboard, modo ahorro).
+
+La clave incluye la versión de datos del usuario (VersionDatos), que las señales de
+Gasto, GastoFijo, Vencimiento, MetaAhorro y PerfilUsuario, y las escrituras en bloque,
+incrementan en cada cambio. Una entrada nunca se invalida a mano: cuando los datos
+cambian la versión sube y la clave vieja deja de usarse hasta que vence. La fecha local
+también forma parte de la clave porque estas vistas calculan plazos respecto de hoy.
+
+Usa la caché configurada en settings.CACHES (locmem o archivos alcanzan): la versión
+vive en la base, así que todos los procesos ven el mismo cambio aunque cada uno tenga
+su propia caché en memoria.
+"""
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import VersionDatos
+
+DURACION_CACHE = 60 * 60
+
+# Aciertos y fallos de este proceso por vista, desde que arrancó
+ESTADISTICAS = {}
+
+
+def contexto_en_cache(nombre, usuario, calcular):
+    """
+    Devuelve el contexto cacheado de la vista `nombre` para el usuario, o lo calcula
+    con `calcular()` y lo guarda. El contexto debe poder serializarse (listas y
+    modelos ya evaluados, no querysets ni formularios).
+    """
+    # La versión se lee antes de calcular: si los datos cambian mientras tanto, el
+    # resultado queda guardado bajo una versión que ya no se va a pedir
+    version = VersionDatos.actual(usuario.id)
+    clave = f'vista:{nombre}:{usuario.id}:{version}:{timezone.localdate().isoformat()}'
+    estadisticas = ESTADISTICAS.setdefault(nombre, {'aciertos': 0, 'fallos': 0})
+
+    contexto = cache.get(clave)
+    if contexto is not None:
+        estadisticas['aciertos'] += 1
+        return contexto
+
+    estadisticas['fallos'] += 1
+    contexto = calcular()
+    cache.set(clave, contexto, DURACION_CACHE)
+    return contexto
+
+
+def estadisticas_cache():
+    """Aciertos, fallos y tasa de aciertos de cada vista cacheada en este proceso"""
+    return {
+        nombre: {**valores, 'tasa_aciertos': valores['aciertos'] / ((valores['aciertos'] + valores['fallos']) or 1)}
+        for nombre, valores in sorted(ESTADISTICAS.items())
+    }
@@ -0,0 +1,195 @@
+"""
+Importación masiva de gastos (historial de MercadoPago, estados de cuenta en PDF
+y cualquier otro origen que produzca filas con descripción y monto).
+
+Todo el lote se valida contra una sola lectura del saldo de cada mes (con
+fecha propia, una fila se valida contra el mes en el que queda registrada), las
+descripciones se normalizan en memoria y los gastos aceptados se insertan con
+bulk_create en una única transacción. Como bulk_create no dispara las señales
+de Gasto, los acumulados diarios y mensuales se actualizan aquí con un
+movimiento por día en lugar de uno por gasto, y la versión de datos del usuario
+se incrementa una vez por lote.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import BalanceMensual, Gasto, PerfilUsuario, VersionDatos, simplificar_descripcion
+from .signals import BALANCES
+
+DESCRIPCION_POR_DEFECTO = 'Gasto importado'
+MONTO_MAXIMO = Decimal('99999999.99')  # max_digits=10, decimal_places=2 en Gasto.monto
+
+_LARGO_DESCRIPCION = Gasto._meta.get_field('descripcion').max_length
+
+
+def normalizar_fila(fila):
+    """
+    Valida una fila y devuelve (descripcion, monto) o lanza ValueError con el motivo.
+    """
+    try:
+        monto = Decimal(str(fila.get('monto')))
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValueError('Monto inválido')
+    if not monto.is_finite():
+        raise ValueError('Monto inválido')
+    monto = monto.quantize(Decimal('0.01'))
+    if monto < Decimal('0.01'):
+        raise ValueError('El monto debe ser mayor a cero')
+    if monto > MONTO_MAXIMO:
+        raise ValueError('El monto excede el máximo permitido')
+
+    descripcion = ' '.join(str(fila.get('descripcion') or '').split())
+    descripcion = simplificar_descripcion(descripcion or DESCRIPCION_POR_DEFECTO)
+    return descripcion[:_LARGO_DESCRIPCION], monto
+
+
+def filas_resumen_tarjeta(movimientos):
+    """
+    Filas para importar_gastos con los consumos en pesos de un resumen de tarjeta.
+
+    Un consumo en un pago conserva su fecha de compra. Cada cuota de una compra en
+    cuotas se factura en el resumen que la trae, así que no lleva fecha y se registra
+    en el mes en que se importa: si usara la fecha de la compra, todas las cuotas
+    caerían en el mes (quizás ya cerrado) en que se hizo la compra.
+    """
+    return [{
+        'descripcion': m['comercio'] + (f" (cuota {m['cuota']}/{m['cuotas']})" if m['cuota'] else ''),
+        'monto': m['monto'],
+        'fecha': None if m['cuota'] else m['fecha'],
+    } for m in movimientos if m['moneda'] == 'ARS']
+
+
+def _fecha_de_fila(fila):
+    """Convierte la 'fecha' de una fila (date o texto ISO) en un datetime aware, o None"""
+    fecha = fila.get('fecha')
+    if isinstance(fecha, str):
+        try:
+            fecha = date.fromisoformat(fecha[:10])
+        except ValueError:
+            return None
+    if isinstance(fecha, datetime):
+        return fecha if timezone.is_aware(fecha) else timezone.make_aware(fecha)
+    if isinstance(fecha, date):
+        # Mediodía local: la fecha no cambia de día al pasar a UTC
+        return timezone.make_aware(datetime.combine(fecha, time(12)))
+    return None
+
+
+def importar_gastos(usuario, filas, descripcion_por_defecto=None, con_fecha=False):
+    """
+    Crea en bloque los gastos de `filas` que entran en el saldo disponible.
+
+    Las filas se procesan en orden y cada gasto aceptado descuenta su monto del
+    saldo de su mes, igual que si se hubieran guardado de a uno. Con `con_fecha`,
+    una compra de un mes anterior se valida contra el saldo de ese mes y no
+    consume el del mes actual.
+
+    Args:
+        usuario: Usuario dueño de los gastos
+        filas: Iterable de dicts con 'descripcion' y 'monto'
+        descripcion_por_defecto: Descripción para las filas que no traen una
+        con_fecha: Usar la 'fecha' de cada fila (p. ej. la fecha de compra de un
+            resumen de tarjeta) en lugar de la fecha actual
+
+    Returns:
+        dict: 'agregados' y 'rechazados' (cantidades), 'saldo_restante' (del mes
+        actual) y 'filas',
+        un reporte por fila con 'indice', 'estado' ('aceptado' o 'rechazado'),
+        'descripcion', 'monto', 'motivo' y, si se creó, 'gasto_id'
+    """
+    filas = list(filas)
+    reporte = []
+
+    with transaction.atomic():
+        # Bloquear el perfil para que dos importaciones simultáneas no usen el mismo saldo
+        perfil, created = PerfilUsuario.objects.select_for_update().get_or_create(user=usuario)
+        ahora = timezone.now()
+        fechas = [(_fecha_de_fila(fila) if con_fecha else None) or ahora for fila in filas]
+        saldos = _saldos_por_mes(perfil, fechas + [ahora])
+
+        aceptados = []
+        for indice, fila in enumerate(filas):
+            if descripcion_por_defecto and not fila.get('descripcion'):
+                fila = {**fila, 'descripcion': descripcion_por_defecto}
+            entrada = {'indice': indice, 'descripcion': fila.get('descripcion'), 'monto': fila.get('monto')}
+            try:
+                descripcion, monto = normalizar_fila(fila)
+            except ValueError as e:
+                reporte.append({**entrada, 'estado': 'rechazado', 'motivo': str(e)})
+                continue
+
+            entrada.update(descripcion=descripcion, monto=monto)
+            mes = _mes(fechas[indice])
+            if monto > saldos[mes]:
+                motivo = f'Saldo insuficiente. Disponible: ${saldos[mes]:.2f}'
+                if mes != _mes(ahora):
+                    motivo += f' en {mes[1]:02d}/{mes[0]}'
+                reporte.append({**entrada, 'estado': 'rechazado', 'motivo': motivo})
+                continue
+
+            saldos[mes] -= monto
+            entrada.update(estado='aceptado', motivo='')
+            reporte.append(entrada)
+            aceptados.append((entrada, Gasto(usuario=usuario, descripcion=descripcion, monto=monto)))
+
+        gastos = Gasto.objects.bulk_create([gasto for _, gasto in aceptados])
+        for (entrada, _), gasto in zip(aceptados, gastos):
+            entrada['gasto_id'] = gasto.pk
+
+        if con_fecha:
+            # Gasto.fecha es auto_now_add, así que la fecha propia se aplica después del insert
+            con_fecha_propia = []
+            for (entrada, _), gasto in zip(aceptados, gastos):
+                fecha = fechas[entrada['indice']]
+                if fecha is not ahora:
+                    gasto.fecha = fecha
+                    con_fecha_propia.append(gasto)
+            Gasto.objects.bulk_update(con_fecha_propia, ['fecha'], batch_size=500)
+
+        _registrar_en_balances(usuario.id, gastos)
+        if gastos:
+            # bulk_create no dispara las señales: invalidar las vistas cacheadas del usuario
+            VersionDatos.incrementar([usuario.id])
+
+    return {
+        'agregados': len(gastos),
+        'rechazados': len(reporte) - len(gastos),
+        'saldo_restante': saldos[_mes(ahora)],
+        'filas': reporte,
+    }
+
+
+def _mes(fecha):
+    fecha = timezone.localtime(fecha)
+    return fecha.year, fecha.month
+
+
+def _saldos_por_mes(perfil, fechas):
+    """Saldo disponible de cada mes de `fechas`, leído en una sola consulta a los balances"""
+    meses = {_mes(fecha) for fecha in fechas}
+    totales = dict.fromkeys(meses, Decimal('0'))
+    balances = BalanceMensual.objects.filter(
+        usuario_id=perfil.user_id, año__in={año for año, _ in meses}
+    ).values_list('año', 'mes', 'total_gastos')
+    for año, mes, total in balances:
+        if (año, mes) in totales:
+            totales[(año, mes)] = total
+    return {mes: perfil.salario_mensual - total for mes, total in totales.items()}
+
+
+def _registrar_en_balances(usuario_id, gastos):
+    """Suma los gastos creados en bloque a los acumulados, un movimiento por día"""
+    por_dia = defaultdict(lambda: [Decimal('0'), 0, None])
+    for gasto in gastos:
+        acumulado = por_dia[timezone.localtime(gasto.fecha).date()]
+        acumulado[0] += gasto.monto
+        acumulado[1] += 1
+        acumulado[2] = gasto.fecha
+
+    for total, cantidad, fecha in por_dia.values():
+        for balance in BALANCES:
+            balance.registrar_movimiento(usuario_id, fecha, total, cantidad=cantidad)
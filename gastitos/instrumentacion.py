@@ -0,0 +1,224 @@
+"""
+Medición de las vistas: tiempo total, consultas SQL, tiempo en la base y tiempo de
+render de plantillas por nombre de URL.
+
+- MedicionVistasMiddleware mide cada request y agrega una muestra a un buffer circular
+  en memoria (settings.INSTRUMENTACION_MAX_MUESTRAS) más totales acumulados por vista.
+  También devuelve el encabezado Server-Timing, visible en las herramientas del navegador.
+- PlantillasMedidas es el backend de plantillas configurado en settings.TEMPLATES: igual
+  al de Django, pero suma el tiempo de render a la medición del request en curso (ese
+  tiempo incluye las consultas que disparan las plantillas).
+- resumen() y formato_prometheus() alimentan el endpoint staff/instrumentacion/ (solo staff).
+- presupuesto_consultas() es un context manager para los tests que falla si un bloque
+  hace más consultas que las permitidas.
+
+Las muestras son de cada proceso, como las estadísticas de cache_vistas.
+"""
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+from django.template.backends.django import DjangoTemplates, Template
+
+MAX_MUESTRAS = getattr(settings, 'INSTRUMENTACION_MAX_MUESTRAS', 5000)
+
+_medicion_actual = ContextVar('medicion_actual', default=None)
+_bloqueo = threading.Lock()
+MUESTRAS = deque(maxlen=MAX_MUESTRAS)
+TOTALES = defaultdict(lambda: {'solicitudes': 0, 'segundos': 0.0, 'consultas': 0, 'sql': 0.0, 'plantillas': 0.0})
+
+
+class Medicion:
+    """Acumula las consultas y el render de plantillas de un request"""
+
+    def __init__(self):
+        self.consultas = 0
+        self.sql = 0.0
+        self.plantillas = 0.0
+
+    def medir_consulta(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas += 1
+            self.sql += time.perf_counter() - inicio
+
+
+class MedicionVistasMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        medicion = Medicion()
+        token = _medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            with connection.execute_wrapper(medicion.medir_consulta):
+                response = self.get_response(request)
+        finally:
+            _medicion_actual.reset(token)
+        segundos = time.perf_counter() - inicio
+
+        match = request.resolver_match
+        vista = (match.view_name if match else None) or 'sin_resolver'
+        registrar_muestra(vista, segundos, medicion, response.status_code)
+        response['Server-Timing'] = (
+            f'sql;desc="{medicion.consultas} consultas";dur={medicion.sql * 1000:.1f}, '
+            f'plantillas;dur={medicion.plantillas * 1000:.1f}, total;dur={segundos * 1000:.1f}'
+        )
+        return response
+
+
+class PlantillaMedida(Template):
+    def render(self, context=None, request=None):
+        medicion = _medicion_actual.get()
+        if medicion is None:
+            return super().render(context, request)
+        inicio = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            medicion.plantillas += time.perf_counter() - inicio
+
+
+class PlantillasMedidas(DjangoTemplates):
+    """Backend DjangoTemplates que mide el tiempo de render de cada plantilla"""
+
+    def from_string(self, template_code):
+        return PlantillaMedida(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        plantilla = super().get_template(template_name)
+        return PlantillaMedida(plantilla.template, self)
+
+
+def registrar_muestra(vista, segundos, medicion, estado=200):
+    with _bloqueo:
+        MUESTRAS.append((vista, segundos, medicion.consultas, medicion.sql, medicion.plantillas, estado))
+        totales = TOTALES[vista]
+        totales['solicitudes'] += 1
+        totales['segundos'] += segundos
+        totales['consultas'] += medicion.consultas
+        totales['sql'] += medicion.sql
+        totales['plantillas'] += medicion.plantillas
+
+
+def reiniciar():
+    with _bloqueo:
+        MUESTRAS.clear()
+        TOTALES.clear()
+
+
+def _percentil(valores, fraccion):
+    """Percentil por rango más cercano de una lista ya ordenada"""
+    if not valores:
+        return 0.0
+    return valores[min(len(valores) - 1, max(0, round(fraccion * len(valores)) - 1))]
+
+
+def resumen():
+    """
+    Estadísticas por vista de las muestras del buffer (las últimas MAX_MUESTRAS).
+
+    Returns:
+        dict: vista -> solicitudes, p50/p95 del tiempo total (ms), consultas promedio y
+        máximas, y promedios de tiempo en SQL y en plantillas (ms)
+    """
+    with _bloqueo:
+        muestras = list(MUESTRAS)
+    por_vista = defaultdict(list)
+    for muestra in muestras:
+        por_vista[muestra[0]].append(muestra)
+
+    resultado = {}
+    for vista, filas in sorted(por_vista.items()):
+        tiempos = sorted(fila[1] for fila in filas)
+        consultas = [fila[2] for fila in filas]
+        resultado[vista] = {
+            'solicitudes': len(filas),
+            'p50_ms': round(_percentil(tiempos, 0.5) * 1000, 2),
+            'p95_ms': round(_percentil(tiempos, 0.95) * 1000, 2),
+            'consultas_promedio': round(sum(consultas) / len(filas), 2),
+            'consultas_max': max(consultas),
+            'sql_ms_promedio': round(sum(fila[3] for fila in filas) / len(filas) * 1000, 2),
+            'plantillas_ms_promedio': round(sum(fila[4] for fila in filas) / len(filas) * 1000, 2),
+            'errores': sum(1 for fila in filas if fila[5] >= 500),
+        }
+    return resultado
+
+
+def _etiqueta(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def formato_prometheus(estadisticas_cache=None):
+    """
+    Métricas en el formato de texto de Prometheus: contadores acumulados por vista y
+    un summary con los cuantiles 0.5 y 0.95 del tiempo total sobre el buffer.
+    """
+    with _bloqueo:
+        totales = {vista: dict(valores) for vista, valores in TOTALES.items()}
+    cuantiles = resumen()
+
+    lineas = []
+
+    def metrica(nombre, tipo, ayuda, filas):
+        lineas.append(f'# HELP {nombre} {ayuda}')
+        lineas.append(f'# TYPE {nombre} {tipo}')
+        lineas.extend(filas)
+
+    vistas = sorted(totales)
+    metrica('gastitos_vista_solicitudes_total', 'counter', 'Solicitudes atendidas por vista', [
+        f'gastitos_vista_solicitudes_total{{vista="{_etiqueta(vista)}"}} {totales[vista]["solicitudes"]}'
+        for vista in vistas
+    ])
+    filas_duracion = []
+    for vista in vistas:
+        etiqueta = _etiqueta(vista)
+        if vista in cuantiles:
+            filas_duracion.append(f'gastitos_vista_duracion_segundos{{vista="{etiqueta}",quantile="0.5"}} {round(cuantiles[vista]["p50_ms"] / 1000, 6)}')
+            filas_duracion.append(f'gastitos_vista_duracion_segundos{{vista="{etiqueta}",quantile="0.95"}} {round(cuantiles[vista]["p95_ms"] / 1000, 6)}')
+        filas_duracion.append(f'gastitos_vista_duracion_segundos_sum{{vista="{etiqueta}"}} {totales[vista]["segundos"]}')
+        filas_duracion.append(f'gastitos_vista_duracion_segundos_count{{vista="{etiqueta}"}} {totales[vista]["solicitudes"]}')
+    metrica('gastitos_vista_duracion_segundos', 'summary', 'Tiempo total del request por vista', filas_duracion)
+    metrica('gastitos_vista_consultas_total', 'counter', 'Consultas SQL por vista', [
+        f'gastitos_vista_consultas_total{{vista="{_etiqueta(vista)}"}} {totales[vista]["consultas"]}' for vista in vistas
+    ])
+    metrica('gastitos_vista_sql_segundos_total', 'counter', 'Tiempo en consultas SQL por vista', [
+        f'gastitos_vista_sql_segundos_total{{vista="{_etiqueta(vista)}"}} {totales[vista]["sql"]}' for vista in vistas
+    ])
+    metrica('gastitos_vista_plantillas_segundos_total', 'counter', 'Tiempo de render de plantillas por vista', [
+        f'gastitos_vista_plantillas_segundos_total{{vista="{_etiqueta(vista)}"}} {totales[vista]["plantillas"]}'
+        for vista in vistas
+    ])
+    if estadisticas_cache:
+        for clave, ayuda in (('aciertos', 'Aciertos'), ('fallos', 'Fallos')):
+            metrica(f'gastitos_cache_vistas_{clave}_total', 'counter', f'{ayuda} de la caché de contexto por vista', [
+                f'gastitos_cache_vistas_{clave}_total{{vista="{_etiqueta(vista)}"}} {valores[clave]}'
+                for vista, valores in estadisticas_cache.items()
+            ])
+    return '\n'.join(lineas) + '\n'
+
+
+@contextmanager
+def presupuesto_consultas(maximo, descripcion=''):
+    """
+    Falla con AssertionError si el bloque ejecuta más de `maximo` consultas. Para tests:
+
+        with presupuesto_consultas(12, 'index'):
+            self.client.get(reverse('index'))
+    """
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as capturadas:
+        yield capturadas
+    if len(capturadas) > maximo:
+        detalle = '\n'.join(f'{numero}. {consulta["sql"]}' for numero, consulta in enumerate(capturadas.captured_queries, 1))
+        raise AssertionError(
+            f'{descripcion or "El bloque"} ejecutó {len(capturadas)} consultas; el presupuesto es {maximo}\n{detalle}'
+        )
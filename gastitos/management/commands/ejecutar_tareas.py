@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from gastitos import tasks  # noqa: F401  (registra las tareas)
+from gastitos.models import EjecucionTarea
+from gastitos.programador import TAREAS, ejecutar_pendientes
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta las tareas programadas pendientes (cierre mensual, gastos fijos, vencimiento de metas)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tarea', action='append', choices=sorted(TAREAS),
+            help='Ejecutar solo esta tarea (se puede repetir)'
+        )
+        parser.add_argument(
+            '--cada', type=int, metavar='SEGUNDOS',
+            help='Quedarse corriendo y buscar tareas pendientes cada estos segundos'
+        )
+        parser.add_argument('--listar', action='store_true', help='Mostrar las últimas ejecuciones y salir')
+
+    def handle(self, *args, **options):
+        if options['listar']:
+            self.listar()
+            return
+
+        if options['cada'] is not None and options['cada'] <= 0:
+            raise CommandError('--cada debe ser mayor a cero')
+
+        while True:
+            ejecuciones = ejecutar_pendientes(nombres=options['tarea'])
+            if ejecuciones is None:
+                self.stdout.write('Otro proceso está ejecutando las tareas programadas')
+            elif not ejecuciones and options['cada'] is None:
+                self.stdout.write('No hay tareas pendientes')
+            for ejecucion in ejecuciones or []:
+                mensaje = (
+                    f'{ejecucion.tarea} {ejecucion.clave}: {ejecucion.get_estado_display().lower()} '
+                    f'en {ejecucion.duracion:.2f} s, {ejecucion.filas or 0} filas'
+                )
+                if ejecucion.estado == 'completado':
+                    self.stdout.write(self.style.SUCCESS(mensaje))
+                else:
+                    reintento = timezone.localtime(ejecucion.lease_hasta)
+                    self.stdout.write(self.style.ERROR(
+                        f'{mensaje} - {ejecucion.error} (se reintenta desde las {reintento:%H:%M})'
+                    ))
+
+            if options['cada'] is None:
+                return
+            time.sleep(options['cada'])
+
+    def listar(self):
+        for nombre, tarea in TAREAS.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{nombre}: {tarea.descripcion}'))
+            for ejecucion in EjecucionTarea.objects.filter(tarea=nombre)[:5]:
+                self.stdout.write(
+                    f'  {ejecucion.clave:<12}{ejecucion.get_estado_display():<12}'
+                    f'intentos {ejecucion.intentos}  filas {ejecucion.filas if ejecucion.filas is not None else "-"}  '
+                    f'{ejecucion.duracion or 0:.2f} s  {ejecucion.error}'
+                )
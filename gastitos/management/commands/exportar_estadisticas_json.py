@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from gastitos.utils_estadisticas import DIRECTORIO_JSON, exportar_estadisticas_json
+
+
+class Command(BaseCommand):
+    help = 'Exporta las estadísticas de un mes a estadisticas/estadisticas_<año>_<mes>.json'
+
+    def add_arguments(self, parser):
+        parser.add_argument('año', type=int)
+        parser.add_argument('mes', type=int)
+        parser.add_argument('--directorio', default=DIRECTORIO_JSON, help='Carpeta de destino')
+
+    def handle(self, *args, **options):
+        if not 1 <= options['mes'] <= 12:
+            raise CommandError('El mes debe estar entre 1 y 12')
+        ruta = exportar_estadisticas_json(options['año'], options['mes'], options['directorio'])
+        self.stdout.write(self.style.SUCCESS(f'Estadísticas exportadas a {ruta}'))
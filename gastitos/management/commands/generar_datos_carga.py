@@ -0,0 +1,159 @@
+import random
+import re
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from gastitos.models import (
+    BalanceDiario, BalanceMensual, EstadisticaMensual, Gasto, GastoFijo, MetaAhorro, PerfilUsuario,
+    Vencimiento, VersionDatos,
+)
+from gastitos.pronostico_ahorro import sumar_meses
+
+CLAVE = 'carga-1234'
+DESCRIPCIONES = [
+    'Supermercado', 'Verdulería', 'Carnicería', 'Farmacia', 'Nafta', 'SUBE', 'Uber', 'Delivery',
+    'Restaurante', 'Café', 'Kiosco', 'Ropa', 'Librería', 'Ferretería', 'Cine', 'Peluquería',
+]
+GASTOS_FIJOS = ['Alquiler', 'Expensas', 'Internet', 'Celular', 'Gimnasio', 'Streaming', 'Seguro del auto', 'Prepaga']
+VENCIMIENTOS = ['Tarjeta Visa', 'Tarjeta Master', 'Luz', 'Gas', 'Agua', 'ABL', 'Patente', 'Monotributo']
+METAS = [
+    ('Viaje', 'plane'), ('Auto', 'car'), ('Casa', 'home'), ('Notebook', 'laptop'),
+    ('Bicicleta', 'bicycle'), ('Curso', 'graduation-cap'), ('Fondo de emergencia', 'piggy-bank'),
+]
+
+
+def generar(usuarios, gastos_por_usuario, meses, meses_cerrados, semilla=0, prefijo='carga', hoy=None):
+    """
+    Crea `usuarios` usuarios con perfil, gastos repartidos en los últimos `meses` meses
+    (incluido el actual), gastos fijos, vencimientos, metas de ahorro y estadísticas de
+    los `meses_cerrados` meses anteriores. Con la misma semilla genera los mismos datos.
+
+    Returns:
+        dict: Cantidad de filas creadas por modelo
+    """
+    generador = random.Random(semilla)
+    hoy = hoy or timezone.localdate()
+    # Meses con gastos vivos, del más viejo al actual
+    meses_vivos = [sumar_meses(hoy.replace(day=1), -atras) for atras in range(meses - 1, -1, -1)]
+    clave = make_password(CLAVE)
+
+    nombres = [f'{prefijo}{numero:05d}' for numero in range(usuarios)]
+    User.objects.bulk_create([User(username=nombre, password=clave) for nombre in nombres], batch_size=1000)
+    usuario_ids = list(User.objects.filter(username__in=nombres).order_by('username').values_list('id', flat=True))
+
+    perfiles, gastos, fijos, vencimientos, metas, estadisticas = [], [], [], [], [], []
+    for usuario_id in usuario_ids:
+        salario = Decimal(generador.randrange(400000, 3000000, 1000))
+        perfiles.append(PerfilUsuario(user_id=usuario_id, salario_mensual=salario))
+
+        for _ in range(gastos_por_usuario):
+            inicio = generador.choice(meses_vivos)
+            ultimo_dia = hoy.day if inicio.month == hoy.month and inicio.year == hoy.year else 28
+            fecha = datetime(inicio.year, inicio.month, generador.randint(1, ultimo_dia),
+                             generador.randint(7, 22), generador.randint(0, 59))
+            gastos.append(Gasto(
+                usuario_id=usuario_id,
+                descripcion=generador.choice(DESCRIPCIONES),
+                monto=Decimal(generador.randint(50000, 8000000)) / 100,
+                fecha=timezone.make_aware(fecha),
+            ))
+
+        for descripcion in generador.sample(GASTOS_FIJOS, generador.randint(2, 5)):
+            fijos.append(GastoFijo(
+                usuario_id=usuario_id, descripcion=descripcion,
+                monto=Decimal(generador.randrange(10000, 400000, 500)), activo=generador.random() < 0.9,
+            ))
+        for descripcion in generador.sample(VENCIMIENTOS, generador.randint(1, 4)):
+            vencimientos.append(Vencimiento(
+                usuario_id=usuario_id, descripcion=descripcion,
+                fecha_vencimiento=hoy + timedelta(days=generador.randint(-10, 45)),
+            ))
+        for nombre, icono in generador.sample(METAS, generador.randint(1, 4)):
+            objetivo = Decimal(generador.randrange(200000, 20000000, 10000))
+            metas.append(MetaAhorro(
+                usuario_id=usuario_id, nombre=nombre, icono=icono,
+                monto_objetivo=objetivo,
+                monto_ahorrado=(objetivo * Decimal(generador.randint(0, 90)) / 100).quantize(Decimal('0.01')),
+                fecha_objetivo=hoy + timedelta(days=generador.randint(30, 900)),
+                moneda='USD' if generador.random() < 0.1 else 'ARS',
+            ))
+        for atras in range(1, meses_cerrados + 1):
+            cerrado = sumar_meses(meses_vivos[0], -atras)
+            estadisticas.append(EstadisticaMensual(
+                usuario_id=usuario_id, año=cerrado.year, mes=cerrado.month,
+                total_gastos=Decimal(generador.randint(10000000, int(salario) * 110)) / 100,
+            ))
+
+    PerfilUsuario.objects.bulk_create(perfiles, batch_size=1000)
+    fechas = [gasto.fecha for gasto in gastos]
+    gastos = Gasto.objects.bulk_create(gastos, batch_size=2000)
+    # Gasto.fecha es auto_now_add: aplicar las fechas generadas después del insert
+    for gasto, fecha in zip(gastos, fechas):
+        gasto.fecha = fecha
+    Gasto.objects.bulk_update(gastos, ['fecha'], batch_size=2000)
+    GastoFijo.objects.bulk_create(fijos, batch_size=1000)
+    Vencimiento.objects.bulk_create(vencimientos, batch_size=1000)
+    MetaAhorro.objects.bulk_create(metas, batch_size=1000)
+    EstadisticaMensual.objects.bulk_create(estadisticas, batch_size=1000)
+
+    # bulk_create no dispara señales: balances y versiones de datos se arman acá
+    BalanceMensual.reconciliar()
+    BalanceDiario.reconciliar()
+    VersionDatos.incrementar(usuario_ids)
+    return {
+        'usuarios': len(usuario_ids),
+        'gastos': len(gastos),
+        'gastos fijos': len(fijos),
+        'vencimientos': len(vencimientos),
+        'metas de ahorro': len(metas),
+        'estadísticas mensuales': len(estadisticas),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera datos de carga reproducibles (usuarios con gastos, gastos fijos, vencimientos, '
+        f'metas y estadísticas mensuales) para medir las vistas. Todos los usuarios tienen la clave "{CLAVE}"'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=100)
+        parser.add_argument('--gastos', type=int, default=500, help='Gastos por usuario')
+        parser.add_argument('--meses', type=int, default=3, help='Meses con gastos, incluido el actual')
+        parser.add_argument('--meses-cerrados', type=int, default=12, help='Meses anteriores con estadísticas')
+        parser.add_argument('--semilla', type=int, default=0)
+        parser.add_argument('--prefijo', default='carga', help='Prefijo de los nombres de usuario')
+        parser.add_argument(
+            '--reemplazar', action='store_true',
+            help='Borrar antes los usuarios generados con el prefijo (y todos sus datos)'
+        )
+
+    def handle(self, *args, **options):
+        if options['usuarios'] <= 0 or options['meses'] <= 0:
+            raise CommandError('--usuarios y --meses deben ser mayores a cero')
+        if options['gastos'] < 0 or options['meses_cerrados'] < 0:
+            raise CommandError('--gastos y --meses-cerrados no pueden ser negativos')
+
+        # Solo los nombres que genera este comando: prefijo seguido de cinco dígitos
+        existentes = User.objects.filter(username__regex=rf"^{re.escape(options['prefijo'])}[0-9]{{5}}$")
+        with transaction.atomic():
+            if options['reemplazar']:
+                eliminados, _ = existentes.delete()
+                if eliminados:
+                    self.stdout.write(f'{eliminados} filas eliminadas')
+            elif existentes.exists():
+                raise CommandError(
+                    f"Ya hay usuarios con el prefijo '{options['prefijo']}'; usá --reemplazar u otro --prefijo"
+                )
+
+            creados = generar(
+                options['usuarios'], options['gastos'], options['meses'], options['meses_cerrados'],
+                semilla=options['semilla'], prefijo=options['prefijo'],
+            )
+        for modelo, cantidad in creados.items():
+            self.stdout.write(self.style.SUCCESS(f'{modelo}: {cantidad}'))
@@ -0,0 +1,61 @@
+import glob
+import os
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from gastitos.models import EstadisticaMensual, VersionDatos
+from gastitos.utils_estadisticas import DIRECTORIO_JSON, leer_estadisticas_json
+
+
+class Command(BaseCommand):
+    help = 'Importa a EstadisticaMensual los archivos estadisticas/estadisticas_<año>_<mes>.json'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directorio', default=DIRECTORIO_JSON, help='Carpeta con los archivos JSON')
+        parser.add_argument(
+            '--sobrescribir', action='store_true',
+            help='Reemplazar los totales que ya estén en la base (por defecto se conservan)'
+        )
+
+    def handle(self, *args, **options):
+        if not os.path.isdir(options['directorio']):
+            raise CommandError(f"No existe la carpeta '{options['directorio']}'")
+
+        archivos = sorted(glob.glob(os.path.join(options['directorio'], 'estadisticas_*.json')))
+        if not archivos:
+            self.stdout.write('No hay archivos de estadísticas para importar')
+            return
+
+        importadas = 0
+        for ruta in archivos:
+            try:
+                año, mes, totales = leer_estadisticas_json(ruta)
+            except (ValueError, OSError) as e:
+                self.stdout.write(self.style.WARNING(f'{os.path.basename(ruta)}: se omite ({e})'))
+                continue
+
+            usuarios = dict(User.objects.filter(username__in=totales).values_list('username', 'id'))
+            filas = [
+                EstadisticaMensual(usuario_id=usuarios[username], año=año, mes=mes, total_gastos=total)
+                for username, total in totales.items()
+                if username in usuarios
+            ]
+            if options['sobrescribir']:
+                EstadisticaMensual.objects.bulk_create(
+                    filas, update_conflicts=True, unique_fields=['usuario', 'año', 'mes'],
+                    update_fields=['total_gastos'], batch_size=500
+                )
+            else:
+                EstadisticaMensual.objects.bulk_create(filas, ignore_conflicts=True, batch_size=500)
+            VersionDatos.incrementar(fila.usuario_id for fila in filas)
+            importadas += len(filas)
+
+            desconocidos = len(totales) - len(filas)
+            self.stdout.write(
+                f'{os.path.basename(ruta)}: {len(filas)} usuarios'
+                + (f', {desconocidos} nombres de usuario inexistentes' if desconocidos else '')
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Estadísticas importadas: {importadas} filas leídas de {len(archivos)} archivos'
+        ))
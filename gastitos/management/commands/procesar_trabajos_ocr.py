@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from gastitos import cache_ocr
+from gastitos.models import TrabajoOCR
+from gastitos.tasks_ocr import ejecutar_ocr, obtener_pool
+
+
+class Command(BaseCommand):
+    help = 'Procesa los trabajos OCR pendientes o que quedaron colgados tras un reinicio'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--minutos', type=int, default=10,
+            help='Reintentar trabajos en "procesando" iniciados hace más de estos minutos'
+        )
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(minutes=options['minutos'])
+        trabajos = list(TrabajoOCR.objects.filter(
+            Q(estado='pendiente') | Q(estado='procesando', fecha_inicio__lt=limite)
+        ).order_by('fecha_creacion'))
+
+        if not trabajos:
+            self.stdout.write('No hay trabajos OCR pendientes')
+            return
+
+        pool = obtener_pool()
+        futures = []
+        for trabajo in trabajos:
+            # Se toma solo si sigue como se leyó: otro proceso que lo haya tomado antes
+            # cambió su estado o su fecha de inicio
+            inicio = timezone.now()
+            tomado = TrabajoOCR.objects.filter(
+                pk=trabajo.pk, estado=trabajo.estado, fecha_inicio=trabajo.fecha_inicio
+            ).update(estado='procesando', fecha_inicio=inicio)
+            if not tomado:
+                continue
+            trabajo.estado, trabajo.fecha_inicio = 'procesando', inicio
+            futures.append((trabajo, pool.submit(ejecutar_ocr, trabajo.tipo, trabajo.archivo.path)))
+
+        for trabajo, future in futures:
+            try:
+                trabajo.resultado = future.result()
+                trabajo.estado = 'completado'
+                trabajo.error = ''
+                cache_ocr.guardar(trabajo.huella, trabajo.tipo, trabajo.resultado)
+            except Exception as e:
+                trabajo.estado = 'error'
+                trabajo.error = str(e)
+            trabajo.fecha_fin = timezone.now()
+            trabajo.save(update_fields=['estado', 'resultado', 'error', 'fecha_fin'])
+
+        completados = sum(1 for trabajo, _ in futures if trabajo.estado == 'completado')
+        self.stdout.write(self.style.SUCCESS(
+            f'Trabajos OCR procesados: {completados} completados, {len(futures) - completados} con error'
+        ))
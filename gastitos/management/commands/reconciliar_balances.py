@@ -0,0 +1,24 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from gastitos.models import BalanceMensual, BalanceDiario
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los balances mensuales y diarios a partir de la tabla de gastos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', help='Nombre de usuario a reconciliar (por defecto, todos)')
+
+    def handle(self, *args, **options):
+        usuario = None
+        if options['usuario']:
+            try:
+                usuario = User.objects.get(username=options['usuario'])
+            except User.DoesNotExist:
+                raise CommandError(f"El usuario '{options['usuario']}' no existe")
+
+        for modelo in (BalanceMensual, BalanceDiario):
+            filas = modelo.reconciliar(usuario=usuario)
+            self.stdout.write(self.style.SUCCESS(
+                f'{modelo._meta.verbose_name_plural} reconciliados: {filas} filas generadas'
+            ))
@@ -13,22 +13,25 @@ class Migration(migrations.Migration):
     ]
 
     operations = [
-        migrations.RemoveField(
-            model_name='logrousuario',
-            name='logro',
-        ),
-        migrations.AlterUniqueTogether(
-            name='logrousuario',
-            unique_together=None,
-        ),
-        migrations.RemoveField(
-            model_name='logrousuario',
-            name='usuario',
-        ),
-        migrations.RemoveField(
-            model_name='racha',
-            name='usuario',
-        ),
+        # 0010 ya borró estas tablas con SQL: solo se actualiza el estado de los modelos
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.RemoveField(
+                model_name='logrousuario',
+                name='logro',
+            ),
+            migrations.AlterUniqueTogether(
+                name='logrousuario',
+                unique_together=None,
+            ),
+            migrations.RemoveField(
+                model_name='logrousuario',
+                name='usuario',
+            ),
+            migrations.RemoveField(
+                model_name='racha',
+                name='usuario',
+            ),
+        ]),
         migrations.CreateModel(
             name='EstadisticaMensual',
             fields=[
@@ -44,13 +47,15 @@ class Migration(migrations.Migration):
                 'unique_together': {('usuario', 'año', 'mes')},
             },
         ),
-        migrations.DeleteModel(
-            name='Logro',
-        ),
-        migrations.DeleteModel(
-            name='LogroUsuario',
-        ),
-        migrations.DeleteModel(
-            name='Racha',
-        ),
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.DeleteModel(
+                name='Logro',
+            ),
+            migrations.DeleteModel(
+                name='LogroUsuario',
+            ),
+            migrations.DeleteModel(
+                name='Racha',
+            ),
+        ]),
     ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.5 on 2026-10-17 04:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def poblar_balances(apps, schema_editor):
+    Gasto = apps.get_model('gastitos', 'Gasto')
+    BalanceMensual = apps.get_model('gastitos', 'BalanceMensual')
+    totales = Gasto.objects.order_by().annotate(
+        año=ExtractYear('fecha'),
+        mes=ExtractMonth('fecha')
+    ).values('usuario_id', 'año', 'mes').annotate(
+        total=Sum('monto'),
+        cantidad=Count('id')
+    )
+    BalanceMensual.objects.bulk_create([
+        BalanceMensual(
+            usuario_id=item['usuario_id'],
+            año=item['año'],
+            mes=item['mes'],
+            total_gastos=item['total'] or 0,
+            cantidad_gastos=item['cantidad']
+        )
+        for item in totales
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gastitos', '0011_remove_logrousuario_logro_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('año', models.IntegerField()),
+                ('mes', models.IntegerField()),
+                ('total_gastos', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('cantidad_gastos', models.PositiveIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Balance Mensual',
+                'verbose_name_plural': 'Balances Mensuales',
+                'ordering': ['-año', '-mes'],
+                'unique_together': {('usuario', 'año', 'mes')},
+            },
+        ),
+        migrations.RunPython(poblar_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-17 04:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def poblar_balances_diarios(apps, schema_editor):
+    Gasto = apps.get_model('gastitos', 'Gasto')
+    BalanceDiario = apps.get_model('gastitos', 'BalanceDiario')
+    totales = Gasto.objects.order_by().annotate(
+        dia=TruncDate('fecha')
+    ).values('usuario_id', 'dia').annotate(
+        total=Sum('monto'),
+        cantidad=Count('id')
+    )
+    BalanceDiario.objects.bulk_create([
+        BalanceDiario(
+            usuario_id=item['usuario_id'],
+            fecha=item['dia'],
+            total_gastos=item['total'] or 0,
+            cantidad_gastos=item['cantidad']
+        )
+        for item in totales
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gastitos', '0012_balancemensual'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_gastos', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('cantidad_gastos', models.PositiveIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('fecha', models.DateField()),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Balance Diario',
+                'verbose_name_plural': 'Balances Diarios',
+                'ordering': ['-fecha'],
+                'unique_together': {('usuario', 'fecha')},
+            },
+        ),
+        migrations.RunPython(poblar_balances_diarios, migrations.RunPython.noop),
+    ]
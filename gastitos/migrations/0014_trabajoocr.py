@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-17 04:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gastitos', '0013_balancediario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoOCR',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('comprobante', 'Comprobante'), ('historial', 'Historial de MercadoPago')], max_length=20)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completado', 'Completado'), ('error', 'Error'), ('confirmado', 'Confirmado')], default='pendiente', max_length=20)),
+                ('archivo', models.FileField(upload_to='ocr/')),
+                ('resultado', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('gasto', models.ForeignKey(blank=True, help_text='Gasto al que pertenece el comprobante, si ya fue creado', null=True, on_delete=django.db.models.deletion.SET_NULL, to='gastitos.gasto')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Trabajo OCR',
+                'verbose_name_plural': 'Trabajos OCR',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['estado', 'fecha_creacion'], name='gastitos_tr_estado_15de76_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-17 05:02
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gastitos', '0014_trabajoocr'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajoocr',
+            name='huella',
+            field=models.CharField(blank=True, help_text='SHA-256 del archivo, para reutilizar resultados en caché', max_length=64),
+        ),
+        migrations.CreateModel(
+            name='ResultadoOCR',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('huella', models.CharField(help_text='SHA-256 del contenido del archivo', max_length=64)),
+                ('tipo', models.CharField(choices=[('comprobante', 'Comprobante'), ('historial', 'Historial de MercadoPago'), ('tarjeta', 'Estado de cuenta de tarjeta')], max_length=20)),
+                ('version', models.PositiveIntegerField(help_text='Versión del pipeline de extracción que generó el resultado')),
+                ('resultado', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('aciertos', models.PositiveIntegerField(default=0)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_ultimo_uso', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Resultado OCR en caché',
+                'verbose_name_plural': 'Resultados OCR en caché',
+                'constraints': [models.UniqueConstraint(fields=('huella', 'tipo', 'version'), name='resultado_ocr_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 05:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gastitos', '0015_resultadoocr'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='resultadoocr',
+            name='tipo',
+            field=models.CharField(choices=[('comprobante', 'Comprobante'), ('historial', 'Historial de MercadoPago'), ('tarjeta', 'Estado de cuenta de tarjeta'), ('tarjeta_movimientos', 'Movimientos de tarjeta')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-17 06:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gastitos', '0016_resultadoocr_tipo_movimientos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CierreMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('año', models.IntegerField()),
+                ('mes', models.IntegerField()),
+                ('estado', models.CharField(choices=[('en_curso', 'En curso'), ('completado', 'Completado')], default='en_curso', max_length=20)),
+                ('ultimo_usuario_id', models.IntegerField(default=0, help_text='Último usuario procesado; el cierre se retoma desde el siguiente')),
+                ('usuarios_procesados', models.PositiveIntegerField(default=0)),
+                ('gastos_eliminados', models.PositiveIntegerField(default=0)),
+                ('fecha_inicio', models.DateTimeField(auto_now_add=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Cierre Mensual',
+                'verbose_name_plural': 'Cierres Mensuales',
+                'ordering': ['-año', '-mes'],
+                'unique_together': {('año', 'mes')},
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gastitos', '0017_cierremensual'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Cerrojo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True)),
+                ('propietario', models.CharField(blank=True, max_length=100)),
+                ('vence', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EjecucionTarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tarea', models.CharField(max_length=50)),
+                ('clave', models.CharField(help_text='Clave de idempotencia: el periodo que procesa la ejecución', max_length=50)),
+                ('estado', models.CharField(choices=[('en_curso', 'En curso'), ('completado', 'Completado'), ('error', 'Error')], default='en_curso', max_length=20)),
+                ('propietario', models.CharField(help_text='Proceso que tiene el lease (host:pid)', max_length=100)),
+                ('lease_hasta', models.DateTimeField(help_text='Pasado este momento otro proceso puede retomar la ejecución')),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('filas', models.PositiveIntegerField(blank=True, help_text='Filas afectadas por la tarea', null=True)),
+                ('duracion', models.FloatField(blank=True, help_text='Duración en segundos', null=True)),
+                ('error', models.TextField(blank=True)),
+                ('fecha_inicio', models.DateTimeField()),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Ejecución de tarea',
+                'verbose_name_plural': 'Ejecuciones de tareas',
+                'ordering': ['-fecha_inicio'],
+                'constraints': [models.UniqueConstraint(fields=('tarea', 'clave'), name='ejecucion_tarea_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def crear_versiones(apps, schema_editor):
+    # Todos los usuarios existentes arrancan con fila: las bajas solo incrementan filas existentes
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    VersionDatos = apps.get_model('gastitos', 'VersionDatos')
+    VersionDatos.objects.bulk_create(
+        [VersionDatos(usuario_id=usuario_id) for usuario_id in User.objects.values_list('id', flat=True)],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('gastitos', '0018_ejecuciontarea_cerrojo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionDatos',
+            fields=[
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(crear_versiones, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-17 08:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gastitos', '0019_versiondatos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gasto',
+            index=models.Index(fields=['usuario', 'fecha', 'id'], name='gastitos_ga_usuario_8e92ab_idx'),
+        ),
+    ]
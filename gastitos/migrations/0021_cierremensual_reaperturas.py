@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 05:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gastitos', '0020_gasto_indice_paginacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cierremensual',
+            name='reaperturas',
+            field=models.PositiveIntegerField(default=0, help_text='Veces que se reabrió por gastos cargados en el mes después del cierre'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-17 05:51
+
+from datetime import datetime
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def marcar_aplicados(apps, schema_editor):
+    from gastitos.models import simplificar_descripcion
+
+    EjecucionTarea = apps.get_model('gastitos', 'EjecucionTarea')
+    Gasto = apps.get_model('gastitos', 'Gasto')
+    GastoFijo = apps.get_model('gastitos', 'GastoFijo')
+
+    # Los gastos fijos que ya existían cuando corrió la última tarea mensual quedan
+    # marcados con ese mes para que no se vuelvan a aplicar
+    ultima = EjecucionTarea.objects.filter(tarea='gastos_fijos', estado='completado').order_by('-clave').first()
+    if ultima is not None:
+        GastoFijo.objects.filter(fecha_creacion__lt=ultima.fecha_inicio).update(ultimo_mes_aplicado=ultima.clave)
+
+    # Los aplicados este mes (a mano o por la tarea) se reconocen como lo hacía la
+    # tarea hasta ahora: un gasto del mes con la misma descripción y el mismo monto
+    hoy = timezone.localdate()
+    mes = hoy.strftime('%Y-%m')
+    pendientes = GastoFijo.objects.exclude(ultimo_mes_aplicado__gte=mes)
+    aplicados = set(Gasto.objects.filter(
+        usuario_id__in=pendientes.values('usuario_id'),
+        fecha__gte=timezone.make_aware(datetime(hoy.year, hoy.month, 1))
+    ).values_list('usuario_id', 'descripcion', 'monto'))
+    marcados = [
+        gasto_fijo.id for gasto_fijo in pendientes
+        if (gasto_fijo.usuario_id, simplificar_descripcion(gasto_fijo.descripcion), gasto_fijo.monto) in aplicados
+    ]
+    GastoFijo.objects.filter(id__in=marcados).update(ultimo_mes_aplicado=mes)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gastitos', '0021_cierremensual_reaperturas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gastofijo',
+            name='ultimo_mes_aplicado',
+            field=models.CharField(blank=True, help_text='Último mes (AAAA-MM) en que se aplicó, a mano o por la tarea mensual', max_length=7),
+        ),
+        migrations.RunPython(marcar_aplicados, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,14 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
+from django.core.serializers.json import DjangoJSONEncoder
 from datetime import datetime
-from django.db.models import Sum
+from django.db.models import Sum, F
+from django.utils import timezone
 from decimal import Decimal
 import calendar
+import functools
+import re
 
 class PerfilUsuario(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -19,15 +23,8 @@ class PerfilUsuario(models.Model):
     
     @property
     def saldo_disponible(self):
-        # Calcular gastos solo del mes actual
-        now = datetime.now()
-        mes_actual = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        
-        total_gastos_mes = self.user.gasto_set.filter(
-            fecha__gte=mes_actual
-        ).aggregate(total=Sum('monto'))['total'] or Decimal('0')
-        
-        return self.salario_mensual - total_gastos_mes
+        # Gastos desde el inicio del mes actual, leídos de los balances mensuales
+        return self.salario_mensual - self.get_total_gastos_mes()
     
     def get_gastos_mes_actual(self):
         """Obtiene los gastos del mes actual"""
@@ -39,10 +36,17 @@ class PerfilUsuario(models.Model):
         )
     
     def get_total_gastos_mes(self):
-        """Obtiene el total de gastos del mes actual"""
-        return self.get_gastos_mes_actual().aggregate(
-            total=Sum('monto')
-        )['total'] or Decimal('0')
+        """
+        Obtiene el total de gastos desde el inicio del mes actual sumando los balances
+        mensuales. Como get_gastos_mes_actual, incluye los gastos con fecha en meses
+        siguientes (cuotas o vencimientos cargados por adelantado).
+        """
+        now = timezone.localtime()
+        total = BalanceMensual.objects.filter(
+            models.Q(año=now.year, mes__gte=now.month) | models.Q(año__gt=now.year),
+            usuario_id=self.user_id,
+        ).aggregate(total=Sum('total_gastos'))['total']
+        return total if total is not None else Decimal('0')
 
 class Gasto(models.Model):
     usuario = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -53,26 +57,251 @@ class Gasto(models.Model):
     
     class Meta:
         ordering = ['-fecha']
+        # Paginación por cursor de la lista de gastos (ver paginacion.py)
+        indexes = [models.Index(fields=['usuario', 'fecha', 'id'])]
     
     def __str__(self):
         return f"{self.descripcion} - ${self.monto}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Recordar monto y fecha originales para ajustar el balance mensual al editar
+        instance._valores_originales = (instance.__dict__.get('monto'), instance.__dict__.get('fecha'))
+        return instance
         
     def save(self, *args, **kwargs):
-        # Simplificar la descripción eliminando prefijos no deseados
-        import re
+        self.descripcion = simplificar_descripcion(self.descripcion)
+        super().save(*args, **kwargs)
+
+
+# Prefijos que deja el OCR al inicio de las descripciones
+_PREFIJO_DOS_LETRAS = re.compile(r'^[a-zA-Z]{2}\s+')  # "oo Golonor Sa", "og Cafemocasrl017"
+_PREFIJO_NUMERICO = re.compile(r'^[\d\s\-:\.]+\s*')  # números o caracteres especiales al inicio
+
+
+def simplificar_descripcion(descripcion):
+    """Simplifica la descripción de un gasto eliminando prefijos no deseados"""
+    if _PREFIJO_DOS_LETRAS.match(descripcion):
+        descripcion_simplificada = _PREFIJO_DOS_LETRAS.sub('', descripcion)
+    else:
+        descripcion_simplificada = _PREFIJO_NUMERICO.sub('', descripcion)
+    
+    # Si aún hay contenido después de la simplificación, usar la descripción simplificada
+    if descripcion_simplificada.strip():
+        return descripcion_simplificada.strip()
+    return descripcion
+
+class BalanceGastos(models.Model):
+    """
+    Base para los acumulados de gastos por usuario (diarios y mensuales),
+    mantenidos incrementalmente en cada alta, edición o baja de Gasto.
+    """
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE)
+    total_gastos = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cantidad_gastos = models.PositiveIntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        abstract = True
+    
+    @classmethod
+    def clave(cls, fecha):
+        """Campos que identifican la fila del acumulado que corresponde a `fecha`"""
+        raise NotImplementedError
+    
+    @classmethod
+    def agrupacion(cls):
+        """Expresiones sobre Gasto.fecha para agrupar al reconstruir, por nombre de campo"""
+        raise NotImplementedError
+    
+    @classmethod
+    def registrar_movimiento(cls, usuario_id, fecha, monto, cantidad=1, crear=True):
+        """
+        Suma `monto` y `cantidad` (pueden ser negativos) al acumulado que corresponde a `fecha`.
+        Si `crear` es False y la fila no existe, no hace nada (bajas en cascada).
+        """
+        if isinstance(fecha, datetime) and timezone.is_aware(fecha):
+            fecha = timezone.localtime(fecha)
+        filtro = {'usuario_id': usuario_id, **cls.clave(fecha)}
+        actualizados = cls.objects.filter(**filtro).update(
+            total_gastos=F('total_gastos') + monto,
+            cantidad_gastos=F('cantidad_gastos') + cantidad,
+            fecha_actualizacion=timezone.now()
+        )
+        if not actualizados and crear:
+            balance, created = cls.objects.get_or_create(
+                defaults={'total_gastos': monto, 'cantidad_gastos': max(cantidad, 0)},
+                **filtro
+            )
+            if not created:
+                cls.registrar_movimiento(usuario_id, fecha, monto, cantidad, crear=False)
+    
+    @classmethod
+    def reconciliar(cls, usuario=None):
+        """
+        Reconstruye los acumulados a partir de la tabla Gasto.
+        Si se especifica un usuario, solo reconstruye sus filas.
+        Devuelve la cantidad de filas generadas.
+        """
+        from django.db import transaction
+        from django.db.models import Count
         
-        # Casos específicos como "oo Golonor Sa" o "og Cafemocasrl017"
-        if re.match(r'^[a-zA-Z]{2}\s+', self.descripcion):
-            descripcion_simplificada = re.sub(r'^[a-zA-Z]{2}\s+', '', self.descripcion)
-        # Otros casos con números o caracteres especiales al inicio
-        else:
-            descripcion_simplificada = re.sub(r'^[\d\s\-:\.]+\s*', '', self.descripcion)
+        gastos = Gasto.objects.all()
+        balances = cls.objects.all()
+        if usuario is not None:
+            gastos = gastos.filter(usuario=usuario)
+            balances = balances.filter(usuario=usuario)
         
-        # Si aún hay contenido después de la simplificación, actualiza la descripción
-        if descripcion_simplificada.strip():
-            self.descripcion = descripcion_simplificada.strip()
-            
-        super().save(*args, **kwargs)
+        agrupacion = {f'clave_{campo}': expresion for campo, expresion in cls.agrupacion().items()}
+        totales = gastos.order_by().annotate(**agrupacion).values('usuario_id', *agrupacion).annotate(
+            total=Sum('monto'),
+            cantidad=Count('id')
+        )
+        
+        filas = [
+            cls(
+                usuario_id=item['usuario_id'],
+                total_gastos=item['total'] or Decimal('0'),
+                cantidad_gastos=item['cantidad'],
+                **{campo: item[f'clave_{campo}'] for campo in cls.agrupacion()}
+            )
+            for item in totales
+        ]
+        
+        with transaction.atomic():
+            balances.delete()
+            cls.objects.bulk_create(filas, batch_size=500)
+            # Las vistas cacheadas se basan en los acumulados: invalidarlas
+            versiones = VersionDatos.objects.all()
+            if usuario is not None:
+                versiones = versiones.filter(usuario=usuario)
+            versiones.update(version=F('version') + 1)
+        
+        return len(filas)
+
+
+class BalanceMensual(BalanceGastos):
+    """Total de gastos por usuario y mes"""
+    año = models.IntegerField()
+    mes = models.IntegerField()  # 1-12
+    
+    class Meta:
+        unique_together = ('usuario', 'año', 'mes')
+        ordering = ['-año', '-mes']
+        verbose_name = 'Balance Mensual'
+        verbose_name_plural = 'Balances Mensuales'
+    
+    def __str__(self):
+        return f"{self.usuario.username} {self.mes}/{self.año} - ${self.total_gastos}"
+    
+    @classmethod
+    def clave(cls, fecha):
+        return {'año': fecha.year, 'mes': fecha.month}
+    
+    @classmethod
+    def agrupacion(cls):
+        from django.db.models.functions import ExtractYear, ExtractMonth
+        return {'año': ExtractYear('fecha'), 'mes': ExtractMonth('fecha')}
+
+
+class BalanceDiario(BalanceGastos):
+    """Total de gastos por usuario y día"""
+    fecha = models.DateField()
+    
+    class Meta:
+        unique_together = ('usuario', 'fecha')
+        ordering = ['-fecha']
+        verbose_name = 'Balance Diario'
+        verbose_name_plural = 'Balances Diarios'
+    
+    def __str__(self):
+        return f"{self.usuario.username} {self.fecha.strftime('%d/%m/%Y')} - ${self.total_gastos}"
+    
+    @classmethod
+    def clave(cls, fecha):
+        return {'fecha': fecha.date() if isinstance(fecha, datetime) else fecha}
+    
+    @classmethod
+    def agrupacion(cls):
+        from django.db.models.functions import TruncDate
+        return {'fecha': TruncDate('fecha')}
+
+
+class TrabajoOCR(models.Model):
+    """Trabajo de OCR (comprobante o historial) procesado en segundo plano"""
+    TIPO_CHOICES = [
+        ('comprobante', 'Comprobante'),
+        ('historial', 'Historial de MercadoPago'),
+    ]
+    
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('completado', 'Completado'),
+        ('error', 'Error'),
+        ('confirmado', 'Confirmado'),
+    ]
+    
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE)
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
+    archivo = models.FileField(upload_to='ocr/')
+    gasto = models.ForeignKey(Gasto, on_delete=models.SET_NULL, blank=True, null=True, help_text="Gasto al que pertenece el comprobante, si ya fue creado")
+    huella = models.CharField(max_length=64, blank=True, help_text="SHA-256 del archivo, para reutilizar resultados en caché")
+    resultado = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(blank=True, null=True)
+    fecha_fin = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        ordering = ['-fecha_creacion']
+        indexes = [models.Index(fields=['estado', 'fecha_creacion'])]
+        verbose_name = 'Trabajo OCR'
+        verbose_name_plural = 'Trabajos OCR'
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.id} - {self.get_estado_display()}"
+    
+    @property
+    def esta_terminado(self):
+        """Verifica si el trabajo ya no está en la cola"""
+        return self.estado in ('completado', 'error', 'confirmado')
+    
+    @property
+    def duracion(self):
+        """Segundos que tardó el OCR, si ya terminó"""
+        if self.fecha_inicio and self.fecha_fin:
+            return (self.fecha_fin - self.fecha_inicio).total_seconds()
+        return None
+
+
+class ResultadoOCR(models.Model):
+    """Resultado de OCR o de lectura de PDF guardado por hash del archivo y versión del pipeline"""
+    TIPO_CHOICES = TrabajoOCR.TIPO_CHOICES + [
+        ('tarjeta', 'Estado de cuenta de tarjeta'),
+        ('tarjeta_movimientos', 'Movimientos de tarjeta'),
+    ]
+    
+    huella = models.CharField(max_length=64, help_text="SHA-256 del contenido del archivo")
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    version = models.PositiveIntegerField(help_text="Versión del pipeline de extracción que generó el resultado")
+    resultado = models.JSONField(encoder=DjangoJSONEncoder)
+    aciertos = models.PositiveIntegerField(default=0)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_ultimo_uso = models.DateTimeField(default=timezone.now, db_index=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['huella', 'tipo', 'version'], name='resultado_ocr_unico'),
+        ]
+        verbose_name = 'Resultado OCR en caché'
+        verbose_name_plural = 'Resultados OCR en caché'
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.huella[:12]} (v{self.version})"
+
 
 class GastoFijo(models.Model):
     usuario = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -80,6 +309,7 @@ class GastoFijo(models.Model):
     monto = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0.01)])
     activo = models.BooleanField(default=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
+    ultimo_mes_aplicado = models.CharField(max_length=7, blank=True, help_text="Último mes (AAAA-MM) en que se aplicó, a mano o por la tarea mensual")
     
     class Meta:
         ordering = ['descripcion']
@@ -88,12 +318,15 @@ class GastoFijo(models.Model):
         return f"{self.descripcion} - ${self.monto} (Fijo)"
     
     def aplicar_gasto(self):
-        """Crea un gasto regular a partir de este gasto fijo"""
-        return Gasto.objects.create(
+        """Crea un gasto regular a partir de este gasto fijo y lo marca como aplicado este mes"""
+        gasto = Gasto.objects.create(
             usuario=self.usuario,
             descripcion=self.descripcion,
             monto=self.monto
         )
+        self.ultimo_mes_aplicado = timezone.localdate().strftime('%Y-%m')
+        self.save(update_fields=['ultimo_mes_aplicado'])
+        return gasto
 
 class Vencimiento(models.Model):
     usuario = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -145,10 +378,26 @@ class EstadisticaMensual(models.Model):
         return f"{nombre_mes} {self.año} - ${self.total_gastos}"
         
     @classmethod
-    def guardar_estadisticas_y_limpiar(cls, año=None, mes=None):
+    def guardar_estadisticas_y_limpiar(cls, año=None, mes=None, usuarios_por_lote=1000):
         """
-        Guarda las estadísticas del mes especificado y elimina los gastos de ese mes.
+        Guarda las estadísticas del mes especificado y pasa los gastos de ese mes de la
+        tabla Gasto al archivo columnar (gastitos.archivo_gastos).
         Si no se especifica año y mes, usa el mes anterior al actual.
+        
+        Los usuarios se procesan en lotes de ids consecutivos. Cada lote es una transacción
+        con una consulta agrupada por usuario, un upsert en bloque de las estadísticas, la
+        escritura de una parte del archivo (que toma su nombre final al confirmarse), el
+        ajuste de los balances y un único DELETE de los gastos del rango. El avance se
+        guarda en CierreMensual junto con cada lote, así que una ejecución interrumpida se
+        retoma desde el último lote confirmado y un mes ya cerrado no se vuelve a procesar.
+        
+        Si un mes cerrado vuelve a tener gastos (importados con fecha de compra o cargados
+        por una tarea atrasada), el cierre se reabre: esa pasada recorre solo los usuarios
+        con gastos en el mes, suma sus totales a las estadísticas ya guardadas y agrega
+        sus gastos al archivo.
+        
+        Returns:
+            CierreMensual: Registro del cierre con su avance
         """
         from django.db import transaction
         
@@ -163,38 +412,211 @@ class EstadisticaMensual(models.Model):
                 mes = fecha_actual.month - 1
                 año = fecha_actual.year
         
-        # Obtener el primer y último día del mes
-        ultimo_dia = calendar.monthrange(año, mes)[1]
-        inicio_mes = datetime(año, mes, 1, 0, 0, 0)
-        fin_mes = datetime(año, mes, ultimo_dia, 23, 59, 59)
+        # Rango [inicio del mes, inicio del mes siguiente) en la zona horaria local
+        inicio_mes = timezone.make_aware(datetime(año, mes, 1))
+        inicio_siguiente = timezone.make_aware(datetime(año + mes // 12, mes % 12 + 1, 1))
         
-        # Procesar cada usuario
-        for usuario in User.objects.all():
+        cierre, created = CierreMensual.objects.get_or_create(año=año, mes=mes)
+        gastos_del_mes = Gasto.objects.filter(fecha__gte=inicio_mes, fecha__lt=inicio_siguiente)
+        
+        if cierre.estado == 'completado' and gastos_del_mes.exists():
             with transaction.atomic():
-                # Obtener todos los gastos del mes para este usuario
-                gastos_mes = Gasto.objects.filter(
-                    usuario=usuario,
+                cierre = CierreMensual.objects.select_for_update().get(pk=cierre.pk)
+                if cierre.estado == 'completado':
+                    cierre.estado = 'en_curso'
+                    cierre.ultimo_usuario_id = 0
+                    cierre.reaperturas += 1
+                    cierre.fecha_fin = None
+                    cierre.save()
+        
+        while cierre.estado != 'completado':
+            with transaction.atomic():
+                cierre = CierreMensual.objects.select_for_update().get(pk=cierre.pk)
+                if cierre.reaperturas:
+                    # Solo los usuarios con gastos cargados después del cierre anterior
+                    usuarios = list(
+                        gastos_del_mes.filter(usuario_id__gt=cierre.ultimo_usuario_id)
+                        .order_by('usuario_id').values_list('usuario_id', flat=True).distinct()[:usuarios_por_lote]
+                    )
+                else:
+                    usuarios = list(
+                        User.objects.filter(id__gt=cierre.ultimo_usuario_id)
+                        .order_by('id').values_list('id', flat=True)[:usuarios_por_lote]
+                    )
+                if not usuarios:
+                    # Después de confirmar, cuando las partes de los lotes ya tienen su nombre final
+                    from .archivo_gastos import consolidar_mes
+                    transaction.on_commit(functools.partial(consolidar_mes, año, mes))
+                    cierre.estado = 'completado'
+                    cierre.fecha_fin = timezone.now()
+                    cierre.save()
+                    break
+                
+                gastos_lote = Gasto.objects.filter(
+                    usuario_id__gte=usuarios[0],
+                    usuario_id__lte=usuarios[-1],
                     fecha__gte=inicio_mes,
-                    fecha__lte=fin_mes
+                    fecha__lt=inicio_siguiente
                 )
                 
-                # Calcular el total de gastos
-                total = gastos_mes.aggregate(total=Sum('monto'))['total'] or Decimal('0')
-                
-                # Guardar la estadística mensual
-                estadistica, created = cls.objects.update_or_create(
-                    usuario=usuario,
-                    año=año,
-                    mes=mes,
-                    defaults={'total_gastos': total}
+                # Total de cada usuario del lote en una sola consulta agrupada
+                totales = dict(
+                    gastos_lote.order_by().values('usuario_id').annotate(total=Sum('monto'))
+                    .values_list('usuario_id', 'total')
+                )
+                if cierre.reaperturas:
+                    # Los gastos de las pasadas anteriores ya no están en Gasto: se suman
+                    anteriores = dict(
+                        cls.objects.filter(usuario_id__in=usuarios, año=año, mes=mes)
+                        .values_list('usuario_id', 'total_gastos')
+                    )
+                    for usuario_id, total in anteriores.items():
+                        totales[usuario_id] = (totales.get(usuario_id) or Decimal('0')) + total
+                cls.objects.bulk_create(
+                    [
+                        cls(usuario_id=usuario_id, año=año, mes=mes, total_gastos=totales.get(usuario_id) or Decimal('0'))
+                        for usuario_id in usuarios
+                    ],
+                    update_conflicts=True,
+                    unique_fields=['usuario', 'año', 'mes'],
+                    update_fields=['total_gastos'],
+                    batch_size=500
                 )
                 
-                # Eliminar los gastos del mes
-                gastos_mes.delete()
+                # Antes de eliminarlos, los gastos del lote pasan al archivo columnar del mes
+                from .archivo_gastos import escribir_parte
+                escribir_parte(año, mes, usuarios[0], gastos_lote.order_by('usuario_id', 'fecha', 'id').values_list(
+                    'usuario_id', 'fecha', 'monto', 'descripcion'
+                ), pasada=cierre.reaperturas)
                 
-        return True
+                # Los balances y las versiones se ajustan aquí en bloque en lugar de gasto por
+                # gasto en post_delete. Como se eliminan todos los gastos del mes de estos
+                # usuarios, sus acumulados del mes quedan en cero
+                balances_del_mes = (
+                    BalanceMensual.objects.filter(año=año, mes=mes),
+                    BalanceDiario.objects.filter(fecha__gte=inicio_mes.date(), fecha__lt=inicio_siguiente.date()),
+                )
+                for balances in balances_del_mes:
+                    balances.filter(usuario_id__gte=usuarios[0], usuario_id__lte=usuarios[-1]).update(
+                        total_gastos=0, cantidad_gastos=0, fecha_actualizacion=timezone.now()
+                    )
+                from .signals import bajas_en_bloque
+                with bajas_en_bloque():
+                    # delete() también desvincula los TrabajoOCR de los gastos (SET_NULL)
+                    _, por_modelo = gastos_lote.delete()
+                eliminados = por_modelo.get(Gasto._meta.label, 0)
+                VersionDatos.objects.filter(usuario_id__gte=usuarios[0], usuario_id__lte=usuarios[-1]).update(
+                    version=F('version') + 1
+                )
+                
+                cierre.ultimo_usuario_id = usuarios[-1]
+                cierre.usuarios_procesados += len(usuarios)
+                cierre.gastos_eliminados += eliminados
+                cierre.save()
+        
+        return cierre
 
 
+class CierreMensual(models.Model):
+    """Avance del cierre de un mes (EstadisticaMensual.guardar_estadisticas_y_limpiar)"""
+    ESTADO_CHOICES = [
+        ('en_curso', 'En curso'),
+        ('completado', 'Completado'),
+    ]
+    
+    año = models.IntegerField()
+    mes = models.IntegerField()  # 1-12
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='en_curso')
+    ultimo_usuario_id = models.IntegerField(default=0, help_text="Último usuario procesado; el cierre se retoma desde el siguiente")
+    usuarios_procesados = models.PositiveIntegerField(default=0)
+    gastos_eliminados = models.PositiveIntegerField(default=0)
+    reaperturas = models.PositiveIntegerField(default=0, help_text="Veces que se reabrió por gastos cargados en el mes después del cierre")
+    fecha_inicio = models.DateTimeField(auto_now_add=True)
+    fecha_fin = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        unique_together = ('año', 'mes')
+        ordering = ['-año', '-mes']
+        verbose_name = 'Cierre Mensual'
+        verbose_name_plural = 'Cierres Mensuales'
+    
+    def __str__(self):
+        return f"Cierre {self.mes}/{self.año} - {self.get_estado_display()}"
+
+
+class EjecucionTarea(models.Model):
+    """Ejecución de una tarea programada para un periodo (ver gastitos.programador)"""
+    ESTADO_CHOICES = [
+        ('en_curso', 'En curso'),
+        ('completado', 'Completado'),
+        ('error', 'Error'),
+    ]
+    
+    tarea = models.CharField(max_length=50)
+    clave = models.CharField(max_length=50, help_text="Clave de idempotencia: el periodo que procesa la ejecución")
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='en_curso')
+    propietario = models.CharField(max_length=100, help_text="Proceso que tiene el lease (host:pid)")
+    lease_hasta = models.DateTimeField(help_text="Pasado este momento otro proceso puede retomar la ejecución")
+    intentos = models.PositiveIntegerField(default=0)
+    filas = models.PositiveIntegerField(blank=True, null=True, help_text="Filas afectadas por la tarea")
+    duracion = models.FloatField(blank=True, null=True, help_text="Duración en segundos")
+    error = models.TextField(blank=True)
+    fecha_inicio = models.DateTimeField()
+    fecha_fin = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tarea', 'clave'], name='ejecucion_tarea_unica'),
+        ]
+        ordering = ['-fecha_inicio']
+        verbose_name = 'Ejecución de tarea'
+        verbose_name_plural = 'Ejecuciones de tareas'
+    
+    def __str__(self):
+        return f"{self.tarea} {self.clave} - {self.get_estado_display()}"
+
+
+class Cerrojo(models.Model):
+    """Cerrojo con vencimiento para que un solo proceso ejecute una sección (p. ej. el programador)"""
+    nombre = models.CharField(max_length=50, unique=True)
+    propietario = models.CharField(max_length=100, blank=True)
+    vence = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.nombre} ({self.propietario or 'libre'})"
+
+
+class VersionDatos(models.Model):
+    """
+    Contador de cambios de los datos de un usuario. Las señales y las escrituras en
+    bloque lo incrementan; las vistas cacheadas lo usan en la clave de la caché.
+    """
+    usuario = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.usuario_id} v{self.version}"
+    
+    @classmethod
+    def actual(cls, usuario_id):
+        return cls.objects.filter(usuario_id=usuario_id).values_list('version', flat=True).first() or 0
+    
+    @classmethod
+    def incrementar(cls, usuario_ids, crear=True):
+        """
+        Incrementa la versión de los usuarios indicados.
+        Si `crear` es False no agrega filas (bajas en cascada, donde el usuario se está borrando).
+        """
+        usuario_ids = set(usuario_ids)
+        if not usuario_ids:
+            return
+        actualizados = cls.objects.filter(usuario_id__in=usuario_ids).update(version=F('version') + 1)
+        if crear and actualizados < len(usuario_ids):
+            cls.objects.bulk_create(
+                [cls(usuario_id=usuario_id, version=1) for usuario_id in usuario_ids],
+                ignore_conflicts=True
+            )
+
 
 class MetaAhorro(models.Model):
     """Modelo para metas de ahorro del usuario"""
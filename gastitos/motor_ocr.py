@@ -0,0 +1,355 @@
+"""
+Motor de OCR persistente.
+
+Cada proceso mantiene un único motor que resuelve una sola vez qué idiomas de
+Tesseract están instalados (settings.OCR_IDIOMAS, por defecto 'spa+eng') y
+reconoce cada imagen en una única pasada, sin reintentos por idioma.
+
+Tesseract corre dentro del proceso, con tesserocr si está instalado o, si no,
+con la API C de libtesseract (la biblioteca que se instala junto con Tesseract)
+a través de ctypes. En los dos casos el motor conserva un juego fijo de
+instancias de la API con los datos de idioma ya cargados: como máximo `hilos`
+(settings.OCR_HILOS_POR_IMAGEN), creadas en el primer uso. Cada reconocimiento
+toma una instancia libre de la cola y la devuelve al terminar, así que reconocer
+una imagen no lanza procesos nuevos y la memoria del proceso no crece con la
+cantidad de imágenes. Las franjas de una captura larga se reparten en un pool de
+hilos que vive lo mismo que el motor.
+
+Solo si no se encuentra ninguna de las dos se usa pytesseract, que lanza un
+proceso de tesseract por imagen (y por franja).
+
+Los procesos del pool de OCR (ver tasks_ocr) crean su motor al iniciar y lo
+reutilizan en todos sus trabajos.
+"""
+import ctypes
+import ctypes.util
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+IDIOMAS_POR_DEFECTO = 'spa+eng'
+
+logger = logging.getLogger(__name__)
+
+_motor = None
+_motor_lock = threading.Lock()
+
+
+class TesseractNoDisponible(Exception):
+    """Tesseract no está instalado o no se encuentra en la ruta configurada"""
+
+
+def _idiomas_configurados():
+    try:
+        from django.conf import settings
+        return getattr(settings, 'OCR_IDIOMAS', IDIOMAS_POR_DEFECTO)
+    except Exception:
+        return IDIOMAS_POR_DEFECTO
+
+
+def _hilos_configurados():
+    try:
+        from django.conf import settings
+        hilos = getattr(settings, 'OCR_HILOS_POR_IMAGEN', None)
+    except Exception:
+        hilos = None
+    return hilos or min(4, os.cpu_count() or 1)
+
+
+def _ruta_libtesseract():
+    try:
+        from django.conf import settings
+        ruta = getattr(settings, 'OCR_LIBTESSERACT', None)
+    except Exception:
+        ruta = None
+    return ruta or ctypes.util.find_library('tesseract')
+
+
+# Funciones de la API C de Tesseract (tesseract/capi.h) que usa el motor: (argumentos, resultado)
+_FIRMAS_LIBTESSERACT = {
+    'TessBaseAPICreate': ([], ctypes.c_void_p),
+    'TessBaseAPIInit3': ([ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p], ctypes.c_int),
+    'TessBaseAPISetImage': (
+        [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int], None
+    ),
+    'TessBaseAPIGetUTF8Text': ([ctypes.c_void_p], ctypes.c_void_p),
+    'TessBaseAPIRecognize': ([ctypes.c_void_p, ctypes.c_void_p], ctypes.c_int),
+    'TessBaseAPIGetIterator': ([ctypes.c_void_p], ctypes.c_void_p),
+    'TessResultIteratorGetPageIteratorConst': ([ctypes.c_void_p], ctypes.c_void_p),
+    'TessResultIteratorGetUTF8Text': ([ctypes.c_void_p, ctypes.c_int], ctypes.c_void_p),
+    'TessPageIteratorBoundingBox': ([ctypes.c_void_p, ctypes.c_int] + [ctypes.POINTER(ctypes.c_int)] * 4, ctypes.c_int),
+    'TessResultIteratorNext': ([ctypes.c_void_p, ctypes.c_int], ctypes.c_int),
+    'TessResultIteratorDelete': ([ctypes.c_void_p], None),
+    'TessDeleteText': ([ctypes.c_void_p], None),
+    'TessBaseAPIEnd': ([ctypes.c_void_p], None),
+    'TessBaseAPIDelete': ([ctypes.c_void_p], None),
+}
+
+
+def _cargar_libtesseract():
+    """libtesseract con las firmas de la API C ya declaradas, o None si no está disponible"""
+    ruta = _ruta_libtesseract()
+    if not ruta:
+        return None
+    try:
+        biblioteca = ctypes.CDLL(ruta)
+        for nombre, (argumentos, resultado) in _FIRMAS_LIBTESSERACT.items():
+            funcion = getattr(biblioteca, nombre)
+            funcion.argtypes = argumentos
+            funcion.restype = resultado
+    except (OSError, AttributeError):
+        # No se pudo cargar, o es una versión sin alguna de las funciones
+        return None
+    return biblioteca
+
+
+class _ApiTesserocr:
+    """Instancia de la API de tesserocr con los idiomas ya cargados"""
+
+    def __init__(self, tesserocr, idiomas):
+        self._tesserocr = tesserocr
+        self._api = tesserocr.PyTessBaseAPI(lang=idiomas or 'eng')
+
+    def texto(self, imagen):
+        self._api.SetImage(imagen)
+        return self._api.GetUTF8Text()
+
+    def lineas(self, imagen):
+        self._api.SetImage(imagen)
+        self._api.Recognize()
+        nivel = self._tesserocr.RIL.TEXTLINE
+        lineas = []
+        for resultado in self._tesserocr.iterate_level(self._api.GetIterator(), nivel):
+            texto = (resultado.GetUTF8Text(nivel) or '').strip()
+            caja = resultado.BoundingBox(nivel)
+            if texto and caja:
+                lineas.append((caja[1], caja[3], texto))
+        return lineas
+
+    def cerrar(self):
+        self._api.End()
+
+
+class _ApiLibtesseract:
+    """Instancia de la API C de libtesseract, usada con ctypes, con los idiomas ya cargados"""
+
+    NIVEL_LINEA = 2  # RIL_TEXTLINE
+
+    def __init__(self, biblioteca, idiomas):
+        self._lib = biblioteca
+        self._api = biblioteca.TessBaseAPICreate()
+        if biblioteca.TessBaseAPIInit3(self._api, None, (idiomas or 'eng').encode()) != 0:
+            biblioteca.TessBaseAPIDelete(self._api)
+            raise RuntimeError(f'libtesseract no pudo cargar los idiomas {idiomas or "eng"}')
+
+    def _cargar_imagen(self, imagen):
+        # Un byte por píxel y filas contiguas: lo que espera TessBaseAPISetImage
+        if imagen.mode != 'L':
+            imagen = imagen.convert('L')
+        ancho, alto = imagen.size
+        self._lib.TessBaseAPISetImage(self._api, imagen.tobytes(), ancho, alto, 1, ancho)
+
+    def _texto(self, puntero):
+        """Copia y libera un texto devuelto por la API"""
+        if not puntero:
+            return ''
+        try:
+            return ctypes.string_at(puntero).decode('utf-8', errors='replace')
+        finally:
+            self._lib.TessDeleteText(puntero)
+
+    def texto(self, imagen):
+        self._cargar_imagen(imagen)
+        return self._texto(self._lib.TessBaseAPIGetUTF8Text(self._api))
+
+    def lineas(self, imagen):
+        self._cargar_imagen(imagen)
+        if self._lib.TessBaseAPIRecognize(self._api, None) != 0:
+            return []
+        iterador = self._lib.TessBaseAPIGetIterator(self._api)
+        if not iterador:
+            return []
+
+        nivel = self.NIVEL_LINEA
+        caja = [ctypes.c_int() for _ in range(4)]
+        lineas = []
+        try:
+            pagina = self._lib.TessResultIteratorGetPageIteratorConst(iterador)
+            while True:
+                texto = self._texto(self._lib.TessResultIteratorGetUTF8Text(iterador, nivel)).strip()
+                if texto and self._lib.TessPageIteratorBoundingBox(
+                    pagina, nivel, *[ctypes.pointer(valor) for valor in caja]
+                ):
+                    lineas.append((caja[1].value, caja[3].value, texto))
+                if not self._lib.TessResultIteratorNext(iterador, nivel):
+                    break
+        finally:
+            self._lib.TessResultIteratorDelete(iterador)
+        return lineas
+
+    def cerrar(self):
+        self._lib.TessBaseAPIEnd(self._api)
+        self._lib.TessBaseAPIDelete(self._api)
+
+
+class MotorOCR:
+    """Envoltorio de Tesseract que se inicializa una vez por proceso"""
+
+    def __init__(self, idiomas=None, hilos=None):
+        from .utils import cargar_bibliotecas_ocr
+        cargar_bibliotecas_ocr()
+        import pytesseract
+
+        self._pytesseract = pytesseract
+        self._lock = threading.Lock()
+        self.idiomas_solicitados = idiomas or _idiomas_configurados()
+        self.hilos = max(1, hilos or _hilos_configurados())
+
+        try:
+            disponibles = set(pytesseract.get_languages(config=''))
+        except pytesseract.TesseractNotFoundError as e:
+            raise TesseractNoDisponible(str(e))
+
+        # Usar solo los idiomas instalados; si no hay ninguno, el idioma por defecto de Tesseract
+        idiomas_validos = [idioma for idioma in self.idiomas_solicitados.split('+') if idioma in disponibles]
+        self.idiomas = '+'.join(idiomas_validos) or None
+
+        self._apis = []  # Todas las instancias creadas (a lo sumo self.hilos)
+        self._apis_libres = queue.Queue()
+        self._executor = None
+        self._fabrica_api = None
+        self.backend = 'pytesseract'
+        for backend, fabrica in self._fabricas_en_proceso():
+            self._fabrica_api = fabrica
+            try:
+                # Cargar la primera instancia ahora, así el primer trabajo no paga la carga
+                with self._api():
+                    pass
+            except RuntimeError:
+                self._fabrica_api = None
+                continue
+            self.backend = backend
+            break
+        else:
+            logger.warning("Sin tesserocr ni libtesseract: cada imagen se reconocerá con un proceso de tesseract aparte")
+
+    def _fabricas_en_proceso(self):
+        """(nombre, fábrica de instancias) de los backends que corren dentro del proceso, en orden de preferencia"""
+        try:
+            import tesserocr
+        except ImportError:
+            pass
+        else:
+            yield 'tesserocr', lambda: _ApiTesserocr(tesserocr, self.idiomas)
+
+        biblioteca = _cargar_libtesseract()
+        if biblioteca is not None:
+            yield 'libtesseract', lambda: _ApiLibtesseract(biblioteca, self.idiomas)
+
+    @contextmanager
+    def _api(self):
+        """Toma una instancia libre (o crea una nueva, hasta self.hilos) y la devuelve al terminar"""
+        try:
+            api = self._apis_libres.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                api = self._fabrica_api() if len(self._apis) < self.hilos else None
+                if api is not None:
+                    self._apis.append(api)
+            if api is None:
+                api = self._apis_libres.get()
+        try:
+            yield api
+        finally:
+            self._apis_libres.put(api)
+
+    def mapear(self, funcion, elementos):
+        """
+        Aplica `funcion` a cada elemento en el pool de hilos del motor y devuelve los
+        resultados en el mismo orden. El pool se crea en el primer uso y se reutiliza.
+        """
+        elementos = list(elementos)
+        if self.hilos == 1 or len(elementos) <= 1:
+            return [funcion(elemento) for elemento in elementos]
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix='motor-ocr')
+        return list(self._executor.map(funcion, elementos))
+
+    def reconocer(self, imagen):
+        """
+        Extrae el texto de una imagen PIL en una sola pasada.
+
+        Args:
+            imagen: Imagen PIL ya preprocesada
+
+        Returns:
+            str: Texto reconocido
+        """
+        if self._fabrica_api is not None:
+            with self._api() as api:
+                return api.texto(imagen)
+        try:
+            if self.idiomas:
+                return self._pytesseract.image_to_string(imagen, lang=self.idiomas)
+            return self._pytesseract.image_to_string(imagen)
+        except self._pytesseract.TesseractNotFoundError as e:
+            raise TesseractNoDisponible(str(e))
+
+    def reconocer_lineas(self, imagen):
+        """
+        Extrae el texto de una imagen PIL línea por línea, con su posición vertical.
+
+        Returns:
+            list: Tuplas (arriba, abajo, texto) en el orden de lectura de Tesseract
+        """
+        if self._fabrica_api is not None:
+            with self._api() as api:
+                return api.lineas(imagen)
+
+        try:
+            opciones = {'lang': self.idiomas} if self.idiomas else {}
+            datos = self._pytesseract.image_to_data(
+                imagen, output_type=self._pytesseract.Output.DICT, **opciones
+            )
+        except self._pytesseract.TesseractNotFoundError as e:
+            raise TesseractNoDisponible(str(e))
+
+        # Agrupar las palabras por (bloque, párrafo, línea) conservando el orden de lectura
+        lineas = {}
+        for i, palabra in enumerate(datos['text']):
+            if not palabra or not palabra.strip():
+                continue
+            clave = (datos['block_num'][i], datos['par_num'][i], datos['line_num'][i])
+            arriba, abajo = datos['top'][i], datos['top'][i] + datos['height'][i]
+            if clave in lineas:
+                linea = lineas[clave]
+                linea[0] = min(linea[0], arriba)
+                linea[1] = max(linea[1], abajo)
+                linea[2].append(palabra)
+            else:
+                lineas[clave] = [arriba, abajo, [palabra]]
+        return [(arriba, abajo, ' '.join(palabras)) for arriba, abajo, palabras in lineas.values()]
+
+    def cerrar(self):
+        """Detiene el pool de hilos y libera las instancias de la API"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            apis, self._apis = self._apis, []
+            self._apis_libres = queue.Queue()
+        if executor is not None:
+            executor.shutdown(wait=True)
+        for api in apis:
+            api.cerrar()
+
+
+def obtener_motor():
+    """Devuelve el motor del proceso, creándolo en el primer uso"""
+    global _motor
+    with _motor_lock:
+        if _motor is None:
+            _motor = MotorOCR()
+        return _motor
@@ -0,0 +1,51 @@
+"""
+Punto de entrada liviano para el OCR y la lectura de PDFs.
+
+Importar este módulo no carga OpenCV, NumPy, PIL, pytesseract ni pdfplumber:
+cada función importa gastitos.utils (y este a su vez las bibliotecas) en el
+primer uso. Las vistas y tareas deben usar estas funciones en lugar de
+importar gastitos.utils directamente.
+"""
+
+
+class PDFDemasiadoLargo(ValueError):
+    """El PDF excede la cantidad de páginas o el tiempo de lectura permitidos en una solicitud"""
+
+
+def extraer_datos_imagen(imagen_file):
+    """Extrae monto y fecha de la imagen de un comprobante"""
+    from .utils import extraer_datos_imagen as _extraer_datos_imagen
+    return _extraer_datos_imagen(imagen_file)
+
+
+def procesar_historial_mercadopago(imagen_file):
+    """Extrae los gastos de una captura del historial de MercadoPago"""
+    from .utils import procesar_historial_mercadopago as _procesar_historial_mercadopago
+    return _procesar_historial_mercadopago(imagen_file)
+
+
+def procesar_pdf_tarjeta_credito(pdf_file):
+    """Extrae el total de un estado de cuenta de tarjeta de crédito en PDF"""
+    from .utils import procesar_pdf_tarjeta_credito as _procesar_pdf_tarjeta_credito
+    return _procesar_pdf_tarjeta_credito(pdf_file)
+
+
+def procesar_movimientos_tarjeta(pdf_file):
+    """Extrae cada compra de un estado de cuenta de tarjeta de crédito en PDF"""
+    from .utils import procesar_movimientos_tarjeta as _procesar_movimientos_tarjeta
+    return _procesar_movimientos_tarjeta(pdf_file)
+
+
+def precargar():
+    """
+    Importa las bibliotecas de OCR y prepara el motor de Tesseract de antemano
+    (por ejemplo, al iniciar los procesos trabajadores).
+    """
+    from .utils import cargar_bibliotecas_ocr
+    from .motor_ocr import obtener_motor, TesseractNoDisponible
+    cargar_bibliotecas_ocr()
+    try:
+        obtener_motor()
+    except TesseractNoDisponible:
+        # Sin Tesseract los trabajos fallarán con un mensaje claro al procesarse
+        pass
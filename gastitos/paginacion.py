@@ -0,0 +1,154 @@
+"""
+Paginación por cursor (keyset) de la lista de gastos.
+
+Las páginas siguen el orden (fecha, id) descendente. En lugar de saltear filas con
+OFFSET, cada enlace lleva el borde de la página vecina: ?despues=<cursor> pide los
+gastos más viejos que ese gasto y ?antes=<cursor> los más nuevos, así que cualquier
+página cuesta lo mismo que la primera (el índice (usuario, fecha, id) de Gasto
+resuelve el rango). El número de página viaja en ?pagina= solo como etiqueta.
+
+Los enlaces numerados se limitan a VENTANA_PAGINAS a cada lado de la página actual;
+sus cursores salen de las filas vecinas, que se leen junto con la página. El total
+de gastos sale de BalanceMensual.cantidad_gastos, que se mantiene en cada alta y baja,
+en lugar de un COUNT(*) sobre los gastos.
+"""
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q, Sum
+from django.utils.http import urlencode
+
+from .models import BalanceMensual, Gasto
+
+GASTOS_POR_PAGINA = 10
+VENTANA_PAGINAS = 2  # Enlaces numerados a cada lado de la página actual
+
+_EPOCA = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def codificar_cursor(gasto):
+    """Cursor de un gasto: microsegundos de su fecha (UTC) e id, p. ej. '1760000000000000_42'"""
+    return f'{(gasto.fecha - _EPOCA) // timedelta(microseconds=1)}_{gasto.pk}'
+
+
+def decodificar_cursor(texto):
+    """(fecha, id) de un cursor, o None si falta o no es válido"""
+    try:
+        microsegundos, pk = texto.split('_')
+        return _EPOCA + timedelta(microseconds=int(microsegundos)), int(pk)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+def total_gastos(usuario):
+    """Cantidad de gastos del usuario según los balances mensuales"""
+    return BalanceMensual.objects.filter(usuario=usuario).aggregate(total=Sum('cantidad_gastos'))['total'] or 0
+
+
+def _mas_viejos(gastos, fecha, pk):
+    # fecha__lte acota el rango del índice; el OR solo desempata entre gastos de la misma fecha
+    return gastos.filter(Q(fecha__lt=fecha) | Q(fecha=fecha, id__lt=pk), fecha__lte=fecha).order_by('-fecha', '-id')
+
+
+def _mas_nuevos(gastos, fecha, pk):
+    return gastos.filter(Q(fecha__gt=fecha) | Q(fecha=fecha, id__gt=pk), fecha__gte=fecha).order_by('fecha', 'id')
+
+
+def _numero(texto):
+    try:
+        return max(1, int(texto))
+    except (TypeError, ValueError):
+        return 1
+
+
+class PaginaGastos:
+    """Página de gastos con los enlaces de su ventana de paginación"""
+
+    def __init__(self, gastos, numero, total, nuevos, viejos, por_pagina, ventana):
+        self.object_list = gastos
+        self.numero = numero
+        self.total = total
+        self.paginas = max(1, math.ceil(total / por_pagina), numero)
+
+        # La página numero - k termina justo antes de gastos[0] (k = 1) o del último gasto
+        # de la página numero - k + 1; la página numero + k empieza después de gastos[-1]
+        # o del último de la página numero + k - 1
+        anteriores = []
+        for k in range(1, ventana + 1):
+            if numero - k < 1 or len(nuevos) < por_pagina * (k - 1) + 1:
+                break
+            borde = gastos[0] if k == 1 else nuevos[por_pagina * (k - 1) - 1]
+            anteriores.insert(0, self._enlace(numero - k, 'antes', borde))
+        siguientes = []
+        for k in range(1, ventana + 1):
+            if len(viejos) < por_pagina * (k - 1) + 1:
+                break
+            borde = gastos[-1] if k == 1 else viejos[por_pagina * (k - 1) - 1]
+            siguientes.append(self._enlace(numero + k, 'despues', borde))
+
+        self.enlaces = anteriores + [{'numero': numero, 'consulta': '', 'actual': True}] + siguientes
+        self.tiene_anterior = bool(anteriores)
+        self.tiene_siguiente = bool(siguientes)
+        self.consulta_anterior = anteriores[-1]['consulta'] if anteriores else ''
+        self.consulta_siguiente = siguientes[0]['consulta'] if siguientes else ''
+        # Enlace directo a la primera página cuando queda fuera de la ventana
+        self.primera_fuera_de_ventana = bool(anteriores) and anteriores[0]['numero'] > 1
+
+    @staticmethod
+    def _enlace(numero, direccion, borde):
+        # La primera página no lleva cursor: así siempre muestra los gastos más nuevos
+        consulta = '' if numero == 1 else urlencode({direccion: codificar_cursor(borde), 'pagina': numero})
+        return {'numero': numero, 'consulta': consulta, 'actual': False}
+
+    @property
+    def tiene_otras_paginas(self):
+        return self.tiene_anterior or self.tiene_siguiente
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def paginar_gastos(usuario, parametros, por_pagina=GASTOS_POR_PAGINA, ventana=VENTANA_PAGINAS):
+    """
+    Arma la página de gastos del usuario pedida en `parametros` (request.GET:
+    'despues', 'antes', 'pagina').
+
+    Hace dos consultas acotadas (la página con las filas vecinas de un lado, y las
+    del otro lado) más la suma de los balances para el total; en la primera página,
+    una sola consulta de gastos.
+
+    Returns:
+        PaginaGastos
+    """
+    gastos = Gasto.objects.filter(usuario=usuario)
+    vecinos = por_pagina * ventana  # Filas que alcanzan para los cursores de la ventana
+    numero = _numero(parametros.get('pagina'))
+    antes = decodificar_cursor(parametros.get('antes'))
+    despues = None if antes else decodificar_cursor(parametros.get('despues'))
+    pagina = nuevos = viejos = None
+
+    if antes:
+        filas = list(_mas_nuevos(gastos, *antes)[:por_pagina + vecinos])
+        # Con una página o menos de gastos más nuevos, lo que se pide es la primera
+        if len(filas) > por_pagina:
+            pagina, nuevos = filas[:por_pagina][::-1], filas[por_pagina:]
+    elif despues:
+        filas = list(_mas_viejos(gastos, *despues)[:por_pagina + vecinos])
+        if filas:
+            pagina, viejos = filas[:por_pagina], filas[por_pagina:]
+
+    if pagina is None:
+        filas = list(gastos.order_by('-fecha', '-id')[:por_pagina + vecinos])
+        pagina, nuevos, viejos, numero = filas[:por_pagina], [], filas[por_pagina:], 1
+    if nuevos is None:
+        nuevos = list(_mas_nuevos(gastos, pagina[0].fecha, pagina[0].pk)[:vecinos])
+    if viejos is None:
+        viejos = list(_mas_viejos(gastos, pagina[-1].fecha, pagina[-1].pk)[:vecinos])
+
+    # Si se agregaron o borraron gastos desde que se armó el enlace, el número puede no
+    # coincidir: nunca menor que las páginas más nuevas que se ven, y 1 si no hay ninguna
+    numero = max(numero, math.ceil(len(nuevos) / por_pagina) + 1) if nuevos else 1
+    return PaginaGastos(pagina, numero, total_gastos(usuario), nuevos, viejos, por_pagina, ventana)
@@ -0,0 +1,262 @@
+"""
+Programador de tareas periódicas seguro con varios procesos.
+
+Cada tarea se registra con un nombre, una función y una forma de calcular su clave de
+idempotencia a partir de la fecha (por ejemplo '2025-03' para una tarea mensual). El
+comando `ejecutar_tareas` (pensado para cron o para correr en un bucle) ejecuta las
+tareas cuya clave todavía no tiene una ejecución completada:
+
+- Un cerrojo de líder (fila de Cerrojo con vencimiento) hace que solo un proceso a la
+  vez recorra las tareas, aunque el comando se lance desde varios servidores.
+- Cada ejecución es una fila de EjecucionTarea única por (tarea, clave) que se toma con
+  un lease: si el proceso muere, otro la retoma cuando el lease vence. Mientras la
+  tarea corre, un hilo renueva el lease, y el resultado solo se guarda si el lease
+  sigue siendo del proceso.
+- Una ejecución fallida se reintenta con una espera que se duplica en cada intento.
+- Se guardan la duración, la cantidad de filas afectadas y el error, si lo hubo.
+"""
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+CERROJO_PROGRAMADOR = 'programador'
+DURACION_CERROJO = timedelta(minutes=5)
+REINTENTO_INICIAL = timedelta(minutes=5)  # Espera tras el primer fallo; se duplica en cada intento
+REINTENTO_MAXIMO = timedelta(hours=6)
+
+
+class Tarea:
+    """Tarea registrada: `funcion(clave)` devuelve la cantidad de filas afectadas"""
+
+    def __init__(self, nombre, funcion, clave, duracion_lease):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.clave = clave  # Recibe la fecha local y devuelve la clave de idempotencia
+        self.duracion_lease = duracion_lease
+        self.descripcion = next(iter((funcion.__doc__ or '').strip().splitlines()), '')
+
+
+TAREAS = {}
+
+
+def registrar_tarea(nombre, clave, duracion_lease=timedelta(minutes=30)):
+    """
+    Decorador que registra una tarea periódica.
+
+    Args:
+        nombre: Identificador de la tarea
+        clave: Función que recibe la fecha local y devuelve la clave del periodo
+        duracion_lease: Tiempo tras el cual otro proceso puede retomar una ejecución colgada
+    """
+    def decorador(funcion):
+        TAREAS[nombre] = Tarea(nombre, funcion, clave, duracion_lease)
+        return funcion
+    return decorador
+
+
+def clave_mensual(fecha):
+    return fecha.strftime('%Y-%m')
+
+
+def clave_mes_anterior(fecha):
+    """Mes que termina antes de `fecha`, para tareas que cierran el mes pasado"""
+    return clave_mensual(fecha.replace(day=1) - timedelta(days=1))
+
+
+def clave_diaria(fecha):
+    return fecha.isoformat()
+
+
+def identificador_proceso():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def tomar_cerrojo(nombre, propietario, duracion=DURACION_CERROJO):
+    """
+    Toma o renueva el cerrojo `nombre` si está libre, vencido o ya es de `propietario`.
+
+    Returns:
+        bool: True si el cerrojo quedó a nombre de `propietario`
+    """
+    from .models import Cerrojo
+
+    ahora = timezone.now()
+    tomado = Cerrojo.objects.filter(
+        Q(vence__lt=ahora) | Q(propietario=propietario) | Q(propietario=''),
+        nombre=nombre
+    ).update(propietario=propietario, vence=ahora + duracion)
+    if tomado:
+        return True
+    try:
+        with transaction.atomic():
+            Cerrojo.objects.create(nombre=nombre, propietario=propietario, vence=ahora + duracion)
+        return True
+    except IntegrityError:
+        # Existe y lo tiene otro proceso
+        return False
+
+
+def liberar_cerrojo(nombre, propietario):
+    from .models import Cerrojo
+    Cerrojo.objects.filter(nombre=nombre, propietario=propietario).update(propietario='', vence=timezone.now())
+
+
+def espera_reintento(intentos):
+    """Tiempo que se espera para reintentar una ejecución que falló en su intento número `intentos`"""
+    return min(REINTENTO_INICIAL * 2 ** max(intentos - 1, 0), REINTENTO_MAXIMO)
+
+
+def _tomar_ejecucion(tarea, clave, propietario):
+    """
+    Crea o retoma la ejecución de (tarea, clave) con un lease a nombre de `propietario`.
+
+    Returns:
+        EjecucionTarea o None si ya está completada, la tiene otro proceso o todavía
+        no pasó la espera para reintentarla
+    """
+    from .models import EjecucionTarea
+
+    ahora = timezone.now()
+    try:
+        with transaction.atomic():
+            return EjecucionTarea.objects.create(
+                tarea=tarea.nombre, clave=clave, estado='en_curso', propietario=propietario,
+                fecha_inicio=ahora, lease_hasta=ahora + tarea.duracion_lease, intentos=1
+            )
+    except IntegrityError:
+        pass
+
+    # Ya existe: retomarla solo si su lease venció. En una ejecución fallida el lease
+    # marca cuándo corresponde el próximo reintento
+    tomada = EjecucionTarea.objects.filter(
+        estado__in=['error', 'en_curso'], lease_hasta__lt=ahora,
+        tarea=tarea.nombre, clave=clave
+    ).update(
+        estado='en_curso', propietario=propietario, fecha_inicio=ahora, fecha_fin=None,
+        lease_hasta=ahora + tarea.duracion_lease, intentos=F('intentos') + 1, error=''
+    )
+    if not tomada:
+        return None
+    return EjecucionTarea.objects.get(tarea=tarea.nombre, clave=clave)
+
+
+def renovar_lease(ejecucion_id, propietario, duracion):
+    """
+    Extiende el lease de una ejecución en curso si todavía es de `propietario`.
+
+    Returns:
+        bool: False si otro proceso la retomó
+    """
+    from .models import EjecucionTarea
+
+    return bool(EjecucionTarea.objects.filter(
+        pk=ejecucion_id, propietario=propietario, estado='en_curso'
+    ).update(lease_hasta=timezone.now() + duracion))
+
+
+@contextmanager
+def _latido(ejecucion, duracion):
+    """Renueva el lease de `ejecucion` cada un tercio de `duracion` mientras dura el bloque"""
+    detener = threading.Event()
+
+    def renovar():
+        try:
+            while not detener.wait(duracion.total_seconds() / 3):
+                try:
+                    if not renovar_lease(ejecucion.pk, ejecucion.propietario, duracion):
+                        break
+                except DatabaseError as e:
+                    # Se reintenta en el próximo latido; el lease todavía no venció
+                    print(f"No se pudo renovar el lease de {ejecucion}: {e}")
+        finally:
+            connection.close()
+
+    hilo = threading.Thread(target=renovar, name=f'latido-{ejecucion.tarea}', daemon=True)
+    hilo.start()
+    try:
+        yield
+    finally:
+        detener.set()
+        hilo.join()
+
+
+def ejecutar_tarea(tarea, clave, propietario=None):
+    """
+    Ejecuta una tarea para una clave si no se ejecutó ya.
+
+    Returns:
+        EjecucionTarea con el resultado, o None si no correspondía ejecutarla o si
+        mientras corría otro proceso retomó la ejecución (su resultado no se guarda)
+    """
+    from .models import EjecucionTarea
+
+    propietario = propietario or identificador_proceso()
+    ejecucion = _tomar_ejecucion(tarea, clave, propietario)
+    if ejecucion is None:
+        return None
+
+    inicio = time.perf_counter()
+    try:
+        with _latido(ejecucion, tarea.duracion_lease):
+            filas = tarea.funcion(clave)
+        ejecucion.estado = 'completado'
+        ejecucion.filas = filas or 0
+    except Exception as e:
+        ejecucion.estado = 'error'
+        ejecucion.error = f'{type(e).__name__}: {e}'
+    ejecucion.duracion = time.perf_counter() - inicio
+    ejecucion.fecha_fin = timezone.now()
+    if ejecucion.estado == 'error':
+        ejecucion.lease_hasta = ejecucion.fecha_fin + espera_reintento(ejecucion.intentos)
+
+    guardada = EjecucionTarea.objects.filter(pk=ejecucion.pk, propietario=propietario, estado='en_curso').update(
+        estado=ejecucion.estado, filas=ejecucion.filas, error=ejecucion.error, duracion=ejecucion.duracion,
+        fecha_fin=ejecucion.fecha_fin, lease_hasta=ejecucion.lease_hasta
+    )
+    return ejecucion if guardada else None
+
+
+def ejecutar_pendientes(nombres=None, ahora=None):
+    """
+    Ejecuta las tareas registradas cuya clave actual no tiene una ejecución completada.
+    Solo el proceso que tiene el cerrojo del programador ejecuta tareas.
+
+    Args:
+        nombres: Tareas a considerar (por defecto, todas las registradas)
+        ahora: Momento de referencia para calcular las claves (por defecto, ahora)
+
+    Returns:
+        list: Ejecuciones realizadas, o None si otro proceso tiene el cerrojo
+    """
+    from .models import EjecucionTarea
+    from . import tasks  # noqa: F401  (registra las tareas)
+
+    propietario = identificador_proceso()
+    if not tomar_cerrojo(CERROJO_PROGRAMADOR, propietario):
+        return None
+
+    fecha = timezone.localtime(ahora or timezone.now()).date()
+    ejecuciones = []
+    try:
+        for tarea in TAREAS.values():
+            if nombres and tarea.nombre not in nombres:
+                continue
+            clave = tarea.clave(fecha)
+            if EjecucionTarea.objects.filter(tarea=tarea.nombre, clave=clave, estado='completado').exists():
+                continue
+            # Renovar el cerrojo antes de cada tarea por si las anteriores fueron largas
+            if not tomar_cerrojo(CERROJO_PROGRAMADOR, propietario):
+                break
+            ejecucion = ejecutar_tarea(tarea, clave, propietario)
+            if ejecucion is not None:
+                ejecuciones.append(ejecucion)
+    finally:
+        liberar_cerrojo(CERROJO_PROGRAMADOR, propietario)
+    return ejecuciones
@@ -0,0 +1,202 @@
+"""
+Pronóstico de cumplimiento de las metas de ahorro por simulación (Monte Carlo).
+
+El ahorro neto de cada mes (salario menos gastos del mes) se toma del historial del
+usuario: meses cerrados de EstadisticaMensual y meses con gastos de BalanceMensual,
+sin contar el mes en curso. Se simulan miles de caminos de ahorro mensual (remuestreando
+los meses del historial, o con una normal si hay pocos) y el ahorro de cada mes se
+reparte entre las metas activas en proporción a su ahorro mensual recomendado.
+
+Con ese reparto fijo, una meta se cumple cuando el ahorro acumulado total alcanza
+`restante / peso`, así que todas las metas se evalúan a la vez sobre la misma matriz de
+acumulados, sin un ciclo por meta:
+
+- probabilidad de llegar a la fecha objetivo: fracción de caminos que alcanzan el umbral
+  antes de esa fecha;
+- fechas P50 y P90: primer mes en que el 50% y el 90% de los caminos la completaron
+  (los cuantiles de un acumulado que no decrece tampoco decrecen mes a mes).
+
+La simulación trabaja en float32 con una fila por mes, para que las sumas acumuladas y
+el ordenamiento parcial recorran memoria contigua.
+
+El reparto no se reasigna cuando una meta se completa, por lo que el pronóstico de las
+demás es conservador. Las metas en dólares no se pronostican: no hay cotización para
+convertir el ahorro en pesos.
+
+Las vistas importan este módulo, así que NumPy se importa recién en la primera
+simulación: un worker que no muestra pronósticos no lo carga.
+"""
+import calendar
+import hashlib
+import math
+from datetime import date
+
+from django.core.cache import cache
+
+from .models import BalanceMensual, EstadisticaMensual
+
+CAMINOS = 10000
+HORIZONTE_MESES = 120  # Metas que no se completan en 10 años quedan sin fecha
+MESES_HISTORIAL = 24
+MESES_MINIMOS_REMUESTREO = 6  # Con menos meses se usa una normal con su media y desvío
+DESVIO_RELATIVO_MINIMO = 0.25  # Incertidumbre mínima respecto de la media si hay pocos datos
+FRACCION_GASTO_ESTIMADA = 0.7  # Sin historial, igual que calcular_capacidad_ahorro_usuario
+SEMILLA = 20250101
+DURACION_CACHE = 60 * 60 * 24
+
+
+def simular_ahorros(historial, caminos=CAMINOS, horizonte=HORIZONTE_MESES, rng=None):
+    """
+    Simula ahorros mensuales a partir del historial de ahorro neto.
+
+    Returns:
+        ndarray float32 (horizonte, caminos): una fila por mes, una columna por camino
+    """
+    import numpy as np
+
+    rng = rng or np.random.default_rng(SEMILLA)
+    historial = np.asarray(historial, dtype=np.float32)
+    if len(historial) >= MESES_MINIMOS_REMUESTREO:
+        return historial.take(rng.integers(0, len(historial), size=(horizonte, caminos)))
+
+    media = float(historial.mean())
+    desvio = float(historial.std(ddof=1)) if len(historial) > 1 else 0.0
+    desvio = max(desvio, abs(media) * DESVIO_RELATIVO_MINIMO)
+    ahorros = rng.standard_normal(size=(horizonte, caminos), dtype=np.float32)
+    ahorros *= desvio
+    ahorros += media
+    return ahorros
+
+
+def pronosticar(ahorros, restantes, pesos, meses_limite):
+    """
+    Evalúa todas las metas sobre los mismos caminos de ahorro simulados.
+
+    Args:
+        ahorros: ndarray (horizonte, caminos) de ahorros mensuales (ver simular_ahorros)
+        restantes: Monto que le falta a cada meta
+        pesos: Fracción del ahorro mensual que recibe cada meta
+        meses_limite: Meses completos hasta la fecha objetivo de cada meta
+
+    Returns:
+        tuple: (probabilidad de cumplir a tiempo, mes P50, mes P90) por meta; los meses
+        se cuentan desde hoy y valen -1 si la meta no se completa dentro del horizonte
+    """
+    import numpy as np
+
+    horizonte, caminos = ahorros.shape
+    restantes = np.asarray(restantes, dtype=np.float64)
+    pesos = np.asarray(pesos, dtype=np.float64)
+    meses_limite = np.clip(np.asarray(meses_limite, dtype=np.intp), 0, horizonte)
+
+    # Acumulado máximo alcanzado hasta cada mes (la fila 0 es hoy): una meta cumplida
+    # no se pierde si después hay meses con ahorro negativo
+    acumulado = np.zeros((horizonte + 1, caminos), dtype=ahorros.dtype)
+    np.cumsum(ahorros, axis=0, out=acumulado[1:])
+    np.maximum.accumulate(acumulado, axis=0, out=acumulado)
+
+    umbrales = np.divide(restantes, pesos, out=np.zeros_like(restantes), where=pesos > 0)
+    umbrales = umbrales.astype(acumulado.dtype)
+    probabilidades = (acumulado[meses_limite] >= umbrales[:, None]).mean(axis=1)
+
+    # En el mes t al menos una fracción q de los caminos cumplió la meta si el valor que
+    # ocupa la posición caminos - ceil(q * caminos) del acumulado ordenado alcanza el
+    # umbral. Ese valor no decrece mes a mes, así que el primer mes sale de una búsqueda
+    # binaria. Basta con particionar cada mes en esas dos posiciones.
+    posiciones = [caminos - math.ceil(q * caminos) for q in (0.5, 0.9)]
+    acumulado.partition(posiciones, axis=1)
+    meses = np.stack([np.searchsorted(acumulado[:, posicion], umbrales, side='left') for posicion in posiciones])
+    meses[meses > horizonte] = -1
+    return probabilidades, meses[0], meses[1]
+
+
+def sumar_meses(fecha, meses):
+    indice = fecha.year * 12 + fecha.month - 1 + meses
+    año, mes = divmod(indice, 12)
+    return date(año, mes + 1, min(fecha.day, calendar.monthrange(año, mes + 1)[1]))
+
+
+def meses_hasta(desde, hasta):
+    """Meses completos entre dos fechas (0 si `hasta` ya pasó)"""
+    meses = (hasta.year - desde.year) * 12 + hasta.month - desde.month - (hasta.day < desde.day)
+    return max(meses, 0)
+
+
+def historial_ahorro_mensual(usuario, salario, hoy=None):
+    """
+    Ahorro neto (salario menos gastos) de los últimos meses completos del usuario.
+
+    Returns:
+        list: Un valor por mes con gastos registrados, o una estimación si no hay ninguno
+    """
+    hoy = hoy or date.today()
+    mes_actual = hoy.year * 12 + hoy.month - 1
+    desde = mes_actual - MESES_HISTORIAL
+    año_desde = desde // 12
+
+    gastos_por_mes = {}
+    for año, mes, total in EstadisticaMensual.objects.filter(
+        usuario=usuario, año__gte=año_desde
+    ).values_list('año', 'mes', 'total_gastos'):
+        gastos_por_mes[año * 12 + mes - 1] = total
+    # Los meses aún no cerrados salen de los acumulados de los gastos vivos
+    for año, mes, total in BalanceMensual.objects.filter(
+        usuario=usuario, año__gte=año_desde, cantidad_gastos__gt=0
+    ).values_list('año', 'mes', 'total_gastos'):
+        gastos_por_mes.setdefault(año * 12 + mes - 1, total)
+
+    historial = [
+        salario - float(total)
+        for indice, total in sorted(gastos_por_mes.items())
+        if desde <= indice < mes_actual
+    ]
+    return historial or [salario * (1 - FRACCION_GASTO_ESTIMADA)]
+
+
+def pronosticar_metas(usuario, resumen=None, caminos=CAMINOS):
+    """
+    Pronostica las metas activas en pesos del usuario.
+
+    El resultado se guarda en la caché con una clave derivada de los datos de entrada
+    (historial, metas y fecha), así que se recalcula solo cuando esos datos cambian.
+
+    Returns:
+        dict: id de meta -> {'probabilidad', 'porcentaje', 'fecha_p50', 'fecha_p90'};
+        las fechas son None si la meta no se completa en HORIZONTE_MESES
+    """
+    from .utils_ahorro import ResumenAhorro
+
+    resumen = resumen or ResumenAhorro(usuario)
+    metas = [meta for meta in resumen.metas_activas if meta.moneda == 'ARS']
+    if not metas:
+        return {}
+
+    hoy = date.today()
+    salario = float(resumen.perfil.salario_mensual) if resumen.perfil else 0.0
+    historial = historial_ahorro_mensual(usuario, salario, hoy)
+    restantes = [float(meta.monto_restante) for meta in metas]
+    recomendados = [float(meta.ahorro_mensual_recomendado) for meta in metas]
+    meses_limite = [meses_hasta(hoy, meta.fecha_objetivo) for meta in metas]
+
+    entradas = (hoy, caminos, historial, [meta.id for meta in metas], restantes, recomendados, meses_limite)
+    clave = f'pronostico_ahorro:{usuario.id}:{hashlib.sha1(repr(entradas).encode()).hexdigest()}'
+    pronosticos = cache.get(clave)
+    if pronosticos is not None:
+        return pronosticos
+
+    total_recomendado = sum(recomendados)
+    pesos = [recomendado / total_recomendado if total_recomendado else 0.0 for recomendado in recomendados]
+    ahorros = simular_ahorros(historial, caminos)
+    probabilidades, meses_p50, meses_p90 = pronosticar(ahorros, restantes, pesos, meses_limite)
+
+    pronosticos = {
+        meta.id: {
+            'probabilidad': float(probabilidad),
+            'porcentaje': float(probabilidad) * 100,
+            'fecha_p50': sumar_meses(hoy, int(mes_p50)) if mes_p50 >= 0 else None,
+            'fecha_p90': sumar_meses(hoy, int(mes_p90)) if mes_p90 >= 0 else None,
+        }
+        for meta, probabilidad, mes_p50, mes_p90 in zip(metas, probabilidades, meses_p50, meses_p90)
+    }
+    cache.set(clave, pronosticos, DURACION_CACHE)
+    return pronosticos
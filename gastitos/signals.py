@@ -0,0 +1,106 @@
+import threading
+from contextlib import contextmanager
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+from decimal import Decimal
+from .models import (
+    Gasto, BalanceMensual, BalanceDiario, GastoFijo, MetaAhorro, PerfilUsuario, Vencimiento, VersionDatos,
+)
+
+# Acumulados que se mantienen con cada alta, edición o baja de Gasto
+BALANCES = (BalanceMensual, BalanceDiario)
+
+# Se envía con `metas` (lista de MetaAhorro ya canceladas) cuando vencen metas de ahorro,
+# para que quien quiera avisarle a los usuarios se conecte sin tocar el vencimiento
+metas_vencidas = Signal()
+
+# Modelos cuyos cambios invalidan las vistas cacheadas del usuario, con su campo de usuario
+DATOS_DEL_USUARIO = {
+    Gasto: 'usuario_id',
+    GastoFijo: 'usuario_id',
+    Vencimiento: 'usuario_id',
+    MetaAhorro: 'usuario_id',
+    PerfilUsuario: 'user_id',
+}
+
+
+# Bajas de Gasto cuyos acumulados y versiones ajusta quien las hace (ver bajas_en_bloque)
+_bajas_en_bloque = threading.local()
+
+
+@contextmanager
+def bajas_en_bloque():
+    """
+    Dentro del bloque, eliminar gastos no ajusta los balances ni las versiones del usuario
+    gasto por gasto: quien elimina en bloque los ajusta después con una consulta por tabla.
+    Solo afecta al hilo actual.
+    """
+    anterior = getattr(_bajas_en_bloque, 'activas', False)
+    _bajas_en_bloque.activas = True
+    try:
+        yield
+    finally:
+        _bajas_en_bloque.activas = anterior
+
+
+def _a_decimal(monto):
+    """Normaliza montos asignados como float o str desde las vistas"""
+    if monto is None:
+        return Decimal('0')
+    return monto if isinstance(monto, Decimal) else Decimal(str(monto))
+
+
+@receiver(post_save, sender=Gasto)
+def actualizar_balance_al_guardar(sender, instance, created, raw=False, **kwargs):
+    """Mantiene los acumulados diario y mensual al crear o editar un gasto"""
+    if raw:
+        return
+
+    monto_nuevo = _a_decimal(instance.monto)
+
+    originales = getattr(instance, '_valores_originales', None)
+    for balance in BALANCES:
+        if created:
+            balance.registrar_movimiento(instance.usuario_id, instance.fecha, monto_nuevo)
+        elif originales is None:
+            # No conocemos los valores anteriores: reconstruir los acumulados del usuario
+            balance.reconciliar(usuario=instance.usuario)
+        else:
+            monto_original, fecha_original = originales
+            balance.registrar_movimiento(
+                instance.usuario_id, fecha_original, -_a_decimal(monto_original), cantidad=-1
+            )
+            balance.registrar_movimiento(instance.usuario_id, instance.fecha, monto_nuevo)
+
+    instance._valores_originales = (instance.monto, instance.fecha)
+
+
+@receiver(post_delete, sender=Gasto)
+def actualizar_balance_al_eliminar(sender, instance, **kwargs):
+    """Descuenta el gasto eliminado de los acumulados de su día y su mes"""
+    if getattr(_bajas_en_bloque, 'activas', False):
+        return
+    # No crear filas nuevas: en un borrado en cascada del usuario el balance ya puede no existir
+    for balance in BALANCES:
+        balance.registrar_movimiento(
+            instance.usuario_id, instance.fecha, -_a_decimal(instance.monto), cantidad=-1, crear=False
+        )
+
+
+def incrementar_version_al_guardar(sender, instance, raw=False, **kwargs):
+    """Invalida las vistas cacheadas del usuario dueño del registro guardado"""
+    if raw:
+        return
+    VersionDatos.incrementar([getattr(instance, DATOS_DEL_USUARIO[sender])])
+
+
+def incrementar_version_al_eliminar(sender, instance, **kwargs):
+    if sender is Gasto and getattr(_bajas_en_bloque, 'activas', False):
+        return
+    # Sin crear filas: en un borrado en cascada del usuario su versión ya puede no existir
+    VersionDatos.incrementar([getattr(instance, DATOS_DEL_USUARIO[sender])], crear=False)
+
+
+for modelo in DATOS_DEL_USUARIO:
+    post_save.connect(incrementar_version_al_guardar, sender=modelo, dispatch_uid=f'version_{modelo.__name__}')
+    post_delete.connect(incrementar_version_al_eliminar, sender=modelo, dispatch_uid=f'version_eliminar_{modelo.__name__}')
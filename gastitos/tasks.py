@@ -1,60 +1,84 @@
-import threading
-import time
-from datetime import datetime, timedelta
-
-def iniciar_tarea_limpieza_mensual():
-    """Inicia un hilo para ejecutar la limpieza mensual de gastos"""
-    thread = threading.Thread(target=programar_limpieza_mensual)
-    thread.daemon = True  # El hilo se cerrará cuando termine la aplicación
-    thread.start()
-
-def programar_limpieza_mensual():
-    """
-    Programa la ejecución de la limpieza mensual para el primer día de cada mes.
-    """
-    while True:
-        # Calcular tiempo hasta el primer día del próximo mes
-        ahora = datetime.now()
-        if ahora.month == 12:
-            proximo_mes = datetime(ahora.year + 1, 1, 1, 0, 5, 0)  # 00:05 AM del primer día
-        else:
-            proximo_mes = datetime(ahora.year, ahora.month + 1, 1, 0, 5, 0)
-        
-        # Calcular segundos hasta el próximo mes
-        segundos_espera = (proximo_mes - ahora).total_seconds()
-        
-        # Si estamos en el primer día del mes y antes de las 00:10 AM, ejecutar ahora
-        if ahora.day == 1 and ahora.hour == 0 and ahora.minute < 10:
-            ejecutar_limpieza_mensual()
-        
-        # Esperar hasta el próximo mes (máximo 1 día para evitar bloqueos largos)
-        tiempo_espera = min(segundos_espera, 86400)  # 86400 segundos = 1 día
-        time.sleep(tiempo_espera)
-        
-        # Si ya es el primer día del mes, ejecutar la limpieza
-        if datetime.now().day == 1 and datetime.now().hour == 0:
-            ejecutar_limpieza_mensual()
-
-def ejecutar_limpieza_mensual():
-    """
-    Ejecuta la limpieza mensual de gastos y guarda las estadísticas.
-    """
-    try:
-        # Importar aquí para evitar importaciones circulares
-        from .models import EstadisticaMensual
-        
-        # Obtener el mes anterior
-        ahora = datetime.now()
-        if ahora.month == 1:
-            mes_anterior = 12
-            año_anterior = ahora.year - 1
-        else:
-            mes_anterior = ahora.month - 1
-            año_anterior = ahora.year
-            
-        # Guardar estadísticas y limpiar gastos del mes anterior
-        EstadisticaMensual.guardar_estadisticas_y_limpiar(año_anterior, mes_anterior)
-        
-        print(f"[{datetime.now()}] Limpieza mensual ejecutada correctamente para {mes_anterior}/{año_anterior}")
-    except Exception as e:
-        print(f"[{datetime.now()}] Error en la limpieza mensual: {str(e)}")
\ No newline at end of file
+"""
+Tareas periódicas de la aplicación, registradas en el programador (gastitos.programador).
+
+Se ejecutan con `python manage.py ejecutar_tareas`, desde cron o en un proceso aparte
+con --cada; cada una corre una sola vez por periodo aunque haya varios servidores.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+
+from .programador import clave_diaria, clave_mensual, clave_mes_anterior, registrar_tarea
+
+
+def _año_mes(clave):
+    año, mes = clave.split('-')
+    return int(año), int(mes)
+
+
+@registrar_tarea('cierre_mensual', clave_mes_anterior, duracion_lease=timedelta(hours=2))
+def cierre_mensual(clave):
+    """Guarda las estadísticas del mes anterior y elimina sus gastos"""
+    # Importar aquí para evitar importaciones circulares
+    from .models import EstadisticaMensual
+
+    año, mes = _año_mes(clave)
+    cierre = EstadisticaMensual.guardar_estadisticas_y_limpiar(año, mes)
+    return cierre.gastos_eliminados
+
+
+@registrar_tarea('cierres_atrasados', clave_diaria, duracion_lease=timedelta(hours=2))
+def cerrar_gastos_atrasados(clave):
+    """Cierra los gastos cargados en meses que ya estaban cerrados"""
+    from .models import CierreMensual, EstadisticaMensual
+
+    eliminados = 0
+    for cierre in CierreMensual.objects.filter(estado='completado').order_by('año', 'mes'):
+        # Un mes sin gastos nuevos no se reabre (guardar_estadisticas_y_limpiar solo lo consulta)
+        antes = cierre.gastos_eliminados
+        eliminados += EstadisticaMensual.guardar_estadisticas_y_limpiar(cierre.año, cierre.mes).gastos_eliminados - antes
+    return eliminados
+
+
+@registrar_tarea('gastos_fijos', clave_mensual)
+def aplicar_gastos_fijos(clave):
+    """Aplica una vez por mes los gastos fijos activos de cada usuario"""
+    from django.db import transaction
+
+    from .importacion import importar_gastos
+    from .models import GastoFijo
+
+    # Los gastos fijos que ya se aplicaron este mes (a mano o en un intento anterior) no se repiten
+    fijos_por_usuario = defaultdict(list)
+    pendientes = (
+        GastoFijo.objects.filter(activo=True).exclude(ultimo_mes_aplicado__gte=clave)
+        .select_related('usuario').order_by('usuario_id', 'id')
+    )
+    for gasto_fijo in pendientes:
+        fijos_por_usuario[gasto_fijo.usuario].append(gasto_fijo)
+
+    agregados = 0
+    for usuario, gastos_fijos in fijos_por_usuario.items():
+        filas = [{'descripcion': gasto_fijo.descripcion, 'monto': gasto_fijo.monto} for gasto_fijo in gastos_fijos]
+        # Los gastos y la marca de aplicado se confirman juntos
+        with transaction.atomic():
+            importacion = importar_gastos(usuario, filas)
+            aplicados = [gastos_fijos[fila['indice']].id for fila in importacion['filas'] if fila['estado'] == 'aceptado']
+            GastoFijo.objects.filter(id__in=aplicados).update(ultimo_mes_aplicado=clave)
+        agregados += importacion['agregados']
+    return agregados
+
+
+@registrar_tarea('vencimiento_metas', clave_diaria)
+def vencer_metas_ahorro(clave):
+    """Cancela las metas de ahorro activas cuya fecha objetivo pasó sin completarse"""
+    from .utils_ahorro import vencer_metas_ahorro as vencer_metas
+
+    return len(vencer_metas(date.fromisoformat(clave)))
+
+
+@registrar_tarea('poda_cache_ocr', clave_diaria)
+def podar_cache_ocr(clave):
+    """Descarta los resultados de OCR de versiones anteriores y los menos usados por encima del límite"""
+    from . import cache_ocr
+
+    return cache_ocr.podar()
@@ -0,0 +1,167 @@
+"""
+Cola local de trabajos OCR.
+
+Las vistas crean un TrabajoOCR y lo encolan en un pool de procesos acotado
+(settings.OCR_WORKERS), de modo que la petición responde de inmediato y una
+ráfaga de subidas no bloquea a los workers web. Los procesos del pool solo
+ejecutan el OCR; el resultado se guarda en la base desde el proceso web.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _inicializar_trabajador():
+    """Prepara un proceso de OCR: prioridad baja, un hilo de OpenMP y el motor ya cargado"""
+    try:
+        os.nice(getattr(settings, 'OCR_NICE', 10))
+    except (AttributeError, OSError):
+        pass
+    
+    # Tesseract con un solo hilo de OpenMP: el paralelismo lo dan los procesos del pool y
+    # las franjas de cada imagen. Tiene que fijarse antes de cargar la biblioteca
+    os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+    
+    # Solo los procesos trabajadores cargan la pila de OCR
+    from .ocr import precargar
+    try:
+        precargar()
+    except ImportError:
+        pass
+
+
+def obtener_pool():
+    """Devuelve el pool de procesos compartido, creándolo en el primer uso"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'OCR_WORKERS', 2),
+                initializer=_inicializar_trabajador
+            )
+        return _pool
+
+
+def _reiniciar_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _serializar(valor):
+    """Convierte fechas a texto para poder guardar el resultado como JSON"""
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, dict):
+        return {clave: _serializar(v) for clave, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_serializar(v) for v in valor]
+    return valor
+
+
+def ejecutar_ocr(tipo, ruta):
+    """
+    Ejecuta el OCR de un archivo. Corre dentro del proceso trabajador y no usa la base de datos.
+
+    Args:
+        tipo: 'comprobante' o 'historial'
+        ruta: Ruta del archivo subido
+
+    Returns:
+        dict: Resultado serializable a JSON
+    """
+    from django.core.files import File
+    from .ocr import extraer_datos_imagen, procesar_historial_mercadopago
+
+    with open(ruta, 'rb') as archivo:
+        if tipo == 'historial':
+            return {'gastos': _serializar(procesar_historial_mercadopago(File(archivo)))}
+        return _serializar(extraer_datos_imagen(File(archivo)) or {'monto': None, 'fecha': None})
+
+
+def _guardar_resultado(trabajo_id, huella, tipo, future):
+    """Callback del pool: guarda el resultado del trabajo desde el proceso web"""
+    from .models import TrabajoOCR
+    from . import cache_ocr
+
+    close_old_connections()
+    try:
+        try:
+            resultado = future.result()
+        except BrokenProcessPool as e:
+            _reiniciar_pool()
+            TrabajoOCR.objects.filter(id=trabajo_id).update(
+                estado='error', error=f'El proceso de OCR terminó inesperadamente: {e}', fecha_fin=timezone.now()
+            )
+        except Exception as e:
+            TrabajoOCR.objects.filter(id=trabajo_id).update(
+                estado='error', error=str(e), fecha_fin=timezone.now()
+            )
+        else:
+            TrabajoOCR.objects.filter(id=trabajo_id).update(
+                estado='completado', resultado=resultado, fecha_fin=timezone.now()
+            )
+            cache_ocr.guardar(huella, tipo, resultado)
+    finally:
+        connection.close()
+
+
+def encolar_trabajo(trabajo):
+    """Envía el trabajo al pool una vez confirmada la transacción que lo creó"""
+    def enviar():
+        from .models import TrabajoOCR
+
+        TrabajoOCR.objects.filter(id=trabajo.id).update(estado='procesando', fecha_inicio=timezone.now())
+        try:
+            future = obtener_pool().submit(ejecutar_ocr, trabajo.tipo, trabajo.archivo.path)
+        except (BrokenProcessPool, RuntimeError) as e:
+            _reiniciar_pool()
+            TrabajoOCR.objects.filter(id=trabajo.id).update(
+                estado='pendiente', error=f'No se pudo encolar: {e}'
+            )
+            return
+        future.add_done_callback(lambda f: _guardar_resultado(trabajo.id, trabajo.huella, trabajo.tipo, f))
+
+    transaction.on_commit(enviar)
+
+
+def puede_encolar(usuario):
+    """Limita los trabajos en curso por usuario para que una ráfaga no acapare el pool"""
+    from .models import TrabajoOCR
+
+    limite = getattr(settings, 'OCR_MAX_TRABAJOS_POR_USUARIO', 5)
+    en_curso = TrabajoOCR.objects.filter(usuario=usuario, estado__in=['pendiente', 'procesando']).count()
+    return en_curso < limite
+
+
+def crear_trabajo(usuario, tipo, archivo, gasto=None):
+    """Crea un TrabajoOCR para el archivo y lo encola, salvo que el resultado ya esté en caché"""
+    from .models import TrabajoOCR
+    from . import cache_ocr
+
+    trabajo = TrabajoOCR(usuario=usuario, tipo=tipo, archivo=archivo, gasto=gasto)
+    trabajo.huella = cache_ocr.calcular_huella(trabajo.archivo)
+
+    resultado = cache_ocr.obtener(trabajo.huella, tipo)
+    if resultado is not None:
+        ahora = timezone.now()
+        trabajo.estado = 'completado'
+        trabajo.resultado = resultado
+        trabajo.fecha_inicio = trabajo.fecha_fin = ahora
+        trabajo.save()
+        return trabajo
+
+    trabajo.save()
+    encolar_trabajo(trabajo)
+    return trabajo
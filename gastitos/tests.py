@@ -1,3 +1,1669 @@
-from django.test import TestCase
+import ctypes
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Sum
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import archivo_gastos, cache_ocr, instrumentacion, tasks  # noqa: F401  (tasks registra las tareas)
+from .importacion import importar_gastos
+from .instrumentacion import presupuesto_consultas
+from .motor_ocr import MotorOCR
+from .paginacion import paginar_gastos
+from .models import (
+    BalanceDiario, BalanceMensual, Cerrojo, CierreMensual, EjecucionTarea, EstadisticaMensual, Gasto, GastoFijo, MetaAhorro, PerfilUsuario, ResultadoOCR,
+    TrabajoOCR, Vencimiento, VersionDatos,
+)
+from .programador import (
+    TAREAS, Tarea, _latido, ejecutar_pendientes, ejecutar_tarea, espera_reintento, liberar_cerrojo, renovar_lease,
+    tomar_cerrojo,
+)
+from .pronostico_ahorro import pronosticar, simular_ahorros
+from .signals import metas_vencidas
+from .tasks_ocr import puede_encolar
+from .utils import (
+    PDFDemasiadoLargo, dividir_en_franjas, extraer_gastos_historial, extraer_movimiento_tarjeta, extraer_paginas_pdf,
+    paginas_pdf, procesar_pdf_tarjeta_credito, reconocer_por_franjas,
+)
+from .utils_ahorro import vencer_metas_ahorro
+
+
+def _gasto(descripcion, monto, fecha):
+    return {'descripcion': descripcion, 'monto': monto, 'fecha': fecha, 'prioridad': 'baja'}
+
+
+class ExtraerGastosHistorialTests(SimpleTestCase):
+    """
+    Salidas de referencia del parser del historial de MercadoPago, iguales a las del parser
+    anterior salvo en los tests test_cambio_intencional_*, que documentan en qué difiere
+    """
+
+    def test_fechas_como_encabezado(self):
+        texto = (
+            "Actividad\n"
+            "15/03/2025\n"
+            "Transferencia enviada Juan Perez $ 7.000\n"
+            "Pago Supermercado Dia $ 12.345,67\n"
+            "14/03/2025\n"
+            "Transferencia recibida Ana + $ 5.000\n"
+            "Pago Edesur $ 26.000\n"
+            "13/03/2025\n"
+            "Recarga SUBE $ 2.000\n"
+            "Pago Edesur $ 26.000"
+        )
+        self.assertEqual(extraer_gastos_historial(texto), [
+            _gasto('Transferencia enviada Juan Perez', 7000.0, date(2025, 3, 15)),
+            _gasto('Pago Supermercado Dia', 12345.0, date(2025, 3, 15)),
+            _gasto('Pago Edesur', 26000.0, date(2025, 3, 14)),
+            _gasto('Recarga SUBE', 2000.0, date(2025, 3, 13)),
+        ])
+
+    def test_fecha_en_la_misma_linea(self):
+        texto = (
+            "Pago Netflix $ 4.299 10/03/2025\n"
+            "Compra Farmacia - $ 1.250 09-03-2025\n"
+            "Depósito recibido $ 50.000 09/03/2025\n"
+            "Pago con QR Kiosco 24 $ 850 08/03/25\n"
+            "Mercado Libre 12,500 07/03/2025\n"
+            "Hoy\n"
+            "$ 999"
+        )
+        self.assertEqual(extraer_gastos_historial(texto), [
+            _gasto('Pago Netflix', 4299.0, date(2025, 3, 10)),
+            _gasto('Compra Farmacia', 1250.0, date(2025, 3, 9)),
+            _gasto('Pago con QR Kiosco 24', 850.0, date(2025, 3, 8)),
+            _gasto('Mercado Libre', 12500.0, date(2025, 3, 7)),
+        ])
+
+    def test_montos_junto_al_signo(self):
+        texto = (
+            "Pago con QR Kiosco 24 $ 850 08/03/25\n"
+            "Mercado Libre 12,500 07/03/2025\n"
+            "Compra en cuotas 3 $ 0 06/03/2025\n"
+            "Rappi*Pedido 3.450 $ 05/03/2025"
+        )
+        montos = [(gasto['descripcion'], gasto['monto']) for gasto in extraer_gastos_historial(texto)]
+        self.assertEqual(montos, [
+            ('Pago con QR Kiosco 24', 850.0),
+            ('Mercado Libre', 12500.0),
+            ('Compra en cuotas', 3.0),
+            ('RappiPedido', 3450.0),
+        ])
+
+    def test_cambio_intencional_la_fecha_de_la_linea_gana(self):
+        # El parser anterior le daba a las dos últimas filas la fecha de dos líneas arriba
+        # (08/03 y 07/03); ahora cada una toma la escrita en su propia línea
+        texto = (
+            "Pago con QR Kiosco 24 $ 850 08/03/25\n"
+            "Mercado Libre 12,500 07/03/2025\n"
+            "Compra en cuotas 3 $ 0 06/03/2025\n"
+            "Rappi*Pedido 3.450 $ 05/03/2025"
+        )
+        fechas = [gasto['fecha'] for gasto in extraer_gastos_historial(texto)]
+        self.assertEqual(fechas, [date(2025, 3, 8), date(2025, 3, 7), date(2025, 3, 6), date(2025, 3, 5)])
+
+    def test_gastos_antes_de_la_primera_fecha(self):
+        texto = (
+            "Tu actividad\n"
+            "Pago Personal $ 5.000\n"
+            "12/02/2025\n"
+            "Débito automático Movistar $ 8.500,00\n"
+            "Transferencia enviada $ 150,50\n"
+            "Cobro QR + $ 3.000\n"
+            "Ok"
+        )
+        self.assertEqual(extraer_gastos_historial(texto), [
+            _gasto('Pago Personal', 5000.0, date(2025, 2, 12)),
+            _gasto('Débito automático Movistar', 8500.0, date(2025, 2, 12)),
+            _gasto('Transferencia enviada', 150.5, date(2025, 2, 12)),
+        ])
+
+    def test_cambio_intencional_el_encabezado_vale_para_todas_sus_filas(self):
+        # El parser anterior solo miraba dos líneas alrededor: las filas 3 a 5 quedaban con
+        # la fecha de hoy. Ahora una fecha encabezado se arrastra hasta la siguiente
+        lineas = ["01/04/2025"] + [f"Pago comercio {i} $ {i}.000" for i in range(1, 6)]
+        gastos = extraer_gastos_historial("\n".join(lineas))
+        self.assertEqual([gasto['fecha'] for gasto in gastos], [date(2025, 4, 1)] * 5)
+
+    def test_duplicados_y_limite(self):
+        lineas = ["Pago Edesur $ 26.000"] * 3 + [f"Pago comercio {i} $ 1.{i:03d}" for i in range(30)]
+        gastos = extraer_gastos_historial("\n".join(lineas), limite=20)
+        self.assertEqual(len(gastos), 20)
+        self.assertEqual(sum(1 for gasto in gastos if gasto['descripcion'] == 'Pago Edesur'), 1)
+
+
+class _ImagenFalsa:
+    """Imagen mínima con size y crop para probar el corte en franjas sin Tesseract"""
+
+    def __init__(self, ancho, alto, desde=0):
+        self.size = (ancho, alto)
+        self.desde = desde
+
+    def crop(self, caja):
+        return _ImagenFalsa(caja[2] - caja[0], caja[3] - caja[1], self.desde + caja[1])
+
+
+class _MotorFalso:
+    """Devuelve las filas de un documento sintético que entran completas en la franja"""
+
+    def __init__(self, filas):
+        self.filas = filas
+
+    def reconocer(self, imagen):
+        return '\n'.join(texto for _, _, texto in self.filas)
+
+    def reconocer_lineas(self, imagen):
+        desde, hasta = imagen.desde, imagen.desde + imagen.size[1]
+        return [
+            (arriba - desde, abajo - desde, texto)
+            for arriba, abajo, texto in self.filas
+            if arriba >= desde and abajo <= hasta
+        ]
+
+    def mapear(self, funcion, elementos):
+        return [funcion(elemento) for elemento in elementos]
+
+
+class ReconocerPorFranjasTests(SimpleTestCase):
+
+    def test_franjas_cubren_la_imagen_sin_huecos(self):
+        franjas = dividir_en_franjas(10000, alto_franja=1600, solapamiento=160)
+        self.assertEqual(franjas[0][0], 0)
+        self.assertEqual(franjas[-1][1], 10000)
+        for anterior, siguiente in zip(franjas, franjas[1:]):
+            self.assertEqual(anterior[3], siguiente[2])
+            self.assertEqual(anterior[1] - siguiente[0], 160)
+
+    def test_imagen_corta_en_una_franja(self):
+        self.assertEqual(dividir_en_franjas(1200), [(0, 1200, 0, 1200)])
+
+    def test_filas_del_solapamiento_aparecen_una_vez(self):
+        filas = [(y, y + 30, f'Pago comercio {i} $ 1.{i:03d}') for i, y in enumerate(range(10, 11950, 45))]
+        texto = reconocer_por_franjas(_ImagenFalsa(1080, 12000), _MotorFalso(filas))
+        self.assertEqual(texto.split('\n'), [texto for _, _, texto in filas])
+
+
+class _ResultadoLinea:
+    def __init__(self, arriba, abajo, texto):
+        self.caja, self.texto = (0, arriba, 100, abajo), texto
+
+    def GetUTF8Text(self, nivel):
+        return self.texto
+
+    def BoundingBox(self, nivel):
+        return self.caja
+
+
+class _TesserocrFalso:
+    """Módulo tesserocr mínimo sobre las filas de _MotorFalso; cuenta instancias y usos simultáneos"""
+
+    class RIL:
+        TEXTLINE = 2
+
+    def __init__(self, filas):
+        self.filas = filas
+        self.creadas = self.cerradas = self.en_uso = self.max_en_uso = 0
+        self.lock = threading.Lock()
+
+    def PyTessBaseAPI(self, lang):
+        self.creadas += 1
+        return _ApiTesserocrFalsa(self)
+
+    def iterate_level(self, iterador, nivel):
+        return iterador
+
+
+class _ApiTesserocrFalsa:
+    def __init__(self, modulo):
+        self.modulo = modulo
+        self.imagen = None
+
+    def SetImage(self, imagen):
+        self.imagen = imagen
+
+    def Recognize(self):
+        with self.modulo.lock:
+            self.modulo.en_uso += 1
+            self.modulo.max_en_uso = max(self.modulo.max_en_uso, self.modulo.en_uso)
+        time.sleep(0.002)
+        with self.modulo.lock:
+            self.modulo.en_uso -= 1
+
+    def GetUTF8Text(self):
+        self.Recognize()
+        return _MotorFalso(self.modulo.filas).reconocer(self.imagen)
+
+    def GetIterator(self):
+        return [_ResultadoLinea(*fila) for fila in _MotorFalso(self.modulo.filas).reconocer_lineas(self.imagen)]
+
+    def End(self):
+        self.modulo.cerradas += 1
+
+
+class MotorOCRTests(SimpleTestCase):
+    """El motor reutiliza un juego acotado de instancias de Tesseract y un solo pool de hilos"""
+
+    def setUp(self):
+        self.filas = [(y, y + 30, f'Pago comercio {i} $ 1.{i:03d}') for i, y in enumerate(range(10, 11950, 45))]
+        self.tesserocr = _TesserocrFalso(self.filas)
+        for parche in (
+            mock.patch.dict(sys.modules, {'tesserocr': self.tesserocr}),
+            mock.patch('pytesseract.get_languages', return_value=['eng', 'spa', 'osd']),
+        ):
+            parche.start()
+            self.addCleanup(parche.stop)
+
+    def test_instancias_acotadas_y_reutilizadas(self):
+        motor = MotorOCR(hilos=3)
+        self.assertEqual((motor.backend, motor.idiomas, self.tesserocr.creadas), ('tesserocr', 'spa+eng', 1))
+
+        esperado = '\n'.join(texto for _, _, texto in self.filas)
+        for _ in range(5):
+            self.assertEqual(reconocer_por_franjas(_ImagenFalsa(1080, 12000), motor), esperado)
+            motor.reconocer(_ImagenFalsa(1080, 1000))
+        executor = motor._executor
+        self.assertEqual(reconocer_por_franjas(_ImagenFalsa(1080, 12000), motor), esperado)
+        self.assertIs(motor._executor, executor)
+
+        # Nunca más instancias (ni más usos en paralelo) que hilos, por más imágenes que pasen
+        self.assertLessEqual(self.tesserocr.creadas, 3)
+        self.assertLessEqual(self.tesserocr.max_en_uso, 3)
+        motor.cerrar()
+        self.assertEqual(self.tesserocr.cerradas, self.tesserocr.creadas)
+
+    def test_un_hilo_reconoce_en_orden_sin_pool(self):
+        motor = MotorOCR(hilos=1)
+        texto = reconocer_por_franjas(_ImagenFalsa(1080, 12000), motor)
+        self.assertEqual(texto.split('\n'), [texto for _, _, texto in self.filas])
+        self.assertIsNone(motor._executor)
+        self.assertEqual(self.tesserocr.creadas, 1)
+
+
+class _LibtesseractFalsa:
+    """API C de libtesseract mínima: cada imagen tiene dos líneas de texto; los textos viven en memoria real"""
+
+    def __init__(self):
+        self.creadas, self.liberados, self.textos = [], [], []
+
+    def _texto(self, contenido):
+        buffer = ctypes.create_string_buffer(contenido.encode())
+        self.textos.append(buffer)
+        return ctypes.addressof(buffer)
+
+    def TessBaseAPICreate(self):
+        self.creadas.append({'imagen': None, 'cerrada': False})
+        return len(self.creadas)
+
+    def TessBaseAPIInit3(self, api, datos, idiomas):
+        self.creadas[api - 1]['idiomas'] = idiomas
+        return 0
+
+    def TessBaseAPISetImage(self, api, pixeles, ancho, alto, bytes_por_pixel, bytes_por_linea):
+        assert len(pixeles) == alto * bytes_por_linea
+        self.creadas[api - 1]['imagen'] = (ancho, alto)
+
+    def TessBaseAPIGetUTF8Text(self, api):
+        ancho, alto = self.creadas[api - 1]['imagen']
+        return self._texto(f'Total $ {ancho}x{alto}\n')
+
+    def TessBaseAPIRecognize(self, api, monitor):
+        return 0
+
+    def TessBaseAPIGetIterator(self, api):
+        self.iterador = iter([(5, 20, 'Pago Coto $ 1.500'), (30, 45, 'Pago Dia $ 700')])
+        self.linea = next(self.iterador)
+        return 99
+
+    def TessResultIteratorGetPageIteratorConst(self, iterador):
+        return 98
+
+    def TessResultIteratorGetUTF8Text(self, iterador, nivel):
+        return self._texto(self.linea[2])
+
+    def TessPageIteratorBoundingBox(self, pagina, nivel, izquierda, arriba, derecha, abajo):
+        arriba.contents.value, abajo.contents.value = self.linea[:2]
+        return 1
+
+    def TessResultIteratorNext(self, iterador, nivel):
+        self.linea = next(self.iterador, None)
+        return self.linea is not None
+
+    def TessResultIteratorDelete(self, iterador):
+        pass
+
+    def TessDeleteText(self, texto):
+        self.liberados.append(texto)
+
+    def TessBaseAPIEnd(self, api):
+        self.creadas[api - 1]['cerrada'] = True
+
+    def TessBaseAPIDelete(self, api):
+        pass
+
+
+class MotorLibtesseractTests(SimpleTestCase):
+    """Sin tesserocr, el motor usa libtesseract dentro del proceso: ningún subproceso por imagen"""
+
+    def test_sin_subprocesos_por_imagen(self):
+        from PIL import Image
+
+        biblioteca = _LibtesseractFalsa()
+        with mock.patch.dict(sys.modules, {'tesserocr': None}), \
+                mock.patch('gastitos.motor_ocr._cargar_libtesseract', return_value=biblioteca), \
+                mock.patch('pytesseract.get_languages', return_value=['spa']):
+            motor = MotorOCR(hilos=2)
+
+        self.assertEqual((motor.backend, biblioteca.creadas[0]['idiomas']), ('libtesseract', b'spa'))
+        with mock.patch('subprocess.Popen', side_effect=AssertionError('se lanzó un proceso')) as popen:
+            for alto in range(100, 120):
+                self.assertEqual(motor.reconocer(Image.new('1', (80, alto), 1)), f'Total $ 80x{alto}\n')
+                self.assertEqual(motor.reconocer_lineas(Image.new('L', (80, alto))), [
+                    (5, 20, 'Pago Coto $ 1.500'), (30, 45, 'Pago Dia $ 700'),
+                ])
+        popen.assert_not_called()
+
+        # Las instancias se reutilizan y cada texto devuelto por la API se libera
+        self.assertLessEqual(len(biblioteca.creadas), 2)
+        self.assertEqual(len(biblioteca.liberados), len(biblioteca.textos))
+        motor.cerrar()
+        self.assertTrue(all(api['cerrada'] for api in biblioteca.creadas))
+
+
+    def test_sin_backend_en_proceso_avisa_por_el_log(self):
+        with mock.patch.dict(sys.modules, {'tesserocr': None}), \
+                mock.patch('gastitos.motor_ocr._cargar_libtesseract', return_value=None), \
+                mock.patch('pytesseract.get_languages', return_value=['spa']), \
+                mock.patch('builtins.print') as imprimir, \
+                self.assertLogs('gastitos.motor_ocr', 'WARNING') as registros:
+            motor = MotorOCR(hilos=1)
+
+        self.assertEqual(motor.backend, 'pytesseract')
+        self.assertIn('proceso de tesseract aparte', registros.output[0])
+        imprimir.assert_not_called()
+
+class ExtraerMovimientoTarjetaTests(SimpleTestCase):
+    """Filas de movimientos de resúmenes de tarjeta"""
+
+    def test_compra_en_cuotas(self):
+        self.assertEqual(extraer_movimiento_tarjeta('15-03-25 * MERCADOLIBRE*MLA C.02/06 001234 12.345,67'), {
+            'fecha': date(2025, 3, 15), 'comercio': 'MERCADOLIBRE MLA', 'cuota': 2, 'cuotas': 6,
+            'monto': 12345.67, 'moneda': 'ARS',
+        })
+
+    def test_formatos_de_cuota_y_fecha(self):
+        coto = extraer_movimiento_tarjeta('03 Mar 25 COTO CUOTA 7/12 1.234,00')
+        self.assertEqual((coto['fecha'], coto['cuota'], coto['cuotas']), (date(2025, 3, 3), 7, 12))
+        ypf = extraer_movimiento_tarjeta('02.03.2025 YPF 07/12 45.000,00')
+        self.assertEqual((ypf['comercio'], ypf['cuota'], ypf['monto']), ('YPF', 7, 45000.0))
+
+    def test_consumo_en_dolares(self):
+        movimiento = extraer_movimiento_tarjeta('15/03/25 123456 SPOTIFY USD 9,99')
+        self.assertEqual((movimiento['comercio'], movimiento['moneda'], movimiento['cuota']), ('SPOTIFY', 'USD', None))
+
+    def test_lineas_que_no_son_compras(self):
+        for linea in [
+            '15-03-25 SU PAGO EN PESOS -50.000,00',
+            '12-03-25 NETFLIX.COM 5.999,00-',
+            'Total a pagar $ 123.456,78',
+            '31-02-25 FECHA INVALIDA 100,00',
+            '',
+        ]:
+            self.assertIsNone(extraer_movimiento_tarjeta(linea), linea)
+
+
+class LecturaPDFTarjetaTests(SimpleTestCase):
+    """Los PDFs se leen página por página y con un límite de páginas y de tiempo"""
+
+    def setUp(self):
+        from benchmarks.pdf_tarjeta import resumen_sintetico
+        from pdfplumber.page import Page
+        self.pdf = resumen_sintetico(8)
+        extraer_texto = Page.extract_text
+        self.extraidas = []
+
+        def contar(pagina, *args, **kwargs):
+            self.extraidas.append(pagina.page_number)
+            return extraer_texto(pagina, *args, **kwargs)
+
+        patcher = mock.patch.object(Page, 'extract_text', autospec=True, side_effect=contar)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_las_paginas_se_extraen_a_medida_que_se_piden(self):
+        paginas = paginas_pdf(self.pdf)
+        self.assertEqual(self.extraidas, [])
+        numero, lineas = next(paginas)
+        self.assertEqual((numero, self.extraidas), (1, [1]))
+        self.assertIn('Total a pagar $ 123.456,78', lineas)
+        next(paginas)
+        self.assertEqual(self.extraidas, [1, 2])
+        paginas.close()
+
+    def test_el_total_se_lee_sin_recorrer_el_resto(self):
+        resultado = procesar_pdf_tarjeta_credito(self.pdf)
+        self.assertEqual(resultado['monto'], 123456.78)
+        self.assertEqual(self.extraidas, [1])
+
+    def test_limite_de_paginas(self):
+        with self.settings(PDF_MAX_PAGINAS=3):
+            self.assertEqual([numero for numero, _ in paginas_pdf(self.pdf)], [1, 2, 3])
+            with self.assertRaises(PDFDemasiadoLargo):
+                extraer_paginas_pdf(self.pdf, procesos=1)
+        self.assertEqual(self.extraidas, [1, 2, 3])
+
+    def test_limite_de_tiempo(self):
+        with self.settings(PDF_SEGUNDOS_MAXIMOS=1e-9):
+            self.assertEqual([numero for numero, _ in paginas_pdf(self.pdf)], [1])
+            with self.assertRaisesMessage(PDFDemasiadoLargo, 'tiempo máximo'):
+                extraer_paginas_pdf(self.pdf, procesos=1)
+
+    def test_las_subidas_comparten_el_pool_de_procesos(self):
+        from . import utils
+        self.addCleanup(utils._reiniciar_pool_pdf)
+        utils._reiniciar_pool_pdf()
+        from concurrent.futures import ProcessPoolExecutor
+        with mock.patch('concurrent.futures.ProcessPoolExecutor', wraps=ProcessPoolExecutor) as crear:
+            primera = extraer_paginas_pdf(self.pdf, procesos=2)
+            segunda = extraer_paginas_pdf(self.pdf, procesos=2)
+        self.assertEqual(crear.call_count, 1)
+        self.assertEqual([numero for numero, _, _ in primera], list(range(1, 9)))
+        self.assertEqual([lineas for _, lineas, _ in primera], [lineas for _, lineas, _ in segunda])
+
+
+class ResumenTarjetaVistaTests(TestCase):
+    """Un resumen demasiado largo se rechaza sin leerlo entero dentro de la solicitud"""
+
+    def test_pdf_con_demasiadas_paginas(self):
+        from benchmarks.pdf_tarjeta import resumen_sintetico
+        usuario = User.objects.create_user('tarjetero', password='clave-de-prueba')
+        PerfilUsuario.objects.create(user=usuario, salario_mensual=Decimal('1000000'))
+        self.client.force_login(usuario)
+        pdf = SimpleUploadedFile('resumen.pdf', resumen_sintetico(8), content_type='application/pdf')
+
+        with self.settings(PDF_MAX_PAGINAS=3), mock.patch('gastitos.utils._extraer_rango_paginas') as extraer:
+            respuesta = self.client.post(
+                reverse('index'), {'tarjeta_credito_submit': '1', 'tarjeta_pdf': pdf},
+                HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+            )
+
+        # Sin leer cada compra, se importa el total buscado en las primeras páginas
+        self.assertTrue(respuesta.json()['success'])
+        self.assertIn('se importó solo el total', respuesta.json()['mensaje'])
+        extraer.assert_not_called()
+        gasto = Gasto.objects.get(usuario=usuario)
+        self.assertEqual(gasto.monto, Decimal('123456.78'))
+        self.assertTrue(gasto.descripcion.startswith('Estado de cuenta'))
+
+
+    def test_cuotas_de_resumenes_sucesivos(self):
+        usuario = User.objects.create_user('cuotas', password='clave-de-prueba')
+        PerfilUsuario.objects.create(user=usuario, salario_mensual=Decimal('1000000'))
+        self.client.force_login(usuario)
+        hoy = timezone.localdate()
+        compra = date(2025, 1, 15)
+        resumenes = {
+            b'resumen-febrero': [
+                {'fecha': compra, 'comercio': 'GARBARINO', 'cuota': 2, 'cuotas': 6, 'monto': 1000.0, 'moneda': 'ARS'},
+                {'fecha': date(2025, 2, 3), 'comercio': 'COTO', 'cuota': None, 'cuotas': None, 'monto': 50.0, 'moneda': 'ARS'},
+            ],
+            b'resumen-marzo': [
+                {'fecha': compra, 'comercio': 'GARBARINO', 'cuota': 3, 'cuotas': 6, 'monto': 1000.0, 'moneda': 'ARS'},
+            ],
+        }
+
+        def extraer(pdf_file):
+            pdf_file.seek(0)
+            return {'movimientos': resumenes[pdf_file.read()], 'total': None, 'paginas': [], 'segundos': 0}
+
+        with mock.patch('gastitos.ocr.procesar_movimientos_tarjeta', side_effect=extraer):
+            for contenido in resumenes:
+                respuesta = self.client.post(reverse('index'), {
+                    'tarjeta_credito_submit': '1',
+                    'tarjeta_pdf': SimpleUploadedFile('resumen.pdf', contenido, content_type='application/pdf'),
+                }, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+                self.assertTrue(respuesta.json()['success'])
+
+        fechas = {
+            descripcion: timezone.localtime(fecha).date()
+            for descripcion, fecha in Gasto.objects.filter(usuario=usuario).values_list('descripcion', 'fecha')
+        }
+        # Cada cuota se registra en el mes en que se importa su resumen; la compra en un pago, en su fecha
+        self.assertEqual(fechas, {'GARBARINO (cuota 2/6)': hoy, 'GARBARINO (cuota 3/6)': hoy, 'COTO': date(2025, 2, 3)})
+        self.assertEqual(
+            BalanceMensual.objects.get(usuario=usuario, año=hoy.year, mes=hoy.month).total_gastos, Decimal('2000')
+        )
+        self.assertFalse(BalanceMensual.objects.filter(usuario=usuario, año=2025, mes=1).exists())
+
+
+class ArchivoGastosTests(SimpleTestCase):
+    """Escritura por partes y lectura con memory-map del archivo de meses cerrados"""
+
+    def setUp(self):
+        self.base = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base)
+
+    def _fecha(self, dia, hora=12):
+        return timezone.make_aware(datetime(2025, 3, dia, hora))
+
+    def _archivar(self):
+        archivo_gastos.escribir_parte(2025, 3, 1, [
+            (1, self._fecha(2), Decimal('1500.50'), 'Coto'),
+            (1, self._fecha(9), Decimal('300.00'), 'Netflix'),
+            (2, self._fecha(3), Decimal('99.99'), 'Coto'),
+        ], base=self.base)
+        archivo_gastos.escribir_parte(2025, 3, 5, [
+            (5, self._fecha(31, 23), Decimal('45000.00'), 'YPF Ñandú'),
+            (7, self._fecha(1, 0), Decimal('10.00'), 'Coto'),
+        ], base=self.base)
+        return archivo_gastos.consolidar_mes(2025, 3, base=self.base)
+
+    def test_consolidar_une_las_partes(self):
+        meta = self._archivar()
+        self.assertEqual((meta['filas'], meta['usuarios']), (5, 4))
+        self.assertEqual(archivo_gastos.meses_archivados(base=self.base), [(2025, 3)])
+        # Consolidar otra vez sin partes nuevas no cambia nada
+        self.assertEqual(archivo_gastos.consolidar_mes(2025, 3, base=self.base), meta)
+
+    def test_gastos_y_totales_por_usuario(self):
+        self._archivar()
+        mes = archivo_gastos.abrir_mes(2025, 3, base=self.base)
+        self.assertEqual(mes.total(1), (Decimal('1800.50'), 2))
+        self.assertEqual(mes.total(3), (Decimal('0'), 0))
+        self.assertEqual(mes.gastos(5), [
+            {'fecha': self._fecha(31, 23), 'descripcion': 'YPF Ñandú', 'monto': Decimal('45000.00')},
+        ])
+        self.assertEqual([g['descripcion'] for g in mes.gastos(7)], ['Coto'])
+
+    def test_busqueda_y_resumen_anual(self):
+        self._archivar()
+        encontrados = archivo_gastos.buscar_gastos(1, 'coto', base=self.base)
+        self.assertEqual([g['monto'] for g in encontrados], [Decimal('1500.50')])
+        self.assertEqual(len(archivo_gastos.buscar_gastos(5, 'ñandú', base=self.base)), 1)
+
+        resumen = archivo_gastos.resumen_anual(1, 2025, base=self.base)
+        self.assertEqual((resumen['total'], resumen['cantidad']), (Decimal('1800.50'), 2))
+        self.assertEqual(resumen['descripciones'][0], {'descripcion': 'Coto', 'total': Decimal('1500.50'), 'cantidad': 1})
+        self.assertEqual(archivo_gastos.resumen_anual(1, 2024, base=self.base)['meses'], [])
+
+
+class PronosticoAhorroTests(SimpleTestCase):
+    """Cumplimiento de metas sobre caminos de ahorro conocidos"""
+
+    def test_ahorro_constante(self):
+        # 100 por mes repartido en dos metas: cumplen al juntar 600 y 2000 en total
+        ahorros = np.full((24, 3), 100, dtype=np.float32)
+        probabilidades, meses_p50, meses_p90 = pronosticar(ahorros, [300, 1000], [0.5, 0.5], [6, 12])
+        self.assertEqual(probabilidades.tolist(), [1.0, 0.0])
+        self.assertEqual(meses_p50.tolist(), [6, 20])
+        self.assertEqual(meses_p90.tolist(), [6, 20])
+
+    def test_caminos_distintos_y_fuera_del_horizonte(self):
+        ahorros = np.array([[100, 200, -50, 100]] * 10, dtype=np.float32)
+        # Umbral 300: caminos en los meses 3, 2, nunca (ahorro negativo) y 3
+        probabilidades, meses_p50, meses_p90 = pronosticar(ahorros, [300, 0], [1, 0], [2, 0])
+        self.assertEqual(probabilidades.tolist(), [0.25, 1.0])
+        self.assertEqual(meses_p50.tolist(), [3, 0])
+        self.assertEqual(meses_p90.tolist(), [-1, 0])
+
+    def test_simulacion_reproducible(self):
+        historial = [1000, 1200, 800, 1500, 900, 1100]
+        ahorros = simular_ahorros(historial, caminos=50, horizonte=12)
+        self.assertEqual(ahorros.shape, (12, 50))
+        self.assertTrue(set(ahorros.ravel().tolist()) <= set(historial))
+        np.testing.assert_array_equal(ahorros, simular_ahorros(historial, caminos=50, horizonte=12))
+
+
+class ModoAhorroConsultasTests(TestCase):
+    """modo_ahorro hace la misma cantidad de consultas con una meta o con muchas"""
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user('ahorrista', password='clave-de-prueba')
+        PerfilUsuario.objects.create(user=self.usuario, salario_mensual=Decimal('900000'))
+        Gasto.objects.create(usuario=self.usuario, descripcion='Coto', monto=Decimal('150000'))
+        self.client.force_login(self.usuario)
+
+    def _crear_metas(self, cantidad):
+        MetaAhorro.objects.bulk_create([
+            MetaAhorro(
+                usuario=self.usuario, nombre=f'Meta {numero}', monto_objetivo=Decimal('500000'),
+                monto_ahorrado=Decimal(numero * 1000), fecha_objetivo=date.today() + timedelta(days=30 + numero),
+                estado='completada' if numero % 5 == 4 else 'activa'
+            )
+            for numero in range(cantidad)
+        ])
+
+    def _contar_consultas(self, consultas):
+        with self.assertNumQueries(consultas):
+            respuesta = self.client.get(reverse('modo_ahorro'))
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta
+
+    # Sesión y usuario, versión de datos, resumen (totales, metas activas, perfil y gastos
+    # recientes), historial para el pronóstico (estadísticas y balances), metas
+    # completadas y el perfil que lee la plantilla base; ninguna escritura
+    CONSULTAS_MODO_AHORRO = 11
+    # Con el contexto en caché: sesión y usuario, versión de datos y perfil de la plantilla
+    CONSULTAS_EN_CACHE = 4
+
+    def test_una_meta(self):
+        self._crear_metas(1)
+        respuesta = self._contar_consultas(self.CONSULTAS_MODO_AHORRO)
+        self.assertEqual(respuesta.context['estadisticas']['total_metas'], 1)
+
+    def test_muchas_metas(self):
+        self._crear_metas(20)
+        respuesta = self._contar_consultas(self.CONSULTAS_MODO_AHORRO)
+        estadisticas = respuesta.context['estadisticas']
+        self.assertEqual((estadisticas['total_metas'], estadisticas['metas_activas']), (20, 16))
+        self.assertEqual(len(estadisticas['metas_con_recomendaciones']), 16)
+
+    def test_cache_hasta_que_cambian_los_datos(self):
+        self._crear_metas(3)
+        self._contar_consultas(self.CONSULTAS_MODO_AHORRO)
+        self._contar_consultas(self.CONSULTAS_EN_CACHE)
+
+        # Agregar ahorro a una meta incrementa la versión de datos y recalcula el contexto
+        MetaAhorro.objects.filter(usuario=self.usuario).first().agregar_ahorro(Decimal('1000'))
+        respuesta = self._contar_consultas(self.CONSULTAS_MODO_AHORRO)
+        self.assertEqual(respuesta.context['estadisticas']['monto_total_ahorrado'], Decimal('4000'))
+        self._contar_consultas(self.CONSULTAS_EN_CACHE)
+
+
+class VencerMetasAhorroTests(TestCase):
+    """El vencimiento cancela en bloque solo las metas activas vencidas sin completar"""
+
+    def test_cancela_las_vencidas_y_avisa(self):
+        usuarios = User.objects.bulk_create([User(username='ana'), User(username='beto')])
+        hoy = date(2025, 6, 15)
+
+        def meta(usuario, nombre, ahorrado, fecha_objetivo, estado='activa'):
+            return MetaAhorro(
+                usuario=usuario, nombre=nombre, monto_objetivo=Decimal('1000'),
+                monto_ahorrado=Decimal(ahorrado), fecha_objetivo=fecha_objetivo, estado=estado
+            )
+
+        MetaAhorro.objects.bulk_create([
+            meta(usuarios[0], 'vencida', 200, date(2025, 6, 14)),
+            meta(usuarios[1], 'vencida', 0, date(2025, 1, 1)),
+            meta(usuarios[0], 'vence hoy', 200, hoy),
+            meta(usuarios[0], 'cumplida a tiempo', 1000, date(2025, 6, 1)),
+            meta(usuarios[1], 'pausada', 0, date(2025, 1, 1), estado='pausada'),
+        ])
+        avisadas = []
+
+        def receptor(sender, metas, **kwargs):
+            avisadas.extend(metas)
+        metas_vencidas.connect(receptor)
+        self.addCleanup(metas_vencidas.disconnect, receptor)
+
+        canceladas = vencer_metas_ahorro(hoy)
+
+        self.assertEqual(sorted((m.usuario_id, m.nombre) for m in canceladas), [
+            (usuarios[0].id, 'vencida'), (usuarios[1].id, 'vencida'),
+        ])
+        self.assertEqual(avisadas, canceladas)
+        self.assertEqual(
+            sorted(MetaAhorro.objects.filter(estado='cancelada').values_list('nombre', flat=True)),
+            ['vencida', 'vencida']
+        )
+        # Una segunda pasada no encuentra nada ni avisa de nuevo
+        self.assertEqual(vencer_metas_ahorro(hoy), [])
+        self.assertEqual(len(avisadas), 2)
+
+
+class PresupuestoConsultasTests(TestCase):
+    """Cada vista principal se mantiene dentro de su presupuesto de consultas"""
+
+    # Primera carga (sin contexto en caché), incluidas sesión, usuario y plantilla base
+    PRESUPUESTOS = {
+        'index': 12,
+        'dashboard': 14,
+        'modo_ahorro': 11,
+        'perfil': 7,
+        'estadisticas_mensuales': 4,
+        'gastos_fijos': 3,
+    }
+
+    def setUp(self):
+        cache.clear()
+        instrumentacion.reiniciar()
+        self.usuario = User.objects.create_user('medido', password='clave-de-prueba')
+        PerfilUsuario.objects.create(user=self.usuario, salario_mensual=Decimal('900000'))
+        Gasto.objects.bulk_create([
+            Gasto(usuario=self.usuario, descripcion=f'Gasto {numero}', monto=Decimal(1000 + numero))
+            for numero in range(30)
+        ])
+        GastoFijo.objects.create(usuario=self.usuario, descripcion='Alquiler', monto=Decimal('300000'))
+        Vencimiento.objects.create(
+            usuario=self.usuario, descripcion='Luz', fecha_vencimiento=date.today()
+        )
+        MetaAhorro.objects.create(
+            usuario=self.usuario, nombre='Viaje', monto_objetivo=Decimal('1000000'),
+            fecha_objetivo=date.today() + timedelta(days=180)
+        )
+        self.client.force_login(self.usuario)
+
+    def test_vistas_dentro_del_presupuesto(self):
+        for vista, maximo in self.PRESUPUESTOS.items():
+            with self.subTest(vista=vista), presupuesto_consultas(maximo, vista):
+                respuesta = self.client.get(reverse(vista))
+                self.assertEqual(respuesta.status_code, 200)
+
+    def test_presupuesto_excedido(self):
+        with self.assertRaisesMessage(AssertionError, 'index ejecutó'):
+            with presupuesto_consultas(2, 'index'):
+                self.client.get(reverse('index'))
+
+    def test_mediciones_por_vista(self):
+        respuesta = self.client.get(reverse('dashboard'))
+        self.assertIn('sql;desc="14 consultas"', respuesta['Server-Timing'])
+        self.client.get(reverse('dashboard'))
+
+        resumen = instrumentacion.resumen()['dashboard']
+        self.assertEqual((resumen['solicitudes'], resumen['consultas_max']), (2, 14))
+        self.assertGreater(resumen['plantillas_ms_promedio'], 0)
+
+        # Solo staff o con el token
+        self.assertEqual(self.client.get(reverse('instrumentacion')).status_code, 403)
+        with self.settings(INSTRUMENTACION_TOKEN='secreto'):
+            self.client.logout()
+            respuesta = self.client.get(reverse('instrumentacion'))
+            self.assertRedirects(respuesta, f"{reverse('admin:login')}?next={reverse('instrumentacion')}")
+            self.assertEqual(self.client.get(reverse('instrumentacion'), HTTP_AUTHORIZATION='Bearer otro').status_code, 302)
+            self.assertEqual(self.client.get(reverse('instrumentacion'), HTTP_AUTHORIZATION='Bearer secreto').status_code, 200)
+        User.objects.filter(pk=self.usuario.pk).update(is_staff=True)
+        self.client.force_login(self.usuario)
+        texto = self.client.get(reverse('instrumentacion'), {'formato': 'prometheus'}).content.decode()
+        self.assertIn('gastitos_vista_solicitudes_total{vista="dashboard"} 2', texto)
+        self.assertIn('gastitos_cache_vistas_aciertos_total{vista="dashboard"} 1', texto)
+
+
+class GenerarDatosCargaTests(TestCase):
+    def generar(self, **opciones):
+        call_command('generar_datos_carga', usuarios=3, gastos=40, meses=2, meses_cerrados=4, stdout=StringIO(), **opciones)
+        return list(Gasto.objects.order_by('usuario__username', 'fecha', 'monto').values_list('descripcion', 'monto', 'fecha'))
+
+    def test_datos_reproducibles(self):
+        gastos = self.generar()
+        usuarios = User.objects.filter(username__startswith='carga')
+        self.assertEqual(usuarios.count(), 3)
+        self.assertEqual(len(gastos), 120)
+        self.assertEqual(EstadisticaMensual.objects.count(), 12)
+        self.assertTrue(GastoFijo.objects.exists() and Vencimiento.objects.exists() and MetaAhorro.objects.exists())
+        self.assertEqual(
+            BalanceMensual.objects.aggregate(total=Sum('total_gastos'))['total'],
+            Gasto.objects.aggregate(total=Sum('monto'))['total']
+        )
+        self.assertEqual(VersionDatos.objects.filter(usuario__in=usuarios).count(), 3)
+        self.assertTrue(self.client.login(username='carga00000', password='carga-1234'))
+
+        with self.assertRaises(CommandError):
+            self.generar()
+        self.assertEqual(self.generar(reemplazar=True), gastos)
+        self.assertNotEqual(self.generar(reemplazar=True, semilla=1), gastos)
+
+
+class ImportarEstadisticasJsonTests(TestCase):
+    """Los archivos de estadísticas malformados se informan y se omiten"""
+
+    def test_archivos_malformados(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        archivos = {
+            'estadisticas_2025_1.json': {'ana': {'total_gastos': 1500.5}, 'nadie': {'total_gastos': 1}},
+            'estadisticas_2025_2.json': {'ana': {'total_gastos': 'mucho'}},
+            'estadisticas_2025_3.json': {'ana': {'total_gastos': [100]}},
+            'estadisticas_2025_4.json': {'ana': {'total_gastos': 'NaN'}},
+        }
+        for nombre, datos in archivos.items():
+            with open(os.path.join(directorio, nombre), 'w') as f:
+                json.dump(datos, f)
+        with open(os.path.join(directorio, 'estadisticas_2025_5.json'), 'w') as f:
+            f.write('{"ana": ')
+        usuario = User.objects.create_user('ana', password='clave-de-prueba')
+
+        salida = StringIO()
+        call_command('importar_estadisticas_json', directorio=directorio, stdout=salida)
+
+        self.assertEqual(
+            list(EstadisticaMensual.objects.filter(usuario=usuario).values_list('mes', 'total_gastos')),
+            [(1, Decimal('1500.50'))]
+        )
+        for mes in (2, 3, 4, 5):
+            self.assertIn(f'estadisticas_2025_{mes}.json: se omite', salida.getvalue())
+        self.assertIn('Total inválido para ana', salida.getvalue())
+
+
+class PaginacionGastosTests(TestCase):
+    def setUp(self):
+        self.usuario = User.objects.create_user('paginado', password='clave-de-prueba')
+        PerfilUsuario.objects.create(user=self.usuario, salario_mensual=Decimal('900000'))
+        gastos = Gasto.objects.bulk_create([
+            Gasto(usuario=self.usuario, descripcion=f'Gasto {numero}', monto=Decimal(100 + numero))
+            for numero in range(45)
+        ])
+        # De a tres gastos con la misma fecha: el id desempata
+        inicio = timezone.now() - timedelta(days=1)
+        for numero, gasto in enumerate(gastos):
+            gasto.fecha = inicio - timedelta(hours=numero // 3)
+        Gasto.objects.bulk_update(gastos, ['fecha'])
+        BalanceMensual.reconciliar()
+        self.orden = list(Gasto.objects.filter(usuario=self.usuario).order_by('-fecha', '-id').values_list('id', flat=True))
+
+    def parametros(self, consulta):
+        return dict(parametro.split('=') for parametro in consulta.split('&')) if consulta else {}
+
+    def test_recorrido_completo_en_ambos_sentidos(self):
+        pagina = paginar_gastos(self.usuario, {})
+        self.assertEqual((pagina.numero, pagina.total, pagina.paginas), (1, 45, 5))
+        paginas = [pagina]
+        while pagina.tiene_siguiente:
+            pagina = paginar_gastos(self.usuario, self.parametros(pagina.consulta_siguiente))
+            paginas.append(pagina)
+        self.assertEqual([pagina.numero for pagina in paginas], [1, 2, 3, 4, 5])
+        self.assertEqual([gasto.id for pagina in paginas for gasto in pagina], self.orden)
+
+        vuelta = [pagina]
+        while pagina.tiene_anterior:
+            pagina = paginar_gastos(self.usuario, self.parametros(pagina.consulta_anterior))
+            vuelta.append(pagina)
+        self.assertEqual([[gasto.id for gasto in pagina] for pagina in vuelta[::-1]],
+                         [[gasto.id for gasto in pagina] for pagina in paginas])
+
+    def test_ventana_de_enlaces(self):
+        pagina = paginar_gastos(self.usuario, {})
+        for _ in range(3):
+            pagina = paginar_gastos(self.usuario, self.parametros(pagina.consulta_siguiente))
+        self.assertEqual([enlace['numero'] for enlace in pagina.enlaces], [2, 3, 4, 5])
+        self.assertTrue(pagina.primera_fuera_de_ventana)
+
+        # Los saltos de dos páginas llegan a los mismos gastos que avanzar de a una
+        segunda = paginar_gastos(self.usuario, self.parametros(pagina.enlaces[0]['consulta']))
+        self.assertEqual([gasto.id for gasto in segunda], self.orden[10:20])
+        ultima = paginar_gastos(self.usuario, self.parametros(segunda.enlaces[-1]['consulta']))
+        self.assertEqual((ultima.numero, [gasto.id for gasto in ultima]), (4, self.orden[30:40]))
+
+    def test_consultas_acotadas(self):
+        with self.assertNumQueries(2):
+            pagina = paginar_gastos(self.usuario, {})
+        with self.assertNumQueries(3):
+            paginar_gastos(self.usuario, self.parametros(pagina.enlaces[-1]['consulta']))
+
+    def test_cursor_invalido_y_json(self):
+        self.client.force_login(self.usuario)
+        respuesta = self.client.get(reverse('index'), {'despues': 'no-es-un-cursor', 'pagina': '7'})
+        self.assertEqual([gasto.id for gasto in respuesta.context['gastos_recientes']], self.orden[:10])
+        self.assertEqual(respuesta.context['total_gastos'], 45)
+
+        ids, siguiente = [], reverse('pagina_gastos')
+        while siguiente:
+            datos = self.client.get(siguiente).json()
+            ids += [gasto['id'] for gasto in datos['gastos']]
+            self.assertIn(datos['gastos'][0]['descripcion'], datos['html'])
+            siguiente = datos['siguiente']
+        self.assertEqual(ids, self.orden)
+
+
+class BalanceGastosTests(TestCase):
+    """Los acumulados diario y mensual siguen cada alta, edición y baja de Gasto"""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('contador', password='clave-de-prueba')
+
+    def crear(self, monto, fecha):
+        gasto = Gasto.objects.create(usuario=self.usuario, descripcion='Compra', monto=Decimal(monto))
+        # fecha es auto_now_add: la fecha del gasto se asigna con una edición
+        Gasto.objects.filter(pk=gasto.pk).update(fecha=fecha)
+        BalanceMensual.reconciliar(usuario=self.usuario)
+        BalanceDiario.reconciliar(usuario=self.usuario)
+        return Gasto.objects.get(pk=gasto.pk)
+
+    def balances(self):
+        mensuales = {
+            (balance.año, balance.mes): (balance.total_gastos, balance.cantidad_gastos)
+            for balance in BalanceMensual.objects.filter(usuario=self.usuario) if balance.cantidad_gastos
+        }
+        diarios = {
+            balance.fecha: (balance.total_gastos, balance.cantidad_gastos)
+            for balance in BalanceDiario.objects.filter(usuario=self.usuario) if balance.cantidad_gastos
+        }
+        return mensuales, diarios
+
+    def reconstruidos(self):
+        BalanceMensual.reconciliar(usuario=self.usuario)
+        BalanceDiario.reconciliar(usuario=self.usuario)
+        return self.balances()
+
+    def test_el_saldo_cuenta_los_gastos_con_fecha_futura(self):
+        perfil = PerfilUsuario.objects.create(user=self.usuario, salario_mensual=Decimal('1000'))
+        ahora = timezone.now()
+        Gasto.objects.create(usuario=self.usuario, descripcion='Coto', monto=Decimal('100'))
+        # Uno más adelante en el mes (o el día 1 del siguiente) y uno del mes pasado, que no cuenta
+        self.crear('40', ahora + timedelta(days=1))
+        self.crear('999', ahora - timedelta(days=40))
+        self.assertEqual(perfil.get_total_gastos_mes(), Decimal('140'))
+        self.assertEqual(perfil.get_total_gastos_mes(), perfil.get_gastos_mes_actual().aggregate(total=Sum('monto'))['total'])
+        self.assertEqual(perfil.saldo_disponible, Decimal('860'))
+
+    def test_alta_edicion_y_baja(self):
+        hoy = timezone.localdate()
+        Gasto.objects.create(usuario=self.usuario, descripcion='Coto', monto=Decimal('100.50'))
+        Gasto.objects.create(usuario=self.usuario, descripcion='Dia', monto=Decimal('50'))
+        mensuales, diarios = self.balances()
+        self.assertEqual(mensuales, {(hoy.year, hoy.month): (Decimal('150.50'), 2)})
+        self.assertEqual(diarios, {hoy: (Decimal('150.50'), 2)})
+
+        # Cambiar monto y pasar el gasto a otro mes mueve el importe entre filas
+        gasto = self.crear('200', datetime(2025, 1, 31, 15, tzinfo=dt_timezone.utc))
+        gasto.monto = Decimal('250')
+        gasto.fecha = datetime(2025, 2, 1, 10, tzinfo=dt_timezone.utc)
+        gasto.save()
+        mensuales, diarios = self.balances()
+        self.assertEqual(mensuales[(2025, 2)], (Decimal('250'), 1))
+        self.assertNotIn((2025, 1), mensuales)
+        self.assertEqual(diarios[date(2025, 2, 1)], (Decimal('250'), 1))
+        self.assertNotIn(date(2025, 1, 31), diarios)
+
+        # Asignar el monto como texto (como hacen algunas vistas) también suma bien
+        gasto.monto = '99.99'
+        gasto.save()
+        self.assertEqual(self.balances()[0][(2025, 2)], (Decimal('99.99'), 1))
+
+        gasto.delete()
+        mensuales, diarios = self.balances()
+        self.assertNotIn((2025, 2), mensuales)
+        self.assertEqual(mensuales, {(hoy.year, hoy.month): (Decimal('150.50'), 2)})
+        self.assertEqual((mensuales, diarios), self.reconstruidos())
+
+    def test_reconciliar_coincide_con_la_suma_de_gastos(self):
+        for numero in range(12):
+            self.crear(1000 + numero, datetime(2025, 1 + numero % 4, 1 + numero, 12, tzinfo=dt_timezone.utc))
+        Gasto.objects.filter(monto__gt=1008).delete()
+        # Un acumulado corrompido a mano se corrige al reconciliar
+        BalanceMensual.objects.filter(usuario=self.usuario).update(total_gastos=0)
+
+        BalanceMensual.reconciliar(usuario=self.usuario)
+        esperados = {}
+        for gasto in Gasto.objects.filter(usuario=self.usuario):
+            total, cantidad = esperados.get((gasto.fecha.year, gasto.fecha.month), (Decimal('0'), 0))
+            esperados[(gasto.fecha.year, gasto.fecha.month)] = (total + gasto.monto, cantidad + 1)
+        self.assertEqual(self.balances()[0], esperados)
+        self.assertEqual(
+            BalanceDiario.objects.filter(usuario=self.usuario).aggregate(total=Sum('total_gastos'))['total'],
+            Gasto.objects.filter(usuario=self.usuario).aggregate(total=Sum('monto'))['total']
+        )
+
+
+class ImportacionGastosTests(TestCase):
+    """Importación en bloque: validación por fila, saldo por mes y acumulados"""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('importador', password='clave-de-prueba')
+        PerfilUsuario.objects.create(user=self.usuario, salario_mensual=Decimal('1000'))
+        self.hoy = timezone.localdate()
+        # Un día de un mes anterior, lejos de los bordes del mes
+        self.pasado = (self.hoy.replace(day=1) - timedelta(days=20)).replace(day=10)
+
+    def test_rechazos_por_fila_y_saldo_agotado(self):
+        resultado = importar_gastos(self.usuario, [
+            {'descripcion': 'Coto', 'monto': '600'},
+            {'descripcion': 'Sin monto', 'monto': 'abc'},
+            {'descripcion': 'Gratis', 'monto': '0'},
+            {'descripcion': 'Dia', 'monto': '500'},
+            {'descripcion': 'Kiosco', 'monto': '400'},
+        ])
+        self.assertEqual((resultado['agregados'], resultado['rechazados']), (2, 3))
+        estados = [(fila['estado'], fila['motivo']) for fila in resultado['filas']]
+        self.assertEqual(estados, [
+            ('aceptado', ''),
+            ('rechazado', 'Monto inválido'),
+            ('rechazado', 'El monto debe ser mayor a cero'),
+            ('rechazado', 'Saldo insuficiente. Disponible: $400.00'),
+            ('aceptado', ''),
+        ])
+        self.assertEqual(resultado['saldo_restante'], Decimal('0'))
+        self.assertEqual(
+            sorted(Gasto.objects.filter(usuario=self.usuario).values_list('monto', flat=True)),
+            [Decimal('400'), Decimal('600')]
+        )
+
+    def test_actualiza_balances_y_version(self):
+        version = VersionDatos.actual(self.usuario.id)
+        importar_gastos(self.usuario, [{'descripcion': 'Coto', 'monto': '100'}, {'descripcion': 'Dia', 'monto': '50.5'}])
+
+        mensual = BalanceMensual.objects.get(usuario=self.usuario, año=self.hoy.year, mes=self.hoy.month)
+        diario = BalanceDiario.objects.get(usuario=self.usuario, fecha=self.hoy)
+        self.assertEqual((mensual.total_gastos, mensual.cantidad_gastos), (Decimal('150.50'), 2))
+        self.assertEqual((diario.total_gastos, diario.cantidad_gastos), (Decimal('150.50'), 2))
+        self.assertEqual(VersionDatos.actual(self.usuario.id), version + 1)
+
+        # Un lote sin filas aceptadas no invalida las vistas cacheadas
+        importar_gastos(self.usuario, [{'descripcion': 'Nada', 'monto': '-1'}])
+        self.assertEqual(VersionDatos.actual(self.usuario.id), version + 1)
+
+    def test_bloquea_el_perfil_y_revierte_ante_un_error(self):
+        with mock.patch.object(
+            PerfilUsuario.objects, 'select_for_update', wraps=PerfilUsuario.objects.select_for_update
+        ) as bloqueo:
+            importar_gastos(self.usuario, [{'descripcion': 'Coto', 'monto': '100'}])
+        bloqueo.assert_called_once_with()
+
+        # Si algo falla dentro de la transacción no quedan gastos sin su acumulado
+        with mock.patch('gastitos.importacion.VersionDatos.incrementar', side_effect=RuntimeError('caída')):
+            with self.assertRaises(RuntimeError):
+                importar_gastos(self.usuario, [{'descripcion': 'Dia', 'monto': '200'}])
+        self.assertEqual(Gasto.objects.filter(usuario=self.usuario).count(), 1)
+        self.assertEqual(
+            BalanceMensual.objects.get(usuario=self.usuario, año=self.hoy.year, mes=self.hoy.month).total_gastos,
+            Decimal('100')
+        )
+
+    def test_con_fecha_valida_contra_el_mes_de_la_compra(self):
+        Gasto.objects.create(usuario=self.usuario, descripcion='Alquiler', monto=Decimal('900'))
+        resultado = importar_gastos(self.usuario, [
+            {'descripcion': 'Compra vieja', 'monto': '700', 'fecha': self.pasado.isoformat()},
+            {'descripcion': 'Otra vieja', 'monto': '400', 'fecha': self.pasado},
+            {'descripcion': 'Compra de hoy', 'monto': '50', 'fecha': self.hoy},
+        ], con_fecha=True)
+
+        # El mes anterior tiene su propio saldo; el del mes actual no se consume
+        estados = [(fila['estado'], fila['motivo']) for fila in resultado['filas']]
+        self.assertEqual(estados, [
+            ('aceptado', ''),
+            ('rechazado', f'Saldo insuficiente. Disponible: $300.00 en {self.pasado.month:02d}/{self.pasado.year}'),
+            ('aceptado', ''),
+        ])
+        self.assertEqual(resultado['saldo_restante'], Decimal('50'))
+
+        vieja = Gasto.objects.get(pk=resultado['filas'][0]['gasto_id'])
+        self.assertEqual(timezone.localtime(vieja.fecha).date(), self.pasado)
+        mensual = BalanceMensual.objects.get(usuario=self.usuario, año=self.pasado.year, mes=self.pasado.month)
+        self.assertEqual((mensual.total_gastos, mensual.cantidad_gastos), (Decimal('700'), 1))
+        self.assertEqual(BalanceDiario.objects.get(usuario=self.usuario, fecha=self.pasado).total_gastos, Decimal('700'))
+        self.assertEqual(
+            BalanceMensual.objects.get(usuario=self.usuario, año=self.hoy.year, mes=self.hoy.month).total_gastos,
+            Decimal('950')
+        )
+
+
+class CierreMensualTests(TransactionTestCase):
+    """Cierre por lotes del mes: estadísticas, archivo, balances y gastos cargados después"""
+    # Con transacciones reales: las partes del archivo toman su nombre al confirmarse cada lote
+
+    def setUp(self):
+        base = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, base)
+        ajustes = self.settings(ARCHIVO_GASTOS_DIR=base)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.usuarios = [User.objects.create_user(f'cierre{numero}', password='clave-de-prueba') for numero in range(3)]
+        for usuario in self.usuarios:
+            PerfilUsuario.objects.create(user=usuario, salario_mensual=Decimal('100000'))
+        # Gastos de marzo de 2025 (el tercer usuario no tiene) y uno de abril que no se cierra
+        self.cargar(self.usuarios[0], ['100', '250.50'], dia=5)
+        self.cargar(self.usuarios[1], ['40'], dia=31)
+        self.abril = self.cargar(self.usuarios[1], ['999'], dia=1, mes=4)[0]
+
+    def cargar(self, usuario, montos, dia, mes=3):
+        gastos = [Gasto.objects.create(usuario=usuario, descripcion='Compra', monto=Decimal(monto)) for monto in montos]
+        Gasto.objects.filter(pk__in=[gasto.pk for gasto in gastos]).update(
+            fecha=timezone.make_aware(datetime(2025, mes, dia, 12))
+        )
+        BalanceMensual.reconciliar(usuario=usuario)
+        BalanceDiario.reconciliar(usuario=usuario)
+        return gastos
+
+    def estadisticas(self):
+        return dict(EstadisticaMensual.objects.filter(año=2025, mes=3).values_list('usuario__username', 'total_gastos'))
+
+    def test_cierre_por_lotes(self):
+        trabajo = TrabajoOCR.objects.create(
+            usuario=self.usuarios[0], tipo='comprobante', archivo='ocr/ticket.png',
+            gasto=Gasto.objects.filter(usuario=self.usuarios[0]).first()
+        )
+        version = VersionDatos.actual(self.usuarios[0].id)
+        cierre = EstadisticaMensual.guardar_estadisticas_y_limpiar(2025, 3, usuarios_por_lote=2)
+
+        self.assertEqual((cierre.estado, cierre.usuarios_procesados, cierre.gastos_eliminados), ('completado', 3, 3))
+        self.assertEqual(self.estadisticas(), {'cierre0': Decimal('350.50'), 'cierre1': Decimal('40'), 'cierre2': Decimal('0')})
+        self.assertEqual(list(Gasto.objects.values_list('pk', flat=True)), [self.abril.pk])
+        trabajo.refresh_from_db()
+        self.assertIsNone(trabajo.gasto_id)
+        # Los acumulados del mes quedan en cero; los de abril no se tocan
+        self.assertFalse(BalanceMensual.objects.filter(año=2025, mes=3, total_gastos__gt=0).exists())
+        self.assertFalse(BalanceDiario.objects.filter(fecha__month=3, total_gastos__gt=0).exists())
+        self.assertEqual(BalanceMensual.objects.get(año=2025, mes=4).total_gastos, Decimal('999'))
+        self.assertEqual(VersionDatos.actual(self.usuarios[0].id), version + 1)
+
+        mes = archivo_gastos.abrir_mes(2025, 3)
+        self.assertEqual(mes.total(self.usuarios[0].id), (Decimal('350.50'), 2))
+        self.assertEqual(mes.total(self.usuarios[1].id), (Decimal('40'), 1))
+        self.assertEqual(mes.meta['filas'], 3)
+
+        # Un mes cerrado sin gastos nuevos no se vuelve a procesar
+        with mock.patch('gastitos.archivo_gastos.escribir_parte') as escribir:
+            EstadisticaMensual.guardar_estadisticas_y_limpiar(2025, 3)
+        escribir.assert_not_called()
+
+    def test_se_retoma_desde_el_ultimo_usuario(self):
+        escribir_parte = archivo_gastos.escribir_parte
+        llamadas = []
+
+        def fallar_en_el_segundo_lote(*args, **kwargs):
+            llamadas.append(args[2])
+            if len(llamadas) == 2:
+                raise OSError('disco lleno')
+            return escribir_parte(*args, **kwargs)
+
+        with mock.patch('gastitos.archivo_gastos.escribir_parte', side_effect=fallar_en_el_segundo_lote):
+            with self.assertRaises(OSError):
+                EstadisticaMensual.guardar_estadisticas_y_limpiar(2025, 3, usuarios_por_lote=1)
+
+        cierre = CierreMensual.objects.get(año=2025, mes=3)
+        self.assertEqual((cierre.estado, cierre.ultimo_usuario_id), ('en_curso', self.usuarios[0].id))
+        # El lote que falló se revirtió entero: sus gastos siguen en la tabla
+        self.assertTrue(Gasto.objects.filter(usuario=self.usuarios[1], fecha__month=3).exists())
+        self.assertFalse(Gasto.objects.filter(usuario=self.usuarios[0]).exists())
+
+        cierre = EstadisticaMensual.guardar_estadisticas_y_limpiar(2025, 3, usuarios_por_lote=1)
+        self.assertEqual((cierre.estado, cierre.usuarios_procesados, cierre.gastos_eliminados), ('completado', 3, 3))
+        self.assertEqual(self.estadisticas()['cierre1'], Decimal('40'))
+        self.assertEqual(archivo_gastos.abrir_mes(2025, 3).meta['filas'], 3)
+
+    def test_la_parte_de_un_lote_revertido_no_se_archiva(self):
+        escribir_parte = archivo_gastos.escribir_parte
+        llamadas = []
+
+        def fallar_despues_de_escribir(*args, **kwargs):
+            llamadas.append(args[2])
+            escribir_parte(*args, **kwargs)
+            if len(llamadas) == 2:
+                raise OSError('disco lleno')
+
+        with mock.patch('gastitos.archivo_gastos.escribir_parte', side_effect=fallar_despues_de_escribir):
+            with self.assertRaises(OSError):
+                EstadisticaMensual.guardar_estadisticas_y_limpiar(2025, 3, usuarios_por_lote=1)
+
+        directorio = os.path.join(archivo_gastos.directorio_base(), '2025-03')
+        self.assertEqual(
+            sorted(os.listdir(directorio)),
+            [f'parte_{self.usuarios[0].id:012d}.npz', f'pendiente_parte_{self.usuarios[1].id:012d}.npz']
+        )
+
+        # Al retomar, los gastos del lote revertido se archivan una sola vez
+        EstadisticaMensual.guardar_estadisticas_y_limpiar(2025, 3, usuarios_por_lote=1)
+        mes = archivo_gastos.abrir_mes(2025, 3)
+        self.assertEqual(mes.meta['filas'], 3)
+        self.assertEqual(mes.total(self.usuarios[1].id), (Decimal('40'), 1))
+
+    def test_gastos_cargados_despues_del_cierre(self):
+        EstadisticaMensual.guardar_estadisticas_y_limpiar(2025, 3)
+        # Un resumen de tarjeta importado después trae una compra de marzo
+        importar_gastos(self.usuarios[0], [{'descripcion': 'Tarde', 'monto': '9.50', 'fecha': date(2025, 3, 2)}], con_fecha=True)
+        self.assertEqual(BalanceMensual.objects.get(usuario=self.usuarios[0], año=2025, mes=3).total_gastos, Decimal('9.50'))
+
+        self.assertEqual(TAREAS['cierres_atrasados'].funcion(timezone.localdate().isoformat()), 1)
+
+        cierre = CierreMensual.objects.get(año=2025, mes=3)
+        self.assertEqual((cierre.estado, cierre.reaperturas, cierre.gastos_eliminados), ('completado', 1, 4))
+        self.assertEqual(self.estadisticas(), {'cierre0': Decimal('360.00'), 'cierre1': Decimal('40'), 'cierre2': Decimal('0')})
+        self.assertFalse(Gasto.objects.filter(fecha__month=3).exists())
+        self.assertEqual(BalanceMensual.objects.get(usuario=self.usuarios[0], año=2025, mes=3).total_gastos, Decimal('0'))
+
+        mes = archivo_gastos.abrir_mes(2025, 3)
+        self.assertEqual(mes.total(self.usuarios[0].id), (Decimal('360.00'), 3))
+        self.assertEqual([gasto['descripcion'] for gasto in mes.gastos(self.usuarios[0].id)], ['Tarde', 'Compra', 'Compra'])
+        self.assertEqual(mes.total(self.usuarios[1].id), (Decimal('40'), 1))
+
+        # Sin gastos nuevos la tarea no reabre nada
+        self.assertEqual(TAREAS['cierres_atrasados'].funcion(timezone.localdate().isoformat()), 0)
+        self.assertEqual(CierreMensual.objects.get(pk=cierre.pk).reaperturas, 1)
+
+
+class ProgramadorTests(TestCase):
+    """Cerrojo de líder, leases de las ejecuciones, reintentos y la tarea de gastos fijos"""
+
+    def setUp(self):
+        self.llamadas = []
+        self.tarea = Tarea('prueba', self.llamadas.append, lambda fecha: fecha.isoformat(), timedelta(minutes=30))
+
+    def vencer(self, **filtros):
+        hace_un_rato = timezone.now() - timedelta(seconds=1)
+        EjecucionTarea.objects.filter(**filtros).update(lease_hasta=hace_un_rato)
+
+    def test_cerrojo_de_lider(self):
+        self.assertTrue(tomar_cerrojo('programador', 'a'))
+        self.assertTrue(tomar_cerrojo('programador', 'a'))  # Renovarlo
+        self.assertFalse(tomar_cerrojo('programador', 'b'))
+        self.assertIsNone(ejecutar_pendientes(nombres=['vencimiento_metas']))
+
+        # Solo el dueño lo libera; vencido, lo toma otro proceso
+        liberar_cerrojo('programador', 'b')
+        self.assertFalse(tomar_cerrojo('programador', 'b'))
+        Cerrojo.objects.filter(nombre='programador').update(vence=timezone.now() - timedelta(seconds=1))
+        self.assertTrue(tomar_cerrojo('programador', 'b'))
+        liberar_cerrojo('programador', 'b')
+        self.assertTrue(tomar_cerrojo('programador', 'a'))
+
+    def test_lease_vencido_se_retoma(self):
+        primera = ejecutar_tarea(self.tarea, '2025-03-01', 'a')
+        self.assertEqual((primera.estado, primera.intentos), ('completado', 1))
+        # Completada no se repite
+        self.assertIsNone(ejecutar_tarea(self.tarea, '2025-03-01', 'b'))
+
+        # Un proceso que murió con la ejecución en curso la retiene hasta que vence su lease
+        EjecucionTarea.objects.create(
+            tarea='prueba', clave='2025-03-02', propietario='a', fecha_inicio=timezone.now(),
+            lease_hasta=timezone.now() + timedelta(minutes=30), intentos=1
+        )
+        self.assertIsNone(ejecutar_tarea(self.tarea, '2025-03-02', 'b'))
+        self.vencer(clave='2025-03-02')
+        retomada = ejecutar_tarea(self.tarea, '2025-03-02', 'b')
+        self.assertEqual((retomada.estado, retomada.propietario, retomada.intentos), ('completado', 'b', 2))
+        self.assertEqual(self.llamadas, ['2025-03-01', '2025-03-02'])
+
+    def test_un_lease_perdido_no_pisa_el_resultado(self):
+        def retomada_por_otro(clave):
+            EjecucionTarea.objects.filter(tarea='prueba', clave=clave).update(propietario='b')
+            return 10
+
+        self.tarea.funcion = retomada_por_otro
+        self.assertIsNone(ejecutar_tarea(self.tarea, '2025-03-01', 'a'))
+        ejecucion = EjecucionTarea.objects.get(tarea='prueba', clave='2025-03-01')
+        self.assertEqual((ejecucion.estado, ejecucion.propietario, ejecucion.filas), ('en_curso', 'b', None))
+
+    def test_el_latido_renueva_el_lease(self):
+        ejecucion = EjecucionTarea.objects.create(
+            tarea='prueba', clave='2025-03-01', propietario='a', fecha_inicio=timezone.now(),
+            lease_hasta=timezone.now(), intentos=1
+        )
+        self.assertTrue(renovar_lease(ejecucion.pk, 'a', timedelta(hours=1)))
+        self.assertGreater(EjecucionTarea.objects.get(pk=ejecucion.pk).lease_hasta, timezone.now() + timedelta(minutes=59))
+        self.assertFalse(renovar_lease(ejecucion.pk, 'b', timedelta(hours=1)))
+
+        with mock.patch('gastitos.programador.renovar_lease', return_value=True) as renovar:
+            with _latido(ejecucion, timedelta(milliseconds=30)):
+                time.sleep(0.1)
+        self.assertGreaterEqual(renovar.call_count, 2)
+        renovar.assert_called_with(ejecucion.pk, 'a', timedelta(milliseconds=30))
+
+    def test_reintentos_con_espera(self):
+        self.assertEqual([espera_reintento(intento) for intento in (1, 2, 3)], [
+            timedelta(minutes=5), timedelta(minutes=10), timedelta(minutes=20)
+        ])
+        self.assertEqual(espera_reintento(20), timedelta(hours=6))
+
+        def fallar(clave):
+            raise ValueError('sin conexión')
+
+        self.tarea.funcion = fallar
+        fallida = ejecutar_tarea(self.tarea, '2025-03-01', 'a')
+        self.assertEqual((fallida.estado, fallida.error), ('error', 'ValueError: sin conexión'))
+        self.assertEqual(fallida.lease_hasta, fallida.fecha_fin + timedelta(minutes=5))
+        # Antes de la espera no se reintenta, ni siquiera desde otro proceso
+        self.assertIsNone(ejecutar_tarea(self.tarea, '2025-03-01', 'b'))
+
+        self.vencer(clave='2025-03-01')
+        segunda = ejecutar_tarea(self.tarea, '2025-03-01', 'b')
+        self.assertEqual((segunda.estado, segunda.intentos), ('error', 2))
+        self.assertEqual(segunda.lease_hasta, segunda.fecha_fin + timedelta(minutes=10))
+
+    def test_gastos_fijos_una_vez_por_mes(self):
+        usuario = User.objects.create_user('fijos', password='clave-de-prueba')
+        PerfilUsuario.objects.create(user=usuario, salario_mensual=Decimal('100000'))
+        alquiler = GastoFijo.objects.create(usuario=usuario, descripcion='Alquiler', monto=Decimal('500'))
+        GastoFijo.objects.create(usuario=usuario, descripcion='Internet', monto=Decimal('80'))
+        GastoFijo.objects.create(usuario=usuario, descripcion='Gimnasio', monto=Decimal('30'), activo=False)
+        # Un gasto igual cargado a mano no cuenta; aplicar el gasto fijo sí
+        Gasto.objects.create(usuario=usuario, descripcion='Internet', monto=Decimal('80'))
+        alquiler.aplicar_gasto()
+
+        ejecuciones = ejecutar_pendientes(nombres=['gastos_fijos'])
+        self.assertEqual([(e.tarea, e.estado, e.filas) for e in ejecuciones], [('gastos_fijos', 'completado', 1)])
+        montos = sorted(Gasto.objects.filter(usuario=usuario).values_list('descripcion', 'monto'))
+        self.assertEqual(montos, [('Alquiler', Decimal('500')), ('Internet', Decimal('80')), ('Internet', Decimal('80'))])
+        mes = timezone.localdate().strftime('%Y-%m')
+        self.assertEqual(set(GastoFijo.objects.filter(activo=True).values_list('ultimo_mes_aplicado', flat=True)), {mes})
+
+        # Otra corrida del mismo mes (p. ej. tras un reintento) no repite nada; el mes siguiente aplica todos
+        self.assertEqual(TAREAS['gastos_fijos'].funcion(mes), 0)
+        self.assertEqual(TAREAS['gastos_fijos'].funcion('2999-01'), 2)
+        self.assertEqual(Gasto.objects.filter(usuario=usuario).count(), 5)
+
+
+class MigracionGastosFijosTests(TransactionTestCase):
+    """Al agregar ultimo_mes_aplicado, los gastos fijos ya aplicados este mes no se cobran otra vez"""
+
+    antes = [('gastitos', '0021_cierremensual_reaperturas')]
+
+    def migrar(self, destino):
+        executor = MigrationExecutor(connection)
+        executor.migrate(destino)
+        return executor.loader.project_state(destino).apps
+
+    def test_aplicado_a_mano_antes_de_migrar(self):
+        despues = MigrationExecutor(connection).loader.graph.leaf_nodes('gastitos')
+        self.addCleanup(self.migrar, despues)
+        apps_anteriores = self.migrar(self.antes)
+        usuario = apps_anteriores.get_model('auth', 'User').objects.create(username='fijos')
+        apps_anteriores.get_model('gastitos', 'PerfilUsuario').objects.create(user=usuario, salario_mensual=Decimal('100000'))
+        fijos = apps_anteriores.get_model('gastitos', 'GastoFijo').objects
+        fijos.create(usuario=usuario, descripcion='Alquiler', monto=Decimal('500'))
+        fijos.create(usuario=usuario, descripcion='Internet', monto=Decimal('80'))
+        # Aplicado a mano este mes, antes de que existiera la marca
+        apps_anteriores.get_model('gastitos', 'Gasto').objects.create(
+            usuario=usuario, descripcion='Alquiler', monto=Decimal('500')
+        )
+
+        self.migrar(despues)
+        mes = timezone.localdate().strftime('%Y-%m')
+        self.assertEqual(
+            dict(GastoFijo.objects.values_list('descripcion', 'ultimo_mes_aplicado')), {'Alquiler': mes, 'Internet': ''}
+        )
+        self.assertEqual(TAREAS['gastos_fijos'].funcion(mes), 1)
+        self.assertEqual(
+            sorted(Gasto.objects.filter(usuario_id=usuario.id).values_list('descripcion', flat=True)),
+            ['Alquiler', 'Internet']
+        )
+
+
+class CalendarioTests(TestCase):
+    """El calendario se valida con la ETag del balance del mes"""
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user('calendario', password='clave-de-prueba')
+        PerfilUsuario.objects.create(user=self.usuario, salario_mensual=Decimal('500000'))
+        self.client.force_login(self.usuario)
+        self.hoy = timezone.localdate()
+        self.mes = {'year': self.hoy.year, 'month': self.hoy.month}
+
+    def test_etag_y_304_hasta_que_cambia_el_mes(self):
+        Gasto.objects.create(usuario=self.usuario, descripcion='Coto', monto=Decimal('1200'))
+        Gasto.objects.create(usuario=self.usuario, descripcion='Dia', monto=Decimal('300.25'))
+        url = reverse('datos_calendario')
+
+        respuesta = self.client.get(url, self.mes)
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        self.assertEqual(datos['total'], '1500.25')
+        self.assertEqual(datos['dias'][str(self.hoy.day)]['total'], '1500.25')
+        etag = respuesta['ETag']
+        self.assertTrue(respuesta.has_header('Last-Modified'))
+
+        self.assertEqual(self.client.get(url, self.mes, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Otro mes tiene su propia etiqueta
+        otro = self.client.get(url, {'year': 2001, 'month': 1})
+        self.assertNotEqual(otro['ETag'], etag)
+        self.assertEqual(otro.json()['dias'], {})
+
+        # Un gasto nuevo en el mes invalida la etiqueta anterior
+        Gasto.objects.create(usuario=self.usuario, descripcion='Kiosco', monto=Decimal('99.75'))
+        respuesta = self.client.get(url, self.mes, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['total'], '1600.00')
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+        # La etiqueta es por usuario: otro usuario con el mismo mes no recibe 304
+        otro_usuario = User.objects.create_user('vecino', password='clave-de-prueba')
+        self.client.force_login(otro_usuario)
+        self.assertEqual(self.client.get(url, self.mes, HTTP_IF_NONE_MATCH=respuesta['ETag']).status_code, 200)
+
+
+class AcumuladosDashboardTests(TestCase):
+    """El dashboard arma sus totales desde los acumulados diarios y mensuales"""
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user('tablero', password='clave-de-prueba')
+        PerfilUsuario.objects.create(user=self.usuario, salario_mensual=Decimal('500000'))
+        self.client.force_login(self.usuario)
+
+    def test_dashboard_usa_los_acumulados(self):
+        Gasto.objects.create(usuario=self.usuario, descripcion='Coto', monto=Decimal('1000'))
+        Gasto.objects.create(usuario=self.usuario, descripcion='Dia', monto=Decimal('500'))
+        # Un mes anterior cargado directamente en los acumulados
+        BalanceMensual.objects.create(usuario=self.usuario, año=2001, mes=1, total_gastos=Decimal('700'), cantidad_gastos=3)
+
+        contexto = self.client.get(reverse('dashboard')).context
+        self.assertEqual(contexto['total_mes_actual'], Decimal('1500'))
+        self.assertEqual(contexto['saldo_restante'], Decimal('498500'))
+        self.assertEqual(json.loads(contexto['totales_data']), [700.0, 1500.0])
+        self.assertEqual(json.loads(contexto['dias_data'])[-1], 1500.0)
+        self.assertEqual(sum(json.loads(contexto['dias_data'])), 1500.0)
+
+
+class _PoolFalso:
+    """Pool que no ejecuta nada: cada envío devuelve un Future que el test completa a mano"""
+
+    def __init__(self):
+        self.envios = []
+
+    def submit(self, funcion, *args):
+        futuro = Future()
+        self.envios.append((args, futuro))
+        return futuro
+
+
+class TrabajosOCRTests(TestCase):
+    """Cola de OCR: límite por usuario, callback de resultado, caché y confirmación única"""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        ajustes = self.settings(MEDIA_ROOT=media, OCR_MAX_TRABAJOS_POR_USUARIO=2)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.pool = _PoolFalso()
+        for parche in (
+            mock.patch('gastitos.tasks_ocr.obtener_pool', return_value=self.pool),
+            # El callback corre en un hilo del pool y cierra su conexión; acá comparte la del test
+            mock.patch('gastitos.tasks_ocr.close_old_connections'),
+            mock.patch('gastitos.tasks_ocr.connection'),
+        ):
+            parche.start()
+            self.addCleanup(parche.stop)
+
+        self.usuario = User.objects.create_user('escaneador', password='clave-de-prueba')
+        PerfilUsuario.objects.create(user=self.usuario, salario_mensual=Decimal('100000'))
+        self.client.force_login(self.usuario)
+
+    def subir(self, contenido, tipo='historial'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('crear_trabajo_ocr'), {
+                'tipo': tipo, 'archivo': SimpleUploadedFile('captura.png', contenido),
+            })
+
+    def trabajo_completado(self, tipo, resultado):
+        return TrabajoOCR.objects.create(
+            usuario=self.usuario, tipo=tipo, estado='completado', resultado=resultado,
+            archivo=SimpleUploadedFile('captura.png', b'imagen'),
+        )
+
+    def confirmar(self, trabajo, **datos):
+        return self.client.post(reverse('confirmar_trabajo_ocr', args=[trabajo.id]), datos)
+
+    def test_encola_guarda_el_resultado_y_reutiliza_la_cache(self):
+        respuesta = self.subir(b'captura-1')
+        self.assertEqual(respuesta.status_code, 202)
+        trabajo = TrabajoOCR.objects.get(id=respuesta.json()['trabajo']['id'])
+        self.assertEqual(trabajo.estado, 'procesando')
+        (tipo, ruta), futuro = self.pool.envios[0]
+        self.assertEqual((tipo, ruta), ('historial', trabajo.archivo.path))
+
+        resultado = {'gastos': [{'descripcion': 'Coto', 'monto': 1500.0, 'fecha': '2025-03-01'}]}
+        futuro.set_result(resultado)
+        trabajo.refresh_from_db()
+        self.assertEqual((trabajo.estado, trabajo.resultado), ('completado', resultado))
+        self.assertIsNotNone(trabajo.fecha_fin)
+
+        # La misma imagen se resuelve desde la caché, sin pasar por el pool
+        datos = self.subir(b'captura-1').json()['trabajo']
+        self.assertEqual((datos['estado'], datos['resultado']), ('completado', resultado))
+        self.assertEqual(len(self.pool.envios), 1)
+
+    def test_limite_de_trabajos_en_curso(self):
+        self.assertEqual(self.subir(b'uno').status_code, 202)
+        self.assertEqual(self.subir(b'dos').status_code, 202)
+        self.assertFalse(puede_encolar(self.usuario))
+        self.assertEqual(self.subir(b'tres').status_code, 429)
+
+        # Cuando uno termina se libera un lugar
+        self.pool.envios[0][1].set_result({'monto': 10.0, 'fecha': None})
+        self.assertTrue(puede_encolar(self.usuario))
+
+    def test_errores_del_proceso(self):
+        self.subir(b'falla', tipo='comprobante')
+        self.subir(b'muere', tipo='comprobante')
+        self.pool.envios[0][1].set_exception(ValueError('imagen corrupta'))
+        with mock.patch('gastitos.tasks_ocr._reiniciar_pool') as reiniciar:
+            self.pool.envios[1][1].set_exception(BrokenProcessPool('terminó'))
+        reiniciar.assert_called_once_with()
+
+        errores = list(TrabajoOCR.objects.order_by('id').values_list('estado', 'error'))
+        self.assertEqual(errores[0], ('error', 'imagen corrupta'))
+        self.assertEqual(errores[1][0], 'error')
+        self.assertIn('terminó inesperadamente', errores[1][1])
+        self.assertFalse(ResultadoOCR.objects.exists())
+
+    def test_un_trabajo_tomado_por_otro_proceso_no_se_repite(self):
+        pendiente, colgado = (
+            TrabajoOCR.objects.create(usuario=self.usuario, tipo='comprobante', archivo=SimpleUploadedFile(nombre, b'imagen'))
+            for nombre in ('uno.png', 'dos.png')
+        )
+        TrabajoOCR.objects.filter(pk=colgado.pk).update(
+            estado='procesando', fecha_inicio=timezone.now() - timedelta(hours=1)
+        )
+        enviados = []
+
+        def enviar(funcion, tipo, ruta):
+            enviados.append(ruta)
+            futuro = Future()
+            futuro.set_result({'monto': 10.0, 'fecha': None})
+            return futuro
+
+        def otro_proceso_toma_el_pendiente():
+            # Después de listar los trabajos, otro proceso se adelanta con el primero
+            TrabajoOCR.objects.filter(pk=pendiente.pk).update(estado='procesando', fecha_inicio=timezone.now())
+            return mock.Mock(submit=enviar)
+
+        with mock.patch('gastitos.management.commands.procesar_trabajos_ocr.obtener_pool',
+                        side_effect=otro_proceso_toma_el_pendiente):
+            call_command('procesar_trabajos_ocr', stdout=StringIO())
+
+        colgado.refresh_from_db()
+        pendiente.refresh_from_db()
+        self.assertEqual(enviados, [colgado.archivo.path])
+        self.assertEqual(colgado.estado, 'completado')
+        self.assertEqual(pendiente.estado, 'procesando')
+
+    def test_confirmar_una_sola_vez(self):
+        trabajo = self.trabajo_completado('historial', {'gastos': [
+            {'descripcion': 'Coto', 'monto': 1500.0, 'fecha': '2025-03-01'},
+            {'descripcion': 'Dia', 'monto': 'no es un monto', 'fecha': '2025-03-01'},
+            {'descripcion': '', 'monto': 200.0, 'fecha': '2025-03-02'},
+        ]})
+        datos = self.confirmar(trabajo).json()
+        self.assertEqual((datos['gastos_agregados'], datos['gastos_rechazados']), (2, 1))
+        self.assertEqual(
+            sorted(Gasto.objects.values_list('descripcion', flat=True)), ['Coto', 'Gasto desde historial']
+        )
+
+        # Un segundo envío (doble clic u otra pestaña) no vuelve a importar
+        respuesta = self.confirmar(trabajo)
+        self.assertEqual(respuesta.status_code, 409)
+        # Ni aunque la otra petición haya leído el trabajo antes de que se confirmara
+        with mock.patch('gastitos.views.get_object_or_404', return_value=trabajo):
+            self.assertEqual(trabajo.estado, 'completado')
+            self.assertEqual(self.confirmar(trabajo).status_code, 409)
+        self.assertEqual(Gasto.objects.count(), 2)
+
+    def test_confirmar_comprobante_valida_el_monto(self):
+        trabajo = self.trabajo_completado('comprobante', {'monto': 1500.0, 'fecha': None})
+
+        respuesta = self.confirmar(trabajo, monto='1.500,00')
+        self.assertEqual((respuesta.status_code, respuesta.json()['error']), (400, 'Monto inválido'))
+        respuesta = self.confirmar(trabajo, monto='250000')
+        self.assertIn('Saldo insuficiente', respuesta.json()['error'])
+        # Los rechazos no consumen el trabajo
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, 'completado')
+        self.assertFalse(Gasto.objects.exists())
+
+        datos = self.confirmar(trabajo, monto='1499.999', descripcion='Farmacity').json()
+        self.assertEqual(datos['gasto']['monto'], '1500.00')
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, 'confirmado')
+        self.assertEqual(self.confirmar(trabajo).status_code, 409)
+
+
+class CacheOCRTests(TestCase):
+    """Caché de resultados por (huella, tipo, versión), con poda LRU periódica"""
+
+    def setUp(self):
+        cache_ocr._guardados_desde_poda = 0
+
+    def test_aciertos_y_fallos_por_clave(self):
+        huella = cache_ocr.calcular_huella(b'comprobante')
+        self.assertIsNone(cache_ocr.obtener(huella, 'comprobante'))
+        cache_ocr.guardar(huella, 'comprobante', {'monto': 1500.0, 'fecha': '2025-03-01'})
+        # Resultados vacíos no se guardan: pueden ser un fallo transitorio
+        cache_ocr.guardar(cache_ocr.calcular_huella(b'vacio'), 'comprobante', {'monto': None, 'fecha': None})
+
+        self.assertEqual(cache_ocr.obtener(huella, 'comprobante'), {'monto': 1500.0, 'fecha': '2025-03-01'})
+        self.assertIsNone(cache_ocr.obtener(huella, 'historial'))
+        self.assertIsNone(cache_ocr.obtener(cache_ocr.calcular_huella(b'vacio'), 'comprobante'))
+        self.assertEqual(ResultadoOCR.objects.get().aciertos, 1)
+
+        # Otra versión del pipeline no ve los resultados anteriores y la poda los elimina
+        with mock.patch('gastitos.cache_ocr.VERSION_PIPELINE', cache_ocr.VERSION_PIPELINE + 1):
+            self.assertIsNone(cache_ocr.obtener(huella, 'comprobante'))
+            self.assertEqual(cache_ocr.podar(), 1)
+        self.assertFalse(ResultadoOCR.objects.exists())
+
+    def test_poda_lru_cada_tantos_guardados(self):
+        with self.settings(OCR_CACHE_MAX_ENTRADAS=2, OCR_CACHE_PODAR_CADA=3):
+            huellas = [cache_ocr.calcular_huella(f'imagen {numero}'.encode()) for numero in range(4)]
+            # Los guardados que no completan el ciclo no cuentan ni borran filas
+            with CaptureQueriesContext(connection) as consultas:
+                cache_ocr.guardar(huellas[0], 'historial', {'gastos': [1]})
+                cache_ocr.guardar(huellas[1], 'historial', {'gastos': [2]})
+            self.assertFalse([consulta for consulta in consultas if 'DELETE' in consulta['sql']])
+            # La primera entrada es la más usada recientemente
+            cache_ocr.obtener(huellas[0], 'historial')
+            self.assertEqual(ResultadoOCR.objects.count(), 2)
+
+            cache_ocr.guardar(huellas[2], 'historial', {'gastos': [3]})
+            self.assertEqual(
+                set(ResultadoOCR.objects.values_list('huella', flat=True)), {huellas[0], huellas[2]}
+            )
+            cache_ocr.guardar(huellas[3], 'historial', {'gastos': [4]})
+            self.assertEqual(ResultadoOCR.objects.count(), 3)
+
+            # La tarea diaria poda aunque no se llegue a la cantidad de guardados
+            self.assertEqual(TAREAS['poda_cache_ocr'].funcion('2025-03-01'), 1)
+            self.assertEqual(ResultadoOCR.objects.count(), 2)
@@ -3,17 +3,26 @@ from . import views
 
 urlpatterns = [
     path('estadisticas/mensuales/', views.estadisticas_mensuales, name='estadisticas_mensuales'),
-    path('admin/limpieza-mensual/', views.ejecutar_limpieza_mensual, name='ejecutar_limpieza_mensual'),
+    path('estadisticas/historial/', views.historial_archivado, name='historial_archivado'),
+    path('staff/limpieza-mensual/', views.ejecutar_limpieza_mensual, name='ejecutar_limpieza_mensual'),
+    path('staff/cache-vistas/', views.estadisticas_cache_vistas, name='estadisticas_cache_vistas'),
+    path('staff/instrumentacion/', views.instrumentacion, name='instrumentacion'),
     path('', views.index, name='index'),
     path('actualizar-salario/', views.actualizar_salario, name='actualizar_salario'),
     path('agregar-gasto/', views.agregar_gasto, name='agregar_gasto'),
     path('agregar_gasto_calendario/', views.agregar_gasto_calendario, name='agregar_gasto_calendario'),
     path('agregar_vencimiento/', views.agregar_vencimiento, name='agregar_vencimiento'),
 
+    path('ocr/trabajos/', views.crear_trabajo_ocr, name='crear_trabajo_ocr'),
+    path('ocr/trabajos/<int:trabajo_id>/', views.estado_trabajo_ocr, name='estado_trabajo_ocr'),
+    path('ocr/trabajos/<int:trabajo_id>/confirmar/', views.confirmar_trabajo_ocr, name='confirmar_trabajo_ocr'),
+
+    path('gastos/pagina/', views.pagina_gastos, name='pagina_gastos'),
     path('eliminar-gasto/<int:gasto_id>/', views.eliminar_gasto, name='eliminar_gasto'),
     path('editar-gasto/', views.editar_gasto, name='editar_gasto'),
     path('gastos-fijos/', views.gastos_fijos, name='gastos_fijos'),
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/calendario/', views.datos_calendario, name='datos_calendario'),
     path('perfil/', views.perfil, name='perfil'),
     path('registro/', views.registro, name='registro'),
     # URLs del modo ahorro
@@ -1,84 +1,190 @@
 import re
-import cv2
-import numpy as np
-from PIL import Image
-import pytesseract
 from datetime import datetime, date
 from decimal import Decimal, InvalidOperation
 import os
+import threading
+from .motor_ocr import obtener_motor, TesseractNoDisponible
+from .ocr import PDFDemasiadoLargo
 
-# Configurar la ruta de Tesseract para Windows
-if os.name == 'nt':  # Windows
-    tesseract_path = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-    if os.path.exists(tesseract_path):
-        pytesseract.pytesseract.tesseract_cmd = tesseract_path
+# OpenCV, NumPy, PIL y pytesseract se importan en el primer uso (ver cargar_bibliotecas_ocr)
+# para que los procesos web que nunca hacen OCR no paguen su tiempo de carga ni su memoria.
+cv2 = None
+np = None
+Image = None
+pytesseract = None
+
+
+def cargar_bibliotecas_ocr():
+    """Importa las bibliotecas de OCR la primera vez que se necesitan"""
+    global cv2, np, Image, pytesseract
+    if pytesseract is not None:
+        return
+    
+    import cv2 as _cv2
+    import numpy as _np
+    from PIL import Image as _Image
+    import pytesseract as _pytesseract
+    
+    # Configurar la ruta de Tesseract para Windows
+    if os.name == 'nt':  # Windows
+        tesseract_path = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+        if os.path.exists(tesseract_path):
+            _pytesseract.pytesseract.tesseract_cmd = tesseract_path
+        else:
+            # Intentar rutas alternativas
+            possible_paths = [
+                r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
+                r'C:\Users\{}\AppData\Local\Tesseract-OCR\tesseract.exe'.format(os.getenv('USERNAME')),
+            ]
+            
+            for path in possible_paths:
+                if os.path.exists(path):
+                    _pytesseract.pytesseract.tesseract_cmd = path
+                    break
+    
+    cv2, np, Image, pytesseract = _cv2, _np, _Image, _pytesseract
+
+# Parámetros del preprocesamiento: las fotos de celular (12+ megapíxeles) se reducen
+# hasta que el texto tenga una altura cómoda para Tesseract antes de aplicar filtros.
+ALTURA_TEXTO_OBJETIVO = 24  # px, altura mediana de los caracteres tras reducir
+ANCHO_MAXIMO_SIN_ESTIMACION = 2000  # px, si no se puede estimar la altura del texto
+ANCHO_MUESTRA = 800  # px, miniatura usada para estimar la altura del texto
+
+
+def leer_bytes_archivo(origen):
+    """
+    Obtiene los bytes de un archivo subido sin pasar por archivos temporales.
+    
+    Args:
+        origen: Archivo de Django (con chunks()), bytes o ruta en disco
+        
+    Returns:
+        bytes: Contenido del archivo
+    """
+    if isinstance(origen, (bytes, bytearray, memoryview)):
+        return origen
+    if isinstance(origen, (str, os.PathLike)):
+        with open(origen, 'rb') as archivo:
+            return archivo.read()
+    if hasattr(origen, 'seek'):
+        origen.seek(0)
+    return b''.join(origen.chunks())
+
+
+def decodificar_imagen(datos):
+    """Decodifica la imagen en memoria directamente a escala de grises"""
+    cargar_bibliotecas_ocr()
+    buffer = np.frombuffer(memoryview(datos), dtype=np.uint8)
+    if buffer.size == 0:
+        return None
+    return cv2.imdecode(buffer, cv2.IMREAD_GRAYSCALE)
+
+
+def estimar_altura_texto(gris):
+    """
+    Estima la altura mediana de los caracteres (en px de la imagen original)
+    a partir de los componentes conexos de una miniatura binarizada.
+    
+    Returns:
+        float: Altura estimada, o None si no hay suficiente texto para estimarla
+    """
+    escala = min(1.0, ANCHO_MUESTRA / gris.shape[1])
+    # INTER_LINEAR alcanza para medir componentes y es mucho más barato que INTER_AREA
+    muestra = cv2.resize(gris, None, fx=escala, fy=escala, interpolation=cv2.INTER_LINEAR) if escala < 1 else gris
+    
+    _, binaria = cv2.threshold(muestra, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(binaria, connectivity=8)
+    alturas = stats[1:, cv2.CC_STAT_HEIGHT]
+    anchos = stats[1:, cv2.CC_STAT_WIDTH]
+    
+    # Descartar ruido (muy chico) y bloques que no son caracteres (logos, bordes, líneas)
+    caracteres = alturas[(alturas >= 3) & (alturas <= muestra.shape[0] * 0.1) & (anchos <= alturas * 3)]
+    if len(caracteres) < 10:
+        return None
+    return float(np.median(caracteres)) / escala
+
+
+def reducir_para_ocr(gris):
+    """Reduce la imagen para que el texto quede cerca de ALTURA_TEXTO_OBJETIVO (nunca la agranda)"""
+    altura_texto = estimar_altura_texto(gris)
+    if altura_texto:
+        factor = ALTURA_TEXTO_OBJETIVO / altura_texto
     else:
-        # Intentar rutas alternativas
-        possible_paths = [
-            r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
-            r'C:\Users\{}\AppData\Local\Tesseract-OCR\tesseract.exe'.format(os.getenv('USERNAME')),
-        ]
+        factor = ANCHO_MAXIMO_SIN_ESTIMACION / gris.shape[1]
+    
+    if factor >= 1:
+        return gris
+    # INTER_AREA evita el aliasing en reducciones fuertes; en reducciones leves INTER_LINEAR
+    # da el mismo resultado para OCR en una fracción del tiempo
+    interpolacion = cv2.INTER_AREA if factor < 0.5 else cv2.INTER_LINEAR
+    return cv2.resize(gris, None, fx=factor, fy=factor, interpolation=interpolacion)
+
+
+def preprocesar_imagen(gris):
+    """
+    Preprocesamiento común para comprobantes e historiales: reducción de tamaño,
+    reducción de ruido, mejora de contraste y binarización adaptativa.
+    
+    Args:
+        gris: Imagen en escala de grises (ndarray)
         
-        for path in possible_paths:
-            if os.path.exists(path):
-                pytesseract.pytesseract.tesseract_cmd = path
-                break
+    Returns:
+        Image: Imagen PIL binarizada lista para OCR
+    """
+    gris = reducir_para_ocr(gris)
+    
+    # Reducir ruido
+    gris = cv2.medianBlur(gris, 3)
+    
+    # Mejorar contraste
+    gris = cv2.convertScaleAbs(gris, alpha=1.5, beta=30)
+    
+    # Binarización adaptativa
+    binario = cv2.adaptiveThreshold(gris, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+    
+    # Convertir a PIL Image para el motor de OCR
+    return Image.fromarray(binario)
+
+
+def imagen_para_ocr(origen):
+    """Decodifica y preprocesa una imagen subida; devuelve None si no es una imagen válida"""
+    gris = decodificar_imagen(leer_bytes_archivo(origen))
+    if gris is None:
+        return None
+    return preprocesar_imagen(gris)
 
-def procesar_imagen_comprobante(imagen_path):
+
+def procesar_imagen_comprobante(imagen):
     """
     Procesa una imagen de comprobante para extraer monto y fecha usando OCR.
     
     Args:
-        imagen_path: Ruta de la imagen a procesar
+        imagen: Archivo de Django, bytes o ruta de la imagen a procesar
         
     Returns:
         dict: Diccionario con 'monto' y 'fecha' extraídos, o None si no se encuentra
     """
     try:
-        # Verificar si Tesseract está disponible
-        if not hasattr(pytesseract.pytesseract, 'tesseract_cmd') or not pytesseract.pytesseract.tesseract_cmd:
-            print("Tesseract no está configurado correctamente")
+        cargar_bibliotecas_ocr()
+        
+        # Obtener el motor de OCR del proceso (idiomas resueltos una sola vez)
+        try:
+            motor = obtener_motor()
+        except TesseractNoDisponible:
+            print("Tesseract no encontrado. Por favor instale Tesseract OCR.")
             return None
             
-        # Abrir y procesar la imagen
-        imagen = cv2.imread(imagen_path)
-        if imagen is None:
+        # Decodificar en memoria y preprocesar la imagen
+        pil_imagen = imagen_para_ocr(imagen)
+        if pil_imagen is None:
             return None
-            
-        # Convertir a escala de grises
-        gris = cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY)
-        
-        # Aplicar filtros para mejorar la legibilidad
-        # Reducir ruido
-        gris = cv2.medianBlur(gris, 3)
-        
-        # Mejorar contraste
-        gris = cv2.convertScaleAbs(gris, alpha=1.5, beta=30)
-        
-        # Binarización adaptativa
-        binario = cv2.adaptiveThreshold(gris, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
-        
-        # Convertir a PIL Image para pytesseract
-        pil_imagen = Image.fromarray(binario)
         
-        # Extraer texto usando OCR
+        # Extraer texto usando OCR (una sola pasada con los idiomas configurados)
         try:
-            # Intentar primero con español, luego con inglés si falla
-            try:
-                texto = pytesseract.image_to_string(pil_imagen, lang='spa')
-            except:
-                # Si falla el español, usar inglés por defecto
-                texto = pytesseract.image_to_string(pil_imagen, lang='eng')
-        except pytesseract.TesseractNotFoundError:
-            print("Tesseract no encontrado. Por favor instale Tesseract OCR.")
-            return None
+            texto = motor.reconocer(pil_imagen)
         except Exception as ocr_error:
             print(f"Error en OCR: {ocr_error}")
-            # Último intento sin especificar idioma
-            try:
-                texto = pytesseract.image_to_string(pil_imagen)
-            except:
-                return None
+            return None
         
         # Procesar el texto extraído
         resultado = extraer_datos_texto(texto)
@@ -197,27 +303,65 @@ def extraer_datos_imagen(imagen_file):
         dict: Diccionario con datos extraídos
     """
     try:
-        # Guardar temporalmente la imagen
-        import tempfile
-        import os
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-            for chunk in imagen_file.chunks():
-                temp_file.write(chunk)
-            temp_path = temp_file.name
-        
-        # Procesar la imagen
-        resultado = procesar_imagen_comprobante(temp_path)
-        
-        # Limpiar archivo temporal
-        os.unlink(temp_path)
-        
-        return resultado
+        # La imagen se decodifica en memoria, sin archivo temporal
+        return procesar_imagen_comprobante(imagen_file)
         
     except Exception as e:
         print(f"Error extrayendo datos de imagen: {e}")
         return None
 
+# Las capturas del historial con scroll pueden medir decenas de miles de píxeles de alto.
+# Se cortan en franjas horizontales que se solapan para que ninguna fila quede partida;
+# cada fila se conserva solo en la franja que contiene su centro.
+ALTO_FRANJA = 1600  # px, tras reducir la imagen para OCR
+SOLAPAMIENTO_FRANJA = 160  # px, debe superar el alto de una fila de texto
+
+
+def dividir_en_franjas(alto, alto_franja=ALTO_FRANJA, solapamiento=SOLAPAMIENTO_FRANJA):
+    """
+    Calcula las franjas horizontales en que se divide una imagen alta.
+    
+    Returns:
+        list: Tuplas (inicio, fin, propio_desde, propio_hasta). Cada franja abarca
+        [inicio, fin) y le corresponden las filas cuyo centro cae en [propio_desde, propio_hasta).
+    """
+    if alto <= alto_franja + solapamiento:
+        return [(0, alto, 0, alto)]
+    
+    paso = alto_franja - solapamiento
+    inicios = list(range(0, alto - solapamiento, paso))
+    franjas = []
+    for i, inicio in enumerate(inicios):
+        fin = min(inicio + alto_franja, alto)
+        propio_desde = 0 if i == 0 else inicio + solapamiento // 2
+        propio_hasta = alto if i == len(inicios) - 1 else fin - solapamiento // 2
+        franjas.append((inicio, fin, propio_desde, propio_hasta))
+    return franjas
+
+
+def reconocer_por_franjas(pil_imagen, motor):
+    """
+    Reconoce una imagen alta por franjas solapadas en paralelo (en el pool de hilos
+    del motor) y une el texto en orden. Las imágenes que entran en una sola franja se
+    reconocen de una vez.
+    """
+    ancho, alto = pil_imagen.size
+    franjas = dividir_en_franjas(alto)
+    if len(franjas) == 1:
+        return motor.reconocer(pil_imagen)
+    
+    def reconocer_franja(franja):
+        inicio, fin, propio_desde, propio_hasta = franja
+        lineas = motor.reconocer_lineas(pil_imagen.crop((0, inicio, ancho, fin)))
+        return [
+            texto for arriba, abajo, texto in lineas
+            if propio_desde <= inicio + (arriba + abajo) / 2 < propio_hasta
+        ]
+    
+    lineas_por_franja = motor.mapear(reconocer_franja, franjas)
+    return '\n'.join(linea for lineas in lineas_por_franja for linea in lineas)
+
+
 def procesar_historial_mercadopago(imagen_file):
     """
     Procesa una imagen del historial de MercadoPago para extraer múltiples gastos.
@@ -231,62 +375,27 @@ def procesar_historial_mercadopago(imagen_file):
     try:
         if not imagen_file:
             return []
+        
+        cargar_bibliotecas_ocr()
             
-        # Verificar si Tesseract está disponible
-        if not hasattr(pytesseract.pytesseract, 'tesseract_cmd') or not pytesseract.pytesseract.tesseract_cmd:
-            print("Tesseract no está configurado correctamente")
-            return []
-            
-        # Guardar temporalmente la imagen
-        import tempfile
-        import os
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-            for chunk in imagen_file.chunks():
-                temp_file.write(chunk)
-            temp_path = temp_file.name
-        
-        # Procesar la imagen
-        imagen = cv2.imread(temp_path)
-        if imagen is None:
-            os.unlink(temp_path)
+        # Obtener el motor de OCR del proceso (idiomas resueltos una sola vez)
+        try:
+            motor = obtener_motor()
+        except TesseractNoDisponible:
+            print("Tesseract no encontrado. Por favor instale Tesseract OCR.")
             return []
-            
-        # Convertir a escala de grises
-        gris = cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY)
-        
-        # Aplicar filtros para mejorar la legibilidad
-        gris = cv2.medianBlur(gris, 3)
-        gris = cv2.convertScaleAbs(gris, alpha=1.5, beta=30)
-        binario = cv2.adaptiveThreshold(gris, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
         
-        # Convertir a PIL Image para pytesseract
-        pil_imagen = Image.fromarray(binario)
+        # Decodificar en memoria y preprocesar la imagen
+        pil_imagen = imagen_para_ocr(imagen_file)
+        if pil_imagen is None:
+            return []
         
-        # Extraer texto usando OCR
+        # Extraer texto usando OCR; las capturas largas se reconocen por franjas en paralelo
         try:
-            # Intentar primero con español, luego con inglés si falla
-            try:
-                texto = pytesseract.image_to_string(pil_imagen, lang='spa')
-            except Exception as e:
-                # Si falla el español, usar inglés por defecto
-                texto = pytesseract.image_to_string(pil_imagen, lang='eng')
-        except pytesseract.TesseractNotFoundError:
-            print("Tesseract no encontrado. Por favor instale Tesseract OCR.")
-            os.unlink(temp_path)
-            return []
+            texto = reconocer_por_franjas(pil_imagen, motor)
         except Exception as ocr_error:
             print(f"Error en OCR: {ocr_error}")
-            try:
-                # Último intento sin especificar idioma
-                texto = pytesseract.image_to_string(pil_imagen)
-            except Exception as final_error:
-                print(f"Error final en OCR: {final_error}")
-                os.unlink(temp_path)
-                return []
-        
-        # Limpiar archivo temporal
-        os.unlink(temp_path)
+            return []
         
         # Extraer múltiples gastos del texto
         gastos = extraer_gastos_historial(texto)
@@ -297,207 +406,280 @@ def procesar_historial_mercadopago(imagen_file):
         print(f"Error procesando historial: {e}")
         return []
 
-def extraer_gastos_historial(texto):
+# Tokenizador del historial de MercadoPago: cada línea se recorre una sola vez y se
+# clasifica en fechas, signos '$' y números; el monto se elige sobre esos tokens.
+_TOKEN_HISTORIAL = re.compile(
+    r'(?P<fecha>\d{1,2}[/-]\d{1,2}[/-]\d{2,4})'
+    r'|(?P<peso>\$)'
+    r'|(?P<numero>\d+(?:[.,]\d+)*)'
+)
+_MILES_PUNTO = re.compile(r'\d{1,3}\.\d{3}')  # 7.000, 26.000
+_MILES_COMA = re.compile(r'\d{1,3},\d{3}')  # 7,000
+_MONTO = re.compile(r'\d{1,3}(?:[.,]\d{3})*(?:[.,]\d{1,2})?')
+_MONTO_HASTA_FINAL = re.compile(r'\d{1,3}(?:[.,]\d{3})*(?:[.,]\d{1,2})?$')
+_SOLO_ESPACIOS = re.compile(r'\s*$')
+_CARACTERES_DESCRIPCION = re.compile(r'[^a-zA-ZáéíóúÁÉÍÓÚñÑ0-9\s]')
+
+PALABRAS_INGRESO_HISTORIAL = ('recibido', 'ingreso', 'depósito', 'crédito')
+LINEAS_BUSQUEDA_FECHA = 2  # Líneas siguientes donde buscar la fecha si todavía no se vio ninguna
+MAX_GASTOS_HISTORIAL = 200  # Por defecto; se configura con settings.OCR_MAX_GASTOS_HISTORIAL
+
+
+def _parsear_fecha_historial(texto):
+    """Convierte DD/MM/AAAA, DD-MM-AAAA, DD/MM/AA o DD-MM-AA en date; None si no es válida"""
+    separador = '/' if '/' in texto else '-'
+    partes = texto.split(separador)
+    if len(partes) != 3:
+        return None
+    dia, mes, año = partes
+    if len(año) == 2:
+        año = int(año)
+        año += 2000 if año < 69 else 1900  # Mismo criterio que strptime('%y')
+    elif len(año) == 4:
+        año = int(año)
+    else:
+        return None
+    try:
+        return date(año, int(mes), int(dia))
+    except ValueError:
+        return None
+
+
+def _normalizar_monto_historial(monto_str):
+    """Convierte un monto con separadores (7.000, 1.234,56, 1,234.56) a float"""
+    if ',' in monto_str and '.' in monto_str:
+        if monto_str.rfind(',') > monto_str.rfind('.'):
+            # Formato: 1.234,56 -> 1234.56
+            monto_str = monto_str.replace('.', '').replace(',', '.')
+        else:
+            # Formato: 1,234.56 -> 1234.56
+            monto_str = monto_str.replace(',', '')
+    elif ',' in monto_str:
+        if len(monto_str.split(',')[-1]) == 2:
+            # Formato: 1234,56 -> 1234.56
+            monto_str = monto_str.replace(',', '.')
+        else:
+            # Formato: 1,234 -> 1234
+            monto_str = monto_str.replace(',', '')
+    elif '.' in monto_str and len(monto_str.split('.')[-1]) == 3:
+        # Formato: 7.000 -> 7000 (separador de miles); con 1 o 2 dígitos es decimal
+        monto_str = monto_str.replace('.', '')
+    return float(monto_str)
+
+
+def _limpiar_descripcion(descripcion):
+    descripcion = _CARACTERES_DESCRIPCION.sub('', descripcion)
+    return ' '.join(descripcion.split())
+
+
+def _separados_por_espacios(linea, inicio, fin):
+    return _SOLO_ESPACIOS.match(linea, inicio, fin) is not None
+
+
+def _tokenizar_linea_historial(linea):
+    """
+    Recorre la línea una vez y devuelve la primera fecha y los candidatos a monto.
+    
+    Los candidatos se prueban en este orden, igual que los patrones originales:
+    miles con punto, miles con coma, monto precedido por '$' y monto seguido de '$'.
+    Cada candidato es (posición, texto del monto, texto de la fecha pegada al monto o '').
+    Ningún monto puede empezar la línea: siempre hay una descripción antes.
+    
+    Returns:
+        tuple: (texto de la primera fecha o None, lista de candidatos en orden de prioridad)
+    """
+    primera_fecha = None
+    miles_punto = miles_coma = con_peso_antes = con_peso_despues = None
+    tokens = list(_TOKEN_HISTORIAL.finditer(linea))
+    
+    for indice, token in enumerate(tokens):
+        tipo = token.lastgroup
+        if tipo == 'fecha':
+            if primera_fecha is None:
+                primera_fecha = token.group()
+            continue
+        if tipo != 'numero':
+            continue
+        
+        texto = token.group()
+        inicio = token.start()
+        siguiente = tokens[indice + 1] if indice + 1 < len(tokens) else None
+        anterior = tokens[indice - 1] if indice > 0 else None
+        
+        def fecha_pegada(fin_monto):
+            # La fecha cuenta solo si sigue al monto completo, separada por espacios
+            if (fin_monto == token.end() and siguiente is not None and siguiente.lastgroup == 'fecha'
+                    and _separados_por_espacios(linea, fin_monto, siguiente.start())):
+                return siguiente.group()
+            return ''
+        
+        desde = 1 if inicio == 0 else 0
+        if miles_punto is None:
+            match = _MILES_PUNTO.search(texto, desde)
+            if match:
+                miles_punto = (inicio + match.start(), match.group(), fecha_pegada(inicio + match.end()))
+        if miles_coma is None:
+            match = _MILES_COMA.search(texto, desde)
+            if match:
+                miles_coma = (inicio + match.start(), match.group(), fecha_pegada(inicio + match.end()))
+        if (con_peso_antes is None and anterior is not None and anterior.lastgroup == 'peso'
+                and anterior.start() >= 1 and _separados_por_espacios(linea, anterior.end(), inicio)):
+            match = _MONTO.match(texto)
+            con_peso_antes = (anterior.start(), match.group(), fecha_pegada(inicio + match.end()))
+        if (con_peso_despues is None and siguiente is not None and siguiente.lastgroup == 'peso'
+                and _separados_por_espacios(linea, token.end(), siguiente.start())):
+            match = _MONTO_HASTA_FINAL.search(texto, desde)
+            if match:
+                # En "4.299 $ 15/03/2025" la fecha va después del signo
+                despues = tokens[indice + 2] if indice + 2 < len(tokens) else None
+                fecha = ''
+                if (despues is not None and despues.lastgroup == 'fecha'
+                        and _separados_por_espacios(linea, siguiente.end(), despues.start())):
+                    fecha = despues.group()
+                con_peso_despues = (inicio + match.start(), match.group(), fecha)
+    
+    candidatos = [c for c in (miles_punto, miles_coma, con_peso_antes, con_peso_despues) if c is not None]
+    return primera_fecha, candidatos
+
+
+def _limite_gastos_historial():
+    try:
+        from django.conf import settings
+        return getattr(settings, 'OCR_MAX_GASTOS_HISTORIAL', MAX_GASTOS_HISTORIAL)
+    except Exception:
+        return MAX_GASTOS_HISTORIAL
+
+
+def extraer_gastos_historial(texto, limite=None):
     """
     Extrae múltiples gastos del texto del historial de MercadoPago.
     
+    Cada línea se tokeniza una sola vez. Las líneas con '+' o con palabras de
+    ingreso se descartan. Un gasto toma la fecha escrita junto a su monto; si no
+    la tiene, la primera fecha de su línea y, si tampoco, la última fecha vista en
+    las líneas anteriores. Los gastos anteriores a la primera fecha del texto toman
+    la que aparezca en las siguientes LINEAS_BUSQUEDA_FECHA líneas.
+    
     Args:
         texto: Texto extraído por OCR del historial
+        limite: Máximo de gastos a devolver (por defecto settings.OCR_MAX_GASTOS_HISTORIAL;
+            None en la configuración significa sin límite)
         
     Returns:
         list: Lista de diccionarios con gastos extraídos
     """
-    gastos = []
+    if limite is None:
+        limite = _limite_gastos_historial()
     
-    # Dividir el texto en líneas
-    lineas = texto.split('\n')
-    
-    # Patrones para identificar transacciones de MercadoPago (solo gastos, sin signo +)
-    # Excluir líneas que contengan '+' antes del monto (ingresos)
-    patrones_transaccion = [
-        # Patrones específicos para montos como 7.000, 5.000, 26.000, 12.000
-        r'(.+?)\s*\$?\s*([0-9]{1,3}\.[0-9]{3})\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})?',
-        r'(.+?)\s*([0-9]{1,3}\.[0-9]{3})\s*\$?\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})?',
-        # Patrones para montos con comas como separador de miles
-        r'(.+?)\s*\$?\s*([0-9]{1,3},[0-9]{3})\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})?',
-        r'(.+?)\s*([0-9]{1,3},[0-9]{3})\s*\$?\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})?',
-        # Patrones más flexibles para capturar cualquier línea con monto
-        r'(.+?)\s*\$\s*([0-9]{1,3}(?:[.,][0-9]{3})*(?:[.,][0-9]{1,2})?)\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})?',
-        r'(.+?)\s*([0-9]{1,3}(?:[.,][0-9]{3})*(?:[.,][0-9]{1,2})?)\s*\$\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})?',
-        # Patrones específicos para tipos de transacción
-        r'Pago\s+(.+?)\s*\$\s*([0-9]{1,3}(?:[.,][0-9]{3})*(?:[.,][0-9]{1,2})?)\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})?',
-        r'Transferencia\s+(.+?)\s*\$\s*([0-9]{1,3}(?:[.,][0-9]{3})*(?:[.,][0-9]{1,2})?)\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})?',
-        # Patrón para líneas que solo contienen monto (sin descripción clara)
-        r'\$\s*([0-9]{1,3}(?:[.,][0-9]{3})*(?:[.,][0-9]{1,2})?)\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})?',
-        r'([0-9]{1,3}(?:[.,][0-9]{3})*(?:[.,][0-9]{1,2})?)\s*\$\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})?',
-    ]
-    
-    # Palabras clave para identificar gastos (no ingresos)
-    palabras_gasto = ['pago', 'compra', 'transferencia', 'débito', 'gasto', 'factura', 'servicio']
-    palabras_ingreso = ['recibido', 'ingreso', 'depósito', 'crédito', 'cobro']
+    gastos = []
+    vistos = set()
+    ultima_fecha = None
+    sin_fecha = []  # (línea, gasto) a la espera de la primera fecha del texto
     
-    # Procesar cada línea
-    for i, linea in enumerate(lineas):
+    for i, linea in enumerate(texto.split('\n')):
         linea = linea.strip()
-        print(f"Procesando línea {i}: '{linea}'")
-        
-        if not linea or len(linea) < 5:
-            print(f"Línea {i} descartada: muy corta")
+        if not linea:
             continue
-            
-        # Filtrar líneas que contengan '+' antes del monto (ingresos)
-        if re.search(r'\+\s*\$?\s*[0-9]', linea) or re.search(r'\+\s*[0-9]', linea):
-            print(f"Línea {i} descartada: contiene signo '+'")
-            continue
-            
-        # Buscar patrones de transacción
-        patron_encontrado = False
-        for j, patron in enumerate(patrones_transaccion):
-            match = re.search(patron, linea, re.IGNORECASE)
-            if match:
-                print(f"Línea {i} coincide con patrón {j}: {patron}")
-                grupos = match.groups()
-                print(f"Grupos capturados: {grupos}")
-                
-                # Manejar diferentes números de grupos según el patrón
-                if len(grupos) >= 2:
-                    descripcion = grupos[0].strip() if grupos[0] else ''
-                    monto_str = grupos[1] if grupos[1] else ''
-                    fecha_str = grupos[2] if len(grupos) > 2 and grupos[2] else ''
-                elif len(grupos) == 1:
-                    # Solo monto, sin descripción
-                    descripcion = ''
-                    monto_str = grupos[0] if grupos[0] else ''
-                    fecha_str = ''
-                else:
-                    continue
-                    
-                patron_encontrado = True
-                
-                # Filtrar solo gastos (no ingresos)
-                # Verificar que no tenga signo '+' en la línea (principal filtro)
-                tiene_signo_mas = '+' in linea
-                
-                # Excluir solo si tiene signo '+' (más permisivo)
-                if tiene_signo_mas:
-                    continue
-                    
-                # Verificar palabras clave de ingreso solo como filtro secundario
-                es_ingreso_claro = any(palabra in linea.lower() for palabra in ['recibido', 'ingreso', 'depósito', 'crédito'])
-                if es_ingreso_claro:
+        
+        texto_fecha, candidatos = _tokenizar_linea_historial(linea)
+        fecha_linea = _parsear_fecha_historial(texto_fecha) if texto_fecha else None
+        
+        if fecha_linea:
+            for linea_gasto, gasto in sin_fecha:
+                if i - linea_gasto <= LINEAS_BUSQUEDA_FECHA:
+                    gasto['fecha'] = fecha_linea
+            sin_fecha = []
+        
+        es_gasto = (
+            len(linea) >= 5
+            and '+' not in linea
+            and not any(palabra in linea.lower() for palabra in PALABRAS_INGRESO_HISTORIAL)
+        )
+        
+        if es_gasto:
+            for posicion, monto_str, fecha_str in candidatos:
+                monto = _normalizar_monto_historial(monto_str)
+                if monto <= 0:
                     continue
                 
-                # Procesar monto
-                monto = None
-                if monto_str:
-                    try:
-                        print(f"Procesando monto_str: '{monto_str}'")
-                        # Normalizar formato de número
-                        if ',' in monto_str and '.' in monto_str:
-                            if monto_str.rfind(',') > monto_str.rfind('.'):
-                                # Formato: 1.234,56 -> 1234.56
-                                monto_str = monto_str.replace('.', '').replace(',', '.')
-                            else:
-                                # Formato: 1,234.56 -> 1234.56
-                                monto_str = monto_str.replace(',', '')
-                        elif ',' in monto_str:
-                            if len(monto_str.split(',')[-1]) == 2:
-                                # Formato: 1234,56 -> 1234.56
-                                monto_str = monto_str.replace(',', '.')
-                            else:
-                                # Formato: 1,234 -> 1234
-                                monto_str = monto_str.replace(',', '')
-                        elif '.' in monto_str:
-                            # Verificar si es separador de miles o decimal
-                            if len(monto_str.split('.')[-1]) == 3:
-                                # Formato: 7.000 -> 7000 (separador de miles)
-                                monto_str = monto_str.replace('.', '')
-                            # Si tiene 1 o 2 dígitos después del punto, es decimal
-                        
-                        monto = float(monto_str)
-                        print(f"Monto procesado: {monto}")
-                    except (ValueError, InvalidOperation) as e:
-                        print(f"Error procesando monto '{monto_str}': {e}")
-                        continue
-                
-                # Procesar fecha
-                fecha = None
-                if fecha_str:
-                    try:
-                        # Intentar diferentes formatos de fecha
-                        for formato in ['%d/%m/%Y', '%d-%m-%Y', '%d/%m/%y', '%d-%m-%y']:
-                            try:
-                                fecha = datetime.strptime(fecha_str, formato).date()
-                                break
-                            except ValueError:
-                                continue
-                    except:
-                        pass
+                descripcion = _limpiar_descripcion(linea[:posicion]) or 'Gasto desde historial'
                 
-                # Si no hay fecha en la línea, buscar en líneas cercanas
-                if not fecha:
-                    for j in range(max(0, i-2), min(len(lineas), i+3)):
-                        fecha_match = re.search(r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})', lineas[j])
-                        if fecha_match:
-                            try:
-                                fecha_str = fecha_match.group(1)
-                                for formato in ['%d/%m/%Y', '%d-%m-%Y', '%d/%m/%y', '%d-%m-%y']:
-                                    try:
-                                        fecha = datetime.strptime(fecha_str, formato).date()
-                                        break
-                                    except ValueError:
-                                        continue
-                                if fecha:
-                                    break
-                            except:
-                                continue
-                
-                # Todos los gastos del historial se marcan como no prioritarios
-                prioridad = 'baja'  # Se mapea a 'no_prioritario' en el modelo
-                
-                # Limpiar descripción
-                if descripcion:
-                    descripcion = re.sub(r'[^a-zA-ZáéíóúÁÉÍÓÚñÑ0-9\s]', '', descripcion)
-                    descripcion = ' '.join(descripcion.split())  # Normalizar espacios
+                # Evitar duplicados basados en monto y descripción
+                clave = (descripcion.lower(), round(monto, 2))
+                if clave in vistos:
+                    break
+                vistos.add(clave)
                 
-                # Agregar gasto si tiene monto válido (más permisivo)
-                if monto and monto > 0:
-                    gasto = {
-                        'descripcion': descripcion or 'Gasto desde historial',
-                        'monto': monto,
-                        'fecha': fecha or date.today(),
-                        'prioridad': prioridad
-                    }
-                    gastos.append(gasto)
-                    print(f"Gasto agregado: {gasto}")
-                    break  # Solo un patrón por línea
-                else:
-                    print(f"Gasto no agregado - monto inválido: {monto}")
-                    
-        if not patron_encontrado:
-            print(f"Línea {i} no coincide con ningún patrón")
+                fecha = (_parsear_fecha_historial(fecha_str) if fecha_str else None) or fecha_linea or ultima_fecha
+                gasto = {
+                    'descripcion': descripcion,
+                    'monto': monto,
+                    'fecha': fecha,
+                    # Todos los gastos del historial se marcan como no prioritarios
+                    'prioridad': 'baja',  # Se mapea a 'no_prioritario' en el modelo
+                }
+                gastos.append(gasto)
+                if fecha is None:
+                    sin_fecha.append((i, gasto))
+                break  # Solo un monto por línea
+        
+        if fecha_linea:
+            ultima_fecha = fecha_linea
     
-    # Filtrar gastos duplicados y validar
-    gastos_validos = []
     for gasto in gastos:
-        if gasto['monto'] and gasto['monto'] > 0:
-            # Evitar duplicados basados en monto y descripción
-            duplicado = False
-            for gasto_existente in gastos_validos:
-                if (abs(gasto['monto'] - gasto_existente['monto']) < 0.01 and 
-                    gasto['descripcion'].lower() == gasto_existente['descripcion'].lower()):
-                    duplicado = True
-                    break
-            
-            if not duplicado:
-                gastos_validos.append(gasto)
+        if gasto['fecha'] is None:
+            gasto['fecha'] = date.today()
     
-    return gastos_validos[:20]  # Limitar a 20 gastos máximo
+    return gastos[:limite] if limite else gastos
+
+
+PDF_MAX_PAGINAS = 60  # Por defecto; se configura con settings.PDF_MAX_PAGINAS
+PDF_SEGUNDOS_MAXIMOS = 20  # Por defecto; se configura con settings.PDF_SEGUNDOS_MAXIMOS
+
+
+def _limites_pdf():
+    """(páginas, segundos) máximos para leer un PDF dentro de una solicitud web"""
+    try:
+        from django.conf import settings
+        return (getattr(settings, 'PDF_MAX_PAGINAS', PDF_MAX_PAGINAS),
+                getattr(settings, 'PDF_SEGUNDOS_MAXIMOS', PDF_SEGUNDOS_MAXIMOS))
+    except Exception:
+        return PDF_MAX_PAGINAS, PDF_SEGUNDOS_MAXIMOS
+
+
+def paginas_pdf(pdf_file):
+    """
+    Recorre un PDF página por página, extrayendo el texto de cada una recién cuando se
+    la pide. El PDF se abre desde la subida en memoria; si quien consume las páginas se
+    detiene, las restantes no se procesan. Tampoco se leen más de settings.PDF_MAX_PAGINAS
+    páginas ni se sigue leyendo pasados settings.PDF_SEGUNDOS_MAXIMOS.
+    
+    Args:
+        pdf_file: Archivo PDF de Django, bytes o ruta en disco
+        
+    Yields:
+        tuple: (número de página, lista de líneas)
+    """
+    import io
+    import time
+    import pdfplumber
+    
+    max_paginas, segundos = _limites_pdf()
+    limite = time.monotonic() + segundos if segundos else None
+    with pdfplumber.open(io.BytesIO(leer_bytes_archivo(pdf_file))) as pdf:
+        for numero, pagina in enumerate(pdf.pages[:max_paginas], 1):
+            texto_pagina = pagina.extract_text() or ''
+            yield numero, texto_pagina.splitlines()
+            # Liberar los objetos de la página ya procesada
+            pagina.close()
+            if limite is not None and time.monotonic() > limite:
+                break
 
 
 def procesar_pdf_tarjeta_credito(pdf_file):
     """
     Procesa un PDF de tarjeta de crédito para extraer el total de gastos.
+    Deja de leer páginas en cuanto encuentra el total y el periodo.
     
     Args:
         pdf_file: Archivo PDF de Django con el estado de cuenta
@@ -506,35 +688,10 @@ def procesar_pdf_tarjeta_credito(pdf_file):
         dict: Diccionario con el total extraído y descripción
     """
     try:
-        import pdfplumber
-        import tempfile
-        import os
-        
         if not pdf_file:
             return None
-            
-        # Guardar temporalmente el PDF
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            for chunk in pdf_file.chunks():
-                temp_file.write(chunk)
-            temp_path = temp_file.name
-        
-        # Extraer texto del PDF
-        texto_completo = ""
-        with pdfplumber.open(temp_path) as pdf:
-            for page in pdf.pages:
-                texto_pagina = page.extract_text()
-                if texto_pagina:
-                    texto_completo += texto_pagina + "\n"
-        
-        # Limpiar archivo temporal
-        os.unlink(temp_path)
-        
-        if not texto_completo:
-            return None
-            
-        # Extraer el total del estado de cuenta
-        total_extraido = extraer_total_tarjeta_credito(texto_completo)
+        
+        total_extraido = buscar_total_tarjeta_credito(lineas for _, lineas in paginas_pdf(pdf_file))
         
         if total_extraido:
             return {
@@ -550,6 +707,97 @@ def procesar_pdf_tarjeta_credito(pdf_file):
         return None
 
 
+# Etiquetas del total a pagar y del periodo, en orden de preferencia. Se buscan todas
+# juntas con una sola expresión por línea.
+_MONTO_TARJETA = r'[0-9]{1,3}(?:[.,][0-9]{3})*(?:[.,][0-9]{1,2})?'
+ETIQUETAS_TOTAL_TARJETA = [
+    r'TOTAL\s+A\s+PAGAR',
+    r'SALDO\s+ACTUAL',
+    r'MONTO\s+TOTAL',
+    r'TOTAL\s+FACTURADO',
+    r'PAGO\s+MÍNIMO',
+    r'NUEVO\s+SALDO',
+    r'SALDO\s+PENDIENTE',
+]
+_FECHA_TARJETA = r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}'
+PATRONES_PERIODO_TARJETA = [
+    rf'PERIODO[:\s]*({_FECHA_TARJETA}\s*AL?\s*{_FECHA_TARJETA})',
+    rf'FACTURACIÓN[:\s]*({_FECHA_TARJETA}\s*AL?\s*{_FECHA_TARJETA})',
+    rf'CORTE[:\s]*({_FECHA_TARJETA})',
+]
+_TOTAL_TARJETA = re.compile(
+    '|'.join(rf'(?P<total{i}>{etiqueta})[:\s]*\$?\s*(?P<monto{i}>{_MONTO_TARJETA})'
+             for i, etiqueta in enumerate(ETIQUETAS_TOTAL_TARJETA))
+)
+_PERIODOS_TARJETA = [re.compile(patron) for patron in PATRONES_PERIODO_TARJETA]
+_HAY_ETIQUETA_TARJETA = re.compile(r'TOTAL|SALDO|PAGO|PERIODO|FACTURACIÓN|CORTE')
+
+
+def _monto_tarjeta(monto_str):
+    """Normaliza el monto de un estado de cuenta: el último separador es el decimal"""
+    monto_str = monto_str.replace(',', '.')
+    if monto_str.count('.') > 1:
+        partes = monto_str.split('.')
+        monto_str = ''.join(partes[:-1]) + '.' + partes[-1]
+    return float(monto_str)
+
+
+def buscar_total_tarjeta_credito(paginas):
+    """
+    Busca el total a pagar y el periodo recorriendo las líneas una sola vez.
+    
+    Entre varias etiquetas gana la de mayor preferencia (y, a igual etiqueta, la
+    primera línea). La búsqueda termina al cerrar la página en la que ya se tienen
+    el total y el periodo, sin leer el resto del documento.
+    
+    Args:
+        paginas: Iterable de páginas, cada una un iterable de líneas
+        
+    Returns:
+        dict: Diccionario con monto, periodo y detalles, o None si no hay total
+    """
+    mejor_total = None  # (preferencia, monto, línea)
+    mejor_periodo = None  # (preferencia, periodo)
+    
+    for lineas in paginas:
+        for linea in lineas:
+            linea = linea.upper()
+            if not _HAY_ETIQUETA_TARJETA.search(linea):
+                continue
+            
+            if mejor_total is None or mejor_total[0] > 0:
+                for match in _TOTAL_TARJETA.finditer(linea):
+                    preferencia = next(i for i in range(len(ETIQUETAS_TOTAL_TARJETA)) if match.group(f'total{i}'))
+                    if mejor_total is not None and preferencia >= mejor_total[0]:
+                        continue
+                    try:
+                        monto = _monto_tarjeta(match.group(f'monto{preferencia}'))
+                    except ValueError:
+                        continue
+                    if monto > 0:
+                        mejor_total = (preferencia, monto, linea.strip())
+            
+            if mejor_periodo is None or mejor_periodo[0] > 0:
+                limite = len(_PERIODOS_TARJETA) if mejor_periodo is None else mejor_periodo[0]
+                for preferencia, patron in enumerate(_PERIODOS_TARJETA[:limite]):
+                    match = patron.search(linea)
+                    if match:
+                        mejor_periodo = (preferencia, match.group(1))
+                        break
+        
+        if mejor_total and mejor_periodo:
+            break
+    
+    if mejor_total is None:
+        return None
+    
+    return {
+        'monto': mejor_total[1],
+        'periodo': mejor_periodo[1] if mejor_periodo else 'Periodo no identificado',
+        'detalles': f'Extraído de: {mejor_total[2]}'
+    }
+
+
 def extraer_total_tarjeta_credito(texto):
     """
     Extrae el total a pagar del texto del estado de cuenta de tarjeta de crédito.
@@ -561,67 +809,240 @@ def extraer_total_tarjeta_credito(texto):
         dict: Diccionario con monto y detalles extraídos
     """
     try:
-        # Normalizar texto
-        texto = texto.upper()
-        lineas = texto.split('\n')
-        
-        # Patrones para buscar el total a pagar
-        patrones_total = [
-            r'TOTAL\s+A\s+PAGAR[:\s]*\$?\s*([0-9]{1,3}(?:[.,][0-9]{3})*(?:[.,][0-9]{1,2})?)',
-            r'SALDO\s+ACTUAL[:\s]*\$?\s*([0-9]{1,3}(?:[.,][0-9]{3})*(?:[.,][0-9]{1,2})?)',
-            r'MONTO\s+TOTAL[:\s]*\$?\s*([0-9]{1,3}(?:[.,][0-9]{3})*(?:[.,][0-9]{1,2})?)',
-            r'TOTAL\s+FACTURADO[:\s]*\$?\s*([0-9]{1,3}(?:[.,][0-9]{3})*(?:[.,][0-9]{1,2})?)',
-            r'PAGO\s+MÍNIMO[:\s]*\$?\s*([0-9]{1,3}(?:[.,][0-9]{3})*(?:[.,][0-9]{1,2})?)',
-            r'NUEVO\s+SALDO[:\s]*\$?\s*([0-9]{1,3}(?:[.,][0-9]{3})*(?:[.,][0-9]{1,2})?)',
-            r'SALDO\s+PENDIENTE[:\s]*\$?\s*([0-9]{1,3}(?:[.,][0-9]{3})*(?:[.,][0-9]{1,2})?)',
-        ]
+        return buscar_total_tarjeta_credito([texto.split('\n')])
+    except Exception as e:
+        print(f"Error extrayendo total: {e}")
+        return None
+
+
+# Movimientos de un resumen de tarjeta: una fila por compra con fecha al inicio, comercio,
+# cuota opcional ("C.02/06", "CUOTA 2/6", "02/06") y monto al final en formato 1.234,56.
+_FECHA_MOVIMIENTO = re.compile(
+    r'^(?P<dia>\d{1,2})[-/.\s](?P<mes>\d{1,2}|[A-Za-zé]{3,10})\.?[-/.\s](?P<año>\d{2}|\d{4})\s+'
+)
+_MONTO_MOVIMIENTO = re.compile(r'(?P<negativo>-)?(?P<monto>\d{1,3}(?:\.\d{3})*,\d{2})(?P<negativo_final>-)?$')
+_CUOTA_MOVIMIENTO = re.compile(r'(?:\bC\.?\s*|\bCUOTA\s*|(?<![\d/])(?=\d{1,2}/\d{1,2}\b))(?P<cuota>\d{1,2})/(?P<cuotas>\d{1,2})\b', re.IGNORECASE)
+_MONEDA_DOLAR = re.compile(r'\b(?:USD|U\$S|US\$)', re.IGNORECASE)
+_COMPROBANTE_MOVIMIENTO = re.compile(r'\b\d{5,}\b')
+_MOVIMIENTOS_EXCLUIDOS = re.compile(r'SU PAGO|PAGO EN PESOS|PAGO EN DOLARES|BONIF|DEVOLUCION|IMPUESTO|PERCEPCION|INTERESES', re.IGNORECASE)
+
+MESES_ABREVIADOS = {
+    'ene': 1, 'feb': 2, 'mar': 3, 'abr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'ago': 8, 'sep': 9, 'set': 9, 'oct': 10, 'nov': 11, 'dic': 12,
+}
+
+PAGINAS_MINIMAS_PARALELO = 6  # Con menos páginas no conviene levantar procesos
+
+
+def extraer_movimiento_tarjeta(linea):
+    """
+    Interpreta una fila de movimiento de un resumen de tarjeta.
+    
+    Args:
+        linea: Línea de texto del PDF
         
-        # Buscar periodo de facturación
-        periodo = None
-        patrones_periodo = [
-            r'PERIODO[:\s]*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\s*AL?\s*\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'FACTURACIÓN[:\s]*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\s*AL?\s*\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'CORTE[:\s]*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-        ]
+    Returns:
+        dict: fecha, comercio, cuota, cuotas, monto y moneda ('ARS' o 'USD'),
+        o None si la línea no es una compra
+    """
+    linea = ' '.join(linea.split())
+    match_fecha = _FECHA_MOVIMIENTO.match(linea)
+    if not match_fecha or _MOVIMIENTOS_EXCLUIDOS.search(linea):
+        return None
+    
+    resto = linea[match_fecha.end():]
+    partes = resto.rsplit(' ', 1)
+    if len(partes) != 2:
+        return None
+    detalle, monto_str = partes
+    match_monto = _MONTO_MOVIMIENTO.match(monto_str)
+    if not match_monto or match_monto.group('negativo') or match_monto.group('negativo_final'):
+        # Sin monto o con monto negativo (pagos, devoluciones): no es un gasto
+        return None
+    
+    mes = match_fecha.group('mes')
+    mes = int(mes) if mes.isdigit() else MESES_ABREVIADOS.get(mes[:3].lower())
+    año = int(match_fecha.group('año'))
+    if año < 100:
+        año += 2000
+    try:
+        fecha = date(año, mes, int(match_fecha.group('dia')))
+    except (TypeError, ValueError):
+        return None
+    
+    cuota = cuotas = None
+    match_cuota = _CUOTA_MOVIMIENTO.search(detalle)
+    if match_cuota and 0 < int(match_cuota.group('cuota')) <= int(match_cuota.group('cuotas')):
+        cuota, cuotas = int(match_cuota.group('cuota')), int(match_cuota.group('cuotas'))
+        detalle = detalle[:match_cuota.start()] + detalle[match_cuota.end():]
+    
+    moneda = 'USD' if _MONEDA_DOLAR.search(detalle) else 'ARS'
+    comercio = _MONEDA_DOLAR.sub('', detalle)
+    comercio = _COMPROBANTE_MOVIMIENTO.sub('', comercio)
+    comercio = ' '.join(comercio.replace('*', ' ').split())
+    if not comercio:
+        return None
+    
+    return {
+        'fecha': fecha,
+        'comercio': comercio,
+        'cuota': cuota,
+        'cuotas': cuotas,
+        'monto': float(match_monto.group('monto').replace('.', '').replace(',', '.')),
+        'moneda': moneda,
+    }
+
+
+def _extraer_rango_paginas(datos, desde, hasta, limite=None):
+    """
+    Extrae el texto de las páginas [desde, hasta) de un PDF. Corre en los procesos del pool.
+    
+    Args:
+        limite: Hora (time.time()) pasada la cual se deja de leer con PDFDemasiadoLargo
+    
+    Returns:
+        list: Tuplas (número de página, líneas, segundos)
+    """
+    import io
+    import time
+    import pdfplumber
+    
+    resultado = []
+    with pdfplumber.open(io.BytesIO(datos)) as pdf:
+        for indice in range(desde, hasta):
+            inicio = time.perf_counter()
+            pagina = pdf.pages[indice]
+            lineas = (pagina.extract_text() or '').splitlines()
+            pagina.close()
+            resultado.append((indice + 1, lineas, time.perf_counter() - inicio))
+            if limite is not None and indice + 1 < hasta and time.time() > limite:
+                raise PDFDemasiadoLargo('La lectura del PDF superó el tiempo máximo permitido')
+    return resultado
+
+
+def _procesos_pdf():
+    try:
+        from django.conf import settings
+        return getattr(settings, 'PDF_PROCESOS', None) or min(4, os.cpu_count() or 1)
+    except Exception:
+        return min(4, os.cpu_count() or 1)
+
+
+_pool_pdf = None
+_pool_pdf_lock = threading.Lock()
+
+
+def obtener_pool_pdf():
+    """Pool de procesos para extraer páginas, creado en el primer uso y compartido por todas las subidas"""
+    global _pool_pdf
+    with _pool_pdf_lock:
+        if _pool_pdf is None:
+            from concurrent.futures import ProcessPoolExecutor
+            _pool_pdf = ProcessPoolExecutor(max_workers=_procesos_pdf())
+        return _pool_pdf
+
+
+def _reiniciar_pool_pdf():
+    global _pool_pdf
+    with _pool_pdf_lock:
+        if _pool_pdf is not None:
+            _pool_pdf.shutdown(wait=False, cancel_futures=True)
+        _pool_pdf = None
+
+
+def extraer_paginas_pdf(datos, procesos=None):
+    """
+    Extrae el texto de todas las páginas de un PDF, repartiendo rangos contiguos de
+    páginas entre procesos cuando el documento es largo. Los PDFs de más de
+    settings.PDF_MAX_PAGINAS páginas, o cuya lectura supera settings.PDF_SEGUNDOS_MAXIMOS,
+    se rechazan con PDFDemasiadoLargo.
+    
+    Args:
+        datos: Contenido del PDF
+        procesos: En cuántos rangos repartir las páginas entre los procesos del pool
+            compartido (por defecto settings.PDF_PROCESOS, el tamaño del pool)
         
-        for patron in patrones_periodo:
-            for linea in lineas:
-                match = re.search(patron, linea)
-                if match:
-                    periodo = match.group(1)
-                    break
-            if periodo:
-                break
+    Returns:
+        list: Tuplas (número de página, líneas, segundos) en orden
+    """
+    import io
+    import time
+    import pdfplumber
+    
+    with pdfplumber.open(io.BytesIO(datos)) as pdf:
+        cantidad = len(pdf.pages)
+    
+    max_paginas, segundos = _limites_pdf()
+    if cantidad > max_paginas:
+        raise PDFDemasiadoLargo(f'El PDF tiene {cantidad} páginas; se aceptan hasta {max_paginas}')
+    limite = time.time() + segundos if segundos else None
+    
+    procesos = min(procesos or _procesos_pdf(), cantidad)
+    if procesos <= 1 or cantidad < PAGINAS_MINIMAS_PARALELO:
+        return _extraer_rango_paginas(datos, 0, cantidad, limite)
+    
+    from concurrent.futures.process import BrokenProcessPool
+    tamaño = -(-cantidad // procesos)
+    rangos = [(desde, min(desde + tamaño, cantidad)) for desde in range(0, cantidad, tamaño)]
+    try:
+        partes = list(obtener_pool_pdf().map(
+            _extraer_rango_paginas, [datos] * len(rangos), *zip(*rangos), [limite] * len(rangos)
+        ))
+    except BrokenProcessPool:
+        # Murió un proceso (p. ej. sin memoria): el próximo PDF usa un pool nuevo
+        _reiniciar_pool_pdf()
+        raise
+    return [pagina for parte in partes for pagina in parte]
+
+
+def procesar_movimientos_tarjeta(pdf_file, procesos=None):
+    """
+    Procesa un resumen de tarjeta completo: extrae las páginas en paralelo y devuelve
+    cada compra, el total a pagar y el tiempo de cada página.
+    
+    Args:
+        pdf_file: Archivo PDF de Django con el estado de cuenta
+        procesos: Cantidad de procesos para extraer las páginas (por defecto settings.PDF_PROCESOS)
+        
+    Returns:
+        dict: 'movimientos' (lista de compras con su página), 'total' (como
+        extraer_total_tarjeta_credito, o None), 'paginas' (número, movimientos y
+        segundos de cada página) y 'segundos' (tiempo total), o None si falla
+        
+    Raises:
+        PDFDemasiadoLargo: Si el PDF excede las páginas o el tiempo permitidos
+    """
+    import time
+    
+    try:
+        if not pdf_file:
+            return None
+        
+        inicio = time.perf_counter()
+        paginas = extraer_paginas_pdf(leer_bytes_archivo(pdf_file), procesos)
         
-        # Buscar el total
-        for patron in patrones_total:
+        movimientos = []
+        resumen_paginas = []
+        for numero, lineas, segundos in paginas:
+            encontrados = 0
             for linea in lineas:
-                match = re.search(patron, linea)
-                if match:
-                    monto_str = match.group(1)
-                    
-                    # Convertir a decimal
-                    try:
-                        # Normalizar formato de número
-                        monto_str = monto_str.replace(',', '.')
-                        # Si tiene más de un punto, el último es decimal
-                        if monto_str.count('.') > 1:
-                            partes = monto_str.split('.')
-                            monto_str = ''.join(partes[:-1]) + '.' + partes[-1]
-                        
-                        monto = float(monto_str)
-                        
-                        if monto > 0:
-                            return {
-                                'monto': monto,
-                                'periodo': periodo or 'Periodo no identificado',
-                                'detalles': f'Extraído de: {linea.strip()}'
-                            }
-                    except (ValueError, InvalidOperation):
-                        continue
+                movimiento = extraer_movimiento_tarjeta(linea)
+                if movimiento:
+                    movimiento['pagina'] = numero
+                    movimientos.append(movimiento)
+                    encontrados += 1
+            resumen_paginas.append({'pagina': numero, 'movimientos': encontrados, 'segundos': round(segundos, 4)})
         
-        return None
+        return {
+            'movimientos': movimientos,
+            'total': buscar_total_tarjeta_credito(lineas for _, lineas, _ in paginas),
+            'paginas': resumen_paginas,
+            'segundos': round(time.perf_counter() - inicio, 4),
+        }
         
+    except PDFDemasiadoLargo:
+        # El motivo se le muestra al usuario en lugar de un "no se pudo extraer"
+        raise
     except Exception as e:
-        print(f"Error extrayendo total: {e}")
-        return None
\ No newline at end of file
+        print(f"Error procesando movimientos del PDF: {e}")
+        return None
@@ -1,25 +1,27 @@
 from django.contrib.auth.models import User
-from django.db.models import Sum, Avg
-from .models import MetaAhorro, Gasto, PerfilUsuario
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum, Avg
+from .models import MetaAhorro, Gasto, PerfilUsuario, VersionDatos
+from .signals import metas_vencidas
 from datetime import datetime, date, timedelta
 from decimal import Decimal
 
 
-def calcular_capacidad_ahorro_usuario(usuario):
+def calcular_capacidad_ahorro_usuario(usuario, perfil=None):
     """Calcula la capacidad de ahorro mensual del usuario basada en su historial"""
     try:
-        perfil = PerfilUsuario.objects.get(user=usuario)
+        perfil = perfil or PerfilUsuario.objects.get(user=usuario)
         
-        # Obtener gastos de los últimos 3 meses para calcular promedio
+        # Obtener gastos de los últimos 3 meses para calcular promedio (total y cantidad en una consulta)
         hace_3_meses = datetime.now() - timedelta(days=90)
         gastos_recientes = Gasto.objects.filter(
             usuario=usuario,
             fecha__gte=hace_3_meses
-        )
+        ).aggregate(total=Sum('monto'), cantidad=Count('id'))
         
-        if gastos_recientes.exists():
+        if gastos_recientes['cantidad']:
             # Calcular promedio mensual de gastos
-            total_gastos = gastos_recientes.aggregate(Sum('monto'))['monto__sum'] or 0
+            total_gastos = gastos_recientes['total'] or 0
             promedio_mensual_gastos = total_gastos / Decimal('3')
         else:
             # Si no hay historial, usar 70% del salario como estimación conservadora
@@ -35,9 +37,39 @@ def calcular_capacidad_ahorro_usuario(usuario):
         return Decimal('0')
 
 
-def calcular_recomendacion_ahorro_inteligente(meta_ahorro, usuario):
+class ResumenAhorro:
+    """
+    Datos de ahorro de un usuario consultados una sola vez por request.
+
+    Junta los totales de todas sus metas (una consulta con agregación condicional),
+    las metas activas, el perfil y la capacidad de ahorro; las funciones de este módulo
+    (y pronostico_ahorro) lo reciben como `resumen` para no repetir esas consultas.
+    """
+    
+    def __init__(self, usuario):
+        self.usuario = usuario
+        self.totales = MetaAhorro.objects.filter(usuario=usuario).aggregate(
+            total_metas=Count('id'),
+            metas_activas=Count('id', filter=Q(estado='activa')),
+            metas_completadas=Count('id', filter=Q(estado='completada')),
+            monto_total_objetivos=Sum('monto_objetivo'),
+            monto_total_ahorrado=Sum('monto_ahorrado'),
+        )
+        self.metas_activas = list(
+            MetaAhorro.objects.filter(usuario=usuario, estado='activa').order_by('fecha_objetivo')
+        )
+        self.perfil = PerfilUsuario.objects.filter(user=usuario).first()
+        self.capacidad_ahorro = (
+            calcular_capacidad_ahorro_usuario(usuario, self.perfil) if self.perfil else Decimal('0')
+        )
+
+
+def calcular_recomendacion_ahorro_inteligente(meta_ahorro, usuario, resumen=None):
     """Calcula una recomendación de ahorro inteligente basada en la capacidad del usuario"""
-    capacidad_ahorro = calcular_capacidad_ahorro_usuario(usuario)
+    if resumen is not None:
+        capacidad_ahorro = resumen.capacidad_ahorro
+    else:
+        capacidad_ahorro = calcular_capacidad_ahorro_usuario(usuario)
     recomendacion_basica = meta_ahorro.ahorro_mensual_recomendado
     
     # Si la recomendación básica excede la capacidad, ajustar
@@ -69,23 +101,24 @@ def calcular_recomendacion_ahorro_inteligente(meta_ahorro, usuario):
         }
 
 
-def obtener_estadisticas_ahorro_usuario(usuario):
+def obtener_estadisticas_ahorro_usuario(usuario, resumen=None):
     """Obtiene estadísticas completas de ahorro del usuario"""
-    metas = MetaAhorro.objects.filter(usuario=usuario)
+    resumen = resumen or ResumenAhorro(usuario)
+    totales = resumen.totales
     
     estadisticas = {
-        'total_metas': metas.count(),
-        'metas_activas': metas.filter(estado='activa').count(),
-        'metas_completadas': metas.filter(estado='completada').count(),
-        'monto_total_objetivos': metas.aggregate(Sum('monto_objetivo'))['monto_objetivo__sum'] or 0,
-        'monto_total_ahorrado': metas.aggregate(Sum('monto_ahorrado'))['monto_ahorrado__sum'] or 0,
-        'capacidad_ahorro_mensual': calcular_capacidad_ahorro_usuario(usuario),
+        'total_metas': totales['total_metas'],
+        'metas_activas': totales['metas_activas'],
+        'metas_completadas': totales['metas_completadas'],
+        'monto_total_objetivos': totales['monto_total_objetivos'] or 0,
+        'monto_total_ahorrado': totales['monto_total_ahorrado'] or 0,
+        'capacidad_ahorro_mensual': resumen.capacidad_ahorro,
         'metas_con_recomendaciones': []
     }
     
     # Agregar recomendaciones para cada meta activa
-    for meta in metas.filter(estado='activa'):
-        recomendacion = calcular_recomendacion_ahorro_inteligente(meta, usuario)
+    for meta in resumen.metas_activas:
+        recomendacion = calcular_recomendacion_ahorro_inteligente(meta, usuario, resumen)
         estadisticas['metas_con_recomendaciones'].append({
             'meta': meta,
             'recomendacion': recomendacion
@@ -94,25 +127,47 @@ def obtener_estadisticas_ahorro_usuario(usuario):
     return estadisticas
 
 
-def verificar_metas_vencidas(usuario):
-    """Verifica y actualiza el estado de metas vencidas"""
-    metas_activas = MetaAhorro.objects.filter(usuario=usuario, estado='activa')
-    metas_actualizadas = []
+def vencer_metas_ahorro(fecha=None, usuario=None):
+    """
+    Cancela con un solo UPDATE las metas activas cuya fecha objetivo pasó sin completarse.
+
+    Args:
+        fecha: Día de referencia; vencen las metas con fecha objetivo anterior (por defecto, hoy)
+        usuario: Limitar a las metas de un usuario (por defecto, las de todos)
+
+    Returns:
+        list: Metas canceladas, que también se envían con la señal metas_vencidas
+    """
+    vencidas = MetaAhorro.objects.filter(
+        estado='activa',
+        fecha_objetivo__lt=fecha or date.today(),
+        monto_ahorrado__lt=F('monto_objetivo')
+    )
+    if usuario is not None:
+        vencidas = vencidas.filter(usuario=usuario)
     
-    for meta in metas_activas:
-        if meta.esta_vencida:
-            meta.estado = 'cancelada'
-            meta.save()
-            metas_actualizadas.append(meta)
+    with transaction.atomic():
+        # Bloquear las filas para que el UPDATE cancele exactamente las metas leídas
+        metas = list(vencidas.select_for_update())
+        if metas:
+            vencidas.update(estado='cancelada')
+            VersionDatos.incrementar(meta.usuario_id for meta in metas)
     
-    return metas_actualizadas
+    for meta in metas:
+        meta.estado = 'cancelada'
+    if metas:
+        metas_vencidas.send(sender=MetaAhorro, metas=metas)
+    return metas
 
 
-def calcular_progreso_general_ahorro(usuario):
+def calcular_progreso_general_ahorro(usuario, resumen=None):
     """Calcula el progreso general de ahorro del usuario"""
-    metas_activas = MetaAhorro.objects.filter(usuario=usuario, estado='activa')
+    if resumen is not None:
+        metas_activas = resumen.metas_activas
+    else:
+        metas_activas = list(MetaAhorro.objects.filter(usuario=usuario, estado='activa'))
     
-    if not metas_activas.exists():
+    if not metas_activas:
         return {
             'progreso_promedio': 0,
             'total_ahorrado': 0,
@@ -145,9 +200,10 @@ def calcular_progreso_general_ahorro(usuario):
     }
 
 
-def generar_consejos_ahorro(usuario):
+def generar_consejos_ahorro(usuario, resumen=None):
     """Genera consejos personalizados de ahorro basados en el perfil del usuario"""
-    estadisticas = obtener_estadisticas_ahorro_usuario(usuario)
+    resumen = resumen or ResumenAhorro(usuario)
+    estadisticas = obtener_estadisticas_ahorro_usuario(usuario, resumen)
     consejos = []
     
     # Consejo basado en capacidad de ahorro
@@ -179,7 +235,7 @@ def generar_consejos_ahorro(usuario):
         })
     
     # Consejo basado en progreso
-    progreso = calcular_progreso_general_ahorro(usuario)
+    progreso = calcular_progreso_general_ahorro(usuario, resumen)
     if progreso['metas_en_riesgo'] > 0:
         consejos.append({
             'tipo': 'warning',
@@ -1,17 +1,31 @@
-from django.db.models import Sum
-from django.contrib.auth.models import User
-from decimal import Decimal
+"""
+Estadísticas mensuales de gastos por usuario.
+
+Se guardan en EstadisticaMensual al cerrar cada mes y se leen con una consulta sobre
+el índice (usuario, año, mes). Los archivos estadisticas/estadisticas_<año>_<mes>.json
+que se usaban antes quedan solo como formato de exportación; los existentes se
+importan a la base con `python manage.py importar_estadisticas_json`.
+"""
+from decimal import Decimal, InvalidOperation
 from datetime import datetime
 import calendar
 import json
 import os
 
-def guardar_estadisticas_mensuales():
+DIRECTORIO_JSON = 'estadisticas'
+
+
+def guardar_estadisticas_mensuales(exportar_json=False):
     """
-    Guarda las estadísticas de gastos del mes anterior en un archivo JSON
-    y elimina los gastos de ese mes.
+    Guarda las estadísticas de gastos del mes anterior y elimina los gastos de ese mes.
+    
+    Args:
+        exportar_json: Además, escribir el archivo JSON del mes en DIRECTORIO_JSON
+        
+    Returns:
+        CierreMensual: Registro del cierre
     """
-    from .models import Gasto
+    from .models import EstadisticaMensual
     
     # Obtener el mes anterior
     fecha_actual = datetime.now()
@@ -22,84 +36,103 @@ def guardar_estadisticas_mensuales():
         mes = fecha_actual.month - 1
         año = fecha_actual.year
     
-    # Obtener el primer y último día del mes
-    ultimo_dia = calendar.monthrange(año, mes)[1]
-    inicio_mes = datetime(año, mes, 1, 0, 0, 0)
-    fin_mes = datetime(año, mes, ultimo_dia, 23, 59, 59)
+    cierre = EstadisticaMensual.guardar_estadisticas_y_limpiar(año, mes)
+    if exportar_json:
+        exportar_estadisticas_json(año, mes)
+    return cierre
+
+
+def obtener_estadisticas_mensuales(usuario, año=None, mes=None):
+    """
+    Obtiene las estadísticas mensuales para un usuario específico.
+    Si no se especifica año y mes, devuelve todas las estadísticas disponibles.
     
-    # Directorio para guardar estadísticas
-    directorio = os.path.join('estadisticas')
-    if not os.path.exists(directorio):
-        os.makedirs(directorio)
+    Returns:
+        list: Diccionarios con total_gastos, año, mes y nombre_mes, del más reciente al más antiguo
+    """
+    from .models import EstadisticaMensual
     
-    # Procesar cada usuario
-    estadisticas = {}
+    estadisticas = EstadisticaMensual.objects.filter(usuario=usuario)
+    if año is not None:
+        estadisticas = estadisticas.filter(año=año)
+    if mes is not None:
+        estadisticas = estadisticas.filter(mes=mes)
     
-    for usuario in User.objects.all():
-        # Obtener todos los gastos del mes para este usuario
-        gastos_mes = Gasto.objects.filter(
-            usuario=usuario,
-            fecha__gte=inicio_mes,
-            fecha__lte=fin_mes
+    return [
+        {
+            'total_gastos': float(total_gastos),
+            'año': año_estadistica,
+            'mes': mes_estadistica,
+            'nombre_mes': calendar.month_name[mes_estadistica],
+        }
+        for año_estadistica, mes_estadistica, total_gastos in estadisticas.order_by('-año', '-mes').values_list(
+            'año', 'mes', 'total_gastos'
         )
-        
-        # Calcular el total de gastos
-        total = gastos_mes.aggregate(total=Sum('monto'))['total'] or Decimal('0')
-        
-        # Guardar la estadística mensual
-        estadisticas[usuario.username] = {
-            'total_gastos': float(total),
+    ]
+
+
+def exportar_estadisticas_json(año, mes, directorio=DIRECTORIO_JSON):
+    """
+    Escribe las estadísticas de un mes en estadisticas_<año>_<mes>.json, con el mismo
+    formato que los archivos históricos (un objeto por nombre de usuario).
+    
+    Returns:
+        str: Ruta del archivo escrito
+    """
+    from .models import EstadisticaMensual
+    
+    os.makedirs(directorio, exist_ok=True)
+    estadisticas = {
+        username: {
+            'total_gastos': float(total_gastos),
             'año': año,
             'mes': mes,
             'nombre_mes': calendar.month_name[mes]
         }
-        
-        # Eliminar los gastos del mes
-        gastos_mes.delete()
-    
-    # Guardar estadísticas en archivo JSON
-    nombre_archivo = f"estadisticas_{año}_{mes}.json"
-    ruta_archivo = os.path.join(directorio, nombre_archivo)
+        for username, total_gastos in EstadisticaMensual.objects.filter(año=año, mes=mes)
+        .order_by('usuario__username').values_list('usuario__username', 'total_gastos')
+    }
     
+    ruta_archivo = os.path.join(directorio, f"estadisticas_{año}_{mes}.json")
     with open(ruta_archivo, 'w') as f:
         json.dump(estadisticas, f, indent=4)
-    
-    return estadisticas
+    return ruta_archivo
 
-def obtener_estadisticas_mensuales(usuario, año=None, mes=None):
-    """
-    Obtiene las estadísticas mensuales para un usuario específico.
-    Si no se especifica año y mes, devuelve todas las estadísticas disponibles.
+
+def leer_estadisticas_json(ruta_archivo):
     """
-    directorio = os.path.join('estadisticas')
-    if not os.path.exists(directorio):
-        return []
+    Lee un archivo estadisticas_<año>_<mes>.json.
     
-    estadisticas = []
+    Returns:
+        tuple: (año, mes, {username: total_gastos como Decimal})
+        
+    Raises:
+        ValueError: Si el nombre o el contenido del archivo no tienen el formato esperado
+    """
+    nombre = os.path.basename(ruta_archivo)
+    if not (nombre.startswith('estadisticas_') and nombre.endswith('.json')):
+        raise ValueError(f'Nombre de archivo inesperado: {nombre}')
+    partes = nombre[len('estadisticas_'):-len('.json')].split('_')
+    if len(partes) != 2:
+        raise ValueError(f'Nombre de archivo inesperado: {nombre}')
+    año, mes = int(partes[0]), int(partes[1])
+    if not 1 <= mes <= 12:
+        raise ValueError(f'Mes inválido en {nombre}')
     
-    # Listar todos los archivos de estadísticas
-    for archivo in os.listdir(directorio):
-        if archivo.startswith('estadisticas_') and archivo.endswith('.json'):
-            try:
-                with open(os.path.join(directorio, archivo), 'r') as f:
-                    datos = json.load(f)
-                
-                # Extraer año y mes del nombre del archivo
-                partes = archivo.replace('estadisticas_', '').replace('.json', '').split('_')
-                año_archivo = int(partes[0])
-                mes_archivo = int(partes[1])
-                
-                # Filtrar por año y mes si se especifican
-                if (año is None or año_archivo == año) and (mes is None or mes_archivo == mes):
-                    # Obtener estadísticas del usuario
-                    if usuario.username in datos:
-                        estadistica = datos[usuario.username]
-                        estadistica['año'] = año_archivo
-                        estadistica['mes'] = mes_archivo
-                        estadisticas.append(estadistica)
-            except:
-                # Ignorar archivos con formato incorrecto
-                pass
+    with open(ruta_archivo, 'r') as f:
+        datos = json.load(f)
+    if not isinstance(datos, dict):
+        raise ValueError(f'Contenido inesperado en {nombre}')
     
-    # Ordenar por año y mes (más reciente primero)
-    return sorted(estadisticas, key=lambda x: (x['año'], x['mes']), reverse=True)
\ No newline at end of file
+    totales = {}
+    for username, estadistica in datos.items():
+        if not isinstance(estadistica, dict):
+            continue
+        try:
+            total = Decimal(str(estadistica.get('total_gastos') or 0))
+        except (InvalidOperation, TypeError):
+            total = None
+        if total is None or not total.is_finite():
+            raise ValueError(f'Total inválido para {username} en {nombre}')
+        totales[username] = total
+    return año, mes, totales
@@ -1,22 +1,27 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.forms import UserCreationForm
-from django.contrib.auth.views import LoginView
+from django.contrib.auth.views import LoginView, redirect_to_login
 from .forms import RegistroForm, BootstrapAuthenticationForm
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from django.db.models import Sum, Q
-from django.db import models
-from django.db.models.functions import TruncMonth
-from django.core.paginator import Paginator
-from .models import Gasto, PerfilUsuario, GastoFijo, Vencimiento, MetaAhorro
+from django.db import models, transaction
+from .models import Gasto, PerfilUsuario, GastoFijo, Vencimiento, MetaAhorro, BalanceMensual, BalanceDiario, TrabajoOCR
 from .forms import GastoForm, PerfilUsuarioForm, SalarioForm, GastoFijoForm, VencimientoForm
 from .forms_ahorro import MetaAhorroForm, AgregarAhorroForm, EditarMetaForm
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
 from decimal import Decimal
 import json
-from .utils import extraer_datos_imagen, procesar_historial_mercadopago
+from .tasks_ocr import crear_trabajo, puede_encolar
+from .importacion import filas_resumen_tarjeta, importar_gastos, normalizar_fila
+from .paginacion import paginar_gastos
 from .utils_estadisticas import guardar_estadisticas_mensuales, obtener_estadisticas_mensuales
 from django.contrib.admin.views.decorators import staff_member_required
 
@@ -28,19 +33,82 @@ def estadisticas_mensuales(request):
         'estadisticas': estadisticas
     })
 
+@login_required
+def historial_archivado(request):
+    """
+    Consultas JSON sobre los gastos de meses cerrados (archivo columnar): desglose
+    del año (?año=2025) y búsqueda por descripción (?q=texto)
+    """
+    from .archivo_gastos import buscar_gastos, meses_archivados, resumen_anual
+    
+    meses = meses_archivados()
+    if not meses:
+        return JsonResponse({'meses': [], 'resumen': None, 'resultados': []})
+    
+    try:
+        año = int(request.GET.get('año') or meses[-1][0])
+    except ValueError:
+        return JsonResponse({'error': 'Año inválido'}, status=400)
+    
+    texto = request.GET.get('q', '').strip()
+    resultados = []
+    if texto:
+        resultados = sorted(buscar_gastos(request.user.id, texto, año), key=lambda g: g['fecha'], reverse=True)
+    
+    return JsonResponse({
+        'meses': [f'{año_mes:04d}-{mes:02d}' for año_mes, mes in meses],
+        'resumen': resumen_anual(request.user.id, año),
+        'resultados': resultados[:200],
+    })
+
 @staff_member_required
 def ejecutar_limpieza_mensual(request):
     """Vista para ejecutar manualmente la limpieza de gastos mensuales"""
     if request.method == 'POST':
-        estadisticas = guardar_estadisticas_mensuales()
+        guardar_estadisticas_mensuales()
         messages.success(request, 'Se han guardado las estadísticas y limpiado los gastos del mes anterior.')
         return redirect('estadisticas_mensuales')
     return render(request, 'gastitos/confirmar_limpieza.html')
 
+@staff_member_required
+def estadisticas_cache_vistas(request):
+    """Aciertos y fallos de la caché de contexto de dashboard y modo ahorro en este proceso"""
+    return JsonResponse({'vistas': estadisticas_cache()})
+
+def instrumentacion(request):
+    """
+    Mediciones por vista (solicitudes, p50/p95, consultas, tiempo en SQL y en plantillas)
+    en JSON, o en el formato de texto de Prometheus con ?formato=prometheus. Requiere
+    staff o el encabezado `Authorization: Bearer <INSTRUMENTACION_TOKEN>`.
+    """
+    from django.conf import settings
+    from django.utils.crypto import constant_time_compare
+    from . import instrumentacion as medicion
+    
+    token = settings.INSTRUMENTACION_TOKEN
+    con_token = bool(token) and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not con_token and not (request.user.is_active and request.user.is_staff):
+        if request.user.is_authenticated:
+            return HttpResponseForbidden()
+        return redirect_to_login(request.get_full_path(), reverse('admin:login'))
+    
+    if request.GET.get('formato') == 'prometheus':
+        return HttpResponse(
+            medicion.formato_prometheus(estadisticas_cache()),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
+    return JsonResponse({
+        'max_muestras': medicion.MAX_MUESTRAS,
+        'vistas': medicion.resumen(),
+        'cache_vistas': estadisticas_cache(),
+    })
+
+from .cache_vistas import contexto_en_cache, estadisticas_cache
+from .pronostico_ahorro import pronosticar_metas
 from .utils_ahorro import (
+    ResumenAhorro,
     obtener_estadisticas_ahorro_usuario,
     calcular_recomendacion_ahorro_inteligente,
-    verificar_metas_vencidas,
     generar_consejos_ahorro
 )
 
@@ -95,27 +163,36 @@ def agregar_gasto_calendario(request):
 @login_required
 def modo_ahorro(request):
     """Vista principal del modo ahorro"""
-    # Verificar metas vencidas
-    verificar_metas_vencidas(request.user)
+    # Solo lee (las metas vencidas las cancela la tarea diaria vencimiento_metas), así que el
+    # contexto se cachea hasta que cambien los datos del usuario
+    context = {
+        **contexto_en_cache('modo_ahorro', request.user, lambda: _contexto_modo_ahorro(request.user)),
+        'form_nueva_meta': MetaAhorroForm(),
+        'form_agregar_ahorro': AgregarAhorroForm()
+    }
     
-    # Obtener estadísticas y datos (se recalculan automáticamente)
-    estadisticas = obtener_estadisticas_ahorro_usuario(request.user)
-    consejos = generar_consejos_ahorro(request.user)
+    return render(request, 'gastitos/modo_ahorro.html', context)
+
+
+def _contexto_modo_ahorro(usuario):
+    # Estadísticas, consejos y metas activas salen del mismo resumen (se consulta una vez)
+    resumen = ResumenAhorro(usuario)
+    estadisticas = obtener_estadisticas_ahorro_usuario(usuario, resumen)
+    consejos = generar_consejos_ahorro(usuario, resumen)
     
-    # Obtener metas del usuario
-    metas_activas = MetaAhorro.objects.filter(usuario=request.user, estado='activa').order_by('fecha_objetivo')
-    metas_completadas = MetaAhorro.objects.filter(usuario=request.user, estado='completada').order_by('-fecha_creacion')[:5]
+    # Obtener metas del usuario, con el pronóstico de cumplimiento de cada una
+    metas_activas = resumen.metas_activas
+    pronosticos = pronosticar_metas(usuario, resumen)
+    for meta in metas_activas:
+        meta.pronostico = pronosticos.get(meta.id)
+    metas_completadas = MetaAhorro.objects.filter(usuario=usuario, estado='completada').order_by('-fecha_creacion')[:5]
     
-    context = {
+    return {
         'estadisticas': estadisticas,
         'consejos': consejos,
         'metas_activas': metas_activas,
-        'metas_completadas': metas_completadas,
-        'form_nueva_meta': MetaAhorroForm(),
-        'form_agregar_ahorro': AgregarAhorroForm()
+        'metas_completadas': list(metas_completadas),
     }
-    
-    return render(request, 'gastitos/modo_ahorro.html', context)
 
 
 @login_required
@@ -143,6 +220,7 @@ def detalle_meta(request, meta_id):
     """Vista de detalle de una meta específica"""
     meta = get_object_or_404(MetaAhorro, id=meta_id, usuario=request.user)
     recomendacion = calcular_recomendacion_ahorro_inteligente(meta, request.user)
+    pronostico = pronosticar_metas(request.user).get(meta.id) if meta.estado == 'activa' else None
     
     # Formulario para agregar ahorro
     form_agregar = AgregarAhorroForm()
@@ -165,6 +243,7 @@ def detalle_meta(request, meta_id):
     context = {
         'meta': meta,
         'recomendacion': recomendacion,
+        'pronostico': pronostico,
         'form_agregar': form_agregar
     }
     
@@ -303,6 +382,143 @@ def agregar_vencimiento(request):
     
     return JsonResponse({'success': False, 'error': 'Método no permitido'})
 
+def _trabajo_ocr_json(trabajo):
+    """Representación JSON de un trabajo OCR para el polling del cliente"""
+    return {
+        'id': trabajo.id,
+        'tipo': trabajo.tipo,
+        'estado': trabajo.estado,
+        'terminado': trabajo.esta_terminado,
+        'resultado': trabajo.resultado,
+        'error': trabajo.error,
+        'duracion': trabajo.duracion,
+        'estado_url': reverse('estado_trabajo_ocr', args=[trabajo.id]),
+        'confirmar_url': reverse('confirmar_trabajo_ocr', args=[trabajo.id]),
+    }
+
+
+@login_required
+def crear_trabajo_ocr(request):
+    """Recibe una imagen y encola su OCR, devolviendo el id del trabajo"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
+    
+    tipo = request.POST.get('tipo', 'comprobante')
+    archivo = request.FILES.get('archivo')
+    if tipo not in dict(TrabajoOCR.TIPO_CHOICES):
+        return JsonResponse({'success': False, 'error': 'Tipo de trabajo inválido'}, status=400)
+    if not archivo:
+        return JsonResponse({'success': False, 'error': 'No se seleccionó ninguna imagen.'}, status=400)
+    if not puede_encolar(request.user):
+        return JsonResponse({
+            'success': False,
+            'error': 'Ya tienes varias imágenes en proceso. Espera a que terminen antes de subir otra.'
+        }, status=429)
+    
+    trabajo = crear_trabajo(request.user, tipo, archivo)
+    return JsonResponse({'success': True, 'trabajo': _trabajo_ocr_json(trabajo)}, status=202)
+
+
+@login_required
+def estado_trabajo_ocr(request, trabajo_id):
+    """Devuelve el estado y, si terminó, el resultado de un trabajo OCR"""
+    trabajo = get_object_or_404(TrabajoOCR, id=trabajo_id, usuario=request.user)
+    return JsonResponse({'success': True, 'trabajo': _trabajo_ocr_json(trabajo)})
+
+
+@login_required
+def confirmar_trabajo_ocr(request, trabajo_id):
+    """Guarda los gastos extraídos por un trabajo OCR completado"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
+    
+    trabajo = get_object_or_404(TrabajoOCR, id=trabajo_id, usuario=request.user)
+    
+    with transaction.atomic():
+        # Reclamar el trabajo antes de crear los gastos: si llega un doble envío (o se
+        # confirma desde dos pestañas) solo una de las peticiones pasa de 'completado'
+        if not TrabajoOCR.objects.filter(id=trabajo.id, estado='completado').update(estado='confirmado'):
+            trabajo.refresh_from_db(fields=['estado'])
+            return JsonResponse({
+                'success': False,
+                'error': f'El trabajo no se puede confirmar en estado "{trabajo.get_estado_display()}"'
+            }, status=409)
+        
+        respuesta, status = _confirmar_resultado(request, trabajo)
+        if not respuesta['success']:
+            # Devolver el trabajo a 'completado' para que se pueda corregir y reintentar
+            transaction.set_rollback(True)
+    
+    if respuesta['success'] and trabajo.gasto_id is None:
+        # La imagen del historial ya no se necesita una vez confirmados los gastos
+        trabajo.archivo.delete(save=False)
+    
+    return JsonResponse(respuesta, status=status)
+
+
+def _confirmar_resultado(request, trabajo):
+    """Crea o ajusta los gastos de un trabajo OCR ya reclamado; devuelve (respuesta, status)"""
+    perfil, created = PerfilUsuario.objects.get_or_create(user=request.user)
+    resultado = trabajo.resultado or {}
+    
+    if trabajo.tipo == 'historial':
+        gastos_extraidos = resultado.get('gastos', [])
+        
+        # Permitir confirmar solo algunos de los gastos extraídos (índices seleccionados)
+        seleccion = request.POST.getlist('seleccion')
+        if seleccion:
+            indices = {int(i) for i in seleccion if i.isdigit()}
+            gastos_extraidos = [g for i, g in enumerate(gastos_extraidos) if i in indices]
+        
+        importacion = importar_gastos(request.user, gastos_extraidos, descripcion_por_defecto='Gasto desde historial')
+        return {
+            'success': True,
+            'gastos_agregados': importacion['agregados'],
+            'gastos_rechazados': importacion['rechazados'],
+            'filas': [
+                {'indice': fila['indice'], 'estado': fila['estado'], 'motivo': fila['motivo'], 'gasto_id': fila.get('gasto_id')}
+                for fila in importacion['filas']
+            ],
+            'mensaje': f'Se procesaron {len(gastos_extraidos)} gastos. {importacion["agregados"]} agregados, {importacion["rechazados"]} rechazados.'
+        }, 200
+    
+    if not resultado.get('monto'):
+        return {'success': False, 'error': 'No se pudo extraer un monto del comprobante.'}, 200
+    
+    # El monto puede venir corregido por el usuario: validarlo igual que una fila importada
+    try:
+        descripcion, monto = normalizar_fila({
+            'descripcion': request.POST.get('descripcion') or 'Gasto desde comprobante',
+            'monto': request.POST.get('monto') or resultado['monto'],
+        })
+    except ValueError as e:
+        return {'success': False, 'error': str(e)}, 400
+    
+    if trabajo.gasto:
+        # Ajustar el gasto existente al monto leído del comprobante
+        gasto = trabajo.gasto
+        diferencia = monto - gasto.monto
+        if diferencia > 0 and diferencia > perfil.saldo_disponible:
+            return {
+                'success': False,
+                'error': f'Saldo insuficiente para el incremento. Disponible: ${perfil.saldo_disponible:.2f}'
+            }, 200
+        gasto.monto = monto
+        gasto.save()
+    else:
+        if monto > perfil.saldo_disponible:
+            return {
+                'success': False,
+                'error': f'Saldo insuficiente. Disponible: ${perfil.saldo_disponible:.2f}'
+            }, 200
+        gasto = Gasto.objects.create(usuario=request.user, descripcion=descripcion, monto=monto)
+    return {
+        'success': True,
+        'gasto': {'id': gasto.id, 'descripcion': gasto.descripcion, 'monto': str(gasto.monto)},
+        'mensaje': f'Gasto "{gasto.descripcion}" guardado por ${gasto.monto:.2f}'
+    }, 200
+
+
 # Quitar @login_required temporalmente para probar
 def index(request):
     if request.user.is_authenticated:
@@ -311,55 +527,37 @@ def index(request):
         if request.method == 'POST':
             # Manejar procesamiento de historial de MercadoPago
             if 'historial_submit' in request.POST:
+                es_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest' or 'application/json' in request.headers.get('Accept', '') or request.headers.get('Content-Type', '').startswith('multipart/form-data')
                 if 'historial_imagen' in request.FILES:
+                    if not puede_encolar(request.user):
+                        error = 'Ya tienes varias imágenes en proceso. Espera a que terminen antes de subir otra.'
+                        messages.warning(request, error)
+                        if es_ajax:
+                            return JsonResponse({'success': False, 'error': error}, status=429)
+                        return redirect('index')
+                    
                     try:
-                        imagen_historial = request.FILES['historial_imagen']
-                        gastos_extraidos = procesar_historial_mercadopago(imagen_historial)
-                        
-                        gastos_agregados = 0
-                        gastos_rechazados = 0
-                        
-                        for gasto_data in gastos_extraidos:
-                            # Validar que el gasto no exceda el saldo disponible
-                            if gasto_data['monto'] <= perfil.saldo_disponible:
-                                try:
-                                    gasto = Gasto(
-                                        usuario=request.user,
-                                        descripcion=gasto_data['descripcion'],
-                                        monto=gasto_data['monto']
-                                    )
-                                    gasto.save()
-                                    gastos_agregados += 1
-                                except Exception as save_error:
-                                    gastos_rechazados += 1
-                            else:
-                                gastos_rechazados += 1
-                        
-                        if gastos_agregados > 0:
-                            messages.success(request, f'Se agregaron {gastos_agregados} gastos del historial.')
-                        if gastos_rechazados > 0:
-                            messages.warning(request, f'{gastos_rechazados} gastos fueron rechazados por saldo insuficiente.')
+                        # El OCR se procesa en segundo plano; el cliente consulta el estado del trabajo
+                        trabajo = crear_trabajo(request.user, 'historial', request.FILES['historial_imagen'])
                         
-                        # Respuesta JSON para AJAX
-                        if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or 'application/json' in request.headers.get('Accept', '') or request.headers.get('Content-Type', '').startswith('multipart/form-data'):
-                            response_data = {
+                        if es_ajax:
+                            return JsonResponse({
                                 'success': True,
-                                'gastos_agregados': gastos_agregados,
-                                'gastos_rechazados': gastos_rechazados,
-                                'mensaje': f'Se procesaron {len(gastos_extraidos)} gastos. {gastos_agregados} agregados, {gastos_rechazados} rechazados por saldo insuficiente.'
-                            }
-                            return JsonResponse(response_data)
+                                'trabajo': _trabajo_ocr_json(trabajo),
+                                'mensaje': 'Historial recibido. Procesando la imagen...'
+                            })
+                        messages.info(request, 'Historial recibido. Los gastos estarán disponibles para confirmar en unos segundos.')
                         
                     except Exception as e:
                         messages.error(request, f'Error procesando historial: {str(e)}')
-                        if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or 'application/json' in request.headers.get('Accept', '') or request.headers.get('Content-Type', '').startswith('multipart/form-data'):
+                        if es_ajax:
                             return JsonResponse({
                                 'success': False,
                                 'error': f'Error procesando historial: {str(e)}'
                             })
                 else:
                     messages.error(request, 'No se seleccionó ninguna imagen.')
-                    if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or 'application/json' in request.headers.get('Accept', '') or request.headers.get('Content-Type', '').startswith('multipart/form-data'):
+                    if es_ajax:
                         return JsonResponse({
                             'success': False,
                             'error': 'No se seleccionó ninguna imagen.'
@@ -371,50 +569,83 @@ def index(request):
             elif 'tarjeta_credito_submit' in request.POST:
                 if 'tarjeta_pdf' in request.FILES:
                     try:
-                        from .utils import procesar_pdf_tarjeta_credito
+                        from .ocr import PDFDemasiadoLargo, procesar_movimientos_tarjeta, procesar_pdf_tarjeta_credito
+                        from .cache_ocr import con_cache
                         
+                        es_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
                         pdf_file = request.FILES['tarjeta_pdf']
-                        resultado = procesar_pdf_tarjeta_credito(pdf_file)
+                        aviso = ''
+                        try:
+                            extraccion = con_cache('tarjeta_movimientos', pdf_file, procesar_movimientos_tarjeta) or {}
+                        except PDFDemasiadoLargo as e:
+                            # Demasiado largo para leer cada compra dentro de la solicitud: queda el total
+                            extraccion = {}
+                            aviso = f' ({e}: se importó solo el total)'
+                        movimientos = extraccion.get('movimientos') or []
+                        # Sin compras reconocibles, el total se busca leyendo solo las primeras páginas
+                        resultado = None if movimientos else con_cache('tarjeta', pdf_file, procesar_pdf_tarjeta_credito)
                         
-                        if resultado:
-                            # Validar que el monto no exceda el saldo disponible
-                            if resultado['monto'] <= perfil.saldo_disponible:
-                                try:
-                                    gasto = Gasto(
-                                        usuario=request.user,
-                                        descripcion=resultado['descripcion'],
-                                        monto=resultado['monto']
-                                    )
-                                    gasto.save()
-                                    
-                                    messages.success(request, f'Estado de cuenta procesado. Total agregado: ${resultado["monto"]:.2f}')
-                                    
-                                    # Respuesta JSON para AJAX
-                                    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                                        return JsonResponse({
-                                            'success': True,
-                                            'total_agregado': float(resultado['monto']),
-                                            'descripcion': resultado['descripcion'],
-                                            'mensaje': f'Estado de cuenta procesado exitosamente. Total: ${resultado["monto"]:.2f}'
-                                        })
-                                    
-                                except Exception as save_error:
-                                    messages.error(request, f'Error al guardar el gasto: {str(save_error)}')
-                                    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                                        return JsonResponse({
-                                            'success': False,
-                                            'error': f'Error al guardar el gasto: {str(save_error)}'
-                                        })
+                        if movimientos:
+                            # Un gasto por compra (las cuotas, en el mes actual); los consumos en
+                            # dólares se informan pero no se importan (el saldo está en pesos)
+                            filas = filas_resumen_tarjeta(movimientos)
+                            importacion = importar_gastos(request.user, filas, con_fecha=True)
+                            en_dolares = len(movimientos) - len(filas)
+                            
+                            mensaje = f'Estado de cuenta procesado: {importacion["agregados"]} movimientos agregados'
+                            if importacion['rechazados']:
+                                mensaje += f', {importacion["rechazados"]} rechazados'
+                            if en_dolares:
+                                mensaje += f', {en_dolares} en dólares sin importar'
+                            if importacion['agregados']:
+                                messages.success(request, mensaje)
                             else:
-                                messages.error(request, f'Saldo insuficiente. Total del estado de cuenta: ${resultado["monto"]:.2f}, Disponible: ${perfil.saldo_disponible:.2f}')
-                                if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                                messages.error(request, mensaje)
+                            
+                            if es_ajax:
+                                return JsonResponse({
+                                    'success': importacion['agregados'] > 0,
+                                    'mensaje': mensaje,
+                                    'error': '' if importacion['agregados'] else mensaje,
+                                    'agregados': importacion['agregados'],
+                                    'rechazados': importacion['rechazados'],
+                                    'en_dolares': en_dolares,
+                                    'total_agregado': float(sum(
+                                        (f['monto'] for f in importacion['filas'] if f['estado'] == 'aceptado'), Decimal('0')
+                                    )),
+                                    'saldo_restante': float(importacion['saldo_restante']),
+                                    'movimientos': [
+                                        {**f, 'monto': float(f['monto']) if f['monto'] is not None else None}
+                                        for f in importacion['filas']
+                                    ],
+                                    'paginas': extraccion.get('paginas', []),
+                                    'segundos': extraccion.get('segundos'),
+                                })
+                        
+                        elif resultado:
+                            # Resumen sin filas reconocibles: se importa el total como un único gasto
+                            fila = importar_gastos(request.user, [resultado])['filas'][0]
+                            if fila['estado'] == 'aceptado':
+                                messages.success(request, f'Estado de cuenta procesado. Total agregado: ${fila["monto"]:.2f}{aviso}')
+                                
+                                # Respuesta JSON para AJAX
+                                if es_ajax:
                                     return JsonResponse({
-                                        'success': False,
-                                        'error': f'Saldo insuficiente. Total: ${resultado["monto"]:.2f}, Disponible: ${perfil.saldo_disponible:.2f}'
+                                        'success': True,
+                                        'total_agregado': float(fila['monto']),
+                                        'descripcion': fila['descripcion'],
+                                        'mensaje': f'Estado de cuenta procesado exitosamente. Total: ${fila["monto"]:.2f}{aviso}',
+                                        'paginas': extraccion.get('paginas', []),
+                                        'segundos': extraccion.get('segundos'),
                                     })
+                            else:
+                                error = f'{fila["motivo"]}. Total del estado de cuenta: ${resultado["monto"]:.2f}'
+                                messages.error(request, error)
+                                if es_ajax:
+                                    return JsonResponse({'success': False, 'error': error})
                         else:
                             messages.error(request, 'No se pudo extraer el total del PDF. Verifica que sea un estado de cuenta válido.')
-                            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                            if es_ajax:
                                 return JsonResponse({
                                     'success': False,
                                     'error': 'No se pudo extraer el total del PDF. Verifica que sea un estado de cuenta válido.'
@@ -451,11 +682,7 @@ def index(request):
                         return redirect('index')
                     
                     # Calcular gastos del mes actual
-                    now = datetime.now()
-                    mes_actual = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-                    total_gastos_mes = perfil.user.gasto_set.filter(
-                        fecha__gte=mes_actual
-                    ).aggregate(total=Sum('monto'))['total'] or Decimal('0')
+                    total_gastos_mes = perfil.get_total_gastos_mes()
                     
                     # Calcular nuevo salario mensual: saldo_deseado + gastos_actuales
                     nuevo_salario = nuevo_saldo + total_gastos_mes
@@ -501,36 +728,24 @@ def index(request):
         # Inicializar formulario de gastos
         gasto_form = GastoForm()
         
-        # Obtener gastos recientes del usuario con paginación
-        gastos_list = Gasto.objects.filter(usuario=request.user).order_by('-fecha')
-        
-        # Implementar paginación - los gastos más recientes aparecen en la página 1
-        page_number = request.GET.get('page', 1)
-        paginator = Paginator(gastos_list, 10)  # 10 gastos por página
-        gastos_recientes = paginator.get_page(page_number)
-        
-        # Mantener los primeros 5 para mostrar en el dashboard principal
-        gastos_dashboard = gastos_list[:5]
-        gastos = gastos_list
+        # Paginación por cursor (fecha, id) - los gastos más recientes aparecen en la página 1
+        gastos_recientes = paginar_gastos(request.user, request.GET)
         
         # Calcular total de gastos del mes actual
         total_mes_actual = perfil.get_total_gastos_mes()
         
         context = {
             'perfil': perfil,
-            'gastos': gastos,
             'gastos_recientes': gastos_recientes,
-            'gastos_dashboard': gastos_dashboard,
             'gasto_form': gasto_form,
             'saldo': perfil.saldo_disponible,
             'salario_configurado': perfil.salario_mensual > 0,
-            'total_gastos': gastos_list.count(),
+            'total_gastos': gastos_recientes.total,
             'total_mes_actual': total_mes_actual,
         }
     else:
         context = {
             'perfil': None,
-            'gastos': [],
             'gastos_recientes': [],
             'gasto_form': None,
             'saldo': 0,
@@ -539,6 +754,28 @@ def index(request):
         }
     return render(request, 'gastos/index.html', context)
 
+@login_required
+def pagina_gastos(request):
+    """Una página de la lista de gastos en JSON, para el scroll infinito del inicio"""
+    pagina = paginar_gastos(request.user, request.GET)
+    siguiente = None
+    if pagina.tiene_siguiente:
+        siguiente = f"{reverse('pagina_gastos')}?{pagina.consulta_siguiente}"
+    
+    return JsonResponse({
+        'pagina': pagina.numero,
+        'paginas': pagina.paginas,
+        'total': pagina.total,
+        'siguiente': siguiente,
+        'gastos': [{
+            'id': gasto.id,
+            'descripcion': gasto.descripcion,
+            'monto': str(gasto.monto),
+            'fecha': timezone.localtime(gasto.fecha).isoformat()
+        } for gasto in pagina],
+        'html': render_to_string('gastos/lista_gastos.html', {'gastos': pagina}, request=request)
+    })
+
 @login_required
 def actualizar_salario(request):
     perfil, created = PerfilUsuario.objects.get_or_create(user=request.user)
@@ -559,29 +796,17 @@ def actualizar_salario(request):
                 gasto = gasto_form.save(commit=False)
                 gasto.usuario = request.user
                 
-                # Si hay una imagen, extraer datos con OCR
-                if gasto.imagen_comprobante:
-                    try:
-                        datos_ocr = extraer_datos_imagen(gasto.imagen_comprobante)
-                        if datos_ocr:
-                            # Si no se proporcionó monto, usar el del OCR
-                            if not gasto.monto and datos_ocr.get('monto'):
-                                gasto.monto = datos_ocr['monto']
-                            
-                            # Si se extrajo fecha, usar la del OCR
-                            if datos_ocr.get('fecha'):
-                                gasto.fecha = datos_ocr['fecha']
-                            
-                            messages.info(request, f'Datos extraídos de la imagen - Monto: ${datos_ocr.get("monto", "N/A")}, Fecha: {datos_ocr.get("fecha", "N/A")}')
-                    except Exception as e:
-                        messages.warning(request, f'No se pudieron extraer datos de la imagen: {str(e)}')
-                
                 # Validar saldo suficiente
                 if gasto.monto > perfil.saldo_disponible:
                     messages.error(request, f'Saldo insuficiente. Disponible: ${perfil.saldo_disponible:.2f}')
                 else:
                     gasto.save()
                     messages.success(request, f'Gasto "{gasto.descripcion}" agregado. Saldo restante: ${perfil.saldo_disponible:.2f}')
+                    
+                    # Si hay una imagen, extraer datos con OCR en segundo plano
+                    if gasto.imagen_comprobante and puede_encolar(request.user):
+                        crear_trabajo(request.user, 'comprobante', gasto.imagen_comprobante.name, gasto=gasto)
+                        messages.info(request, 'Procesando el comprobante. Podrás revisar los datos extraídos en unos segundos.')
                 
                 return redirect('actualizar_salario')
     
@@ -612,23 +837,6 @@ def agregar_gasto(request):
             gasto = form.save(commit=False)
             gasto.usuario = request.user
             
-            # Si hay una imagen, extraer datos con OCR
-            if gasto.imagen_comprobante:
-                try:
-                    datos_ocr = extraer_datos_imagen(gasto.imagen_comprobante)
-                    if datos_ocr:
-                        # Si no se proporcionó monto, usar el del OCR
-                        if not gasto.monto and datos_ocr.get('monto'):
-                            gasto.monto = datos_ocr['monto']
-                        
-                        # Si se extrajo fecha, usar la del OCR
-                        if datos_ocr.get('fecha'):
-                            gasto.fecha = datos_ocr['fecha']
-                        
-                        messages.info(request, f'Datos extraídos de la imagen - Monto: ${datos_ocr.get("monto", "N/A")}, Fecha: {datos_ocr.get("fecha", "N/A")}')
-                except Exception as e:
-                    messages.warning(request, f'No se pudieron extraer datos de la imagen: {str(e)}')
-            
             # Validar saldo suficiente
             if gasto.monto > perfil.saldo_disponible:
                 messages.error(request, f'Saldo insuficiente. Disponible: ${perfil.saldo_disponible:.2f}')
@@ -636,8 +844,10 @@ def agregar_gasto(request):
             
             gasto.save()
             
-            # Procesar gamificación después de agregar gasto
-            procesar_gamificacion_usuario(request.user)
+            # Si hay una imagen, extraer datos con OCR en segundo plano
+            if gasto.imagen_comprobante and puede_encolar(request.user):
+                crear_trabajo(request.user, 'comprobante', gasto.imagen_comprobante.name, gasto=gasto)
+                messages.info(request, 'Procesando el comprobante. Podrás revisar los datos extraídos en unos segundos.')
             
             messages.success(request, 'Gasto agregado exitosamente')
             return redirect('index')
@@ -699,30 +909,35 @@ def editar_gasto(request):
 
 @login_required
 def dashboard(request):
-    perfil, created = PerfilUsuario.objects.get_or_create(user=request.user)
-    
+    # El contexto se recalcula solo cuando cambian los datos del usuario (ver cache_vistas)
+    context = contexto_en_cache('dashboard', request.user, lambda: _contexto_dashboard(request.user))
+    return render(request, 'dashboard.html', context)
 
+
+def _contexto_dashboard(usuario):
+    perfil, created = PerfilUsuario.objects.get_or_create(user=usuario)
     
-    # Verificar metas vencidas y obtener estadísticas de ahorro
-    verificar_metas_vencidas(request.user)
-    estadisticas_ahorro = obtener_estadisticas_ahorro_usuario(request.user)
+    # Estadísticas de ahorro (las metas vencidas las cancela la tarea diaria)
+    estadisticas_ahorro = obtener_estadisticas_ahorro_usuario(usuario)
     
-    # Gastos por mes con detalles
-    gastos_por_mes = Gasto.objects.filter(usuario=request.user).annotate(
-        mes=TruncMonth('fecha')
-    ).values('mes').annotate(
-        total=Sum('monto')
-    ).order_by('mes')
+    # Gastos por mes desde los acumulados mensuales (una sola consulta, evaluada una vez)
+    gastos_por_mes = [
+        {'mes': date(item['año'], item['mes'], 1), 'total': item['total_gastos']}
+        for item in BalanceMensual.objects.filter(
+            usuario=usuario,
+            cantidad_gastos__gt=0
+        ).order_by('año', 'mes').values('año', 'mes', 'total_gastos')
+    ]
     
     # Gastos del mes actual
     from datetime import datetime
     mes_actual = datetime.now().replace(day=1)
     gastos_mes_actual = Gasto.objects.filter(
-        usuario=request.user,
+        usuario=usuario,
         fecha__gte=mes_actual
     )
     
-    total_mes_actual = gastos_mes_actual.aggregate(Sum('monto'))['monto__sum'] or Decimal('0')
+    total_mes_actual = perfil.get_total_gastos_mes()
     
     # Saldo restante del mes
     saldo_restante = perfil.salario_mensual - total_mes_actual
@@ -757,14 +972,14 @@ def dashboard(request):
     if fines_semana_restantes == 0:
         fines_semana_restantes = 1
         
-    gasto_por_finde = saldo_restante / fines_semana_restantes if saldo_restante > 0 else 0
+    gasto_por_finde = saldo_restante / Decimal(str(fines_semana_restantes)) if saldo_restante > 0 else 0
     
     # Verificar si se acerca al límite (200,000 pesos restantes)
     advertencia_limite = saldo_restante <= 200000 and saldo_restante > 0
     
     # Obtener vencimientos próximos (dentro de 3 días)
     vencimientos_proximos = Vencimiento.objects.filter(
-        usuario=request.user,
+        usuario=usuario,
         activo=True
     ).filter(
         fecha_vencimiento__gte=datetime.now().date(),
@@ -781,20 +996,18 @@ def dashboard(request):
         totales_data.append(float(item['total'] or 0))
         saldos_data.append(float(perfil.salario_mensual - (item['total'] or Decimal('0'))))
     
-    # Preparar datos para el calendario - organizar gastos por mes y día
-    todos_los_gastos = Gasto.objects.filter(usuario=request.user).order_by('fecha')
-    gastos_calendario = {}
-    
-    for gasto in todos_los_gastos:
-        mes_key = gasto.fecha.strftime('%Y-%m')
-        if mes_key not in gastos_calendario:
-            gastos_calendario[mes_key] = []
-        
-        gastos_calendario[mes_key].append({
-            'fecha': gasto.fecha.isoformat(),
-            'descripcion': gasto.descripcion,
-            'monto': str(gasto.monto)
-        })
+    # Gastos diarios de los últimos 30 días desde los acumulados diarios
+    hace_30_dias = hoy - timedelta(days=29)
+    totales_diarios = dict(BalanceDiario.objects.filter(
+        usuario=usuario,
+        fecha__gte=hace_30_dias
+    ).values_list('fecha', 'total_gastos'))
+    dias_labels = []
+    dias_data = []
+    for i in range(30):
+        dia = hace_30_dias + timedelta(days=i)
+        dias_labels.append(dia.strftime('%d/%m'))
+        dias_data.append(float(totales_diarios.get(dia, 0)))
     
     # Crear historial simple para los últimos 6 meses
     historial_simple = []
@@ -804,7 +1017,7 @@ def dashboard(request):
     ]
     
     # Obtener los últimos 6 meses de datos
-    ultimos_6_meses = gastos_por_mes[-6:] if len(gastos_por_mes) >= 6 else gastos_por_mes
+    ultimos_6_meses = gastos_por_mes[-6:]
     
     total_gastos_periodo = 0
     mes_mayor_gasto = {'mes': '', 'total': 0}
@@ -845,12 +1058,13 @@ def dashboard(request):
         'saldo_restante': saldo_restante,
         'gasto_por_finde': gasto_por_finde,
         'advertencia_limite': advertencia_limite,
-        'vencimientos_proximos': vencimientos_proximos,
+        'vencimientos_proximos': list(vencimientos_proximos),
         'meses_labels': json.dumps(meses_labels),
         'totales_data': json.dumps(totales_data),
         'saldos_data': json.dumps(saldos_data),
-        'gastos_recientes': gastos_mes_actual.order_by('-fecha')[:10],
-        'gastos_json': json.dumps(gastos_calendario),
+        'dias_labels': json.dumps(dias_labels),
+        'dias_data': json.dumps(dias_data),
+        'gastos_recientes': list(gastos_mes_actual.order_by('-fecha')[:10]),
         'historial_simple': historial_simple,
         'promedio_mensual': promedio_mensual,
         'mes_mayor_gasto': mes_mayor_gasto['mes'],
@@ -859,7 +1073,79 @@ def dashboard(request):
         'estadisticas_ahorro': estadisticas_ahorro,
     }
     
-    return render(request, 'dashboard.html', context)
+    return context
+
+def _mes_calendario(request):
+    """Obtiene (año, mes) de los parámetros GET, por defecto el mes actual"""
+    hoy = timezone.localdate()
+    try:
+        año = int(request.GET.get('year', hoy.year))
+        mes = int(request.GET.get('month', hoy.month))
+    except (TypeError, ValueError):
+        return hoy.year, hoy.month
+    if not 1 <= mes <= 12 or not 1900 <= año <= 9999:
+        return hoy.year, hoy.month
+    return año, mes
+
+
+def _balance_calendario(request):
+    """Fila del balance mensual usada para validar la caché del calendario"""
+    año, mes = _mes_calendario(request)
+    return BalanceMensual.objects.filter(
+        usuario_id=request.user.id, año=año, mes=mes
+    ).values('total_gastos', 'cantidad_gastos', 'fecha_actualizacion').first()
+
+
+def _etag_calendario(request):
+    año, mes = _mes_calendario(request)
+    balance = _balance_calendario(request)
+    if balance is None:
+        return f'{request.user.id}-{año}-{mes}-vacio'
+    return f"{request.user.id}-{año}-{mes}-{balance['cantidad_gastos']}-{balance['total_gastos']}-{balance['fecha_actualizacion'].timestamp()}"
+
+
+def _last_modified_calendario(request):
+    balance = _balance_calendario(request)
+    return balance['fecha_actualizacion'] if balance else None
+
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_etag_calendario, last_modified_func=_last_modified_calendario)
+def datos_calendario(request):
+    """Devuelve los gastos de un mes agrupados por día para el calendario del dashboard"""
+    año, mes = _mes_calendario(request)
+    inicio_mes = timezone.make_aware(datetime(año, mes, 1))
+    inicio_siguiente = timezone.make_aware(datetime(año + 1, 1, 1) if mes == 12 else datetime(año, mes + 1, 1))
+    
+    gastos_mes = Gasto.objects.filter(
+        usuario=request.user,
+        fecha__gte=inicio_mes,
+        fecha__lt=inicio_siguiente
+    ).order_by('fecha').values('id', 'descripcion', 'monto', 'fecha')
+    
+    dias = {}
+    total_mes = Decimal('0')
+    for gasto in gastos_mes:
+        fecha = timezone.localtime(gasto['fecha'])
+        dia = dias.setdefault(fecha.day, {'total': Decimal('0'), 'gastos': []})
+        dia['total'] += gasto['monto']
+        dia['gastos'].append({
+            'id': gasto['id'],
+            'fecha': fecha.isoformat(),
+            'descripcion': gasto['descripcion'],
+            'monto': str(gasto['monto'])
+        })
+        total_mes += gasto['monto']
+    
+    for dia in dias.values():
+        dia['total'] = str(dia['total'])
+    
+    return JsonResponse({
+        'mes': f'{año}-{mes:02d}',
+        'total': str(total_mes),
+        'dias': dias
+    })
 
 @login_required
 def perfil(request):
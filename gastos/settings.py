@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,6 +43,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'gastitos.instrumentacion.MedicionVistasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,7 +57,7 @@ ROOT_URLCONF = 'gastos.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'gastitos.instrumentacion.PlantillasMedidas',  # DjangoTemplates que mide el render
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -125,6 +127,36 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Caché de contexto del dashboard y el modo ahorro por versión de datos del usuario
+# (ver gastitos/cache_vistas.py). Con varios procesos, cada uno tiene su propia caché en
+# memoria; FileBasedCache la comparte entre procesos de la misma máquina.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'gastitos',
+    }
+}
+
+# Archivo columnar de los gastos de meses cerrados (ver gastitos/archivo_gastos.py)
+ARCHIVO_GASTOS_DIR = BASE_DIR / 'archivo_gastos'
+
+# OCR en segundo plano (pool local de procesos, sin broker externo)
+OCR_WORKERS = 2
+OCR_MAX_TRABAJOS_POR_USUARIO = 5
+OCR_IDIOMAS = 'spa+eng'  # Se usan solo los idiomas instalados en Tesseract
+OCR_MAX_GASTOS_HISTORIAL = 200  # Gastos que se extraen como máximo de una captura del historial
+OCR_HILOS_POR_IMAGEN = None  # Franjas reconocidas en paralelo e instancias de Tesseract por proceso (None: hasta 4 según los núcleos)
+OCR_LIBTESSERACT = None  # Ruta de libtesseract para el OCR dentro del proceso (None: buscarla en el sistema)
+OCR_CACHE_MAX_ENTRADAS = 1000  # Resultados de OCR/PDF guardados por hash; se descartan los menos usados
+OCR_CACHE_PODAR_CADA = 50  # Guardados por proceso entre podas de la caché (además de la tarea diaria)
+PDF_PROCESOS = None  # Procesos para extraer en paralelo las páginas de un resumen largo (None: hasta 4 según los núcleos)
+PDF_MAX_PAGINAS = 60  # Páginas que se leen como máximo de un PDF subido (los resúmenes más largos se rechazan)
+PDF_SEGUNDOS_MAXIMOS = 20  # Tiempo máximo de lectura de un PDF dentro de la solicitud
+
+# Medición de vistas (ver gastitos/instrumentacion.py y staff/instrumentacion/)
+INSTRUMENTACION_MAX_MUESTRAS = 5000  # Últimos requests que se guardan para los percentiles
+INSTRUMENTACION_TOKEN = os.environ.get('INSTRUMENTACION_TOKEN')  # Bearer para que Prometheus lea sin sesión de staff
+
 # Login/Logout configuration
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'